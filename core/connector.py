@@ -61,6 +61,9 @@ class Connector:
             def __getattribute__(*args):
                 attr = getattr(self.obj, args[1])
                 if isinstance(attr, InterfaceMethod):
+                    # Not overloaded interface methods fall back to their default implementation
+                    if not attr.registered:
+                        return attr
                     return attr[self.interface]
                 else:
                     return attr
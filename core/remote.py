@@ -27,6 +27,7 @@ from qtpy.QtCore import QObject
 from urllib.parse import urlparse
 import ssl
 from .util.models import DictTableModel, ListTableModel
+from .util.network import share_array, release_shared_array
 import rpyc
 from rpyc.utils.server import ThreadedServer
 rpyc.core.protocol.DEFAULT_CONFIG['allow_pickle'] = True
@@ -91,12 +92,18 @@ class RemoteObjectManager(QObject):
                 """ code that runs when a connection is created
                     (to init the service, if needed)
                 """
+                # shared memory segments handed out to this client and not released yet
+                self._shared_array_names = set()
                 logger.info('Client connected!')
 
             def on_disconnect(self, conn):
                 """ code that runs when the connection has already closed
                     (to finalize the service, if needed)
                 """
+                # free the segments the client did not release (e.g. lost connection)
+                for name in self._shared_array_names:
+                    release_shared_array(name)
+                self._shared_array_names.clear()
                 logger.info('Client disconnected!')
 
             def exposed_getModule(self, name):
@@ -121,6 +128,28 @@ class RemoteObjectManager(QObject):
                     else:
                         logger.error('Client requested a module that is not shared.')
                         return None
+
+            def exposed_share_array(self, array, client_host=None, allow_socket=False):
+                """ Hand out a numpy array via shared memory or as raw buffer (see netobtain).
+
+                  @param numpy.ndarray array: array to transfer
+                  @param str client_host: host name of the client
+                  @param bool allow_socket: whether the client accepts a raw buffer socket
+
+                  @return tuple: array descriptor
+                """
+                descriptor = share_array(array, client_host, allow_socket)
+                if descriptor is not None and descriptor[0] == 'shm':
+                    self._shared_array_names.add(descriptor[3])
+                return descriptor
+
+            def exposed_release_array(self, name):
+                """ Free a shared memory segment after the client copied the array.
+
+                  @param str name: name of the shared memory segment
+                """
+                self._shared_array_names.discard(name)
+                release_shared_array(name)
         return RemoteModuleService
 
     def createServer(self, hostname, port, certfile=None, keyfile=None, cacertfile=None):
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+This file contains a histogram that can be updated incrementally.
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import numpy as np
+
+
+class IncrementalHistogram:
+    """
+    Histogram with a fixed number of equally wide bins that is updated by adding and removing
+    values instead of being recalculated from all data.
+
+    The range of the histogram starts at <origin> and is chosen to fit the first values added, or
+    the bin width is fixed from the start (e.g. bins of width 1 centered on integer counts). Values
+    outside the current range extend the range by doubling the bin width (merging pairs of
+    neighbouring bins), so the counts never need to be recalculated from the data. Percentiles are
+    read from the cumulative counts in O(number_of_bins) and coarser histograms are made on demand
+    by merging neighbouring bins (see rebin).
+
+    Usage example:
+
+        histogram = IncrementalHistogram(number_of_bins=1024)
+        histogram.add(image[image != 0])
+        low, high = histogram.percentile_range(1, 99)
+    """
+
+    def __init__(self, number_of_bins=1024, origin=0.0, bin_width=None):
+        """
+        @param int number_of_bins: number of bins (rounded up to an even number)
+        @param float origin: lower edge of the histogram range until a smaller value is added
+        @param float bin_width: optional, fixed bin width until values outside of the range
+                                origin + [0, number_of_bins] * bin_width are added. By default the
+                                bin width is chosen to fit the first values added.
+        """
+        number_of_bins = max(2, int(number_of_bins))
+        self.number_of_bins = number_of_bins + number_of_bins % 2
+        self.counts = np.zeros(self.number_of_bins, dtype='int64')
+        self.origin = float(origin)
+        self.low = self.origin
+        self._initial_bin_width = float(bin_width) if bin_width else 0.0
+        self.bin_width = self._initial_bin_width
+
+    @property
+    def total(self):
+        """
+        Number of values in the histogram.
+        """
+        return int(self.counts.sum())
+
+    @property
+    def high(self):
+        """
+        Upper edge of the histogram range.
+        """
+        return self.low + self.number_of_bins * self.bin_width
+
+    @property
+    def bin_edges(self):
+        return self.low + np.arange(self.number_of_bins + 1) * self.bin_width
+
+    def clear(self):
+        """
+        Remove all values and reset the range.
+        """
+        self.counts[:] = 0
+        self.low = self.origin
+        self.bin_width = self._initial_bin_width
+
+    def add(self, values):
+        """
+        Add values to the histogram. Non-finite values are ignored.
+
+        @param numpy.ndarray values: values to add
+        """
+        indices = self._bin_indices(values, extend_range=True)
+        if indices.size > 0:
+            self.counts += np.bincount(indices, minlength=self.number_of_bins)
+
+    def remove(self, values):
+        """
+        Remove values previously added to the histogram. Non-finite values are ignored.
+
+        @param numpy.ndarray values: values to remove
+        """
+        indices = self._bin_indices(values, extend_range=False)
+        if indices.size > 0:
+            self.counts -= np.bincount(indices, minlength=self.number_of_bins)
+            # Guard against values that have not been added before
+            np.maximum(self.counts, 0, out=self.counts)
+
+    def percentile_range(self, low_percentile, high_percentile):
+        """
+        Range of values between two percentiles, quantized to the bin edges: the lower edge of the
+        bin holding the low percentile and the upper edge of the bin holding the high percentile.
+
+        @param float low_percentile: lower percentile (0..100)
+        @param float high_percentile: upper percentile (0..100)
+
+        @return tuple: (low value, high value), None if the histogram is empty
+        """
+        cumulative = np.cumsum(self.counts)
+        total = cumulative[-1]
+        if total == 0:
+            return None
+        ranks = [max(int(np.ceil(total * min(max(percentile, 0), 100) / 100)), 1)
+                 for percentile in (low_percentile, high_percentile)]
+        low_bin, high_bin = np.searchsorted(cumulative, ranks, side='left')
+        return self.low + low_bin * self.bin_width, self.low + (high_bin + 1) * self.bin_width
+
+    def rebin(self, number_of_bins=None):
+        """
+        Bin edges and counts of the occupied part of the histogram (first to last non-empty bin),
+        with groups of neighbouring bins merged to get at most number_of_bins bins.
+
+        @param int number_of_bins: optional, maximum number of bins. By default all bins of the
+                                   occupied part are returned.
+
+        @return tuple(numpy.ndarray, numpy.ndarray): bin edges and counts (no counts and a single
+                                                     edge if the histogram is empty)
+        """
+        occupied = np.flatnonzero(self.counts)
+        if occupied.size == 0:
+            return np.array([self.low]), np.zeros(0, dtype='int64')
+        first, stop = occupied[0], occupied[-1] + 1
+        factor = 1
+        if number_of_bins is not None and number_of_bins > 0:
+            factor = max(int(np.ceil((stop - first) / int(number_of_bins))), 1)
+        size = int(np.ceil((stop - first) / factor))
+        counts = np.zeros(size * factor, dtype='int64')
+        counts[:stop - first] = self.counts[first:stop]
+        counts = counts.reshape(size, factor).sum(axis=1)
+        bin_edges = self.low + (first + np.arange(size + 1) * factor) * self.bin_width
+        return bin_edges, counts
+
+    def _bin_indices(self, values, extend_range):
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[np.isfinite(values)]
+        if values.size == 0:
+            return np.zeros(0, dtype=int)
+        if extend_range:
+            self._extend_range(values.min(), values.max())
+        elif self.bin_width == 0:
+            return np.zeros(0, dtype=int)
+        indices = np.floor((values - self.low) / self.bin_width).astype(int)
+        # Values on the upper edge belong to the last bin
+        return np.clip(indices, 0, self.number_of_bins - 1)
+
+    def _extend_range(self, min_value, max_value):
+        if self.bin_width == 0:
+            # First values: choose the range to start at the origin (or the minimum value)
+            self.low = min(self.low, min_value)
+            span = max_value - self.low
+            self.bin_width = span / self.number_of_bins if span > 0 else 1.0
+            return
+        half = self.number_of_bins // 2
+        while max_value > self.high:
+            merged = self.counts.reshape(half, 2).sum(axis=1)
+            self.counts[:half] = merged
+            self.counts[half:] = 0
+            self.bin_width *= 2
+        while min_value < self.low:
+            merged = self.counts.reshape(half, 2).sum(axis=1)
+            self.counts[half:] = merged
+            self.counts[:half] = 0
+            self.low -= self.number_of_bins * self.bin_width
+            self.bin_width *= 2
@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+"""
+This file contains a non-blocking watcher detecting the end of motions of motor and magnet stages.
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import time
+import numpy as np
+from concurrent.futures import Future
+from qtpy import QtCore
+
+from core.util.mutex import Mutex
+
+
+class _MotionWatch:
+    """ State of a single watched motion. """
+
+    def __init__(self, device, axes, target, velocities, tolerance, deadline, progress_callback,
+                 max_interval):
+        self.device = device
+        self.axes = axes
+        self.target = target
+        self.velocities = velocities
+        self.tolerance = tolerance
+        self.deadline = deadline
+        self.progress_callback = progress_callback
+        self.max_interval = max_interval
+        self.future = Future()
+        self.due = 0.0
+        self.backoff = 0.0
+        self.stopped_before = False
+
+
+class MotionCompletionWatcher(QtCore.QObject):
+    """
+    Detects the end of motions of devices implementing the get_status/get_pos methods of the
+    MotorInterface or MagnetInterface without blocking the calling thread.
+
+    watch() returns a concurrent.futures.Future which is resolved with the final position dict
+    of the device as soon as the motion has finished, i.e. if all watched axes reported a status
+    not in moving_states on two consecutive polls or if the position is within the tolerance of
+    the target. Completion callbacks are attached with future.add_done_callback and are called in
+    the thread of the watcher.
+
+    All watches share a single timer. The poll interval of each watch adapts to the motion: if
+    the target and the axis velocities are known, the next poll is scheduled for the expected
+    arrival (remaining distance / velocity of the slowest axis), otherwise the interval grows
+    exponentially. Both are clipped to [min_interval, max_interval]. Devices watched by several
+    watches at once are queried only once per poll.
+
+    The watcher must be created in the thread the callbacks should be called in (usually the
+    thread of the logic module), watch() can be called from any thread.
+
+    Usage example:
+
+        self._motion_watcher = MotionCompletionWatcher(max_interval=1.0, parent=self)
+        self._motor.move_abs({'x': 1e-3})
+        future = self._motion_watcher.watch(self._motor, target={'x': 1e-3})
+        future.add_done_callback(self._move_finished)
+    """
+    # Status codes of an axis meaning the axis is moving. 1 and -1 are used by the magnet stages,
+    # 2 by motors reporting backward motions separately.
+    moving_states = (1, -1, 2)
+
+    _sigScheduleRequested = QtCore.Signal()
+
+    def __init__(self, min_interval=0.02, max_interval=1.0, parent=None):
+        """
+        @param float min_interval: shortest interval between two polls of a device in s
+        @param float max_interval: longest interval between two polls of a device in s
+        @param QObject parent: optional Qt parent object
+        """
+        super().__init__(parent)
+        self._lock = Mutex()
+        self._watches = list()
+        self._min_interval = 0.0
+        self._max_interval = 0.0
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._poll)
+        # Decouple the timer from calls of watch() in other threads
+        self._sigScheduleRequested.connect(self._schedule)
+
+    @property
+    def min_interval(self):
+        return self._min_interval
+
+    @min_interval.setter
+    def min_interval(self, interval):
+        self._min_interval = max(float(interval), 0.001)
+        self._max_interval = max(self._max_interval, self._min_interval)
+
+    @property
+    def max_interval(self):
+        return self._max_interval
+
+    @max_interval.setter
+    def max_interval(self, interval):
+        self._max_interval = max(float(interval), self._min_interval)
+
+    @property
+    def active(self):
+        """
+        True if any motion is watched.
+        """
+        with self._lock:
+            return any(not watch.future.done() for watch in self._watches)
+
+    def watch(self, device, target=None, axes=None, velocities=None, tolerance=None, timeout=None,
+              progress_callback=None, max_interval=None):
+        """
+        Watch a device until its current motion has finished.
+
+        @param object device: device (or interfuse) with get_status and get_pos methods
+        @param dict target: optional, {axis label: target position} of the motion. Used for the
+                            adaptive poll interval and the tolerance.
+        @param list axes: optional, axis labels to watch. Defaults to the axes of the target or
+                          to all axes of the device.
+        @param dict velocities: optional, {axis label: velocity} of the motion. Queried by
+                                get_velocity of the device if omitted and a target is given.
+        @param float tolerance: optional, the motion is finished as soon as the euclidean distance
+                                to the target is smaller, even if the device still reports moving
+        @param float timeout: optional, fail with a TimeoutError after this time in s
+        @param callable progress_callback: optional, called with the position dict on each poll
+        @param float max_interval: optional, longest poll interval of this watch in s (e.g. to
+                                   log the position during the motion with progress_callback)
+
+        @return concurrent.futures.Future: resolved with the final position dict of the device
+        """
+        if target is not None:
+            target = dict(target)
+            if axes is None:
+                axes = list(target)
+            if velocities is None:
+                velocities = self._query_velocities(device, list(target))
+        if velocities is not None:
+            velocities = {axis: abs(float(vel)) for axis, vel in velocities.items()
+                          if vel is not None and np.isfinite(vel) and vel != 0}
+        now = time.monotonic()
+        watch = _MotionWatch(device=device,
+                             axes=None if axes is None else list(axes),
+                             target=target,
+                             velocities=velocities if velocities else None,
+                             tolerance=tolerance,
+                             deadline=None if timeout is None else now + timeout,
+                             progress_callback=progress_callback,
+                             max_interval=max_interval)
+        # give the device a moment to start the motion before the first poll
+        watch.due = now + self._min_interval
+        watch.backoff = self._min_interval
+        with self._lock:
+            self._watches.append(watch)
+        self._sigScheduleRequested.emit()
+        return watch.future
+
+    def cancel_all(self, device=None):
+        """
+        Cancel all watches (of a device). Done callbacks are called with the cancelled futures.
+
+        @param object device: optional, only cancel the watches of this device
+        """
+        with self._lock:
+            watches = [watch for watch in self._watches if device is None or watch.device is device]
+        for watch in watches:
+            watch.future.cancel()
+        self._sigScheduleRequested.emit()
+
+    def _schedule(self):
+        """
+        Start the timer for the next due watch.
+        """
+        with self._lock:
+            self._watches = [watch for watch in self._watches if not watch.future.done()]
+            if not self._watches:
+                self._timer.stop()
+                return
+            due = min(watch.due for watch in self._watches)
+        delay = max(due - time.monotonic(), 0.0)
+        self._timer.start(int(round(delay * 1000)))
+
+    def _poll(self):
+        """
+        Query all devices with due watches and resolve the watches of finished motions.
+        """
+        now = time.monotonic()
+        with self._lock:
+            due_watches = [watch for watch in self._watches
+                           if not watch.future.done() and watch.due <= now + 0.001]
+        # group the watches by device to query each device only once
+        devices = list()
+        for watch in due_watches:
+            if not any(device is watch.device for device, _ in devices):
+                devices.append((watch.device, [w for w in due_watches if w.device is watch.device]))
+
+        for device, watches in devices:
+            axes = self._union_of_axes(watches)
+            try:
+                status = device.get_status() if axes is None else device.get_status(axes)
+                position = None
+                if any(w.target is not None or w.progress_callback is not None for w in watches):
+                    position = device.get_pos() if axes is None else device.get_pos(axes)
+            except Exception as e:
+                for watch in watches:
+                    if watch.future.set_running_or_notify_cancel():
+                        watch.future.set_exception(e)
+                continue
+            now = time.monotonic()
+            for watch in watches:
+                self._update_watch(watch, status, position, now)
+        self._schedule()
+
+    def _update_watch(self, watch, status, position, now):
+        if watch.progress_callback is not None and position is not None:
+            watch.progress_callback(position)
+
+        moving = self._is_moving(status, watch.axes)
+        remaining = self._remaining_distance(watch, position)
+        reached = (watch.tolerance is not None and remaining is not None and
+                   np.sqrt(np.sum(np.square(list(remaining.values())))) <= watch.tolerance)
+        # a single idle status may be read before the device started moving
+        if reached or (not moving and watch.stopped_before):
+            if watch.future.set_running_or_notify_cancel():
+                watch.future.set_result(position if position is not None else dict())
+            return
+        if watch.deadline is not None and now >= watch.deadline:
+            if watch.future.set_running_or_notify_cancel():
+                watch.future.set_exception(
+                    TimeoutError('Motion of {0} did not finish in time.'.format(watch.device)))
+            return
+        watch.stopped_before = not moving
+
+        times = list()
+        if remaining is not None and watch.velocities is not None:
+            times = [abs(remaining[axis]) / watch.velocities[axis]
+                     for axis in remaining if axis in watch.velocities]
+        if not moving:
+            interval = self._min_interval
+        elif times:
+            # poll again when the slowest axis is expected to arrive
+            interval = max(times)
+        else:
+            watch.backoff = min(2 * watch.backoff, self._max_interval)
+            interval = watch.backoff
+        max_interval = self._max_interval
+        if watch.max_interval is not None:
+            max_interval = min(max_interval, watch.max_interval)
+        watch.due = now + min(max(interval, self._min_interval), max_interval)
+
+    def _is_moving(self, status, axes):
+        if not isinstance(status, dict):
+            return self._status_code(status) in self.moving_states
+        labels = status if axes is None else [axis for axis in axes if axis in status]
+        return any(self._status_code(status[axis]) in self.moving_states for axis in labels)
+
+    @staticmethod
+    def _status_code(status):
+        # status of an axis is either the status number or a tuple (number, description dict)
+        if isinstance(status, (tuple, list)):
+            status = status[0] if len(status) > 0 else 0
+        try:
+            return int(status)
+        except (TypeError, ValueError):
+            return 0
+
+    @staticmethod
+    def _remaining_distance(watch, position):
+        if watch.target is None or not isinstance(position, dict):
+            return None
+        remaining = {axis: watch.target[axis] - position[axis]
+                     for axis in watch.target if axis in position}
+        return remaining if remaining else None
+
+    @staticmethod
+    def _union_of_axes(watches):
+        axes = list()
+        for watch in watches:
+            if watch.axes is None:
+                return None
+            axes.extend(axis for axis in watch.axes if axis not in axes)
+        return axes
+
+    @staticmethod
+    def _query_velocities(device, axes):
+        try:
+            velocities = device.get_velocity(axes)
+        except Exception:
+            return None
+        return velocities if isinstance(velocities, dict) else None
@@ -19,14 +19,248 @@ Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
 top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
 """
 
+import mmap
+import os
+import socket
+import ssl
+import threading
+import numpy as np
 import rpyc.core.netref
 import rpyc.utils.classic
 
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    # Python < 3.8. Arrays are transferred via socket instead.
+    shared_memory = None
+
+# shared memory segments handed out by this process (as server), by segment name
+_shared_arrays = dict()
+
+# timeout in seconds for the raw buffer socket transfer
+RAW_SOCKET_TIMEOUT = 10
+
 
 def netobtain(obj):
-    """
+    """ Get a local copy of obj if it is a rpyc remote object.
+
+    NumPy arrays are transferred via shared memory if the remote qudi instance runs on the same
+    host and via a separate raw buffer socket otherwise (in-band through rpyc for SSL connections).
+    All other remote objects are copied by rpyc (pickle).
+
+    @param object obj: local object or rpyc netref to a remote object
+
+    @return object: local object
     """
     if isinstance(obj, rpyc.core.netref.BaseNetref):
+        if _is_remote_ndarray(obj):
+            array = _obtain_array(obj)
+            if array is not None:
+                return array
         return rpyc.utils.classic.obtain(obj)
     else:
         return obj
+
+
+def share_array(array, client_host=None, allow_socket=False):
+    """ Server side of the array transport. Exposed by the remote module service.
+
+    If the client runs on the same host (and shared memory is available) the array is copied into
+    a new shared memory segment which the client has to release by calling release_shared_array.
+    The remote module service also releases all segments of a client when it disconnects.
+    Otherwise the raw array buffer is sent over a one-shot socket (if allowed) or returned as bytes.
+
+    @param numpy.ndarray array: the array to transfer
+    @param str client_host: host name of the client or None to avoid shared memory
+    @param bool allow_socket: whether the client accepts an unencrypted raw buffer socket
+
+    @return tuple: (transport, shape, dtype string, payload). transport is 'shm' (payload: segment
+                   name), 'socket' (payload: (port, token)) or 'bytes' (payload: raw buffer).
+                   Returns None for arrays that can not be transferred this way (object or
+                   structured dtypes).
+    """
+    array = np.ascontiguousarray(array)
+    if array.dtype.hasobject or array.dtype.fields is not None:
+        return None
+    if array.nbytes == 0:
+        return 'bytes', array.shape, array.dtype.str, b''
+    if shared_memory is not None and client_host == socket.gethostname():
+        shm = shared_memory.SharedMemory(create=True, size=array.nbytes)
+        np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+        _shared_arrays[shm.name] = shm
+        return 'shm', array.shape, array.dtype.str, shm.name
+    if allow_socket:
+        return 'socket', array.shape, array.dtype.str, _serve_raw_buffer(array)
+    return 'bytes', array.shape, array.dtype.str, array.tobytes()
+
+
+def release_shared_array(name):
+    """ Server side of the array transport. Frees a shared memory segment created by share_array.
+
+    @param str name: name of the shared memory segment
+    """
+    shm = _shared_arrays.pop(name, None)
+    if shm is not None:
+        shm.close()
+        shm.unlink()
+
+
+def _serve_raw_buffer(array):
+    """ Send the buffer of an array to the first client presenting the right token.
+
+    @param numpy.ndarray array: C-contiguous array to send
+
+    @return tuple: (port, token) the client has to connect to and send
+    """
+    token = os.urandom(16)
+    server_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server_sock.bind(('', 0))
+    server_sock.listen(1)
+    server_sock.settimeout(RAW_SOCKET_TIMEOUT)
+    buffer = memoryview(array.reshape(-1).view(np.uint8))
+
+    def send():
+        try:
+            conn, _ = server_sock.accept()
+            with conn:
+                conn.settimeout(RAW_SOCKET_TIMEOUT)
+                if _recv_exactly(conn, bytearray(len(token))) == token:
+                    conn.sendall(buffer)
+        except OSError:
+            pass
+        finally:
+            server_sock.close()
+
+    threading.Thread(target=send, name='netobtain-array', daemon=True).start()
+    return server_sock.getsockname()[1], token
+
+
+def _recv_exactly(sock, buffer):
+    """ Fill a writable buffer from a socket.
+
+    @param socket.socket sock: connected socket
+    @param buffer: writable buffer (bytearray, memoryview) to fill
+
+    @return buffer: the filled buffer
+    """
+    view = memoryview(buffer).cast('B')
+    received = 0
+    while received < len(view):
+        n_bytes = sock.recv_into(view[received:])
+        if n_bytes == 0:
+            raise ConnectionError('Connection closed before all data was received.')
+        received += n_bytes
+    return buffer
+
+
+def _is_remote_ndarray(obj):
+    """ Check if a rpyc netref points to a numpy.ndarray without asking the remote side.
+
+    @param rpyc.core.netref.BaseNetref obj: netref to check
+
+    @return bool: True if the remote object is a numpy.ndarray
+    """
+    netref_class = type(obj)
+    # rpyc >= 4.1 names the netref class after the fully qualified remote class name
+    if netref_class.__name__ == 'numpy.ndarray':
+        return True
+    return netref_class.__name__ == 'ndarray' and str(netref_class.__module__).startswith('numpy')
+
+
+def _obtain_array(remote_array):
+    """ Client side of the array transport.
+
+    @param rpyc.core.netref.BaseNetref remote_array: netref to a remote numpy.ndarray
+
+    @return numpy.ndarray: local copy of the array or None if the remote side does not support
+                           the array transport
+    """
+    conn = object.__getattribute__(remote_array, '____conn__')
+    service = conn.root
+    peer_host = _get_plain_socket_peer(conn)
+    client_host = None if shared_memory is None else socket.gethostname()
+    try:
+        descriptor = service.share_array(remote_array, client_host, peer_host is not None)
+    except AttributeError:
+        # remote qudi version without array transport
+        return None
+    if descriptor is None:
+        return None
+
+    transport, shape, dtype, payload = descriptor
+    if transport == 'shm':
+        try:
+            array = _read_shared_array(payload, tuple(shape), dtype)
+        finally:
+            service.release_array(payload)
+        if array is not None:
+            return array
+        # same host name but no common shared memory (e.g. containers)
+        transport, shape, dtype, payload = service.share_array(
+            remote_array, None, peer_host is not None)
+
+    array = np.empty(tuple(shape), dtype=dtype)
+    if transport == 'socket':
+        port, token = payload
+        try:
+            with socket.create_connection((peer_host, port), timeout=RAW_SOCKET_TIMEOUT) as sock:
+                sock.sendall(token)
+                _recv_exactly(sock, array.reshape(-1).view(np.uint8))
+            return array
+        except OSError:
+            transport, shape, dtype, payload = service.share_array(remote_array, None, False)
+    if array.nbytes > 0:
+        array.reshape(-1)[:] = np.frombuffer(payload, dtype=dtype)
+    return array
+
+
+def _get_plain_socket_peer(conn):
+    """ Address of the remote side of an unencrypted rpyc connection.
+
+    @param rpyc.core.protocol.Connection conn: rpyc connection
+
+    @return str: peer address or None for SSL (or non-socket) connections
+    """
+    try:
+        sock = conn._channel.stream.sock
+    except AttributeError:
+        return None
+    if isinstance(sock, ssl.SSLSocket) or sock.family != socket.AF_INET:
+        return None
+    return sock.getpeername()[0]
+
+
+def _read_shared_array(name, shape, dtype):
+    """ Get an array from a shared memory segment owned by the server.
+
+    @param str name: name of the shared memory segment
+    @param tuple shape: shape of the array
+    @param str dtype: dtype string of the array
+
+    @return numpy.ndarray: local array or None if the segment can not be opened
+    """
+    shm_path = os.path.join('/dev/shm', name)
+    if os.path.exists(shm_path):
+        # Map the segment directly (zero-copy). The mapping stays valid after the server unlinked
+        # the segment and is released together with the returned array.
+        with open(shm_path, 'r+b') as file:
+            mapped = mmap.mmap(file.fileno(), 0)
+        count = int(np.prod(shape))
+        return np.frombuffer(mapped, dtype=dtype, count=count).reshape(shape)
+
+    try:
+        shm = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return None
+    if os.name == 'posix' and name not in _shared_arrays:
+        # The server unlinks the segment. Keep the resource tracker of this process from
+        # unlinking (and warning about) it as well.
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        except (ImportError, AttributeError):
+            pass
+    try:
+        return np.ndarray(shape, dtype=dtype, buffer=shm.buf).copy()
+    finally:
+        shm.close()
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""
+This file contains a streaming writer for binary sample files (e.g. AWG waveform files).
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import os
+import zlib
+import numpy as np
+
+
+class SampleFileWriter:
+    """
+    Streaming writer for binary sample files with a size known in advance.
+
+    The file layout is: header, one or more data sections, footer. Each data section holds
+    number_of_samples items of its own numpy dtype, e.g. a section of float32 analog samples
+    followed by a section of uint8 marker bytes (WFMX) or a single section of interleaved records
+    (WFM). The file is preallocated to its final size on creation and every chunk of samples is
+    written at its absolute position, so the file is opened only once, no temporary files are
+    needed and the sections can be filled chunk by chunk in parallel.
+
+    Usage example:
+
+        with SampleFileWriter(path, total_samples, ['<f4', 'u1'], header=header) as writer:
+            for analog_chunk, marker_chunk in chunks:
+                writer.write(analog_chunk, section=0)
+                writer.write(marker_chunk, section=1)
+    """
+    # Size of the temporary buffers used for dtype conversion and interleaving of record fields
+    # if memory mapping is not used
+    _buffer_bytes = 16 * 1024 ** 2
+
+    def __init__(self, path, number_of_samples, section_dtypes, header=b'', footer=b'',
+                 use_mmap=False):
+        """
+        Create the file and preallocate it to its final size.
+
+        @param str path: path of the file to create (an existing file is overwritten)
+        @param int number_of_samples: number of items in each data section
+        @param list section_dtypes: numpy dtype (or dtype specifier) of each data section
+        @param bytes header: header bytes written at the beginning of the file
+        @param bytes footer: footer bytes written at the end of the file
+        @param bool use_mmap: write the samples through a memory mapping of the data sections
+                              instead of positioned file writes
+        """
+        self.path = path
+        self.number_of_samples = int(number_of_samples)
+        self.use_mmap = bool(use_mmap)
+        self._dtypes = [np.dtype(dtype) for dtype in section_dtypes]
+        self._cursors = [0] * len(self._dtypes)
+        self._offsets = list()
+        offset = len(header)
+        for dtype in self._dtypes:
+            self._offsets.append(offset)
+            offset += self.number_of_samples * dtype.itemsize
+        self.file_size = offset + len(footer)
+        self._memmaps = dict()
+
+        self._file = open(path, 'w+b')
+        self._preallocate()
+        self._file.write(header)
+        if footer:
+            self._file.seek(offset)
+            self._file.write(footer)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    @property
+    def closed(self):
+        return self._file.closed
+
+    def position(self, section=0):
+        """
+        Number of samples already written to a data section.
+
+        @param int section: index of the data section
+
+        @return int: number of samples written
+        """
+        return self._cursors[section]
+
+    def write(self, data, section=0, position=None):
+        """
+        Write a chunk of samples into a data section.
+
+        @param numpy.ndarray|dict data: samples to write. Converted to the dtype of the section.
+                                        For sections with a structured (record) dtype a dict
+                                        mapping field names to sample arrays can be passed.
+                                        Missing fields are left at zero.
+        @param int section: index of the data section to write to
+        @param int position: sample index in the section to write to. Defaults to the end of the
+                             previously written chunk of this section.
+
+        @return int: number of samples written
+        """
+        dtype = self._dtypes[section]
+        if position is None:
+            position = self._cursors[section]
+        if isinstance(data, dict):
+            data = {name: samples for name, samples in data.items() if samples is not None}
+            length = len(next(iter(data.values()))) if data else 0
+        else:
+            length = len(data)
+        if position < 0 or position + length > self.number_of_samples:
+            raise ValueError('Unable to write {0:d} samples at position {1:d} into section of '
+                             'file "{2}" with {3:d} samples.'
+                             ''.format(length, position, self.path, self.number_of_samples))
+        if length == 0:
+            return 0
+
+        if self.use_mmap:
+            view = self._get_memmap(section)[position:position + length]
+            if isinstance(data, dict):
+                for name, samples in data.items():
+                    view[name] = samples
+            else:
+                view[...] = data
+        else:
+            self._file.seek(self._offsets[section] + position * dtype.itemsize)
+            buffer_length = max(1, self._buffer_bytes // dtype.itemsize)
+            if isinstance(data, dict):
+                buffer = np.zeros(min(length, buffer_length), dtype=dtype)
+            for start in range(0, length, buffer_length):
+                stop = min(start + buffer_length, length)
+                if isinstance(data, dict):
+                    chunk = buffer[:stop - start]
+                    for name, samples in data.items():
+                        chunk[name] = samples[start:stop]
+                else:
+                    # No copy if the data already has the section dtype
+                    chunk = np.ascontiguousarray(data[start:stop], dtype=dtype)
+                self._file.write(chunk.data)
+
+        self._cursors[section] = max(self._cursors[section], position + length)
+        return length
+
+    def flush(self):
+        """
+        Flush all written samples to the file.
+        """
+        for memmap in self._memmaps.values():
+            memmap.flush()
+        self._file.flush()
+
+    def close(self, checksum=False):
+        """
+        Flush and close the file.
+
+        @param bool checksum: calculate the CRC32 checksum of the complete file after closing
+
+        @return int: CRC32 checksum of the file if checksum is True, None otherwise
+        """
+        if not self._file.closed:
+            self.flush()
+            self._memmaps.clear()
+            self._file.close()
+        return self.checksum() if checksum else None
+
+    def checksum(self):
+        """
+        Calculate the CRC32 checksum of the file content as written to disk.
+
+        @return int: CRC32 checksum
+        """
+        if not self._file.closed:
+            self.flush()
+        crc = 0
+        with open(self.path, 'rb') as file:
+            while True:
+                block = file.read(self._buffer_bytes)
+                if not block:
+                    break
+                crc = zlib.crc32(block, crc)
+        return crc
+
+    def _preallocate(self):
+        """
+        Reserve the full file size on disk. Uses posix_fallocate if available and falls back to
+        extending the file size otherwise.
+        """
+        if self.file_size == 0:
+            return
+        if hasattr(os, 'posix_fallocate'):
+            try:
+                os.posix_fallocate(self._file.fileno(), 0, self.file_size)
+                return
+            except OSError:
+                # Not supported by the file system
+                pass
+        self._file.truncate(self.file_size)
+
+    def _get_memmap(self, section):
+        """
+        Get (and create if necessary) the memory mapping of a data section.
+
+        @param int section: index of the data section
+
+        @return numpy.memmap: memory mapped array of the data section
+        """
+        if section not in self._memmaps:
+            self._file.flush()
+            self._memmaps[section] = np.memmap(self._file,
+                                               dtype=self._dtypes[section],
+                                               mode='r+',
+                                               offset=self._offsets[section],
+                                               shape=(self.number_of_samples,))
+        return self._memmaps[section]
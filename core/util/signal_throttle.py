@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+This file contains a rate limiter for signals triggering GUI updates.
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import time
+from qtpy import QtCore
+
+
+class SignalThrottle(QtCore.QObject):
+    """
+    Coalesces signal emissions and calls a slot at most max_rate times per second.
+
+    Connect one or more signals to trigger() instead of the slot. The first emission calls the
+    slot right away. Emissions arriving within 1 / max_rate seconds after the last call are not
+    delivered one by one: only the arguments of the latest emission are kept and the slot is
+    called once with them when the interval has passed. So the slot always ends up with the latest
+    payload, but a logic emitting faster than the GUI can redraw does not fill the event queue with
+    redraws.
+
+    The throttle must be created in the thread the slot should be called in (usually the GUI
+    thread). Emissions from other threads are then queued into this thread.
+
+    Usage example:
+
+        self._plot_throttle = SignalThrottle(self.update_plots, max_rate=30)
+        logic.sigPlotsUpdated.connect(self._plot_throttle.trigger, QtCore.Qt.QueuedConnection)
+    """
+
+    def __init__(self, slot, max_rate=30, parent=None):
+        """
+        @param callable slot: function to call with the arguments of the latest emission
+        @param float max_rate: maximum number of slot calls per second. Values <= 0 disable the
+                               throttling, i.e. every emission is delivered.
+        @param QObject parent: optional Qt parent object
+        """
+        super().__init__(parent)
+        self._slot = slot
+        self._min_interval = 0.0
+        self._last_call = None
+        self._pending_args = None
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.flush)
+        self.max_rate = max_rate
+
+    @property
+    def max_rate(self):
+        return 1 / self._min_interval if self._min_interval > 0 else 0
+
+    @max_rate.setter
+    def max_rate(self, rate):
+        rate = float(rate) if rate else 0.0
+        self._min_interval = 1 / rate if rate > 0 else 0.0
+
+    @property
+    def pending(self):
+        """
+        True if an emission is waiting to be delivered.
+        """
+        return self._pending_args is not None
+
+    def trigger(self, *args):
+        """
+        Connect signals to this method. Calls the slot immediately if the last call is longer ago
+        than 1 / max_rate, otherwise keeps the arguments for the next call.
+        """
+        self._pending_args = args
+        if self._timer.isActive():
+            return
+        remaining = 0.0
+        if self._last_call is not None:
+            remaining = self._min_interval - (time.monotonic() - self._last_call)
+        if remaining <= 0:
+            self.flush()
+        else:
+            self._timer.start(int(round(remaining * 1000)))
+
+    def flush(self):
+        """
+        Call the slot with the arguments of the latest emission right away, if any.
+        """
+        self._timer.stop()
+        if self._pending_args is None:
+            return
+        args = self._pending_args
+        self._pending_args = None
+        self._last_call = time.monotonic()
+        self._slot(*args)
+
+    def cancel(self):
+        """
+        Drop the pending emission without calling the slot.
+        """
+        self._timer.stop()
+        self._pending_args = None
@@ -28,6 +28,7 @@ import time
 from core.connector import Connector
 from core.configoption import ConfigOption
 from core.statusvariable import StatusVar
+from core.util.signal_throttle import SignalThrottle
 from qtwidgets.scan_plotwidget import ScanImageItem
 from gui.guibase import GUIBase
 from gui.guiutils import ColorBar
@@ -125,6 +126,9 @@ class ConfocalGui(GUIBase):
 
     default_meter_prefix = ConfigOption('default_meter_prefix', None)  # assume the unit prefix of position spinbox
 
+    # maximum number of image redraws per second while scanning, <= 0 redraws after every line
+    max_refresh_rate = ConfigOption('max_refresh_rate', 30)
+
     # status var
     adjust_cursor_roi = StatusVar(default=True)
     slider_small_step = StatusVar(default=10e-9)    # initial value in meter
@@ -486,11 +490,20 @@ class ConfocalGui(GUIBase):
         self._mw.depth_cb_high_percentile_DoubleSpinBox.valueChanged.connect(self.shortcut_to_depth_cb_centiles)
 
         # Connect the emitted signal of an image change from the logic with
-        # a refresh of the GUI picture:
-        self._scanning_logic.signal_xy_image_updated.connect(self.refresh_xy_image)
-        self._scanning_logic.signal_xy_image_updated.connect(self.refresh_scan_line)
-        self._scanning_logic.signal_depth_image_updated.connect(self.refresh_scan_line)
-        self._scanning_logic.signal_depth_image_updated.connect(self.refresh_depth_image)
+        # a refresh of the GUI picture. The logic emits after every line, so the refreshes are
+        # throttled to max_refresh_rate (only the latest image state is drawn).
+        self._xy_image_throttle = SignalThrottle(self.refresh_xy_image, self.max_refresh_rate)
+        self._depth_image_throttle = SignalThrottle(self.refresh_depth_image,
+                                                    self.max_refresh_rate)
+        self._scan_line_throttle = SignalThrottle(self.refresh_scan_line, self.max_refresh_rate)
+        self._scanning_logic.signal_xy_image_updated.connect(
+            self._xy_image_throttle.trigger, QtCore.Qt.QueuedConnection)
+        self._scanning_logic.signal_xy_image_updated.connect(
+            self._scan_line_throttle.trigger, QtCore.Qt.QueuedConnection)
+        self._scanning_logic.signal_depth_image_updated.connect(
+            self._scan_line_throttle.trigger, QtCore.Qt.QueuedConnection)
+        self._scanning_logic.signal_depth_image_updated.connect(
+            self._depth_image_throttle.trigger, QtCore.Qt.QueuedConnection)
         self._optimizer_logic.sigImageUpdated.connect(self.refresh_refocus_image)
         self._scanning_logic.sigImageXYInitialized.connect(self.adjust_xy_window)
         self._scanning_logic.sigImageDepthInitialized.connect(self.adjust_depth_window)
@@ -648,6 +661,15 @@ class ConfocalGui(GUIBase):
 
         @return int: error code (0:OK, -1:error)
         """
+        self._scanning_logic.signal_xy_image_updated.disconnect(self._xy_image_throttle.trigger)
+        self._scanning_logic.signal_xy_image_updated.disconnect(self._scan_line_throttle.trigger)
+        self._scanning_logic.signal_depth_image_updated.disconnect(
+            self._scan_line_throttle.trigger)
+        self._scanning_logic.signal_depth_image_updated.disconnect(
+            self._depth_image_throttle.trigger)
+        for throttle in (self._xy_image_throttle, self._depth_image_throttle,
+                         self._scan_line_throttle):
+            throttle.cancel()
         self._mw.close()
         return 0
 
@@ -704,22 +726,26 @@ class ConfocalGui(GUIBase):
     def get_xy_cb_range(self):
         """ Determines the cb_min and cb_max values for the xy scan image
         """
-        # If "Manual" is checked, or the image data is empty (all zeros), then take manual cb range.
-        if self._mw.xy_cb_manual_RadioButton.isChecked() or np.count_nonzero(self.xy_image.image) < 1:
+        # If "Manual" is checked, then take manual cb range.
+        if self._mw.xy_cb_manual_RadioButton.isChecked():
             cb_min = self._mw.xy_cb_min_DoubleSpinBox.value()
             cb_max = self._mw.xy_cb_max_DoubleSpinBox.value()
 
         # Otherwise, calculate cb range from percentiles.
         else:
-            # Exclude any zeros (which are typically due to unfinished scan)
-            xy_image_nonzero = self.xy_image.image[np.nonzero(self.xy_image.image)]
-
             # Read centile range
             low_centile = self._mw.xy_cb_low_percentile_DoubleSpinBox.value()
             high_centile = self._mw.xy_cb_high_percentile_DoubleSpinBox.value()
 
-            cb_min = np.percentile(xy_image_nonzero, low_centile)
-            cb_max = np.percentile(xy_image_nonzero, high_centile)
+            # The logic keeps a histogram of the non-zero counts (zeros are typically due to
+            # unfinished scan), so the whole image does not need to be sorted on every line.
+            cb_range = self._scanning_logic.get_image_percentiles(
+                low_centile, high_centile, channel=self.xy_channel, zscan=False)
+            if cb_range is None:
+                # The image data is empty (all zeros), take manual cb range.
+                cb_range = (self._mw.xy_cb_min_DoubleSpinBox.value(),
+                            self._mw.xy_cb_max_DoubleSpinBox.value())
+            cb_min, cb_max = cb_range
 
         cb_range = [cb_min, cb_max]
 
@@ -728,22 +754,26 @@ class ConfocalGui(GUIBase):
     def get_depth_cb_range(self):
         """ Determines the cb_min and cb_max values for the xy scan image
         """
-        # If "Manual" is checked, or the image data is empty (all zeros), then take manual cb range.
-        if self._mw.depth_cb_manual_RadioButton.isChecked() or np.count_nonzero(self.depth_image.image) < 1:
+        # If "Manual" is checked, then take manual cb range.
+        if self._mw.depth_cb_manual_RadioButton.isChecked():
             cb_min = self._mw.depth_cb_min_DoubleSpinBox.value()
             cb_max = self._mw.depth_cb_max_DoubleSpinBox.value()
 
         # Otherwise, calculate cb range from percentiles.
         else:
-            # Exclude any zeros (which are typically due to unfinished scan)
-            depth_image_nonzero = self.depth_image.image[np.nonzero(self.depth_image.image)]
-
             # Read centile range
             low_centile = self._mw.depth_cb_low_percentile_DoubleSpinBox.value()
             high_centile = self._mw.depth_cb_high_percentile_DoubleSpinBox.value()
 
-            cb_min = np.percentile(depth_image_nonzero, low_centile)
-            cb_max = np.percentile(depth_image_nonzero, high_centile)
+            # The logic keeps a histogram of the non-zero counts (zeros are typically due to
+            # unfinished scan), so the whole image does not need to be sorted on every line.
+            cb_range = self._scanning_logic.get_image_percentiles(
+                low_centile, high_centile, channel=self.depth_channel, zscan=True)
+            if cb_range is None:
+                # The image data is empty (all zeros), take manual cb range.
+                cb_range = (self._mw.depth_cb_min_DoubleSpinBox.value(),
+                            self._mw.depth_cb_max_DoubleSpinBox.value())
+            cb_min, cb_max = cb_range
 
         cb_range = [cb_min, cb_max]
         return cb_range
@@ -879,6 +909,9 @@ class ConfocalGui(GUIBase):
         self._scanning_logic.set_clock_frequency(self._sd.clock_frequency_InputWidget.value())
         self._scanning_logic.return_slowness = self._sd.return_slowness_InputWidget.value()
         self._scanning_logic.permanent_scan = self._sd.loop_scan_CheckBox.isChecked()
+        self._scanning_logic.bidirectional_scan = self._sd.bidirectional_scan_CheckBox.isChecked()
+        self._scanning_logic.bidirectional_line_shift = self._sd.bidirectional_line_shift_SpinBox.value()
+        self._scanning_logic.lines_per_block = self._sd.lines_per_block_SpinBox.value()
         self._scanning_logic.depth_scan_dir_is_xz = self._sd.depth_dir_x_radioButton.isChecked()
         self.fixed_aspect_ratio_xy = self._sd.fixed_aspect_xy_checkBox.isChecked()
         self.fixed_aspect_ratio_depth = self._sd.fixed_aspect_depth_checkBox.isChecked()
@@ -897,6 +930,10 @@ class ConfocalGui(GUIBase):
         self._sd.clock_frequency_InputWidget.setValue(int(self._scanning_logic._clock_frequency))
         self._sd.return_slowness_InputWidget.setValue(int(self._scanning_logic.return_slowness))
         self._sd.loop_scan_CheckBox.setChecked(self._scanning_logic.permanent_scan)
+        self._sd.bidirectional_scan_CheckBox.setChecked(self._scanning_logic.bidirectional_scan)
+        self._sd.bidirectional_line_shift_SpinBox.setValue(
+            int(self._scanning_logic.bidirectional_line_shift))
+        self._sd.lines_per_block_SpinBox.setValue(int(self._scanning_logic.lines_per_block))
         if self._scanning_logic.depth_scan_dir_is_xz:
             self._sd.depth_dir_x_radioButton.setChecked(True)
         else:
@@ -923,6 +960,7 @@ class ConfocalGui(GUIBase):
         self._optimizer_logic.return_slowness = self._osd.return_slow_SpinBox.value()
         self._optimizer_logic.hw_settle_time = self._osd.hw_settle_time_SpinBox.value() / 1000
         self._optimizer_logic.do_surface_subtraction = self._osd.do_surface_subtraction_CheckBox.isChecked()
+        self._optimizer_logic.do_adaptive_refocus = self._osd.do_adaptive_refocus_CheckBox.isChecked()
         index = self._osd.opt_channel_ComboBox.currentIndex()
         self._optimizer_logic.opt_channel = int(self._osd.opt_channel_ComboBox.itemData(index, QtCore.Qt.UserRole))
 
@@ -945,6 +983,7 @@ class ConfocalGui(GUIBase):
         self._osd.return_slow_SpinBox.setValue(self._optimizer_logic.return_slowness)
         self._osd.hw_settle_time_SpinBox.setValue(self._optimizer_logic.hw_settle_time * 1000)
         self._osd.do_surface_subtraction_CheckBox.setChecked(self._optimizer_logic.do_surface_subtraction)
+        self._osd.do_adaptive_refocus_CheckBox.setChecked(self._optimizer_logic.do_adaptive_refocus)
 
         old_ch = self._optimizer_logic.opt_channel
         index = self._osd.opt_channel_ComboBox.findData(old_ch)
@@ -1379,17 +1418,19 @@ class ConfocalGui(GUIBase):
     def refresh_xy_image(self):
         """ Update the current XY image from the logic.
 
-        Everytime the scanner is scanning a line in xy the
-        image is rebuild and updated in the GUI.
+        Everytime the scanner is scanning a line in xy only the
+        changed lines are redrawn, unless the colour scale or the image changed.
         """
         self.xy_image.getViewBox().updateAutoRange()
 
         xy_image_data = self._scanning_logic.xy_image[:, :, 3 + self.xy_channel]
+        updated_rows = self._scanning_logic.pop_updated_image_rows(zscan=False)
 
         cb_range = self.get_xy_cb_range()
 
         # Now update image with new color scale, and update colorbar
-        self.xy_image.setImage(image=xy_image_data, levels=(cb_range[0], cb_range[1]))
+        self.xy_image.update_image_rows(
+            xy_image_data, updated_rows, levels=(cb_range[0], cb_range[1]))
         self.refresh_xy_colorbar()
 
         # Unlock state widget if scan is finished
@@ -1399,17 +1440,19 @@ class ConfocalGui(GUIBase):
     def refresh_depth_image(self):
         """ Update the current Depth image from the logic.
 
-        Everytime the scanner is scanning a line in depth the
-        image is rebuild and updated in the GUI.
+        Everytime the scanner is scanning a line in depth only the
+        changed lines are redrawn, unless the colour scale or the image changed.
         """
 
         self.depth_image.getViewBox().enableAutoRange()
 
         depth_image_data = self._scanning_logic.depth_image[:, :, 3 + self.depth_channel]
+        updated_rows = self._scanning_logic.pop_updated_image_rows(zscan=True)
         cb_range = self.get_depth_cb_range()
 
         # Now update image with new color scale, and update colorbar
-        self.depth_image.setImage(image=depth_image_data, levels=(cb_range[0], cb_range[1]))
+        self.depth_image.update_image_rows(
+            depth_image_data, updated_rows, levels=(cb_range[0], cb_range[1]))
         self.refresh_depth_colorbar()
 
         # Unlock state widget if scan is finished
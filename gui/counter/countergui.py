@@ -25,6 +25,8 @@ import os
 import pyqtgraph as pg
 
 from core.connector import Connector
+from core.configoption import ConfigOption
+from core.util.signal_throttle import SignalThrottle
 from gui.colordefs import QudiPalettePale as palette
 from gui.guibase import GUIBase
 from qtpy import QtCore
@@ -55,6 +57,9 @@ class CounterGui(GUIBase):
     # declare connectors
     counterlogic1 = Connector(interface='CounterLogic')
 
+    # maximum number of plot redraws per second, <= 0 redraws after every count sample
+    max_refresh_rate = ConfigOption('max_refresh_rate', 30)
+
     sigStartCounter = QtCore.Signal()
     sigStopCounter = QtCore.Signal()
 
@@ -176,7 +181,10 @@ class CounterGui(GUIBase):
         ##################
         # Handling signals from the logic
 
-        self._counting_logic.sigCounterUpdated.connect(self.updateData)
+        # The logic emits after every count sample, only the latest state is drawn
+        self._update_throttle = SignalThrottle(self.updateData, self.max_refresh_rate)
+        self._counting_logic.sigCounterUpdated.connect(self._update_throttle.trigger,
+                                                       QtCore.Qt.QueuedConnection)
 
         # ToDo:
         # self._counting_logic.sigCountContinuousNext.connect()
@@ -246,6 +254,7 @@ class CounterGui(GUIBase):
         self.sigStartCounter.disconnect()
         self.sigStopCounter.disconnect()
         self._counting_logic.sigCounterUpdated.disconnect()
+        self._update_throttle.cancel()
         self._counting_logic.sigCountingSamplesChanged.disconnect()
         self._counting_logic.sigCountLengthChanged.disconnect()
         self._counting_logic.sigCountFrequencyChanged.disconnect()
@@ -24,7 +24,9 @@ import os
 import pyqtgraph as pg
 
 from core.connector import Connector
+from core.configoption import ConfigOption
 from core.util import units
+from core.util.signal_throttle import SignalThrottle
 from gui.guibase import GUIBase
 from gui.guiutils import ColorBar
 from gui.colordefs import ColorScaleInferno
@@ -75,6 +77,9 @@ class ODMRGui(GUIBase):
     odmrlogic1 = Connector(interface='ODMRLogic')
     savelogic = Connector(interface='SaveLogic')
 
+    # maximum number of plot redraws per second, <= 0 redraws after every sweep
+    max_refresh_rate = ConfigOption('max_refresh_rate', 30)
+
     sigStartOdmrScan = QtCore.Signal()
     sigStopOdmrScan = QtCore.Signal()
     sigContinueOdmrScan = QtCore.Signal()
@@ -395,7 +400,10 @@ class ODMRGui(GUIBase):
                                                      QtCore.Qt.QueuedConnection)
         self._odmr_logic.sigOutputStateUpdated.connect(self.update_status,
                                                        QtCore.Qt.QueuedConnection)
-        self._odmr_logic.sigOdmrPlotsUpdated.connect(self.update_plots, QtCore.Qt.QueuedConnection)
+        # The logic emits after every sweep, only the latest plot data is drawn
+        self._plots_throttle = SignalThrottle(self.update_plots, self.max_refresh_rate)
+        self._odmr_logic.sigOdmrPlotsUpdated.connect(self._plots_throttle.trigger,
+                                                     QtCore.Qt.QueuedConnection)
         self._odmr_logic.sigOdmrFitUpdated.connect(self.update_fit, QtCore.Qt.QueuedConnection)
         self._odmr_logic.sigOdmrElapsedTimeUpdated.connect(self.update_elapsedtime,
                                                            QtCore.Qt.QueuedConnection)
@@ -424,6 +432,7 @@ class ODMRGui(GUIBase):
         self._odmr_logic.sigParameterUpdated.disconnect()
         self._odmr_logic.sigOutputStateUpdated.disconnect()
         self._odmr_logic.sigOdmrPlotsUpdated.disconnect()
+        self._plots_throttle.cancel()
         self._odmr_logic.sigOdmrFitUpdated.disconnect()
         self._odmr_logic.sigOdmrElapsedTimeUpdated.disconnect()
         self.sigCwMwOn.disconnect()
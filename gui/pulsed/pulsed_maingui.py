@@ -26,9 +26,11 @@ import pyqtgraph as pg
 import datetime
 
 from core.connector import Connector
+from core.configoption import ConfigOption
 from core.statusvariable import StatusVar
 from core.util import units
 from core.util.helpers import natural_sort
+from core.util.signal_throttle import SignalThrottle
 from gui.colordefs import QudiPalettePale as palette
 from gui.fitsettings import FitSettingsDialog
 from gui.guibase import GUIBase
@@ -147,6 +149,9 @@ class PulsedMeasurementGui(GUIBase):
     ## declare connectors
     pulsedmasterlogic = Connector(interface='PulsedMasterLogic')
 
+    # maximum number of measurement plot redraws per second, <= 0 redraws after every update
+    max_refresh_rate = ConfigOption('max_refresh_rate', 30)
+
     # status var
     _ana_param_x_axis_name_text = StatusVar('ana_param_x_axis_name_LineEdit', 'Tau')
     _ana_param_x_axis_unit_text = StatusVar('ana_param_x_axis_unit_LineEdit', 's')
@@ -409,6 +414,8 @@ class PulsedMeasurementGui(GUIBase):
 
         self._pe.laserpulses_ComboBox.currentIndexChanged.connect(self.update_laser_data)
         self._pe.laserpulses_display_raw_CheckBox.stateChanged.connect(self.update_laser_data)
+        self._pe.laserpulses_PlotWidget.getViewBox().sigXRangeChanged.connect(
+            self.update_laser_data)
         return
 
     def _connect_predefined_methods_tab_signals(self):
@@ -416,7 +423,11 @@ class PulsedMeasurementGui(GUIBase):
 
     def _connect_logic_signals(self):
         # Connect update signals from pulsed_master_logic
-        self.pulsedmasterlogic().sigMeasurementDataUpdated.connect(self.measurement_data_updated)
+        # Only the latest measurement data is drawn if the logic updates faster than
+        # max_refresh_rate
+        self._data_throttle = SignalThrottle(self.measurement_data_updated, self.max_refresh_rate)
+        self.pulsedmasterlogic().sigMeasurementDataUpdated.connect(self._data_throttle.trigger,
+                                                                   QtCore.Qt.QueuedConnection)
         self.pulsedmasterlogic().sigTimerUpdated.connect(self.measurement_timer_updated)
         self.pulsedmasterlogic().sigFitUpdated.connect(self.fit_data_updated)
         self.pulsedmasterlogic().sigMeasurementStatusUpdated.connect(self.measurement_status_updated)
@@ -567,6 +578,7 @@ class PulsedMeasurementGui(GUIBase):
 
         self._pe.laserpulses_ComboBox.currentIndexChanged.disconnect()
         self._pe.laserpulses_display_raw_CheckBox.stateChanged.disconnect()
+        self._pe.laserpulses_PlotWidget.getViewBox().sigXRangeChanged.disconnect()
         return
 
     def _disconnect_predefined_methods_tab_signals(self):
@@ -582,6 +594,7 @@ class PulsedMeasurementGui(GUIBase):
     def _disconnect_logic_signals(self):
         # Disconnect update signals from pulsed_master_logic
         self.pulsedmasterlogic().sigMeasurementDataUpdated.disconnect()
+        self._data_throttle.cancel()
         self.pulsedmasterlogic().sigTimerUpdated.disconnect()
         self.pulsedmasterlogic().sigFitUpdated.disconnect()
         self.pulsedmasterlogic().sigMeasurementStatusUpdated.disconnect()
@@ -3162,26 +3175,22 @@ class PulsedMeasurementGui(GUIBase):
         """
         laser_index = self._pe.laserpulses_ComboBox.currentIndex()
         show_raw = self._pe.laserpulses_display_raw_CheckBox.isChecked()
-        is_gated = len(self.pulsedmasterlogic().raw_data.shape) > 1
 
-        # Determine the right array to plot as y-data
-        if show_raw:
-            if is_gated:
-                if laser_index == 0:
-                    y_data = np.sum(self.pulsedmasterlogic().raw_data, axis=0)
-                else:
-                    y_data = self.pulsedmasterlogic().raw_data[laser_index - 1]
-            else:
-                y_data = self.pulsedmasterlogic().raw_data
+        # Request the displayed range (plus one range width on each side for panning) decimated
+        # to about two points per pixel. Request the full trace while auto-ranging.
+        view_box = self._pe.laserpulses_PlotWidget.getViewBox()
+        pixels = max(int(view_box.width()), 500)
+        if view_box.autoRangeEnabled()[0]:
+            x_range = None
+            max_points = 2 * pixels
         else:
-            if laser_index == 0:
-                y_data = np.sum(self.pulsedmasterlogic().laser_data, axis=0)
-            else:
-                y_data = self.pulsedmasterlogic().laser_data[laser_index - 1]
-
-        # Calculate the x-axis of the laser plot here
-        bin_width = self.pulsedmasterlogic().fast_counter_settings['bin_width']
-        x_data = np.arange(y_data.size, dtype=float) * bin_width
+            x_min, x_max = view_box.viewRange()[0]
+            x_range = (2 * x_min - x_max, 2 * x_max - x_min)
+            max_points = 6 * pixels
+        x_data, y_data = self.pulsedmasterlogic().get_laser_display_data(laser_index=laser_index,
+                                                                         show_raw=show_raw,
+                                                                         x_range=x_range,
+                                                                         max_points=max_points)
 
         # Plot data
         self.lasertrace_image.setData(x=x_data, y=y_data)
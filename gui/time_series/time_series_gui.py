@@ -26,6 +26,7 @@ import pyqtgraph as pg
 from core.connector import Connector
 from core.configoption import ConfigOption
 from core.statusvariable import StatusVar
+from core.util.signal_throttle import SignalThrottle
 from gui.colordefs import QudiPalettePale as palette
 from gui.guibase import GUIBase
 from qtpy import QtCore
@@ -79,6 +80,8 @@ class TimeSeriesGui(GUIBase):
 
     # declare ConfigOptions
     _use_antialias = ConfigOption('use_antialias', default=True)
+    # maximum number of plot redraws per second, <= 0 redraws after every data frame
+    _max_refresh_rate = ConfigOption('max_refresh_rate', default=30)
 
     # declare StatusVars
     _current_value_channel = StatusVar(name='current_value_channel', default=None)
@@ -239,8 +242,10 @@ class TimeSeriesGui(GUIBase):
 
         ##################
         # Handling signals from the logic
+        # Only the latest data frame is drawn if the logic emits faster than max_refresh_rate
+        self._data_throttle = SignalThrottle(self.update_data, self._max_refresh_rate)
         self._time_series_logic.sigDataChanged.connect(
-            self.update_data, QtCore.Qt.QueuedConnection)
+            self._data_throttle.trigger, QtCore.Qt.QueuedConnection)
         self._time_series_logic.sigSettingsChanged.connect(
             self.update_settings, QtCore.Qt.QueuedConnection)
         self._time_series_logic.sigStatusChanged.connect(
@@ -282,6 +287,7 @@ class TimeSeriesGui(GUIBase):
         self.sigStopRecording.disconnect()
         self.sigSettingsChanged.disconnect()
         self._time_series_logic.sigDataChanged.disconnect()
+        self._data_throttle.cancel()
         self._time_series_logic.sigSettingsChanged.disconnect()
         self._time_series_logic.sigStatusChanged.disconnect()
 
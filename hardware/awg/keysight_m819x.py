@@ -25,7 +25,6 @@ import visa
 import os
 import time
 import numpy as np
-import scipy.interpolate
 from fnmatch import fnmatch
 from collections import OrderedDict
 from abc import abstractmethod
@@ -54,6 +53,8 @@ class AWGM819X(Base, PulserInterface):
     _wave_mem_mode = None
     _wave_file_extension = '.bin'
     _wave_transfer_datatype = 'h'
+    # number of samples converted at once into device integers (temporary arrays stay cache sized)
+    _conversion_chunk_size = 2 ** 16
 
     # explicitly set low/high levels for [[d_ch1_low, d_ch1_high], [d_ch2_low, d_ch2_high], ...]
     _d_ch_level_low_high = ConfigOption(name='d_ch_level_low_high', default=[], missing='nothing')
@@ -1410,23 +1411,10 @@ class AWGM819X(Base, PulserInterface):
         :return:    np.array(dtype=int16)
         """
 
-        bitsize = int(2 ** n_bits)
-        min_intval = -bitsize / 2
-        max_intval = bitsize / 2 - 1
+        val_int = np.empty(len(val), dtype='int16')
+        self._convert_samples_into(val_int, analog_samples=val, n_bits=n_bits)
 
-        max_u_samples = 1  # data should be normalized in (-1..1)
-
-        if max(abs(val)) > 1:
-            self.log.warning("Samples from sequencegenerator out of range. Normalizing to -1..1. Please change the "
-                             "maximum peak to peak Voltage in the Pulse Generator Settings if you want to use a higher "
-                             "power.")
-            biggest_val = max([abs(np.min(val)), np.max(val)])
-            max_u_samples = biggest_val
-        # manual 8.22.4 Waveform Data Format in Direct Mode
-        # 2 bits LSB reserved for markers
-        mapper = scipy.interpolate.interp1d([-max_u_samples, max_u_samples], [min_intval, max_intval])
-
-        return mapper(val)
+        return val_int
 
     def bool_to_sample(self, val_dch_1, val_dch_2, int_type_str='int16'):
         """
@@ -1439,10 +1427,69 @@ class AWGM819X(Base, PulserInterface):
         :return:
         """
 
-        bit_dch_1 = 0x1 & np.asarray(val_dch_1).astype(int_type_str)
-        bit_dch_2 = 0x2 & (np.asarray(val_dch_2).astype(int_type_str) << 1)
+        val_int = np.empty(len(val_dch_1), dtype=int_type_str)
+        self._convert_samples_into(val_int, marker_1=np.asarray(val_dch_1), marker_2=np.asarray(val_dch_2))
+
+        return val_int
+
+    def _convert_samples_into(self, out, analog_samples=None, n_bits=0, shift_bits=0,
+                              marker_1=None, marker_2=None):
+        """
+        Fused conversion of analog samples and marker states into the integer format of the device.
+        The analog samples are mapped onto n_bits signed integers (rounded to nearest and clipped)
+        and shifted left by shift_bits. The markers are packed into bit 0 (marker_1) and bit 1 (marker_2).
+        The result is written into the preallocated array out, working on _conversion_chunk_size
+        samples at a time so that no full size temporary arrays are created.
 
-        return bit_dch_1 + bit_dch_2
+        :param out: np.ndarray(dtype=int8 or int16) to write the samples into (may be a strided view)
+        :param analog_samples: optional, np.ndarray of samples from the sequence generator normed (-1...1)
+        :param n_bits: number of bits; sets the highest integer allowed. Eg. 8 bits -> int in [-128, 127]
+        :param shift_bits: number of bits the analog values are shifted to the left
+        :param marker_1: optional, np.ndarray(dtype=bool) of the marker encoded in bit 0
+        :param marker_2: optional, np.ndarray(dtype=bool) of the marker encoded in bit 1
+        """
+
+        if analog_samples is not None:
+            n_bits = int(n_bits)
+            min_intval = -2 ** (n_bits - 1)
+            max_intval = 2 ** (n_bits - 1) - 1
+
+            max_u_samples = 1  # data should be normalized in (-1..1)
+            if len(analog_samples) > 0:
+                biggest_val = max(np.max(analog_samples), -np.min(analog_samples))
+                if biggest_val > 1:
+                    self.log.warning("Samples from sequencegenerator out of range. Normalizing to -1..1. Please "
+                                     "change the maximum peak to peak Voltage in the Pulse Generator Settings if "
+                                     "you want to use a higher power.")
+                    max_u_samples = biggest_val
+            # manual 8.22.4 Waveform Data Format in Direct Mode
+            # map -max_u_samples..max_u_samples linearly onto min_intval..max_intval
+            scale = (max_intval - min_intval) / (2 * max_u_samples)
+            offset = (max_intval + min_intval) / 2
+
+        chunk_size = self._conversion_chunk_size
+        float_chunk = np.empty(min(len(out), chunk_size), dtype='float32')
+        marker_chunk = np.empty(min(len(out), chunk_size), dtype=out.dtype)
+        for start in range(0, len(out), chunk_size):
+            stop = min(start + chunk_size, len(out))
+            out_chunk = out[start:stop]
+            if analog_samples is not None:
+                values = float_chunk[:stop - start]
+                np.multiply(analog_samples[start:stop], scale, out=values)
+                values += offset
+                np.rint(values, out=values)
+                np.clip(values, min_intval, max_intval, out=values)
+                np.copyto(out_chunk, values, casting='unsafe')
+                if shift_bits:
+                    np.left_shift(out_chunk, shift_bits, out=out_chunk)
+            else:
+                out_chunk.fill(0)
+            if marker_1 is not None:
+                np.bitwise_or(out_chunk, marker_1[start:stop], out=out_chunk)
+            if marker_2 is not None:
+                markers = marker_chunk[:stop - start]
+                np.left_shift(marker_2[start:stop], 1, out=markers)
+                np.bitwise_or(out_chunk, markers, out=out_chunk)
 
     @abstractmethod
     def _compile_bin_samples(self, analog_samples, digital_samples, ch_num):
@@ -2306,18 +2353,20 @@ class AWGM8195A(AWGM819X):
         interleaved = self.interleaved_wavefile
         self.log.debug("Compiling samples for {}, interleaved: {}".format(ch_str, interleaved))
 
-        a_samples = self.float_to_sample(analog_samples[ch_str])
+        a_samples = analog_samples[ch_str]
 
         if interleaved and ch_str == 'a_ch1':
-            d_samples = self.bool_to_sample(digital_samples['d_ch1'], digital_samples['d_ch2'],
-                                            int_type_str='int8')
             # the analog and digital samples are stored in the following format: a1, d1, a2, d2, a3, d3, ...
-            comb_samples = np.zeros(2 * a_samples.size, dtype=np.int8)
-            comb_samples[::2] =  a_samples
-            comb_samples[1::2] = d_samples
+            comb_samples = np.empty(2 * a_samples.size, dtype=np.int8)
+            self._convert_samples_into(comb_samples[::2], analog_samples=a_samples,
+                                       n_bits=self._dac_resolution)
+            self._convert_samples_into(comb_samples[1::2], marker_1=digital_samples['d_ch1'],
+                                       marker_2=digital_samples['d_ch2'])
 
         else:
-            comb_samples = a_samples
+            comb_samples = np.empty(a_samples.size, dtype=np.int8)
+            self._convert_samples_into(comb_samples, analog_samples=a_samples,
+                                       n_bits=self._dac_resolution)
 
         return comb_samples
 
@@ -2406,9 +2455,10 @@ class AWGM8195A(AWGM819X):
 
     def float_to_sample(self, val):
 
-        val_int = self._float_to_int(val, self._dac_resolution)
+        val_int = np.empty(len(val), dtype='int8')
+        self._convert_samples_into(val_int, analog_samples=val, n_bits=self._dac_resolution)
 
-        return val_int.astype('int8')
+        return val_int
 
     def _define_new_sequence(self, name, num_steps):
         # no storage system for sequences on 8195a
@@ -2668,14 +2718,17 @@ class AWGM8190A(AWGM819X):
 
         marker = self.marker_on
 
-        a_samples = self.float_to_sample(analog_samples[ch_num])
-        marker_sample = digital_samples[self._analogue_ch_corresponding_digital_chs(ch_num)[0]]
-        marker_sync = digital_samples[self._analogue_ch_corresponding_digital_chs(ch_num)[1]]
-        d_samples = self.bool_to_sample(marker_sample, marker_sync, int_type_str='int16')
+        a_samples = analog_samples[ch_num]
+        shiftbits = 16 - self._dac_resolution  # 2 for marker, dac: 12 -> 2, dac: 14 -> 4
+        comb_samples = np.empty(a_samples.size, dtype='int16')
         if marker:
-            comb_samples = a_samples + d_samples
+            marker_sample = digital_samples[self._analogue_ch_corresponding_digital_chs(ch_num)[0]]
+            marker_sync = digital_samples[self._analogue_ch_corresponding_digital_chs(ch_num)[1]]
+            self._convert_samples_into(comb_samples, analog_samples=a_samples, n_bits=self._dac_resolution,
+                                       shift_bits=shiftbits, marker_1=marker_sample, marker_2=marker_sync)
         else:
-            comb_samples = a_samples
+            self._convert_samples_into(comb_samples, analog_samples=a_samples, n_bits=self._dac_resolution,
+                                       shift_bits=shiftbits)
 
         return comb_samples
 
@@ -2754,10 +2807,12 @@ class AWGM8190A(AWGM819X):
 
     def float_to_sample(self, val):
 
-        val_int = self._float_to_int(val, self._dac_resolution)
+        val_int = np.empty(len(val), dtype='int16')
         shiftbits = 16 - self._dac_resolution  # 2 for marker, dac: 12 -> 2, dac: 14 -> 4
+        self._convert_samples_into(val_int, analog_samples=val, n_bits=self._dac_resolution,
+                                   shift_bits=shiftbits)
 
-        return val_int.astype('int16') << shiftbits
+        return val_int
 
     def _delete_all_sequences(self):
 
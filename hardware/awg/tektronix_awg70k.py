@@ -34,6 +34,7 @@ from core.module import Base
 from core.configoption import ConfigOption
 from core.util.modules import get_home_dir
 from core.util.helpers import natural_sort
+from core.util.sample_file_writer import SampleFileWriter
 from interface.pulser_interface import PulserInterface, PulserConstraints, SequenceOption
 
 
@@ -94,6 +95,9 @@ class AWG70K(Base, PulserInterface):
         if not os.path.exists(self._tmp_work_dir):
             os.makedirs(os.path.abspath(self._tmp_work_dir))
 
+        # Open sample file writers of waveforms written chunkwise
+        self._wfm_writers = dict()
+
         # connect to awg using PyVISA
         if self._visa_address not in self._rm.list_resources():
             self.awg = None
@@ -127,6 +131,10 @@ class AWG70K(Base, PulserInterface):
     def on_deactivate(self):
         """ Required tasks to be performed during deactivation of the module.
         """
+        # Close the files of waveforms whose last chunk has not been written
+        for filename in list(self._wfm_writers):
+            self._close_wfm_writer(filename)
+
         # Closes the connection to the AWG
         try:
             self.awg.close()
@@ -1586,54 +1594,46 @@ class AWG70K(Base, PulserInterface):
         @return list: the list contains the string names of the created files for the passed
                       presampled arrays
         """
-        # The memory overhead of the tmp file write/read process in bytes. Only used if wfmx file is
-        # written in chunks in order to avoid excessive memory usage.
-        tmp_bytes_overhead = 16777216  # 16 MB
-
         if not filename.endswith('.wfmx'):
             filename += '.wfmx'
         wfmx_path = os.path.join(self._tmp_work_dir, filename)
-        tmp_path = os.path.join(self._tmp_work_dir, 'digital_tmp.bin')
 
-        # if it is the first chunk, create the .WFMX file with header.
+        # if it is the first chunk, create the preallocated .WFMX file with header.
+        # The file holds the analog samples (np.float32) of the entire waveform followed by the
+        # marker bytes (np.uint8). Both are written at their final position in the file.
         if is_first_chunk:
-            # create header
             header = self._create_xml_header(total_number_of_samples, marker_bytes is not None)
-            # write header
-            with open(wfmx_path, 'wb') as wfmxfile:
-                wfmxfile.write(header.encode('utf8'))
-            # Check if a tmp digital samples file is present and delete it if necessary.
-            if os.path.isfile(tmp_path):
-                os.remove(tmp_path)
-
-        # append analog samples to the .WFMX file.
-        # Write digital samples in temporary file if not the entire samples are passed at once.
-        with open(wfmx_path, 'ab') as wfmxfile:
-            # append analog samples in binary format. One sample is 4 bytes (np.float32).
-            wfmxfile.write(analog_samples)
-
-        # Write digital samples to tmp file if chunkwise writing is used and it's not the last chunk
-        if not is_last_chunk and marker_bytes is not None:
-            with open(tmp_path, 'ab') as tmp_file:
-                tmp_file.write(marker_bytes)
-
-        # If this is the last chunk, write digital samples from tmp file to wfmx file (if present)
-        # and also append the currently passed digital samples to wfmx file.
-        # Read from tmp file in chunks of tmp_bytes_overhead in order to avoid too much memory
-        # overhead.
-        if is_last_chunk and marker_bytes is not None:
-            with open(wfmx_path, 'ab') as wfmxfile:
-                # Copy over digital samples from tmp file. Delete tmp file afterwards.
-                if os.path.isfile(tmp_path):
-                    with open(tmp_path, 'rb') as tmp_file:
-                        while True:
-                            tmp = tmp_file.read(tmp_bytes_overhead)
-                            if not tmp:
-                                break
-                            wfmxfile.write(tmp)
-                    os.remove(tmp_path)
-                # Append current digital samples array to wfmx file
-                wfmxfile.write(marker_bytes)
+            section_dtypes = ['<f4'] if marker_bytes is None else ['<f4', 'u1']
+            self._close_wfm_writer(filename)
+            self._wfm_writers[filename] = SampleFileWriter(wfmx_path,
+                                                           total_number_of_samples,
+                                                           section_dtypes,
+                                                           header=header.encode('utf8'))
+        writer = self._wfm_writers.get(filename)
+        if writer is None:
+            self.log.error('Unable to write samples to "{0}". The first chunk of the waveform '
+                           'has not been written.'.format(filename))
+            return
+
+        chunk_position = writer.position(section=0)
+        writer.write(analog_samples, section=0)
+        if marker_bytes is not None:
+            writer.write(marker_bytes, section=1, position=chunk_position)
+
+        if is_last_chunk:
+            self._close_wfm_writer(filename)
+        else:
+            writer.flush()
+        return
+
+    def _close_wfm_writer(self, filename):
+        """ Close the sample file writer of a waveform file if it is open.
+
+        @param str filename: name of the waveform file
+        """
+        writer = self._wfm_writers.pop(filename, None)
+        if writer is not None:
+            writer.close()
         return
 
     def _create_xml_header(self, number_of_samples, markers_active):
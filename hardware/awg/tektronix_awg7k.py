@@ -30,6 +30,7 @@ from collections import OrderedDict
 
 from core.util.modules import get_home_dir
 from core.util.helpers import natural_sort
+from core.util.sample_file_writer import SampleFileWriter
 from core.module import Base
 from core.configoption import ConfigOption
 from interface.pulser_interface import PulserInterface, PulserConstraints, SequenceOption
@@ -91,6 +92,9 @@ class AWG7k(Base, PulserInterface):
         if not os.path.exists(self._tmp_work_dir):
             os.makedirs(os.path.abspath(self._tmp_work_dir))
 
+        # Open sample file writers of waveforms written chunkwise
+        self._wfm_writers = dict()
+
         try:
             self.awg = self._rm.open_resource(
                 self._visa_address,
@@ -132,6 +136,10 @@ class AWG7k(Base, PulserInterface):
     def on_deactivate(self):
         """ Deinitialisation performed during deactivation of the module.
         """
+        # Close the files of waveforms whose last chunk has not been written
+        for filename in list(self._wfm_writers):
+            self._close_wfm_writer(filename)
+
         # Closes the connection to the AWG
         try:
             self.awg.close()
@@ -1406,55 +1414,50 @@ class AWG7k(Base, PulserInterface):
         @param is_last_chunk: bool, indicates if the current chunk is the last
                               write to this file.
         """
-        # The memory overhead of the tmp file write/read process in bytes.
-        tmp_bytes_overhead = 104857600  # 100 MB
-        tmp_samples = tmp_bytes_overhead // 5
-        if tmp_samples > len(analog_samples):
-            tmp_samples = len(analog_samples)
-
         if not filename.endswith('.wfm'):
             filename += '.wfm'
         wfm_path = os.path.join(self._tmp_work_dir, filename)
 
-        # if it is the first chunk, create the WFM file with header.
+        # if it is the first chunk, create the preallocated WFM file with header and footer.
         if is_first_chunk:
-            with open(wfm_path, 'wb') as wfm_file:
-                # write the first line, which is the header file, if first chunk is passed:
-                num_bytes = str(int(total_number_of_samples * 5))
-                num_digits = str(len(num_bytes))
-                header = 'MAGIC 1000\r\n#{0}{1}'.format(num_digits, num_bytes)
-                wfm_file.write(header.encode())
-
-        # For the WFM file format unfortunately we need to write the digital sampels together
-        # with the analog samples. Therefore we need a temporary copy of all samples for each
-        # analog channel.
-        write_array = np.zeros(tmp_samples, dtype='float32, uint8')
-
-        # Consecutively prepare and write chunks of maximal size tmp_bytes_overhead to file
-        samples_written = 0
-        with open(wfm_path, 'ab') as wfm_file:
-            while samples_written < len(analog_samples):
-                write_end = samples_written + write_array.size
-                # Prepare tmp write array
-                write_array['f0'] = analog_samples[samples_written:write_end]
-                if marker_bytes is not None:
-                    write_array['f1'] = marker_bytes[samples_written:write_end]
-                # Write to file
-                wfm_file.write(write_array)
-                # Increment write counter
-                samples_written = write_end
-                # Reduce write array size if
-                if 0 < total_number_of_samples - samples_written < write_array.size:
-                    write_array.resize(total_number_of_samples - samples_written)
-
-        del write_array
-
-        # append footer if it's the last chunk to write
-        if is_last_chunk:
+            # the first line is the header
+            num_bytes = str(int(total_number_of_samples * 5))
+            num_digits = str(len(num_bytes))
+            header = 'MAGIC 1000\r\n#{0}{1}'.format(num_digits, num_bytes)
             # the footer encodes the sample rate, which was used for that file:
             footer = 'CLOCK {0:16.10E}\r\n'.format(self.get_sample_rate())
-            with open(wfm_path, 'ab') as wfm_file:
-                wfm_file.write(footer.encode())
+            # For the WFM file format unfortunately we need to write the digital samples together
+            # with the analog samples. Each sample is a record of 4 bytes (np.float32) for the
+            # analog sample and 1 byte (np.uint8) for the markers.
+            self._close_wfm_writer(filename)
+            self._wfm_writers[filename] = SampleFileWriter(wfm_path,
+                                                           total_number_of_samples,
+                                                           ['float32, uint8'],
+                                                           header=header.encode(),
+                                                           footer=footer.encode())
+        writer = self._wfm_writers.get(filename)
+        if writer is None:
+            self.log.error('Unable to write samples to "{0}". The first chunk of the waveform '
+                           'has not been written.'.format(filename))
+            return
+
+        # The records are interleaved chunkwise in a small buffer by the writer
+        writer.write({'f0': analog_samples, 'f1': marker_bytes})
+
+        if is_last_chunk:
+            self._close_wfm_writer(filename)
+        else:
+            writer.flush()
+        return
+
+    def _close_wfm_writer(self, filename):
+        """ Close the sample file writer of a waveform file if it is open.
+
+        @param str filename: name of the waveform file
+        """
+        writer = self._wfm_writers.pop(filename, None)
+        if writer is not None:
+            writer.close()
         return
 
     def sequence_set_waveform(self, waveform_name, step, track):
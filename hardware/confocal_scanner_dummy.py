@@ -36,6 +36,9 @@ class ConfocalScannerDummy(Base, ConfocalScannerInterface):
     confocal_scanner_dummy:
         module.Class: 'confocal_scanner_dummy.ConfocalScannerDummy'
         clock_frequency: 100 # in Hz
+        number_of_emitters: 500 # optional, number of randomly placed emitters
+        emitter_cutoff: 5 # optional, emitters further away than this many sigma are ignored
+        simulate_timing: True # optional, set False to scan without waiting (e.g. for benchmarks)
         fitlogic: 'fitlogic' # name of the fitlogic module, see default config
 
     """
@@ -45,6 +48,12 @@ class ConfocalScannerDummy(Base, ConfocalScannerInterface):
 
     # config
     _clock_frequency = ConfigOption('clock_frequency', 100, missing='warn')
+    _num_points = ConfigOption('number_of_emitters', 500)
+    _emitter_cutoff = ConfigOption('emitter_cutoff', 5)
+    _simulate_timing = ConfigOption('simulate_timing', True)
+
+    # number of pixels of a line evaluated at once
+    _pixels_per_chunk = 64
 
     def __init__(self, config, **kwargs):
         super().__init__(config=config, **kwargs)
@@ -55,7 +64,10 @@ class ConfocalScannerDummy(Base, ConfocalScannerInterface):
 
         self._position_range = [[0, 100e-6], [0, 100e-6], [0, 100e-6], [0, 1e-6]]
         self._current_position = [0, 0, 0, 0][0:len(self.get_scanner_axes())]
-        self._num_points = 500
+
+        # spatial index of the emitters: grid cell (ix, iy) -> emitter indices
+        self._emitter_grid = dict()
+        self._grid_cell_size = 1e-6
 
     def on_activate(self):
         """ Initialisation performed during activation of the module.
@@ -120,6 +132,8 @@ class ConfocalScannerDummy(Base, ConfocalScannerInterface):
         # offset
         self._points_z[:, 3] = 0
 
+        self._build_emitter_grid()
+
     def on_deactivate(self):
         """ Deactivate properly the confocal scanner dummy.
         """
@@ -317,18 +331,22 @@ class ConfocalScannerDummy(Base, ConfocalScannerInterface):
             self._set_up_line(np.shape(line_path)[1])
 
         count_data = np.random.uniform(0, 2e4, self._line_length)
-        z_data = line_path[2, :]
-
-        #TODO: Change the gaussian function here to the one from fitlogic and delete the local modules to calculate
-        #the gaussian functions
+        z_data = np.array(line_path[2, :])
         x_data = np.array(line_path[0, :])
         y_data = np.array(line_path[1, :])
-        for i in range(self._num_points):
-            count_data += self.twoD_gaussian_function((x_data, y_data), *(self._points[i])
-                ) * self.gaussian_function(np.array(z_data), *(self._points_z[i]))
 
-        time.sleep(self._line_length * 1. / self._clock_frequency)
-        time.sleep(self._line_length * 1. / self._clock_frequency)
+        # Evaluate the line in chunks of pixels, so that only the emitters close enough to each
+        # chunk are looked up and the temporary arrays stay small even for long or diagonal lines
+        for start in range(0, self._line_length, self._pixels_per_chunk):
+            chunk = slice(start, start + self._pixels_per_chunk)
+            emitters = self._get_emitters_near(x_data[chunk], y_data[chunk])
+            if emitters.size > 0:
+                count_data[chunk] += self._emitter_counts(
+                    x_data[chunk], y_data[chunk], z_data[chunk], emitters)
+
+        if self._simulate_timing:
+            time.sleep(self._line_length * 1. / self._clock_frequency)
+            time.sleep(self._line_length * 1. / self._clock_frequency)
 
         # update the scanner position instance variable
         self._current_position = list(line_path[:, -1])
@@ -357,6 +375,68 @@ class ConfocalScannerDummy(Base, ConfocalScannerInterface):
         self.log.debug('ConfocalScannerDummy>close_scanner_clock')
         return 0
 
+    def _build_emitter_grid(self):
+        """ Sorts the emitters into a grid of square cells in the xy plane.
+
+        The cell size is the cutoff distance of the broadest emitter, so only the cells touched by a
+        line (plus one neighbouring cell) need to be evaluated.
+        """
+        max_sigma = np.max(np.abs(self._points[:, 3:5])) if self._num_points > 0 else 1e-6
+        self._grid_cell_size = self._emitter_cutoff * max_sigma
+        cells = np.floor(self._points[:, 1:3] / self._grid_cell_size).astype(np.int64)
+        unique_cells, cell_index = np.unique(cells, axis=0, return_inverse=True)
+        cell_index = cell_index.ravel()
+        order = np.argsort(cell_index, kind='stable')
+        splits = np.cumsum(np.bincount(cell_index, minlength=len(unique_cells)))[:-1]
+        self._emitter_grid = {
+            tuple(cell): indices for cell, indices in zip(unique_cells, np.split(order, splits))}
+
+    def _get_emitters_near(self, x_data, y_data):
+        """ Looks up all emitters that can contribute to a line from the emitter grid.
+
+        @param numpy.ndarray x_data: x positions of the line
+        @param numpy.ndarray y_data: y positions of the line
+
+        @return numpy.ndarray: indices of the emitters within the cutoff distance of the line
+        """
+        ix_min, iy_min = np.floor(
+            np.array([np.min(x_data), np.min(y_data)]) / self._grid_cell_size).astype(np.int64) - 1
+        ix_max, iy_max = np.floor(
+            np.array([np.max(x_data), np.max(y_data)]) / self._grid_cell_size).astype(np.int64) + 1
+        emitters = [self._emitter_grid[(ix, iy)]
+                    for ix in range(ix_min, ix_max + 1)
+                    for iy in range(iy_min, iy_max + 1)
+                    if (ix, iy) in self._emitter_grid]
+        if not emitters:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(emitters)
+
+    def _emitter_counts(self, x_data, y_data, z_data, emitters):
+        """ Fluorescence of the given emitters at the positions of a line.
+
+        Evaluates the same model as twoD_gaussian_function times gaussian_function for all given
+        emitters at once.
+
+        @param numpy.ndarray x_data: x positions of the line
+        @param numpy.ndarray y_data: y positions of the line
+        @param numpy.ndarray z_data: z positions of the line
+        @param numpy.ndarray emitters: indices of the emitters to evaluate
+
+        @return numpy.ndarray: summed counts for each position of the line
+        """
+        amplitude, x_zero, y_zero, sigma_x, sigma_y, theta, offset = (
+            self._points[emitters].T[:, :, np.newaxis])
+        amplitude_z, z_zero, sigma_z, offset_z = self._points_z[emitters].T[:, :, np.newaxis]
+
+        a = (np.cos(theta)**2) / (2 * sigma_x**2) + (np.sin(theta)**2) / (2 * sigma_y**2)
+        b = -(np.sin(2 * theta)) / (4 * sigma_x**2) + (np.sin(2 * theta)) / (4 * sigma_y**2)
+        c = (np.sin(theta)**2) / (2 * sigma_x**2) + (np.cos(theta)**2) / (2 * sigma_y**2)
+        dx = x_data - x_zero
+        dy = y_data - y_zero
+        xy_counts = offset + amplitude * np.exp(-(a * dx**2 + 2 * b * dx * dy + c * dy**2))
+        z_counts = amplitude_z * np.exp(-(z_data - z_zero)**2 / (2 * sigma_z**2)) + offset_z
+        return np.sum(xy_counts * z_counts, axis=0)
+
 ############################################################################
 #                                                                          #
 #    the following two functions are needed to fluoreschence signal        #
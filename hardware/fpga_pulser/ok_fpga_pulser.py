@@ -80,12 +80,12 @@ class OkFpgaPulser(Base, PulserInterface):
         self._disconnect_fpga()
 
     @__current_waveform.representer
-    def _convert_current_waveform(self, waveform_bytearray):
-        return np.frombuffer(waveform_bytearray, dtype='uint8')
+    def _convert_current_waveform(self, waveform):
+        return np.asarray(waveform, dtype='uint8')
 
     @__current_waveform.constructor
     def _recover_current_waveform(self, waveform_nparray):
-        return bytearray(waveform_nparray.tobytes())
+        return np.array(waveform_nparray, dtype='uint8')
 
     def get_constraints(self):
         """
@@ -215,6 +215,8 @@ class OkFpgaPulser(Base, PulserInterface):
         # in 1024 byte blocks and the rest is transfered in 32 byte blocks
         big_bytesize = (len(self.__current_waveform) // 1024) * 1024
         small_bytesize = len(self.__current_waveform) - big_bytesize
+        # zero-copy view on the waveform buffer
+        waveform_buffer = memoryview(self.__current_waveform)
 
         # try repeatedly to upload the samples to the FPGA RAM
         # stop if the upload was successful
@@ -228,12 +230,12 @@ class OkFpgaPulser(Base, PulserInterface):
                 # enable sequence write mode in FPGA
                 self.write((255 << 24) + 2)
                 # write to FPGA DDR2-RAM
-                self.fpga.WriteToBlockPipeIn(0x80, 1024, self.__current_waveform[0:big_bytesize])
+                self._write_block_pipe(1024, waveform_buffer[0:big_bytesize])
             if small_bytesize != 0:
                 # enable sequence write mode in FPGA
                 self.write((8 << 24) + 2)
                 # write to FPGA DDR2-RAM
-                self.fpga.WriteToBlockPipeIn(0x80, 32, self.__current_waveform[big_bytesize:])
+                self._write_block_pipe(32, waveform_buffer[big_bytesize:])
 
             # check if upload was successful
             self.write(0x00)
@@ -306,7 +308,7 @@ class OkFpgaPulser(Base, PulserInterface):
         self.__currently_loaded_waveform = ''
         self.__current_waveform_name = ''
         # just for good measures, write and load a empty waveform
-        self.__current_waveform = bytearray(np.zeros(32))
+        self.__current_waveform = np.zeros(32, dtype='uint8')
         self.__samples_written = 32
         self.load_waveform([self.__current_waveform_name])
         return 0
@@ -573,7 +575,7 @@ class OkFpgaPulser(Base, PulserInterface):
                 self.log.warning('No samples handed over for waveform generation.')
                 return -1, list()
             else:
-                self.__current_waveform = bytearray(np.zeros(32))
+                self.__current_waveform = np.zeros(32, dtype='uint8')
                 self.__samples_written = 32
                 self.__current_waveform_name = ''
                 return 0, list()
@@ -597,26 +599,72 @@ class OkFpgaPulser(Base, PulserInterface):
         chunk_length = len(digital_samples[list(digital_samples)[0]])
         write_end_index = self.__samples_written + chunk_length
 
-        # Encode samples for each channel in bit mask and create waveform array
-        for chnl, samples in digital_samples.items():
-            # get channel index in range 0..7
-            chnl_ind = int(chnl.rsplit('ch', 1)[1]) - 1
-            # Represent bool values as np.uint8
-            uint8_samples = samples.view('uint8')
-            # left shift 0/1 values to bit position corresponding to channel index
-            np.left_shift(uint8_samples, chnl_ind, out=uint8_samples)
-            # Add samples to waveform array
-            np.add(self.__current_waveform[self.__samples_written:write_end_index],
-                   uint8_samples,
-                   out=self.__current_waveform[self.__samples_written:write_end_index])
-
-        # Convert numpy array to bytearray
-        self.__current_waveform = bytearray(self.__current_waveform.tobytes())
+        # Encode samples for each channel in bit mask directly into the waveform array
+        self._encode_digital_samples(
+            digital_samples, self.__current_waveform[self.__samples_written:write_end_index])
 
         # increment the current write index
         self.__samples_written += chunk_length
         return chunk_length, [self.__current_waveform_name]
 
+    def set_pulse_ensemble(self, ensemble_name, ensemble_info):
+        """
+        Create the waveform directly from the digital instruction table of the ensemble.
+
+        @param str ensemble_name: the name of the waveform to be created
+        @param dict ensemble_info: information about the ensemble, see PulserInterface
+
+        @return bool: True if the waveform has been created, False otherwise
+        """
+        if ensemble_info['analog_channels'] or 'digital_instruction_table' not in ensemble_info:
+            return False
+        if self.__current_status != 0:
+            self.log.error('FPGA is not idle, so the waveform can`t be written at this time.')
+            return False
+
+        table = ensemble_info['digital_instruction_table']
+        number_of_samples = table['number_of_samples']
+
+        # Append zero-timebins to waveform if the length is no integer multiple of 32
+        padded_length = max(32, -(-number_of_samples // 32) * 32)
+        if padded_length != number_of_samples:
+            self.log.warning('FPGA pulse sequence length is no integer multiple of 32 samples.'
+                             '\nAppending {0:d} zero-samples to the sequence.'
+                             ''.format(padded_length - number_of_samples))
+
+        self.__current_waveform = np.zeros(padded_length, dtype='uint8')
+        self.__current_waveform[:number_of_samples] = np.repeat(
+            table['flat_bitmasks'].astype('uint8'), table['flat_durations'])
+        self.__current_waveform_name = ensemble_name
+        self.__samples_written = number_of_samples
+        return True
+
+    @staticmethod
+    def _encode_digital_samples(digital_samples, out):
+        """ Pack the digital channel samples into one byte per sample (bit n = channel n+1).
+
+        @param dict digital_samples: keys are the generic digital channel names (i.e. 'd_ch1') and
+                                     values are 1D numpy arrays of type bool of equal length.
+        @param numpy.ndarray out: uint8 array of the same length to write the bit masks into
+        """
+        shifted = np.empty((len(digital_samples), len(out)), dtype='uint8')
+        for row, (chnl, samples) in zip(shifted, digital_samples.items()):
+            # left shift 0/1 values to bit position corresponding to channel index 0..7
+            np.left_shift(samples.view('uint8'), int(chnl.rsplit('ch', 1)[1]) - 1, out=row)
+        np.bitwise_or.reduce(shifted, axis=0, out=out)
+
+    def _write_block_pipe(self, block_size, data):
+        """ Write a buffer to the FPGA DDR2-RAM pipe.
+
+        @param int block_size: block size of the transfer in bytes
+        @param memoryview data: buffer to transfer
+        """
+        try:
+            self.fpga.WriteToBlockPipeIn(0x80, block_size, data)
+        except TypeError:
+            # Older FrontPanel bindings only accept bytearray objects
+            self.fpga.WriteToBlockPipeIn(0x80, block_size, bytearray(data))
+
     def write_sequence(self, name, sequence_parameters):
         """
         Write a new sequence on the device memory.
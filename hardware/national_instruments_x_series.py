@@ -1407,6 +1407,42 @@ class NationalInstrumentsXSeries(Base, SlowCounterInterface, ConfocalScannerInte
         # return values is a rate of counts/s
         return all_data.transpose()
 
+    def scan_lines(self, line_paths, pixel_clock=False):
+        """ Scans several lines as one analog output waveform and counter task.
+
+        @param list line_paths: list of float[c][m_i] arrays defining the voltage points of each line
+        @param pixel_clock: bool for all lines or a sequence of bools, one for each line, whether
+                            we need to output a pixel clock for the line
+
+        @return list: float[m_i][n] n-channel photon counts per second for each line
+
+        The pixel clock is the scanner clock routed to the pixel clock channel for a whole task. If
+        a pixel clock channel is configured and only some lines need the pixel clock, each run of
+        consecutive lines with the same setting is scanned as a task of its own, so that the pixel
+        clock only ticks on the samples of these lines.
+        """
+        if np.ndim(pixel_clock) == 0:
+            pixel_clock = [pixel_clock] * len(line_paths)
+        pixel_clock = [bool(line_pixel_clock) for line_pixel_clock in pixel_clock]
+        if self._pixel_clock_channel is None:
+            # no pixel clock output, so all lines fit into one task
+            pixel_clock = [False] * len(line_paths)
+
+        all_counts = list()
+        start = 0
+        while start < len(line_paths):
+            stop = start + 1
+            while stop < len(line_paths) and pixel_clock[stop] == pixel_clock[start]:
+                stop += 1
+            line_lengths = [np.shape(path)[1] for path in line_paths[start:stop]]
+            counts = self.scan_line(np.hstack(line_paths[start:stop]),
+                                    pixel_clock=pixel_clock[start])
+            if np.any(counts == -1):
+                return [np.array([[-1.]])]
+            all_counts.extend(np.split(counts, np.cumsum(line_lengths)[:-1]))
+            start = stop
+        return all_counts
+
     def close_scanner(self):
         """ Closes the scanner and cleans up afterwards.
 
@@ -1825,6 +1825,53 @@ class PulseBlasterESRPRO(Base, SwitchInterface, PulserInterface):
 
         return chunk_length, [self._current_pb_waveform_name]
 
+    def set_pulse_ensemble(self, ensemble_name, ensemble_info):
+        """ Create the PulseBlaster sequence directly from the digital
+            instruction table of the ensemble.
+
+        @param str ensemble_name: the name of the waveform to be created
+        @param dict ensemble_info: information about the ensemble, see
+                                   PulserInterface
+
+        @return bool: True if the sequence has been written, False otherwise
+        """
+        if ensemble_info['analog_channels'] or 'digital_instruction_table' not in ensemble_info:
+            return False
+
+        table = ensemble_info['digital_instruction_table']
+        if len(table['flat_durations']) == 0:
+            return False
+
+        # channel numbers start with 0, bit n of the bitmask is channel n
+        active_channels = {mask: [bit for bit in range(32) if (mask >> bit) & 1]
+                           for mask in np.unique(table['flat_bitmasks']).tolist()}
+
+        pb_sequence_list = list()
+        for duration, mask in zip(table['flat_durations'].tolist(),
+                                  table['flat_bitmasks'].tolist()):
+            length = duration * self.GRAN_MIN
+            # increase length by 1%, to remove the ambiguity for the comparison
+            if length * 1.01 < self.LEN_MIN:
+                self.log.warning('Current waveform contains a pulse of length '
+                                 '{0:.2f}ns, which is smaller than the minimal '
+                                 'allowed length of {1:.2f}ns! Pulse sequence '
+                                 'might most probably look unexpected. '
+                                 'Increase the length of the smallest pulse!'
+                                 ''.format(length*1e9, self.LEN_MIN*1e9))
+            pb_sequence_list.append({'active_channels': list(active_channels[mask]),
+                                     'length': length})
+
+        self._current_activation_config = table['digital_channels']
+        self._current_pb_waveform_theoretical = pb_sequence_list
+        self._current_pb_waveform_name = ensemble_name
+        self._current_pb_waveform = self._correct_sequence_for_delays(self._current_pb_waveform_theoretical)
+        self.write_pulse_form(self._current_pb_waveform)
+        self.log.debug('Waveform written in PulseBlaster with name "{0}" '
+                       'and a total length of {1} sequence '
+                       'entries.'.format(self._current_pb_waveform_name,
+                                          len(self._current_pb_waveform)))
+        return True
+
     def _convert_sample_to_pb_sequence(self, digital_samples):
         """ Helper method to create a pulse blaster sequence.
 
@@ -31,6 +31,7 @@ from core.configoption import ConfigOption
 from interface.pulser_interface import PulserInterface, PulserConstraints
 from collections import OrderedDict
 import pulsestreamer as ps
+import numpy as np
 import os
 
 
@@ -592,94 +593,112 @@ a
             bits = bits | (1<< channel)
         return bits
 
-    def set_pulse_ensemble(self, ensemble_name, ensemble):
+    @staticmethod
+    def _get_channel_rle(rising, falling, n_samples):
+        """ Build the run length encoded sequence of a single digital channel from its edges.
+
+        @param numpy.ndarray rising: sample indices of the rising edges
+        @param numpy.ndarray falling: sample indices of the falling edges (same length as rising)
+        @param int n_samples: total length of the sequence in samples
+
+        @return list: run length encoded sequence as list of (duration, level) tuples
+
+        The durations alternate between LOW and HIGH, starting with the LOW time before the first
+        rising edge and ending with the LOW time after the last falling edge. A falling edge at
+        sample 0 (e.g. a sync pulse wrapping around) makes the last HIGH pulse last until the end of
+        the sequence. Durations of zero are dropped.
+        """
+        rising = np.asarray(rising, dtype='int64')
+        falling = np.asarray(falling, dtype='int64')
+
+        durations = np.empty(2 * len(rising) + 1, dtype='int64')
+        durations[0] = rising[0]
+        durations[1::2] = falling - rising
+        durations[2:-1:2] = rising[1:] - falling[:-1]
+        durations[-1] = n_samples - falling[-1]
+        if falling[0] == 0:
+            durations[-2] = n_samples - rising[-1]
+            durations[-1] = 0
+
+        levels = np.zeros(len(durations), dtype='int64')
+        levels[1::2] = 1
+
+        nonzero = durations > 0
+        return list(zip(durations[nonzero].tolist(), levels[nonzero].tolist()))
+
+    @staticmethod
+    def _get_channel_edges(durations, bitmasks, channel_num):
+        """ Get the edges of a single digital channel from the digital instruction table.
+
+        @param numpy.ndarray durations: segment lengths in samples of the digital instruction table
+        @param numpy.ndarray bitmasks: channel bitmasks of the digital instruction table segments
+        @param int channel_num: channel number (bit position in the bitmasks)
+
+        @return tuple(numpy.ndarray, numpy.ndarray): sample indices of the rising and falling edges
+
+        A channel that is HIGH at the start of the sequence has a rising edge at sample 0, a channel
+        that is HIGH at the end has a falling edge at the total number of samples. Hence there are
+        as many rising as falling edges and the first rising edge comes first (see _get_channel_rle).
+        """
+        levels = (np.asarray(bitmasks, dtype='int64') >> channel_num) & 1
+        segment_starts = np.concatenate(([0], np.cumsum(durations, dtype='int64')))
+        level_changes = np.diff(np.concatenate(([0], levels, [0])))
+        return (segment_starts[np.flatnonzero(level_changes == 1)],
+                segment_starts[np.flatnonzero(level_changes == -1)])
+
+    def set_pulse_ensemble(self, ensemble_name, ensemble_info):
+        """ Set up the pulse sequence from the digital instruction table of the ensemble.
+
+        @param str ensemble_name: the name of the waveform to be created
+        @param dict ensemble_info: information about the ensemble, see PulserInterface
+
+        @return bool: True if the sequence has been set up, False otherwise
+        """
+        if 'digital_instruction_table' not in ensemble_info:
+            self.log.error('No digital instruction table found for ensemble "{}"'
+                           ''.format(ensemble_name))
+            return False
+        table = ensemble_info['digital_instruction_table']
+        n_samples = ensemble_info['number_of_samples']
+
         # Here we actually set up the pulse sequence on the PulseStreamer
         active_channels = [channel for channel, active in self.get_active_channels().items() if active]
         sq = self.pulse_streamer.createSequence()
-        self._current_pulse_ensemble = ensemble
+        self._current_pulse_ensemble = ensemble_info
 
-        # digital channel set up
+        # digital channel set up. Channels with identical pulse trains are merged and handed to
+        # the PulseStreamer API in a single call.
+        channel_rle = OrderedDict()
         for channel in active_channels:
-            rle = []
             try:
                 channel_num = PulseStreamer.numeric_channel(channel)
-                # TODO: check what the correct number of elements supplied is
-                # n_elem = ensemble['number_of_elements']
-                n_samples = ensemble['number_of_samples'] # total time in ns for PulseStreamer
-                rising = ensemble['digital_rising_bins'][channel]
-                falling = ensemble['digital_falling_bins'][channel]
-                n_elem = len(rising)  # will serve for now
-
-                # not all channels have pulses to configure
-                if len(rising) + len(falling) == 0:
-                    self.log.debug('No pulses on channel "{}"'.format(channel))
-                    continue
-
-                # a few sanity checks, just in case I missed something
-                if len(rising) != n_elem:
-                    self.log.warn('Number of rising edges {} does not match expected number {} on channel {}'.format(len(rising), n_elem, channel))
-                    return False
-                if len(falling) != n_elem:
-                    self.log.warn('Number of falling edges {} does not match expected number {} on channel {}'.format(len(falling), n_elem, channel))
-                    return False
-                if falling[0] < rising[0]:
-                    # starts with a falling edge?
-                    # e.g. a sync pulse might only rise once, at the end
-                    if falling[0] == 0:
-                        # This is ok, just starts low
-                        pass
-                    else:
-                        self.log.error('Pulse sequence for channel {} starts with a falling edge, unexpectedly'.format(channel))
-                        return False
-
-                # Now build the run length encoded sequence for this channel
-                # it may start with a low
-                if rising[0] > 0:
-                    rle.append((rising[0], 0))
-
-                # followed by alternating high and low pulses with some length. Total length is nsamples
-                for i in range(0, n_elem):
-                    # add HIGH pulse
-
-                    # need to deal with the case that falling[0] == 0 (i.e. for a sync pulse). In this case, duration
-                    # will end up being negative and the pulse will never be added
-                    if i == (n_elem - 1) and falling[0] == 0:
-                        duration = n_samples - rising[i]
-                        self.log.debug('Adding inferred rising pulse of duration {} to channel {}'.format(duration, channel))
-                    else:
-                        duration = falling[i] - rising[i]
-                    if duration > 0:
-                        rle.append((duration, 1))
-
-                    # add LOW pulse
-                    if i+1 < n_elem:
-                        duration = rising[i+1] - falling[i]
-                        if duration > 0:
-                            rle.append((duration, 0))
-                    elif falling[i] < n_samples:
-                        if i == (n_elem - 1) and falling[0] == 0:
-                            self.log.debug('Ignoring final pulse of channel {} as it should be set at the start of the sequence'.format(channel))
-                            continue
-                        duration = n_samples - falling[i]
-                        if duration > 0:
-                            rle.append((duration, 0))
-
-                # At this point should have the form the PulseStreamer API uses for pulse sequences.
-                # Set up this channel
-                self.log.debug('Setting pulse sequence on channel {}\n{}'.format(channel_num, rle))
-                sq.setDigital(channel_num, rle)
-
-            except KeyError:
-                self.log.exception('Could not find pulse train description for channel "{}"'.format(channel))
-                return False
-
             except ValueError:
                 self.log.exception('Failed to extract channel number for channel "{}"'.format(channel))
                 return False
 
+            # not all channels have pulses to configure
+            if channel not in table['digital_channels']:
+                self.log.debug('No pulses on channel "{}"'.format(channel))
+                continue
+
+            rising, falling = self._get_channel_edges(
+                table['flat_durations'], table['flat_bitmasks'], channel_num)
+            if len(rising) == 0:
+                # channel stays LOW during the whole sequence
+                rle = ((n_samples, 0),)
+            else:
+                rle = tuple(self._get_channel_rle(rising, falling, n_samples))
+            channel_rle.setdefault(rle, list()).append(channel_num)
+
+        # At this point the pulse trains have the form the PulseStreamer API uses for pulse sequences.
+        for rle, channel_nums in channel_rle.items():
+            self.log.debug('Setting pulse sequence with {} pulses on channel(s) {}'.format(len(rle), channel_nums))
+            sq.setDigital(channel_nums, list(rle))
+
         #TODO: add analogue channel configuration
 
         self._sequence = sq
+        self.waveforms[ensemble_name] = 1
         self.current_loaded_asset = ensemble_name
 
         return True
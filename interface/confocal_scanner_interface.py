@@ -20,7 +20,9 @@ Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
 top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
 """
 
-from core.interface import abstract_interface_method
+import numpy as np
+
+from core.interface import abstract_interface_method, interface_method
 from core.meta import InterfaceMetaclass
 
 
@@ -180,6 +182,32 @@ class ConfocalScannerInterface(metaclass=InterfaceMetaclass):
         """
         pass
 
+    @interface_method
+    def scan_lines(self, line_paths, pixel_clock=False):
+        """ Scans several lines in one go and returns the counts of each of them.
+
+        @param list line_paths: list of float[k][n_i] arrays, each defining the pixel positions of
+                                one line (including return paths between the lines)
+        @param pixel_clock: bool for all lines or a sequence of bools, one for each line, whether
+                            we need to output a pixel clock for the line (e.g. only for the image
+                            lines, not for the return paths)
+
+        @return list: float[n_i][m] photon counts per second for each line, see scan_line.
+                      On error, a list containing a single array of -1 is returned.
+
+        Optional method. Hardware that can output several lines as one waveform/counter task should
+        override it. The default implementation scans the lines one by one using scan_line.
+        """
+        if np.ndim(pixel_clock) == 0:
+            pixel_clock = [pixel_clock] * len(line_paths)
+        all_counts = list()
+        for path, line_pixel_clock in zip(line_paths, pixel_clock):
+            counts = self.scan_line(path, pixel_clock=bool(line_pixel_clock))
+            if np.any(counts == -1):
+                return [np.array([[-1.]])]
+            all_counts.append(counts)
+        return all_counts
+
     @abstract_interface_method
     def close_scanner(self):
         """ Closes the scanner and cleans up afterwards.
@@ -21,7 +21,7 @@ top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi
 """
 
 
-from core.interface import abstract_interface_method
+from core.interface import abstract_interface_method, interface_method
 from core.meta import InterfaceMetaclass
 from core.interface import ScalarConstraint
 from enum import Enum
@@ -458,6 +458,28 @@ class PulserInterface(metaclass=InterfaceMetaclass):
         """
         pass
 
+    @interface_method
+    def set_pulse_ensemble(self, ensemble_name, ensemble_info):
+        """
+        Create a waveform directly from the analyzed PulseBlockEnsemble instead of samples.
+
+        @param str ensemble_name: the name of the waveform to be created
+        @param dict ensemble_info: information about the ensemble as returned by
+                                   SequenceGeneratorLogic.analyze_block_ensemble. If the ensemble
+                                   uses digital channels it additionally contains the state
+                                   transition table of the digital channels under the key
+                                   'digital_instruction_table' (see
+                                   SequenceGeneratorLogic.get_digital_instruction_table).
+
+        @return bool: True if the waveform has been created, False if the samples are needed
+
+        Optional method. Digital pulse generators that are programmed with state transitions
+        (e.g. PulseBlaster, FPGA pulser, PulseStreamer) should override it. If the ensemble has
+        no analog channels and this method returns True, write_waveform will not be called for the
+        ensemble. The default implementation returns False, i.e. the ensemble is sampled.
+        """
+        return False
+
     @abstract_interface_method
     def write_sequence(self, name, sequence_parameters):
         """
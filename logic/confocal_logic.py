@@ -30,6 +30,7 @@ import matplotlib.pyplot as plt
 
 from logic.generic_logic import GenericLogic
 from core.util.mutex import Mutex
+from core.util.histogram import IncrementalHistogram
 from core.connector import Connector
 from core.statusvariable import StatusVar
 
@@ -261,6 +262,9 @@ class ConfocalLogic(GenericLogic):
     _clock_frequency = StatusVar('clock_frequency', 500)
     return_slowness = StatusVar(default=50)
     max_history_length = StatusVar(default=10)
+    bidirectional_scan = StatusVar(default=False)
+    bidirectional_line_shift = StatusVar(default=0)
+    lines_per_block = StatusVar(default=1)
 
     # signals
     signal_start_scanning = QtCore.Signal(str)
@@ -286,12 +290,22 @@ class ConfocalLogic(GenericLogic):
 
     signal_history_event = QtCore.Signal()
 
+    # number of bins of the count histograms used for the percentile colour scaling
+    _histogram_bins = 1024
+
     def __init__(self, config, **kwargs):
         super().__init__(config=config, **kwargs)
 
         #locking for thread safety
         self.threadlock = Mutex()
 
+        # Count histograms (one per count channel) and rows changed since the last call of
+        # pop_updated_image_rows for the xy and depth image. Both are bound to the image array
+        # they belong to and are reset once the image array is replaced.
+        self._image_lock = Mutex()
+        self._image_histograms = {'xy': (None, list()), 'depth': (None, list())}
+        self._image_rows_updated = {'xy': (None, 0, 0), 'depth': (None, 0, 0)}
+
         # counter for scan_image
         self._scan_counter = 0
         self._zscan = False
@@ -715,6 +729,8 @@ class ConfocalLogic(GenericLogic):
     def _scan_line(self):
         """scanning an image in either depth or xy
 
+        If lines_per_block is larger than 1 and the scanner supports it, several lines (including
+        their return paths) are handed to the hardware in one go via scan_lines.
         """
         # stops scanning
         if self.stopRequested:
@@ -743,6 +759,10 @@ class ConfocalLogic(GenericLogic):
         s_ch = len(self.get_scanner_count_channels())
 
         try:
+            # all paths to scan in this block, only the counts of the image lines are kept
+            paths = list()
+            is_image_line = list()
+
             if self._scan_counter == 0:
                 # make a line from the current cursor position to
                 # the starting position of the first scan line of the scan
@@ -756,84 +776,63 @@ class ConfocalLogic(GenericLogic):
                     start_line = np.vstack(
                         [lsx, lsy, lsz, np.ones(lsx.shape) * self._current_a])
                 # move to the start position of the scan, counts are thrown away
-                start_line_counts = self._scanning_device.scan_line(start_line)
-                if np.any(start_line_counts == -1):
-                    self.stopRequested = True
-                    self.signal_scan_lines_next.emit()
-                    return
-
-            # adjust z of line in image to current z before building the line
-            if not self._zscan:
-                z_shape = image[self._scan_counter, :, 2].shape
-                image[self._scan_counter, :, 2] = self._current_z * np.ones(z_shape)
-
-            # make a line in the scan, _scan_counter says which one it is
-            lsx = image[self._scan_counter, :, 0]
-            lsy = image[self._scan_counter, :, 1]
-            lsz = image[self._scan_counter, :, 2]
-            if n_ch <= 3:
-                line = np.vstack([lsx, lsy, lsz][0:n_ch])
-            else:
-                line = np.vstack(
-                    [lsx, lsy, lsz, np.ones(lsx.shape) * self._current_a])
-
-            # scan the line in the scan
-            line_counts = self._scanning_device.scan_line(line, pixel_clock=True)
-            if np.any(line_counts == -1):
-                self.stopRequested = True
-                self.signal_scan_lines_next.emit()
-                return
-
-            # make a line to go to the starting position of the next scan line
-            if self.depth_img_is_xz or not self._zscan:
-                if n_ch <= 3:
-                    return_line = np.vstack([
-                        self._return_XL,
-                        image[self._scan_counter, 0, 1] * np.ones(self._return_XL.shape),
-                        image[self._scan_counter, 0, 2] * np.ones(self._return_XL.shape)
-                    ][0:n_ch])
-                else:
-                    return_line = np.vstack([
-                            self._return_XL,
-                            image[self._scan_counter, 0, 1] * np.ones(self._return_XL.shape),
-                            image[self._scan_counter, 0, 2] * np.ones(self._return_XL.shape),
-                            np.ones(self._return_XL.shape) * self._current_a
-                        ])
+                paths.append(start_line)
+                is_image_line.append(False)
+
+            n_lines = min(max(int(self.lines_per_block), 1),
+                          np.size(self._image_vert_axis) - self._scan_counter)
+            rows = range(self._scan_counter, self._scan_counter + n_lines)
+            for row in rows:
+                # adjust z of line in image to current z before building the line
+                if not self._zscan:
+                    image[row, :, 2] = self._current_z
+
+                # make a line in the scan, row says which one it is
+                paths.append(self._get_image_line_path(image, row, n_ch))
+                is_image_line.append(True)
+
+                # make a line to go to the starting position of the next scan line
+                # In bidirectional mode the next line starts where this one ended.
+                if not self.bidirectional_scan:
+                    paths.append(self._get_return_line_path(image, row, n_ch))
+                    is_image_line.append(False)
+
+            # scan all lines of this block, the pixel clock is only needed for the image lines
+            if n_lines > 1:
+                all_counts = self._scanning_device.scan_lines(paths, pixel_clock=is_image_line)
             else:
-                if n_ch <= 3:
-                    return_line = np.vstack([
-                            image[self._scan_counter, 0, 1] * np.ones(self._return_YL.shape),
-                            self._return_YL,
-                            image[self._scan_counter, 0, 2] * np.ones(self._return_YL.shape)
-                        ][0:n_ch])
-                else:
-                    return_line = np.vstack([
-                            image[self._scan_counter, 0, 1] * np.ones(self._return_YL.shape),
-                            self._return_YL,
-                            image[self._scan_counter, 0, 2] * np.ones(self._return_YL.shape),
-                            np.ones(self._return_YL.shape) * self._current_a
-                        ])
-
-            # return the scanner to the start of next line, counts are thrown away
-            return_line_counts = self._scanning_device.scan_line(return_line)
-            if np.any(return_line_counts == -1):
+                all_counts = [self._scanning_device.scan_line(path, pixel_clock=image_line)
+                              for path, image_line in zip(paths, is_image_line)]
+            if any(np.any(counts == -1) for counts in all_counts):
                 self.stopRequested = True
                 self.signal_scan_lines_next.emit()
                 return
 
-            # update image with counts from the line we just scanned
+            # update image with counts from the lines we just scanned
+            line_counts = [counts for counts, image_line in zip(all_counts, is_image_line)
+                           if image_line]
+            image_name = 'depth' if self._zscan else 'xy'
+            with self._image_lock:
+                histograms = self._get_image_histograms(image_name)
+                for row, counts in zip(rows, line_counts):
+                    if self._is_backward_line(row):
+                        counts = self._correct_backward_line(counts[::-1])
+                    # Zeros (pixels not scanned yet) are excluded from the histograms
+                    for channel, histogram in enumerate(histograms):
+                        old_counts = image[row, :, 3 + channel]
+                        histogram.remove(old_counts[old_counts != 0])
+                    image[row, :, 3:3 + s_ch] = counts
+                    for channel, histogram in enumerate(histograms):
+                        new_counts = image[row, :, 3 + channel]
+                        histogram.add(new_counts[new_counts != 0])
+                self._mark_image_rows_updated(image_name, rows.start, rows.stop)
             if self._zscan:
-                if self.depth_img_is_xz:
-                    self.depth_image[self._scan_counter, :, 3:3 + s_ch] = line_counts
-                else:
-                    self.depth_image[self._scan_counter, :, 3:3 + s_ch] = line_counts
                 self.signal_depth_image_updated.emit()
             else:
-                self.xy_image[self._scan_counter, :, 3:3 + s_ch] = line_counts
                 self.signal_xy_image_updated.emit()
 
             # next line in scan
-            self._scan_counter += 1
+            self._scan_counter += n_lines
 
             # stop scanning when last line scan was performed and makes scan not continuable
             if self._scan_counter >= np.size(self._image_vert_axis):
@@ -852,6 +851,164 @@ class ConfocalLogic(GenericLogic):
             self.stop_scanning()
             self.signal_scan_lines_next.emit()
 
+    def _image_by_name(self, name):
+        return self.depth_image if name == 'depth' else self.xy_image
+
+    def _get_image_histograms(self, name):
+        """ Get the count histograms of an image and rebuild them if the image array has been
+        replaced (new scan, history) since they have been built.
+
+        Must be called with self._image_lock held.
+
+        @param str name: 'xy' or 'depth'
+
+        @return list: IncrementalHistogram of each count channel
+        """
+        image = self._image_by_name(name)
+        source, histograms = self._image_histograms[name]
+        if source is not image:
+            histograms = list()
+            for channel in range(image.shape[2] - 3):
+                histogram = IncrementalHistogram(number_of_bins=self._histogram_bins)
+                counts = image[:, :, 3 + channel]
+                histogram.add(counts[counts != 0])
+                histograms.append(histogram)
+            self._image_histograms[name] = (image, histograms)
+        return histograms
+
+    def _mark_image_rows_updated(self, name, start, stop):
+        """ Add rows to the range of rows changed since the last call of pop_updated_image_rows.
+
+        Must be called with self._image_lock held.
+        """
+        source, old_start, old_stop = self._image_rows_updated[name]
+        if source is not self._image_by_name(name):
+            # image has been replaced, the next refresh has to redraw the whole image anyway
+            return
+        if old_start < old_stop:
+            start, stop = min(start, old_start), max(stop, old_stop)
+        self._image_rows_updated[name] = (source, start, stop)
+
+    def pop_updated_image_rows(self, zscan=False):
+        """ Get the range of image rows changed since the last call and reset it.
+
+        Meant for the GUI to redraw only the rows changed by the last scan lines.
+
+        @param bool zscan: depth image if True, xy image otherwise
+
+        @return tuple: (first row, row after the last row) of the changed rows (empty range if
+                       nothing changed), None if the image array has been replaced and the whole
+                       image needs to be redrawn
+        """
+        name = 'depth' if zscan else 'xy'
+        with self._image_lock:
+            image = self._image_by_name(name)
+            source, start, stop = self._image_rows_updated[name]
+            self._image_rows_updated[name] = (image, 0, 0)
+        if source is not image:
+            return None
+        return start, stop
+
+    def get_image_percentiles(self, low_percentile, high_percentile, channel=0, zscan=False):
+        """ Get the count values at two percentiles of the non-zero pixels of an image.
+
+        The values are read from a histogram of the image that is updated line by line, so they
+        are quantized to the histogram bin edges (1/1024 of the count range or better), but do not
+        require sorting all pixels on every update.
+
+        @param float low_percentile: lower percentile (0..100)
+        @param float high_percentile: upper percentile (0..100)
+        @param int channel: index of the count channel
+        @param bool zscan: depth image if True, xy image otherwise
+
+        @return tuple: (low value, high value), None if the image has no non-zero pixels
+        """
+        with self._image_lock:
+            histograms = self._get_image_histograms('depth' if zscan else 'xy')
+            if not 0 <= channel < len(histograms):
+                return None
+            return histograms[channel].percentile_range(low_percentile, high_percentile)
+
+    def _is_backward_line(self, row):
+        """ In bidirectional mode every odd line is scanned backwards.
+
+        @param int row: index of the image line
+
+        @return bool: True if the line is scanned backwards
+        """
+        return self.bidirectional_scan and row % 2 == 1
+
+    def _get_image_line_path(self, image, row, n_ch):
+        """ Build the scanner path for a line of the image.
+
+        @param numpy.ndarray image: the image that is scanned
+        @param int row: index of the image line
+        @param int n_ch: number of scanner axes
+
+        @return numpy.ndarray: the line path (n_ch x pixels)
+        """
+        pixel_order = slice(None, None, -1) if self._is_backward_line(row) else slice(None)
+        lsx = image[row, pixel_order, 0]
+        lsy = image[row, pixel_order, 1]
+        lsz = image[row, pixel_order, 2]
+        if n_ch <= 3:
+            return np.vstack([lsx, lsy, lsz][0:n_ch])
+        return np.vstack([lsx, lsy, lsz, np.ones(lsx.shape) * self._current_a])
+
+    def _get_return_line_path(self, image, row, n_ch):
+        """ Build the path returning the scanner to the start of the next line.
+
+        @param numpy.ndarray image: the image that is scanned
+        @param int row: index of the image line that has just been scanned
+        @param int n_ch: number of scanner axes
+
+        @return numpy.ndarray: the return path (n_ch x return_slowness)
+        """
+        if self.depth_img_is_xz or not self._zscan:
+            if n_ch <= 3:
+                return np.vstack([
+                    self._return_XL,
+                    image[row, 0, 1] * np.ones(self._return_XL.shape),
+                    image[row, 0, 2] * np.ones(self._return_XL.shape)
+                ][0:n_ch])
+            return np.vstack([
+                self._return_XL,
+                image[row, 0, 1] * np.ones(self._return_XL.shape),
+                image[row, 0, 2] * np.ones(self._return_XL.shape),
+                np.ones(self._return_XL.shape) * self._current_a
+            ])
+        if n_ch <= 3:
+            return np.vstack([
+                image[row, 0, 1] * np.ones(self._return_YL.shape),
+                self._return_YL,
+                image[row, 0, 2] * np.ones(self._return_YL.shape)
+            ][0:n_ch])
+        return np.vstack([
+            image[row, 0, 1] * np.ones(self._return_YL.shape),
+            self._return_YL,
+            image[row, 0, 2] * np.ones(self._return_YL.shape),
+            np.ones(self._return_YL.shape) * self._current_a
+        ])
+
+    def _correct_backward_line(self, line_counts):
+        """ Shift the counts of a backward scanned line to compensate for scanner hysteresis.
+
+        @param numpy.ndarray line_counts: counts of the backward line, already in forward pixel order
+
+        @return numpy.ndarray: shifted counts. The pixels shifted in at the edge repeat the edge value.
+        """
+        shift = int(self.bidirectional_line_shift)
+        if shift == 0 or abs(shift) >= len(line_counts):
+            return line_counts
+        corrected = np.empty_like(line_counts)
+        if shift > 0:
+            corrected[shift:] = line_counts[:-shift]
+            corrected[:shift] = line_counts[0]
+        else:
+            corrected[:shift] = line_counts[-shift:]
+            corrected[shift:] = line_counts[-1]
+        return corrected
+
     def save_xy_data(self, colorscale_range=None, percentile_range=None, block=True):
         """ Save the current confocal xy data to file.
 
@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains the vectorized transition counting and dwell time analysis of single shot
+readout traces used by the TraceAnalysisLogic to calculate flip probabilities and lifetimes, and
+streaming variants of both.
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import numpy as np
+
+
+def threshold_pair_counts(trace, threshold):
+    """
+    Count the pairs of consecutive data points of a trace with respect to a single threshold
+    (as used by TraceAnalysisLogic.analyze_flip_prob2). Points equal to the threshold are
+    neither high nor low.
+
+    @param numpy.ndarray trace: 1D trace of data
+    @param float threshold: threshold between the low (dark) and high (bright) state
+
+    @return tuple(int, int, int, int): number of pairs starting high, starting low, staying high
+                                       and staying low
+    """
+    trace = np.asarray(trace)
+    high = trace > threshold
+    low = trace < threshold
+    return (np.count_nonzero(high[:-1]),
+            np.count_nonzero(low[:-1]),
+            np.count_nonzero(high[:-1] & high[1:]),
+            np.count_nonzero(low[:-1] & low[1:]))
+
+
+def initialization_pair_counts(trace, init_threshold, ana_threshold):
+    """
+    Count the transitions between consecutive data points of a trace, where the first point is
+    classified by the initialization thresholds and the second point by the analysis thresholds
+    (as used by TraceAnalysisLogic.analyze_flip_prob3 and analyze_flip_prob4). If the analysis
+    thresholds overlap, a point that is both above and below is counted as high.
+
+    @param numpy.ndarray trace: 1D trace of data
+    @param list init_threshold: [low, high] thresholds of the initialization point
+    @param list ana_threshold: [low, high] thresholds of the analysis point
+
+    @return tuple(int, int, int, int): number of transitions high -> high, high -> low,
+                                       low -> high and low -> low
+    """
+    trace = np.asarray(trace)
+    init_high = trace[:-1] > init_threshold[1]
+    init_low = trace[:-1] < init_threshold[0]
+    ana_high = trace[1:] > ana_threshold[1]
+    ana_low = (trace[1:] < ana_threshold[0]) & ~ana_high
+    return (np.count_nonzero(init_high & ana_high),
+            np.count_nonzero(init_high & ana_low),
+            np.count_nonzero(init_low & ana_high),
+            np.count_nonzero(init_low & ana_low))
+
+
+class FlipStatistics:
+    """
+    Streaming flip probability analysis of a single shot readout trace arriving in chunks.
+
+    The transition counts of both analysis methods of the TraceAnalysisLogic (single threshold as
+    in analyze_flip_prob2 and initialization/analysis thresholds as in analyze_flip_prob3) are
+    accumulated chunk by chunk. The last point of each chunk is kept to count the transition
+    into the next chunk, so the results are identical to the analysis of the whole trace.
+
+    Usage example:
+
+        statistics = FlipStatistics(init_threshold=[10, 20], ana_threshold=[15, 15])
+        for chunk in chunks:
+            statistics.update(chunk)
+            probability, lost_events = statistics.flip_probability_init()
+    """
+
+    def __init__(self, threshold=1, init_threshold=None, ana_threshold=None):
+        """
+        @param float threshold: threshold of the single threshold analysis
+        @param list init_threshold: [low, high] thresholds of the initialization point
+        @param list ana_threshold: [low, high] thresholds of the analysis point
+        """
+        self.threshold = threshold
+        self.init_threshold = init_threshold if init_threshold is not None else [1, 1]
+        self.ana_threshold = ana_threshold if ana_threshold is not None else [1, 1]
+        self.reset()
+
+    def reset(self):
+        """
+        Remove all data.
+        """
+        self.length = 0
+        # single threshold: pairs starting high/low and staying high/low
+        self.start_high = 0
+        self.start_low = 0
+        self.stay_high = 0
+        self.stay_low = 0
+        # initialization/analysis thresholds
+        self.high_to_high = 0
+        self.high_to_low = 0
+        self.low_to_high = 0
+        self.low_to_low = 0
+        self._last_point = None
+
+    def update(self, trace_chunk):
+        """
+        Add the next chunk of the trace.
+
+        @param numpy.ndarray trace_chunk: 1D data following the data added before
+        """
+        trace_chunk = np.asarray(trace_chunk).ravel()
+        if trace_chunk.size == 0:
+            return
+        self.length += trace_chunk.size
+        if self._last_point is not None:
+            trace_chunk = np.concatenate((self._last_point, trace_chunk))
+        self._last_point = trace_chunk[-1:].copy()
+
+        counts = threshold_pair_counts(trace_chunk, self.threshold)
+        self.start_high += counts[0]
+        self.start_low += counts[1]
+        self.stay_high += counts[2]
+        self.stay_low += counts[3]
+
+        counts = initialization_pair_counts(trace_chunk, self.init_threshold, self.ana_threshold)
+        self.high_to_high += counts[0]
+        self.high_to_low += counts[1]
+        self.low_to_high += counts[2]
+        self.low_to_low += counts[3]
+
+    def flip_probability(self, analyze_mode='full'):
+        """
+        Flip probability with respect to the single threshold, see
+        TraceAnalysisLogic.analyze_flip_prob2. NaN if no data point has been analyzed yet.
+
+        @param str analyze_mode: 'full', 'dark' or 'bright'
+
+        @return tuple(float, float): flip probability and lost events (in % for 'dark' and
+                                     'bright')
+        """
+        if analyze_mode == 'full':
+            no_flip = self.stay_high + self.stay_low
+            return _ratio_complement(no_flip, self.length), 0.0
+        if analyze_mode == 'dark':
+            return (_ratio_complement(self.stay_low, self.start_low),
+                    (1.0 - _ratio(self.start_low, self.length)) * 100)
+        if analyze_mode == 'bright':
+            return (_ratio_complement(self.stay_high, self.start_high),
+                    (1.0 - _ratio(self.start_high, self.length)) * 100)
+        raise ValueError('Unknown analyze_mode "{0}", use "full", "dark" or "bright".'
+                         ''.format(analyze_mode))
+
+    def flip_probability_init(self, analyze_mode='full'):
+        """
+        Flip probability with respect to the initialization and analysis thresholds, see
+        TraceAnalysisLogic.analyze_flip_prob3. NaN if no transition has been analyzed yet.
+
+        @param str analyze_mode: 'full', 'dark' (initialized low) or 'bright' (initialized high)
+
+        @return tuple(float, float): flip probability and number of lost events
+        """
+        if analyze_mode not in ('full', 'dark', 'bright'):
+            raise ValueError('Unknown analyze_mode "{0}", use "full", "dark" or "bright".'
+                             ''.format(analyze_mode))
+        flip = 0
+        no_flip = 0
+        if analyze_mode in ('bright', 'full'):
+            no_flip += self.high_to_high
+            flip += self.high_to_low
+        if analyze_mode in ('dark', 'full'):
+            flip += self.low_to_high
+            no_flip += self.low_to_low
+        return _ratio(flip, flip + no_flip), float(self.length - (flip + no_flip))
+
+
+def run_lengths(states):
+    """
+    Run length encoding of a trace of states: the lengths of the runs of equal consecutive
+    values and the value of each run, in trace order.
+
+    @param numpy.ndarray states: 1D array of states (e.g. bool)
+
+    @return tuple(numpy.ndarray, numpy.ndarray): length and state of each run
+    """
+    states = np.asarray(states).ravel()
+    if states.size == 0:
+        return np.zeros(0, dtype=int), states
+    starts = np.concatenate(([0], np.flatnonzero(states[1:] != states[:-1]) + 1))
+    lengths = np.diff(np.append(starts, states.size))
+    return lengths, states[starts]
+
+
+class DwellTimeStatistics:
+    """
+    Streaming dwell time analysis of a single shot readout trace arriving in chunks.
+
+    The trace is digitized (high: >= threshold, low: < threshold) and the number of runs of each
+    length is counted for both states in one pass over each chunk. The last run of a chunk may
+    continue in the next chunk, so it is kept open until the state changes. The histograms are
+    identical to those of the whole trace.
+
+    Usage example:
+
+        statistics = DwellTimeStatistics(threshold=12, dt=1e-3)
+        for chunk in chunks:
+            statistics.update(chunk)
+        dwell_times, high_counts, low_counts = statistics.histograms()
+    """
+
+    def __init__(self, threshold, dt=1.0):
+        """
+        @param float threshold: values >= threshold are in the high state, all others low
+        @param float dt: time between two data points of the trace
+        """
+        self.threshold = threshold
+        self.dt = dt
+        self.reset()
+
+    def reset(self):
+        """
+        Remove all data.
+        """
+        self.length = 0
+        self._high_counts = np.zeros(1, dtype='int64')
+        self._low_counts = np.zeros(1, dtype='int64')
+        self._open_length = 0
+        self._open_state = None
+
+    def update(self, trace_chunk):
+        """
+        Add the next chunk of the trace.
+
+        @param numpy.ndarray trace_chunk: 1D data following the data added before
+        """
+        trace_chunk = np.asarray(trace_chunk).ravel()
+        if trace_chunk.size == 0:
+            return
+        self.length += trace_chunk.size
+        lengths, states = run_lengths(trace_chunk >= self.threshold)
+        if self._open_state is not None:
+            if states[0] == self._open_state:
+                lengths[0] += self._open_length
+            else:
+                self._add_runs(np.array([self._open_length]), np.array([self._open_state]))
+        self._open_length = int(lengths[-1])
+        self._open_state = bool(states[-1])
+        self._add_runs(lengths[:-1], states[:-1])
+
+    def histograms(self, include_open_run=True):
+        """
+        Dwell time histograms of both states.
+
+        @param bool include_open_run: count the last run of the data added so far, although it may
+                                      continue in the next chunk
+
+        @return tuple(numpy.ndarray, numpy.ndarray, numpy.ndarray): dwell times (multiples of dt
+                starting at 0) and the number of runs in the high and low state with each dwell
+                time
+        """
+        high_counts = self._high_counts.copy()
+        low_counts = self._low_counts.copy()
+        if include_open_run and self._open_state is not None:
+            if self._open_state:
+                high_counts = _add_bincount(high_counts, [self._open_length])
+            else:
+                low_counts = _add_bincount(low_counts, [self._open_length])
+        size = max(high_counts.size, low_counts.size)
+        high_counts = np.pad(high_counts, (0, size - high_counts.size), 'constant')
+        low_counts = np.pad(low_counts, (0, size - low_counts.size), 'constant')
+        return np.arange(size) * self.dt, high_counts, low_counts
+
+    def _add_runs(self, lengths, states):
+        states = states.astype(bool)
+        self._high_counts = _add_bincount(self._high_counts, lengths[states])
+        self._low_counts = _add_bincount(self._low_counts, lengths[~states])
+
+
+def _add_bincount(counts, values):
+    values = np.asarray(values, dtype=int)
+    if values.size == 0:
+        return counts
+    new_counts = np.bincount(values)
+    if new_counts.size > counts.size:
+        new_counts[:counts.size] += counts
+        return new_counts
+    counts = counts.copy()
+    counts[:new_counts.size] += new_counts
+    return counts
+
+
+def _ratio(numerator, denominator):
+    return numerator / denominator if denominator > 0 else np.nan
+
+
+def _ratio_complement(numerator, denominator):
+    return 1.0 - numerator / denominator if denominator > 0 else np.nan
@@ -186,6 +186,20 @@ class ScannerTiltInterfuse(GenericLogic, ConfocalScannerInterface):
             line_path[:][2] += self._calc_dz(line_path[:][0], line_path[:][1])
         return self._scanning_device.scan_line(line_path, pixel_clock)
 
+    def scan_lines(self, line_paths, pixel_clock=False):
+        """ Scans several lines in one go and returns the counts of each of them.
+
+        @param list line_paths: list of float[4][m_i] arrays defining the positions of each line
+        @param pixel_clock: bool for all lines or a sequence of bools, one for each line, whether
+                            we need to output a pixel clock for the line
+
+        @return list: the photon counts per second for each line
+        """
+        if self.tiltcorrection:
+            for line_path in line_paths:
+                line_path[:][2] += self._calc_dz(line_path[:][0], line_path[:][1])
+        return self._scanning_device.scan_lines(line_paths, pixel_clock)
+
     def close_scanner(self):
         """ Closes the scanner and cleans up afterwards.
 
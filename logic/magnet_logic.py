@@ -27,7 +27,9 @@ import time
 from collections import OrderedDict
 from core.connector import Connector
 from core.statusvariable import StatusVar
+from core.util.motion_watcher import MotionCompletionWatcher
 from logic.generic_logic import GenericLogic
+from logic.magnet_pathways import PATHWAY_MODES, grid_pathway_order, estimate_pathway_duration
 from qtpy import QtCore
 from interface.slow_counter_interface import CountingMode
 
@@ -82,6 +84,14 @@ class MagnetLogic(GenericLogic):
     align_2d_axis1_step = StatusVar('align_2d_axis1_step', 1e-3)
     align_2d_axis1_vel = StatusVar('align_2d_axis1_vel', 10e-6)
     curr_2d_pathway_mode = StatusVar('curr_2d_pathway_mode', 'snake-wise')
+    # adaptive 2D alignment: measure a coarse grid with every n-th point first and refine around
+    # the optimum ('max' or 'min' of the measured value) by halving the step down to the grid step
+    align_2d_adaptive = StatusVar('align_2d_adaptive', False)
+    align_2d_adaptive_coarse_step = StatusVar('align_2d_adaptive_coarse_step', 4)
+    align_2d_adaptive_optimum = StatusVar('align_2d_adaptive_optimum', 'max')
+    # continuous (pipelined) 2D alignment: measured values are assigned to grid points within this
+    # distance (in grid steps) of the magnet position at the time of the measurement
+    align_2d_position_tolerance = StatusVar('align_2d_position_tolerance', 0.5)
 
     _checktime = StatusVar('_checktime', 2.5)
     _1D_axis0_data = StatusVar('_1D_axis0_data', default=np.arange(3))
@@ -166,6 +176,9 @@ class MagnetLogic(GenericLogic):
     sig2DAxis1RangeChanged = QtCore.Signal(float)
     sig2DAxis1StepChanged = QtCore.Signal(float)
     sig2DAxis1VelChanged = QtCore.Signal(float)
+    sig2DPathwayModeChanged = QtCore.Signal(str)
+    sig2DAdaptiveChanged = QtCore.Signal(dict)
+    sig2DPositionToleranceChanged = QtCore.Signal(float)
 
     sigMoveRelChanged = QtCore.Signal(dict)
 
@@ -183,6 +196,14 @@ class MagnetLogic(GenericLogic):
         super().__init__(config=config, **kwargs)
 
         self._stop_measure = False
+        # current step (in grid steps) of the adaptive 2D alignment, None if not adaptive
+        self._adaptive_2d_stride = None
+        # distance to the next point at which the measurement may start, None to wait until the
+        # magnet stopped
+        self._2d_settle_tolerance = None
+        # sum and number of the counter samples per grid point of the continuous 2D alignment
+        self._2d_cont_sum = None
+        self._2d_cont_num = None
 
     def on_activate(self):
         """ Definition and initialisation of the GUI.
@@ -210,13 +231,18 @@ class MagnetLogic(GenericLogic):
         self.sigAbort.connect(self._magnet_device.abort)
         self.sigVelChanged.connect(self._magnet_device.set_velocity)
 
+        # non-blocking detection of the end of magnet motions, polled at most every checktime
+        self._motion_watcher = MotionCompletionWatcher(max_interval=self._checktime, parent=self)
+
         # signal connect for alignment:
 
         self._sigInitializeMeasPos.connect(self._move_to_curr_pathway_index)
         self._sigStepwiseAlignmentNext.connect(self._stepwise_loop_body,
                                                QtCore.Qt.QueuedConnection)
+        self._sigContinuousAlignmentNext.connect(self._continuous_loop_body,
+                                                 QtCore.Qt.QueuedConnection)
 
-        self.pathway_modes = ['spiral-in', 'spiral-out', 'snake-wise', 'diagonal-snake-wise']
+        self.pathway_modes = list(PATHWAY_MODES)
 
         # relative movement settings
 
@@ -295,6 +321,8 @@ class MagnetLogic(GenericLogic):
 
         self._statusVariables['odmr_2d_low_fitfunction'] = self.odmr_2d_low_fitfunction
         self._statusVariables['odmr_2d_high_fitfunction'] = self.odmr_2d_high_fitfunction
+
+        self._motion_watcher.cancel_all()
         return 0
 
     def get_hardware_constraints(self):
@@ -416,7 +444,8 @@ class MagnetLogic(GenericLogic):
 
     def _create_2d_pathway(self, axis0_name, axis0_range, axis0_step,
                            axis1_name, axis1_range, axis1_step, init_pos,
-                           axis0_vel=None, axis1_vel=None):
+                           axis0_vel=None, axis1_vel=None, axis0_indices=None,
+                           axis1_indices=None, exclude=None, start_pos=None, first_path_index=0):
         """ Create a path along with the magnet should move.
 
         @param str axis0_name:
@@ -425,6 +454,14 @@ class MagnetLogic(GenericLogic):
         @param str axis1_name:
         @param float axis1_range:
         @param float axis1_step:
+        @param dict init_pos: current position, the grid is centered around it
+        @param float axis0_vel: optional velocity of axis0 during the moves
+        @param float axis1_vel: optional velocity of axis1 during the moves
+        @param list axis0_indices: optional, use only these grid indices along axis0
+        @param list axis1_indices: optional, use only these grid indices along axis1
+        @param set exclude: optional, (axis0 index, axis1 index) tuples of grid points to skip
+        @param dict start_pos: optional, position before the first move (default: init_pos)
+        @param int first_path_index: path index of the first point in the back_map
 
         @return array: 1D np.array, which has dictionary as entries. In this
                        dictionary, it will be specified, how the magnet is going
@@ -451,182 +488,179 @@ class MagnetLogic(GenericLogic):
         and the acceleration of the movement.
         E.g. if no velocity is specified, then nothing will be changed in terms
         of speed during the move.
-        """
-
-        # calculate number of steps (those are NOT the number of points!)
-        axis0_num_of_steps = int(axis0_range / axis0_step)
-        axis1_num_of_steps = int(axis1_range / axis1_step)
-
-        # make an array of movement steps
-        axis0_steparray = [axis0_step] * axis0_num_of_steps
-        axis1_steparray = [axis1_step] * axis1_num_of_steps
-
-        pathway = []
-
-        # FIXME: create these path modes:
-        if self.curr_2d_pathway_mode == 'spiral-in':
-            self.log.error('The pathway creation method "{0}" through the '
-                           'matrix is not implemented yet!\nReturn an empty '
-                           'patharray.'.format(self.curr_2d_pathway_mode))
-            return [], []
-
-        elif self.curr_2d_pathway_mode == 'spiral-out':
-            self.log.error('The pathway creation method "{0}" through the '
-                           'matrix is not implemented yet!\nReturn an empty '
-                           'patharray.'.format(self.curr_2d_pathway_mode))
-            return [], []
 
-        elif self.curr_2d_pathway_mode == 'diagonal-snake-wise':
-            self.log.error('The pathway creation method "{0}" through the '
-                           'matrix is not implemented yet!\nReturn an empty '
-                           'patharray.'.format(self.current_2d_pathway_mode))
-            return [], []
+        The order of the grid points is chosen by curr_2d_pathway_mode, see
+        logic/magnet_pathways.py for the available modes.
+        """
 
-        elif self.curr_2d_pathway_mode == 'selected-points':
-            self.log.error('The pathway creation method "{0}" through the '
-                           'matrix is not implemented yet!\nReturn an empty '
-                           'patharray.'.format(self.current_2d_pathway_mode))
+        if self.curr_2d_pathway_mode not in self.pathway_modes:
+            self.log.error('The pathway creation method "{0}" through the matrix is not '
+                           'implemented. Available methods are {1}.\nReturn an empty '
+                           'patharray.'.format(self.curr_2d_pathway_mode, self.pathway_modes))
             return [], []
 
-        # choose the snake-wise as default for now.
-        else:
-
-            # create a snake-wise stepping procedure through the matrix:
-            self.log.debug(axis0_name)
-            self.log.debug(axis0_range)
-            self.log.debug(init_pos[axis0_name])
-            axis0_pos = round(init_pos[axis0_name] - axis0_range / 2, 7)
-            axis1_pos = round(init_pos[axis1_name] - axis1_range / 2, 7)
-
-            # append again so that the for loop later will run once again
-            # through the axis0 array but the last value of axis1_steparray will
-            # not be performed.
-            axis1_steparray.append(axis1_num_of_steps)
+        # the grid positions. +1 because number of points and not number of steps are needed:
+        axis0_positions = np.round(init_pos[axis0_name] - axis0_range / 2
+                                   + np.arange(int(axis0_range / axis0_step) + 1) * axis0_step, 7)
+        axis1_positions = np.round(init_pos[axis1_name] - axis1_range / 2
+                                   + np.arange(int(axis1_range / axis1_step) + 1) * axis1_step, 7)
+
+        # optionally restrict the pathway to a sub-grid
+        if axis0_indices is None:
+            axis0_indices = np.arange(len(axis0_positions))
+        if axis1_indices is None:
+            axis1_indices = np.arange(len(axis1_positions))
+        axis0_indices = np.asarray(axis0_indices, dtype=int)
+        axis1_indices = np.asarray(axis1_indices, dtype=int)
+        if start_pos is None:
+            start_pos = init_pos
+
+        # order of the grid points (axis0 index, axis1 index) according to the pathway mode
+        velocities = None
+        if self.curr_2d_pathway_mode == 'ramp-time':
+            velocities = self._get_2d_alignment_velocities(axis0_name, axis1_name,
+                                                           axis0_vel, axis1_vel)
+            if velocities is None:
+                return [], []
+        grid_order = grid_pathway_order(self.curr_2d_pathway_mode,
+                                        axis0_positions[axis0_indices],
+                                        axis1_positions[axis1_indices],
+                                        start_position=(start_pos[axis0_name],
+                                                        start_pos[axis1_name]),
+                                        velocities=velocities)
+        grid_order = np.column_stack((axis0_indices[grid_order[:, 0]],
+                                      axis1_indices[grid_order[:, 1]]))
+        if exclude:
+            grid_order = [index for index in grid_order if tuple(index) not in exclude]
+
+        # step_config is the dict containing the commands for one pathway entry.
+        # back_map is a map to transform a pathway index value back to an absolute position and
+        # index. That will be important for saving the data corresponding to a certain
+        # path_index value.
+        pathway = []
+        back_map = dict()
+        for path_index, (axis0_index, axis1_index) in enumerate(grid_order, first_path_index):
+            axis0_pos = float(axis0_positions[axis0_index])
+            axis1_pos = float(axis1_positions[axis1_index])
 
-            # step_config is the dict containing the commands for one pathway
-            # entry. Move at first to start position:
+            # absolute movement:
             step_config = dict()
-
-            if axis0_vel is None:
-                step_config[axis0_name] = {'move_abs': axis0_pos}
-            else:
-                step_config[axis0_name] = {'move_abs': axis0_pos, 'move_vel': axis0_vel}
-
-            if axis1_vel is None:
-                step_config[axis1_name] = {'move_abs': axis1_pos}
-            else:
-                step_config[axis1_name] = {'move_abs': axis1_pos, 'move_vel': axis1_vel}
-
+            step_config[axis0_name] = {'move_abs': axis0_pos}
+            step_config[axis1_name] = {'move_abs': axis1_pos}
+            if axis0_vel is not None:
+                step_config[axis0_name]['move_vel'] = axis0_vel
+            if axis1_vel is not None:
+                step_config[axis1_name]['move_vel'] = axis1_vel
             pathway.append(step_config)
 
-            path_index = 0
-
-            # these indices should be used to facilitate the mapping to a 2D
-            # array, since the
-            axis0_index = 0
-            axis1_index = 0
-
-            # that is a map to transform a pathway index value back to an
-            # absolute position and index. That will be important for saving the
-            # data corresponding to a certain path_index value.
-            back_map = dict()
             back_map[path_index] = {axis0_name: axis0_pos,
                                     axis1_name: axis1_pos,
-                                    'index': (axis0_index, axis1_index)}
-
-            path_index += 1
-            # axis0_index += 1
-
-            go_pos_dir = True
-            for step_in_axis1 in axis1_steparray:
-
-                if go_pos_dir:
-                    go_pos_dir = False
-                    direction = +1
-                else:
-                    go_pos_dir = True
-                    direction = -1
-
-                for step_in_axis0 in axis0_steparray:
-
-                    axis0_index += direction
-                    # make move along axis0:
-                    step_config = dict()
-
-                    # relative movement:
-                    # step_config[axis0_name] = {'move_rel': direction*step_in_axis0}
-
-                    # absolute movement:
-                    axis0_pos = round(axis0_pos + direction * step_in_axis0, 7)
-
-                    # if axis0_vel is None:
-                    #     step_config[axis0_name] = {'move_abs': axis0_pos}
-                    #     step_config[axis1_name] = {'move_abs': axis1_pos}
-                    # else:
-                    #     step_config[axis0_name] = {'move_abs': axis0_pos,
-                    #                                'move_vel': axis0_vel}
-                    if axis1_vel is None and axis0_vel is None:
-                        step_config[axis0_name] = {'move_abs': axis0_pos}
-                        step_config[axis1_name] = {'move_abs': axis1_pos}
-                    else:
-                        step_config[axis0_name] = {'move_abs': axis0_pos}
-                        step_config[axis1_name] = {'move_abs': axis1_pos}
-
-                        if axis0_vel is not None:
-                            step_config[axis0_name] = {'move_abs': axis0_pos, 'move_vel': axis0_vel}
-
-                        if axis1_vel is not None:
-                            step_config[axis1_name] = {'move_abs': axis1_pos, 'move_vel': axis1_vel}
-
-                    # append to the pathway
-                    pathway.append(step_config)
-                    back_map[path_index] = {axis0_name: axis0_pos,
-                                            axis1_name: axis1_pos,
-                                            'index': (axis0_index, axis1_index)}
-                    path_index += 1
-
-                if (axis1_index + 1) >= len(axis1_steparray):
-                    break
-
-                # make a move along axis1:
-                step_config = dict()
-
-                # relative movement:
-                # step_config[axis1_name] = {'move_rel' : step_in_axis1}
-
-                # absolute movement:
-                axis1_pos = round(axis1_pos + step_in_axis1, 7)
-
-                if axis1_vel is None and axis0_vel is None:
-                    step_config[axis0_name] = {'move_abs': axis0_pos}
-                    step_config[axis1_name] = {'move_abs': axis1_pos}
-                else:
-                    step_config[axis0_name] = {'move_abs': axis0_pos}
-                    step_config[axis1_name] = {'move_abs': axis1_pos}
-
-                    if axis0_vel is not None:
-                        step_config[axis0_name] = {'move_abs': axis0_pos, 'move_vel': axis0_vel}
-
-                    if axis1_vel is not None:
-                        step_config[axis1_name] = {'move_abs': axis1_pos, 'move_vel': axis1_vel}
-
-                pathway.append(step_config)
-                axis1_index += 1
-                back_map[path_index] = {axis0_name: axis0_pos,
-                                        axis1_name: axis1_pos,
-                                        'index': (axis0_index, axis1_index)}
-                path_index += 1
+                                    'index': (int(axis0_index), int(axis1_index))}
 
         return pathway, back_map
 
-    def _create_2d_cont_pathway(self, pathway):
+    def _get_2d_alignment_velocities(self, axis0_name, axis1_name, axis0_vel=None,
+                                     axis1_vel=None):
+        """ Get the velocities of the two alignment axes. Velocities that are not given (or not
+        positive) are taken from the maximum velocity in the hardware constraints.
+
+        @param str axis0_name: name of axis0
+        @param str axis1_name: name of axis1
+        @param float axis0_vel: velocity of axis0
+        @param float axis1_vel: velocity of axis1
 
-        # go through the passed 1D path and reduce the whole movement just to
-        # corner points
+        @return tuple: (axis0 velocity, axis1 velocity), None if a velocity is unknown
+        """
+        constraints = self.get_hardware_constraints()
+        velocities = list()
+        for axis_name, vel in ((axis0_name, axis0_vel), (axis1_name, axis1_vel)):
+            if vel is None or not vel > 0:
+                vel = constraints[axis_name].get('vel_max')
+            if vel is None or not vel > 0:
+                self.log.error('Unable to determine the velocity of axis "{0}". Set a positive '
+                               'alignment velocity or vel_max constraint.'.format(axis_name))
+                return None
+            velocities.append(vel)
+        return tuple(velocities)
+
+    def estimate_2d_pathway_durations(self, modes=None):
+        """ Estimate the travel time of the 2D alignment for the current alignment settings
+        and each pathway mode, so the fastest route for the grid can be chosen.
+
+        The estimate includes the moves from the current position to the first point and back
+        after the last point. Axes are assumed to move simultaneously with the alignment velocity
+        (or vel_max of the hardware constraints). The end of a move is detected by a poll
+        scheduled for the expected arrival, so the polling adds no considerable time. The
+        measurement time at each point is not included.
+
+        @param list modes: pathway modes to estimate, default all available modes
+
+        @return OrderedDict: estimated travel time in s for each pathway mode, sorted from the
+                             fastest to the slowest mode
+        """
+        if modes is None:
+            modes = self.pathway_modes
+        axis0_name = self.align_2d_axis0_name
+        axis1_name = self.align_2d_axis1_name
+        velocities = self._get_2d_alignment_velocities(axis0_name, axis1_name,
+                                                       self.align_2d_axis0_vel,
+                                                       self.align_2d_axis1_vel)
+        if velocities is None:
+            return OrderedDict()
+        init_pos = self.get_pos([axis0_name, axis1_name])
+        start_position = (init_pos[axis0_name], init_pos[axis1_name])
+
+        durations = dict()
+        curr_mode = self.curr_2d_pathway_mode
+        try:
+            for mode in modes:
+                self.curr_2d_pathway_mode = mode
+                pathway, back_map = self._create_2d_pathway(axis0_name,
+                                                            self.align_2d_axis0_range,
+                                                            self.align_2d_axis0_step,
+                                                            axis1_name,
+                                                            self.align_2d_axis1_range,
+                                                            self.align_2d_axis1_step,
+                                                            init_pos,
+                                                            self.align_2d_axis0_vel,
+                                                            self.align_2d_axis1_vel)
+                if not pathway:
+                    continue
+                positions = [(back_map[index][axis0_name], back_map[index][axis1_name])
+                             for index in range(len(pathway))]
+                durations[mode] = estimate_pathway_duration(positions,
+                                                            velocities,
+                                                            start_position=start_position)
+        finally:
+            self.curr_2d_pathway_mode = curr_mode
+
+        durations = OrderedDict(sorted(durations.items(), key=lambda item: item[1]))
+        report = ', '.join('{0}: {1:.0f} s'.format(mode, duration)
+                           for mode, duration in durations.items())
+        self.log.info('Estimated travel time of the 2D alignment pathway modes: {0}'
+                      ''.format(report))
+        return durations
+
+    def _create_2d_cont_pathway(self, pathway):
+        """ Reduce a pathway to its corner points. The magnet moves straight through all points in
+        between, so only the first and the last point and the points where the direction of the
+        motion changes are kept.
 
-        pathway_cont = dict()
+        @param list pathway: pathway with absolute moves as created by _create_2d_pathway
 
-        return pathway_cont
+        @return list: the pathway entries of the corner points
+        """
+        if len(pathway) < 3:
+            return list(pathway)
+        axes = list(pathway[0])
+        positions = np.array([[entry[axis]['move_abs'] for axis in axes] for entry in pathway])
+        steps = np.diff(positions, axis=0)
+        lengths = np.linalg.norm(steps, axis=1)
+        directions = steps / np.where(lengths > 0, lengths, 1)[:, np.newaxis]
+        # a point is passed straight through if the directions of the moves to and from it agree
+        straight = np.all(np.isclose(directions[1:], directions[:-1]), axis=1)
+        keep = np.concatenate(([True], ~straight, [True]))
+        return [entry for entry, keep_entry in zip(pathway, keep) if keep_entry]
 
     def _prepare_2d_graph(self, axis0_start, axis0_range, axis0_step,
                           axis1_start, axis1_range, axis1_step):
@@ -721,6 +755,21 @@ class MagnetLogic(GenericLogic):
         # during alignment, the return will be a dict!
         self._saved_pos_before_align = self.get_pos([self.align_2d_axis0_name, self.align_2d_axis1_name])
 
+        # Continuous (pipelined) measurement: the fluorescence is recorded during the motion
+        # through the corner points of the pathway and mapped back onto the grid by the logged
+        # positions. Methods measuring at single points start the measurement as soon as the
+        # magnet is within the position tolerance of the point instead.
+        self._2d_settle_tolerance = None
+        if not stepwise_meas:
+            if self.align_2d_adaptive:
+                self.log.warning('The adaptive 2D alignment needs stepwise measurements, the '
+                                 'points are measured one by one.')
+                stepwise_meas = True
+            elif self.curr_alignment_method != '2d_fluorescence':
+                self._2d_settle_tolerance = self.align_2d_position_tolerance * min(
+                    self.align_2d_axis0_step, self.align_2d_axis1_step)
+                stepwise_meas = True
+
         if not continue_meas:
 
             self.sigMeasurementStarted.emit()
@@ -729,6 +778,21 @@ class MagnetLogic(GenericLogic):
             # current measurement point
             self._pathway_index = 0
 
+            # in adaptive mode the pathway holds only the coarse grid at first and is extended
+            # by _extend_adaptive_2d_pathway
+            axis0_indices = None
+            axis1_indices = None
+            self._adaptive_2d_stride = None
+            self._adaptive_2d_init_pos = self._saved_pos_before_align
+            if self.align_2d_adaptive:
+                self._adaptive_2d_stride = max(int(self.align_2d_adaptive_coarse_step), 1)
+                axis0_indices = self._adaptive_2d_grid_indices(
+                    int(self.align_2d_axis0_range / self.align_2d_axis0_step) + 1,
+                    self._adaptive_2d_stride)
+                axis1_indices = self._adaptive_2d_grid_indices(
+                    int(self.align_2d_axis1_range / self.align_2d_axis1_step) + 1,
+                    self._adaptive_2d_stride)
+
             self._pathway, self._backmap = self._create_2d_pathway(self.align_2d_axis0_name,
                                                                    self.align_2d_axis0_range,
                                                                    self.align_2d_axis0_step,
@@ -737,12 +801,15 @@ class MagnetLogic(GenericLogic):
                                                                    self.align_2d_axis1_step,
                                                                    self._saved_pos_before_align,
                                                                    self.align_2d_axis0_vel,
-                                                                   self.align_2d_axis1_vel)
+                                                                   self.align_2d_axis1_vel,
+                                                                   axis0_indices=axis0_indices,
+                                                                   axis1_indices=axis1_indices)
 
             # determine the start point, either relative or absolute!
-            # Now the absolute position will be used:
-            axis0_start = self._backmap[0][self.align_2d_axis0_name]
-            axis1_start = self._backmap[0][self.align_2d_axis1_name]
+            # Now the absolute position will be used. The pathway does not necessarily start
+            # at the first grid point, but always contains it.
+            axis0_start = min(entry[self.align_2d_axis0_name] for entry in self._backmap.values())
+            axis1_start = min(entry[self.align_2d_axis1_name] for entry in self._backmap.values())
 
             prepared_graph = self._prepare_2d_graph(
                 axis0_start,
@@ -755,10 +822,12 @@ class MagnetLogic(GenericLogic):
             self._2D_data_matrix, self._2D_axis0_data, self._2D_axis1_data = prepared_graph
 
             self._2D_add_data_matrix = np.zeros(shape=np.shape(self._2D_data_matrix), dtype=object)
+            self._2d_cont_sum = None
+            self._2d_cont_num = None
 
             if stepwise_meas:
-                # just make it to an empty dict
-                self._pathway_cont = dict()
+                # just make it to an empty list
+                self._pathway_cont = list()
 
             else:
                 # create from the path_points the continuous points
@@ -774,9 +843,13 @@ class MagnetLogic(GenericLogic):
         #          things.
 
         else:
+            if not stepwise_meas and not self._pathway_cont:
+                self._pathway_cont = self._create_2d_cont_pathway(self._pathway)
             # tell all the connected instances that measurement is continuing:
             self.sigMeasurementContinued.emit()
 
+        self._pathway_cont_index = 0
+
         # run at first the _move_to_curr_pathway_index method to go to the
         # index position:
         self._sigInitializeMeasPos.emit(stepwise_meas)
@@ -797,24 +870,40 @@ class MagnetLogic(GenericLogic):
         # self.set_velocity(move_dict_vel)
         self._magnet_device.move_abs(move_dict_abs)
         # self.move_rel(move_dict_rel)
-        while self._check_is_moving():
-            time.sleep(self._checktime)
-            self.log.debug("Went into while loop in _move_to_curr_pathway_index")
-
-        # this function will return to this function if position is reached:
-        start_pos = self._saved_pos_before_align
-        end_pos = dict()
-        for axis_name in self._saved_pos_before_align:
-            end_pos[axis_name] = self._backmap[self._pathway_index][axis_name]
-
-        self.log.debug("(first movement) magnet moving ? {0}".format(self._check_is_moving()))
 
         if stepwise_meas:
-            # start the Stepwise alignment loop body self._stepwise_loop_body:
-            self._sigStepwiseAlignmentNext.emit()
+            # start the Stepwise alignment loop body self._stepwise_loop_body
+            # as soon as the position is reached:
+            next_signal = self._sigStepwiseAlignmentNext
         else:
             # start the continuous alignment loop body self._continuous_loop_body:
-            self._sigContinuousAlignmentNext.emit()
+            next_signal = self._sigContinuousAlignmentNext
+        self._emit_after_motion(next_signal, move_dict_abs, move_dict_vel)
+
+    def _emit_after_motion(self, next_signal, target, velocities=None, **kwargs):
+        """ Emit a signal as soon as the magnet finished the motion to a target, without blocking
+            the logic thread in the meantime.
+
+        @param Signal next_signal: signal (without arguments) to emit after the motion
+        @param dict target: absolute target position of the moving axes
+        @param dict velocities: optional, velocities of the moving axes
+        @param kwargs: additional keyword arguments of MotionCompletionWatcher.watch
+        """
+        future = self._motion_watcher.watch(self._magnet_device,
+                                            target=target,
+                                            velocities=velocities if velocities else None,
+                                            **kwargs)
+        future.add_done_callback(lambda f: self._motion_finished(f, next_signal))
+
+    def _motion_finished(self, future, next_signal):
+        """ Completion callback of the motion watches started by _emit_after_motion. """
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            self.log.error('Could not detect the end of the magnet motion, the alignment will '
+                           'be stopped: {0}'.format(future.exception()))
+            self._stop_measure = True
+        next_signal.emit()
 
     def _stepwise_loop_body(self):
         """ Go one by one through the created path
@@ -868,6 +957,10 @@ class MagnetLogic(GenericLogic):
         # increase the index
         self._pathway_index += 1
 
+        # adaptive alignment: add the points of the next finer stage around the optimum
+        if self._pathway_index >= len(self._pathway) and self._adaptive_2d_stride is not None:
+            self._extend_adaptive_2d_pathway()
+
         if self._pathway_index < len(self._pathway):
 
             #
@@ -880,34 +973,245 @@ class MagnetLogic(GenericLogic):
             # self.set_velocity(move_dict_vel)
             self._magnet_device.move_abs(move_dict_abs)
 
-            while self._check_is_moving():
-                time.sleep(self._checktime)
-                self.log.debug("Went into while loop in stepwise_loop_body")
-
-            self.log.debug("stepwise_loop_body reports magnet moving ? {0}".format(self._check_is_moving()))
-
-            # this function will return to this function if position is reached:
-            start_pos = dict()
-            end_pos = dict()
-            for axis_name in self._saved_pos_before_align:
-                start_pos[axis_name] = self._backmap[self._pathway_index - 1][axis_name]
-                end_pos[axis_name] = self._backmap[self._pathway_index][axis_name]
-
-            # rerun this loop again
-            self._sigStepwiseAlignmentNext.emit()
+            # rerun this loop again as soon as the position is reached (or the magnet is within
+            # the settle tolerance of the position in the continuous mode)
+            self._emit_after_motion(self._sigStepwiseAlignmentNext, move_dict_abs, move_dict_vel,
+                                    tolerance=self._2d_settle_tolerance)
 
         else:
             self._end_alignment_procedure()
         return
 
+    @staticmethod
+    def _adaptive_2d_grid_indices(num_points, stride):
+        """ Indices of every stride-th grid point along an axis, including the last point.
+
+        @param int num_points: number of grid points along the axis
+        @param int stride: step between the selected points in grid steps
+
+        @return list: selected grid indices
+        """
+        indices = list(range(0, num_points, stride))
+        if indices[-1] != num_points - 1:
+            indices.append(num_points - 1)
+        return indices
+
+    def _extend_adaptive_2d_pathway(self):
+        """ Append the points of the next stage of the adaptive 2D alignment to the pathway.
+
+        The step of the next stage is half the step of the current stage. Its points lie within
+        one current step around the optimum of the points measured so far (see
+        _adaptive_2d_refinement_center); points measured already are skipped.
+
+        @return bool: True if points have been added, False if the alignment is complete
+        """
+        axis0_name = self.align_2d_axis0_name
+        axis1_name = self.align_2d_axis1_name
+        num_points = np.shape(self._2D_data_matrix)
+        measured = {self._backmap[index]['index'] for index in range(len(self._pathway))}
+
+        while self._adaptive_2d_stride is not None and self._adaptive_2d_stride > 1:
+            stride = self._adaptive_2d_stride
+            center = self._adaptive_2d_refinement_center(measured, stride)
+            self._adaptive_2d_stride = max(stride // 2, 1)
+            new_stride = self._adaptive_2d_stride
+
+            window_indices = list()
+            for axis, axis_center in enumerate(center):
+                window = range(max(axis_center - stride, 0),
+                               min(axis_center + stride, num_points[axis] - 1) + 1)
+                window_indices.append(
+                    [index for index in window if index % new_stride == 0 or index == axis_center])
+
+            last_entry = self._backmap[len(self._pathway) - 1]
+            pathway, back_map = self._create_2d_pathway(axis0_name,
+                                                        self.align_2d_axis0_range,
+                                                        self.align_2d_axis0_step,
+                                                        axis1_name,
+                                                        self.align_2d_axis1_range,
+                                                        self.align_2d_axis1_step,
+                                                        self._adaptive_2d_init_pos,
+                                                        self.align_2d_axis0_vel,
+                                                        self.align_2d_axis1_vel,
+                                                        axis0_indices=window_indices[0],
+                                                        axis1_indices=window_indices[1],
+                                                        exclude=measured,
+                                                        start_pos=last_entry,
+                                                        first_path_index=len(self._pathway))
+            if pathway:
+                self.log.info('Adaptive alignment: refining around grid point {0} with step {1} '
+                              '({2:d} new points).'.format(center, new_stride, len(pathway)))
+                self._pathway.extend(pathway)
+                self._backmap.update(back_map)
+                return True
+
+        self._adaptive_2d_stride = None
+        return False
+
+    def _adaptive_2d_refinement_center(self, measured, stride):
+        """ Estimate the grid point of the optimum from the points measured so far.
+
+        A quadratic surface is fitted to the measured points within one stride around the best
+        measured point. If the surface has an extremum of the right kind (maximum or minimum,
+        see align_2d_adaptive_optimum) within this region, the grid point closest to it is used,
+        otherwise the best measured point.
+
+        @param set measured: (axis0 index, axis1 index) tuples of the measured grid points
+        @param int stride: step between the measured points around the optimum in grid steps
+
+        @return tuple: (axis0 index, axis1 index) of the estimated optimum
+        """
+        sign = -1 if self.align_2d_adaptive_optimum == 'min' else 1
+        indices = np.array(sorted(measured), dtype=int)
+        values = sign * np.array([self._2D_data_matrix[tuple(index)] for index in indices],
+                                 dtype=float)
+        best = indices[int(np.argmax(values))]
+
+        # fit f = a + b*x + c*y + d*x^2 + e*y^2 + g*x*y in grid steps relative to the best point
+        near = np.all(np.abs(indices - best) <= stride, axis=1)
+        x, y = (indices[near] - best).T.astype(float)
+        if np.count_nonzero(near) >= 6:
+            design = np.column_stack((np.ones_like(x), x, y, x ** 2, y ** 2, x * y))
+            coefficients, _, rank, _ = np.linalg.lstsq(design, values[near], rcond=None)
+            if rank == 6:
+                _, b, c, d, e, g = coefficients
+                hessian = np.array([[2 * d, g], [g, 2 * e]])
+                # maximum (of the sign corrected values) if the hessian is negative definite
+                if np.all(np.linalg.eigvalsh(hessian) < 0):
+                    offset = np.linalg.solve(hessian, [-b, -c])
+                    if np.all(np.abs(offset) <= stride):
+                        center = np.round(best + offset).astype(int)
+                        center = np.clip(center, 0, np.array(np.shape(self._2D_data_matrix)) - 1)
+                        return int(center[0]), int(center[1])
+        return int(best[0]), int(best[1])
+
     def _continuous_loop_body(self):
-        """ Go as much as possible in one direction
+        """ Move to the next corner point of the continuous pathway.
 
-        @return:
+        The counter records the fluorescence during the whole motion and the magnet position is
+        logged on each check of the motion. After each segment the recorded counter samples are
+        mapped back onto the grid (see _map_continuous_2d_data), so the magnet does not stop at
+        the grid points between the corner points.
+        """
+        finished = self._stop_measure or self._pathway_cont_index >= len(self._pathway_cont)
+        if self._pathway_cont_index == 0 and not finished:
+            self._start_continuous_2d_recording()
+        elif self._pathway_cont_index > 0:
+            self._map_continuous_2d_data(resume=not finished)
 
-        The loop body goes through the 1D array
+        if finished:
+            self._end_alignment_procedure()
+            return
+
+        move_dict_vel, \
+        move_dict_abs, \
+        move_dict_rel = self._move_to_index(self._pathway_cont_index, self._pathway_cont)
+        self._pathway_cont_index += 1
+
+        self._magnet_device.move_abs(move_dict_abs)
+        self._emit_after_motion(self._sigContinuousAlignmentNext,
+                                move_dict_abs,
+                                self._2d_cont_velocities,
+                                progress_callback=self._log_continuous_2d_position,
+                                max_interval=self._2d_cont_log_interval)
+
+    def _start_continuous_2d_recording(self):
+        """ Start the counter recording and the position log of the continuous 2D alignment. """
+        axis0_name = self.align_2d_axis0_name
+        axis1_name = self.align_2d_axis1_name
+        shape = np.shape(self._2D_data_matrix)
+        if self._2d_cont_sum is None or np.shape(self._2d_cont_sum) != shape:
+            self._2d_cont_sum = np.zeros(shape)
+            self._2d_cont_num = np.zeros(shape, dtype=int)
+
+        # log the position at least 4 times per grid step
+        velocities = self._get_2d_alignment_velocities(axis0_name, axis1_name,
+                                                       self.align_2d_axis0_vel,
+                                                       self.align_2d_axis1_vel)
+        if velocities is None:
+            self._2d_cont_velocities = None
+            self._2d_cont_log_interval = None
+        else:
+            self._2d_cont_velocities = {axis0_name: velocities[0], axis1_name: velocities[1]}
+            self._2d_cont_log_interval = 0.25 * min(self.align_2d_axis0_step / velocities[0],
+                                                    self.align_2d_axis1_step / velocities[1])
+
+        if self._counter_logic.get_counting_mode() != CountingMode.CONTINUOUS:
+            self._counter_logic.set_counting_mode(mode=CountingMode.CONTINUOUS)
+
+        pos = self.get_pos([axis0_name, axis1_name])
+        self._2d_cont_log = [(time.time(), pos[axis0_name], pos[axis1_name])]
+        self._2d_cont_mapped = 0
+        # the counter time stamps are relative to the start of the recording
+        self._2d_cont_start_time = time.time()
+        self._counter_logic.start_saving()
+
+    def _log_continuous_2d_position(self, pos):
+        """ Add the current magnet position to the position log of the continuous 2D alignment.
+
+        @param dict pos: position of the alignment axes
         """
-        pass
+        self._2d_cont_log.append((time.time(),
+                                  pos[self.align_2d_axis0_name],
+                                  pos[self.align_2d_axis1_name]))
+
+    def _map_continuous_2d_data(self, resume=True):
+        """ Map the counter samples recorded since the last call back onto the grid.
+
+        The position of each sample is interpolated from the position log at the center of its
+        count interval. Samples within align_2d_position_tolerance (in grid steps) of a grid point
+        are averaged into this point. Samples recorded after the last logged position are kept
+        for the next call.
+
+        @param bool resume: continue the counter recording afterwards
+        """
+        data_array, parameters = self._counter_logic.save_data(to_file=False)
+        if resume:
+            self._counter_logic.start_saving(resume=True)
+
+        data_array = np.array(data_array[self._2d_cont_mapped:])
+        log = np.array(self._2d_cont_log)
+        if len(data_array) == 0 or len(log) < 2:
+            return
+
+        # the counter samples are time stamped at the end of their count interval
+        times = (self._2d_cont_start_time + data_array[:, 0]
+                 - 0.5 / self._counter_logic.get_count_frequency())
+        num_ready = int(np.searchsorted(times, log[-1, 0], side='right'))
+        self._2d_cont_mapped += num_ready
+        # keep the last logged position as start of the interpolation of the next segment
+        self._2d_cont_log = self._2d_cont_log[-1:]
+
+        in_log = times[:num_ready] >= log[0, 0]
+        times = times[:num_ready][in_log]
+        counts = data_array[:num_ready, 1][in_log]
+        pos0 = np.interp(times, log[:, 0], log[:, 1])
+        pos1 = np.interp(times, log[:, 0], log[:, 2])
+
+        step0 = self.align_2d_axis0_step
+        step1 = self.align_2d_axis1_step
+        index0 = np.rint((pos0 - self._2D_axis0_data[0]) / step0).astype(int)
+        index1 = np.rint((pos1 - self._2D_axis1_data[0]) / step1).astype(int)
+        shape = np.shape(self._2D_data_matrix)
+        on_grid = (index0 >= 0) & (index0 < shape[0]) & (index1 >= 0) & (index1 < shape[1])
+        index0, index1 = index0[on_grid], index1[on_grid]
+        pos0, pos1, counts = pos0[on_grid], pos1[on_grid], counts[on_grid]
+        tolerance = self.align_2d_position_tolerance
+        close = ((np.abs(pos0 - self._2D_axis0_data[index0]) <= tolerance * step0)
+                 & (np.abs(pos1 - self._2D_axis1_data[index1]) <= tolerance * step1))
+        index0, index1, counts = index0[close], index1[close], counts[close]
+        if len(counts) == 0:
+            return
+
+        np.add.at(self._2d_cont_sum, (index0, index1), counts)
+        np.add.at(self._2d_cont_num, (index0, index1), 1)
+        for cell in np.unique(np.ravel_multi_index((index0, index1), shape)):
+            index = tuple(int(i) for i in np.unravel_index(cell, shape))
+            self._2D_data_matrix[index] = self._2d_cont_sum[index] / self._2d_cont_num[index]
+            add_data = OrderedDict(parameters)
+            add_data['Number of counter samples'] = int(self._2d_cont_num[index])
+            self._2D_add_data_matrix[index] = add_data
+        self.sig2DMatrixChanged.emit()
 
     def stop_alignment(self):
         """ Stops any kind of ongoing alignment measurement by setting a flag.
@@ -927,16 +1231,17 @@ class MagnetLogic(GenericLogic):
 
         # move back to the first position before the alignment has started:
         #
-        constraints = self.get_hardware_constraints()
-
-        last_pos = dict()
-        for axis_name in self._saved_pos_before_align:
-            last_pos[axis_name] = self._backmap[self._pathway_index - 1][axis_name]
-
         self._magnet_device.move_abs(self._saved_pos_before_align)
 
-        while self._check_is_moving():
-            time.sleep(self._checktime)
+        future = self._motion_watcher.watch(self._magnet_device,
+                                            target=self._saved_pos_before_align)
+        future.add_done_callback(self._finish_alignment_procedure)
+
+    def _finish_alignment_procedure(self, future):
+        """ Completion callback of the motion back to the position before the alignment. """
+        if not future.cancelled() and future.exception() is not None:
+            self.log.error('Could not detect the end of the magnet motion back to the start '
+                           'position: {0}'.format(future.exception()))
 
         self.sigMeasurementFinished.emit()
 
@@ -948,54 +1253,38 @@ class MagnetLogic(GenericLogic):
         pass
 
     def _check_position_reached_loop(self, start_pos_dict, end_pos_dict):
-        """ Perform just a while loop, which checks everytime the conditions
+        """ Watch the motion from start to end position without blocking and emit sigPosReached
+            when the end position is reached.
 
         @param dict start_pos_dict: the position in this dictionary must be
                                     absolute positions!
-        @param dict end_pos_dict:
-        @param float checktime: the checktime in seconds
+        @param dict end_pos_dict: absolute target positions
 
-        @return:
-
-        Whenever the magnet has passed 95% of the way, the method will return.
+        @return concurrent.futures.Future: resolved with the final position
 
-        Check also whether the difference in position increases again, and if so
-        stop the measurement and raise an error, since either the velocity was
-        too fast or the magnet does not move further.
+        Whenever the magnet has passed 97% of the way (or is closer to the end position than the
+        minimal step of the axes) or has stopped, sigPosReached is emitted. The current position
+        is emitted by sigPosChanged on every check.
         """
-
-        distance_init = 0.0
         constraints = self.get_hardware_constraints()
+        distance_init = 0.0
         minimal_distance = 0.0
         for axis_label in start_pos_dict:
-            distance_init = (end_pos_dict[axis_label] - start_pos_dict[axis_label]) ** 2
-            minimal_distance = minimal_distance + (constraints[axis_label]['pos_step']) ** 2
+            distance_init += (end_pos_dict[axis_label] - start_pos_dict[axis_label]) ** 2
+            minimal_distance += (constraints[axis_label]['pos_step']) ** 2
         distance_init = np.sqrt(distance_init)
         minimal_distance = np.sqrt(minimal_distance)
 
         # take 97% distance tolerance:
-        distance_tolerance = 0.03 * distance_init
-
-        current_dist = 0.0
-
-        while True:
-            time.sleep(self._checktime)
-
-            curr_pos = self.get_pos(list(end_pos_dict))
-
-            for axis_label in start_pos_dict:
-                current_dist = (end_pos_dict[axis_label] - curr_pos[axis_label]) ** 2
-
-            current_dist = np.sqrt(current_dist)
-
-            self.sigPosChanged.emit(curr_pos)
+        distance_tolerance = max(0.03 * distance_init, minimal_distance)
 
-            if (current_dist <= distance_tolerance) or (current_dist <= minimal_distance) or self._stop_measure:
-                self.sigPosReached.emit()
-
-                break
-
-                # return either pos reached signal of check position
+        target = {axis_label: end_pos_dict[axis_label] for axis_label in start_pos_dict}
+        future = self._motion_watcher.watch(self._magnet_device,
+                                            target=target,
+                                            tolerance=distance_tolerance,
+                                            progress_callback=self.sigPosChanged.emit)
+        future.add_done_callback(lambda f: None if f.cancelled() else self.sigPosReached.emit())
+        return future
 
     def _check_is_moving(self):
         """
@@ -1932,6 +2221,7 @@ class MagnetLogic(GenericLogic):
     def set_pos_checktime(self, checktime):
         if not np.isclose(0, checktime) and checktime > 0:
             self._checktime = checktime
+            self._motion_watcher.max_interval = checktime
         else:
             self.log.warning('Could not set a new value for checktime, since '
                              'the passed value "{0}" is either zero or negative!\n'
@@ -2051,10 +2341,80 @@ class MagnetLogic(GenericLogic):
 
     def set_align_2d_axis1_vel(self, vel):
         """Set the specified value """
-        self._2d_align_axis1_vel = vel
+        self.align_2d_axis1_vel = vel
         self.sig2DAxis1VelChanged.emit(vel)
         return vel
 
+    def set_2d_pathway_mode(self, mode):
+        """Set the order in which the points of the 2D alignment grid are measured.
+
+        @param str mode: one of self.pathway_modes
+
+        @return str: the pathway mode in use
+        """
+        if mode not in self.pathway_modes:
+            self.log.error('Unknown pathway mode "{0}". Available modes are {1}.'
+                           ''.format(mode, self.pathway_modes))
+        else:
+            self.curr_2d_pathway_mode = mode
+        self.sig2DPathwayModeChanged.emit(self.curr_2d_pathway_mode)
+        return self.curr_2d_pathway_mode
+
+    def set_2d_adaptive_alignment(self, enabled=None, coarse_step=None, optimum=None):
+        """Set the parameters of the adaptive (coarse-to-fine) 2D alignment.
+
+        @param bool enabled: measure a coarse grid first and refine only around the optimum
+        @param int coarse_step: step of the coarse grid in alignment grid steps
+        @param str optimum: 'max' or 'min', the optimum of the measured value
+
+        @return dict: the adaptive alignment parameters in use
+        """
+        if enabled is not None:
+            self.align_2d_adaptive = bool(enabled)
+        if coarse_step is not None:
+            if int(coarse_step) >= 1:
+                self.align_2d_adaptive_coarse_step = int(coarse_step)
+            else:
+                self.log.error('The coarse step of the adaptive alignment must be >= 1.')
+        if optimum is not None:
+            if optimum in ('max', 'min'):
+                self.align_2d_adaptive_optimum = optimum
+            else:
+                self.log.error('The optimum of the adaptive alignment must be "max" or "min".')
+        params = self.get_2d_adaptive_alignment()
+        self.sig2DAdaptiveChanged.emit(params)
+        return params
+
+    def get_2d_adaptive_alignment(self):
+        """Return the current parameters of the adaptive 2D alignment"""
+        return {'enabled': self.align_2d_adaptive,
+                'coarse_step': self.align_2d_adaptive_coarse_step,
+                'optimum': self.align_2d_adaptive_optimum}
+
+    def set_align_2d_position_tolerance(self, tolerance):
+        """Set the distance (in grid steps) from a grid point, within which values measured
+        during the continuous 2D alignment are assigned to the point.
+
+        @param float tolerance: position tolerance in grid steps (0 < tolerance <= 0.5 assigns
+                                each value to at most one point)
+
+        @return float: the position tolerance in use
+        """
+        if tolerance > 0:
+            self.align_2d_position_tolerance = float(tolerance)
+        else:
+            self.log.error('The position tolerance of the 2D alignment must be positive.')
+        self.sig2DPositionToleranceChanged.emit(self.align_2d_position_tolerance)
+        return self.align_2d_position_tolerance
+
+    def get_align_2d_position_tolerance(self):
+        """Return the current value"""
+        return self.align_2d_position_tolerance
+
+    def get_2d_pathway_mode(self):
+        """Return the current value"""
+        return self.curr_2d_pathway_mode
+
     def get_align_2d_axis0_name(self):
         """Return the current value"""
         return self.align_2d_axis0_name
@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains the strategies used by the MagnetLogic to order the points of a 2D alignment
+grid into a pathway, and the estimation of the time needed to travel along a pathway.
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import numpy as np
+
+# Names of the available pathway modes, see grid_pathway_order
+PATHWAY_MODES = ('snake-wise', 'snake-wise-axis1', 'hilbert', 'nearest-neighbour', 'ramp-time')
+
+# Refine orders with 2-opt moves up to this number of grid points (the cost matrix and each pass
+# scale quadratically with the number of points)
+_MAX_2OPT_POINTS = 400
+# Use the greedy nearest neighbour order as candidate of mode 'ramp-time' up to this number of
+# grid points (each step scans all points)
+_MAX_GREEDY_POINTS = 2500
+
+
+def grid_pathway_order(mode, axis0_positions, axis1_positions, start_position=None,
+                       velocities=None):
+    """
+    Order all points of a 2D grid into a pathway.
+
+    Available modes:
+        'snake-wise': serpentine raster, axis0 is the fast axis (the default of the MagnetLogic)
+        'snake-wise-axis1': serpentine raster, axis1 is the fast axis
+        'hilbert': Hilbert curve through the grid (points outside the grid are skipped for grids
+                   that are not square with a power of two points per side)
+        'nearest-neighbour': greedy nearest neighbour ordering by euclidean distance in axis units
+                             starting next to start_position
+        'ramp-time': ordering minimizing the travel time for axes moving simultaneously with the
+                     given velocities, i.e. the time of a move is the time of the slowest axis.
+                     The best of both serpentines and the greedy nearest neighbour order (with
+                     respect to the travel time) refined by 2-opt moves is used (greedy order
+                     and 2-opt only for small grids).
+
+    @param str mode: pathway mode, one of PATHWAY_MODES
+    @param numpy.ndarray axis0_positions: grid positions along axis0
+    @param numpy.ndarray axis1_positions: grid positions along axis1
+    @param tuple start_position: (axis0, axis1) position before the first move. Defaults to the
+                                 first grid point.
+    @param tuple velocities: (axis0, axis1) velocity, needed for mode 'ramp-time'
+
+    @return numpy.ndarray: (number of points, 2) array of (axis0 index, axis1 index) in pathway
+                           order
+    """
+    num0, num1 = len(axis0_positions), len(axis1_positions)
+    if mode == 'snake-wise':
+        return serpentine_order(num0, num1, fast_axis=0)
+    if mode == 'snake-wise-axis1':
+        return serpentine_order(num0, num1, fast_axis=1)
+    if mode == 'hilbert':
+        return hilbert_order(num0, num1)
+
+    indices = serpentine_order(num0, num1, fast_axis=0)
+    points = _grid_points(axis0_positions, axis1_positions, indices)
+    start = points[0] if start_position is None else np.asarray(start_position, dtype=float)
+    if mode == 'nearest-neighbour':
+        return indices[nearest_neighbour_order(points, start)]
+    if mode == 'ramp-time':
+        if velocities is None:
+            raise ValueError('Pathway mode "ramp-time" needs the velocities of both axes.')
+        scale = 1 / _check_velocities(velocities)
+        # with scaled coordinates the travel time is the chebyshev distance
+        scaled_points = points * scale
+        scaled_start = start * scale
+        candidates = [np.arange(len(points)),
+                      _order_of(indices, serpentine_order(num0, num1, fast_axis=1))]
+        if len(points) <= _MAX_GREEDY_POINTS:
+            candidates.append(
+                nearest_neighbour_order(scaled_points, scaled_start, metric='chebyshev'))
+        best_order, best_time = None, np.inf
+        for order in candidates:
+            if len(points) <= _MAX_2OPT_POINTS:
+                order = two_opt_order(scaled_points, scaled_start, order, metric='chebyshev')
+            total = _closed_path_cost(scaled_points[order], scaled_start, metric='chebyshev')
+            if total < best_time:
+                best_order, best_time = order, total
+        return indices[best_order]
+    raise ValueError('Unknown pathway mode "{0}". Available modes are: {1}'
+                     ''.format(mode, PATHWAY_MODES))
+
+
+def serpentine_order(num_axis0, num_axis1, fast_axis=0):
+    """
+    Serpentine (boustrophedon) raster through a grid starting at index (0, 0).
+
+    @param int num_axis0: number of points along axis0
+    @param int num_axis1: number of points along axis1
+    @param int fast_axis: axis stepped through first (0 or 1)
+
+    @return numpy.ndarray: (number of points, 2) array of (axis0 index, axis1 index)
+    """
+    num_fast, num_slow = (num_axis0, num_axis1) if fast_axis == 0 else (num_axis1, num_axis0)
+    slow = np.repeat(np.arange(num_slow), num_fast)
+    fast = np.tile(np.arange(num_fast), num_slow)
+    # every second line runs backwards
+    backwards = slow % 2 == 1
+    fast[backwards] = num_fast - 1 - fast[backwards]
+    if fast_axis == 0:
+        return np.column_stack((fast, slow))
+    return np.column_stack((slow, fast))
+
+
+def hilbert_order(num_axis0, num_axis1):
+    """
+    Hilbert curve through a grid. The curve is built on the smallest enclosing square grid with a
+    power of two points per side and points outside of the grid are skipped.
+
+    @param int num_axis0: number of points along axis0
+    @param int num_axis1: number of points along axis1
+
+    @return numpy.ndarray: (number of points, 2) array of (axis0 index, axis1 index)
+    """
+    side = 1
+    while side < max(num_axis0, num_axis1):
+        side *= 2
+    indices = serpentine_order(num_axis0, num_axis1, fast_axis=0)
+    x = indices[:, 0].copy()
+    y = indices[:, 1].copy()
+    distance = np.zeros(len(indices), dtype=np.int64)
+    s = side // 2
+    while s > 0:
+        rx = (x & s) > 0
+        ry = (y & s) > 0
+        distance += s * s * ((3 * rx.astype(np.int64)) ^ ry.astype(np.int64))
+        # rotate the quadrant
+        flip = ~ry & rx
+        x[flip] = side - 1 - x[flip]
+        y[flip] = side - 1 - y[flip]
+        swap = ~ry
+        x[swap], y[swap] = y[swap], x[swap].copy()
+        s //= 2
+    return indices[np.argsort(distance, kind='stable')]
+
+
+def nearest_neighbour_order(points, start, metric='euclidean'):
+    """
+    Greedy nearest neighbour ordering: always go to the closest point not visited yet. Ties are
+    resolved by the lower point index.
+
+    @param numpy.ndarray points: (number of points, 2) array of positions
+    @param numpy.ndarray start: position before the first move
+    @param str metric: 'euclidean' or 'chebyshev' (maximum of the absolute axis differences)
+
+    @return numpy.ndarray: order of the points
+    """
+    remaining = np.ones(len(points), dtype=bool)
+    order = np.empty(len(points), dtype=int)
+    current = np.asarray(start, dtype=float)
+    for step in range(len(points)):
+        cost = _distance(points, current, metric)
+        cost[~remaining] = np.inf
+        index = int(np.argmin(cost))
+        order[step] = index
+        remaining[index] = False
+        current = points[index]
+    return order
+
+
+def two_opt_order(points, start, order, metric='euclidean', max_passes=50):
+    """
+    Improve an ordering by 2-opt moves (reversing parts of the pathway) until no move shortens the
+    closed pathway start -> points -> start.
+
+    @param numpy.ndarray points: (number of points, 2) array of positions
+    @param numpy.ndarray start: position before the first and after the last move
+    @param numpy.ndarray order: initial order of the points
+    @param str metric: 'euclidean' or 'chebyshev'
+    @param int max_passes: maximum number of passes through all moves
+
+    @return numpy.ndarray: improved order of the points
+    """
+    tour = np.concatenate(([0], np.asarray(order) + 1))
+    nodes = np.vstack((np.asarray(start, dtype=float), points))
+    cost = np.stack([_distance(nodes, node, metric) for node in nodes])
+    size = len(tour)
+    for _ in range(max_passes):
+        improved = False
+        for i in range(size - 2):
+            a, b = tour[i], tour[i + 1]
+            j = np.arange(i + 2, size)
+            c = tour[j]
+            d = tour[(j + 1) % size]
+            gain = cost[a, b] + cost[c, d] - cost[a, c] - cost[b, d]
+            best = int(np.argmax(gain))
+            if gain[best] > 1e-12 * (cost[a, b] + cost[c[best], d[best]]):
+                tour[i + 1:j[best] + 1] = tour[i + 1:j[best] + 1][::-1]
+                improved = True
+        if not improved:
+            break
+    return tour[1:] - 1
+
+
+def move_durations(positions, velocities, start_position=None):
+    """
+    Duration of each move along a pathway for axes moving simultaneously, i.e. the duration of a
+    move is the duration of the slowest axis.
+
+    @param numpy.ndarray positions: (number of points, number of axes) positions in pathway order
+    @param tuple velocities: velocity of each axis
+    @param tuple start_position: position before the first move. If given, the first move from
+                                 this position is included.
+
+    @return numpy.ndarray: duration of each move in s
+    """
+    positions = np.asarray(positions, dtype=float)
+    if start_position is not None:
+        positions = np.vstack((np.asarray(start_position, dtype=float), positions))
+    steps = np.abs(np.diff(positions, axis=0)) / _check_velocities(velocities)
+    return steps.max(axis=1) if steps.size > 0 else np.zeros(0)
+
+
+def estimate_pathway_duration(positions, velocities, start_position=None, return_to_start=True,
+                              poll_interval=None):
+    """
+    Estimate the total travel time along a pathway.
+
+    @param numpy.ndarray positions: (number of points, number of axes) positions in pathway order
+    @param tuple velocities: velocity of each axis
+    @param tuple start_position: position before the first move (included if given)
+    @param bool return_to_start: include the move back to start_position after the last point
+    @param float poll_interval: if the end of each move is detected by polling in this interval,
+                                every move takes a multiple of it
+
+    @return float: estimated travel time in s
+    """
+    positions = np.asarray(positions, dtype=float)
+    if return_to_start and start_position is not None:
+        positions = np.vstack((positions, np.asarray(start_position, dtype=float)))
+    durations = move_durations(positions, velocities, start_position)
+    if poll_interval is not None and poll_interval > 0:
+        durations = np.ceil(durations / poll_interval) * poll_interval
+    return float(durations.sum())
+
+
+def _check_velocities(velocities):
+    velocities = np.asarray(velocities, dtype=float)
+    if np.any(~np.isfinite(velocities)) or np.any(velocities <= 0):
+        raise ValueError('All axis velocities must be positive, got {0}.'.format(velocities))
+    return velocities
+
+
+def _grid_points(axis0_positions, axis1_positions, indices):
+    return np.column_stack((np.asarray(axis0_positions, dtype=float)[indices[:, 0]],
+                            np.asarray(axis1_positions, dtype=float)[indices[:, 1]]))
+
+
+def _order_of(reference, indices):
+    """
+    Positions of the rows of indices in the (grid index) array reference.
+    """
+    width = max(reference[:, 1].max(), indices[:, 1].max()) + 1
+    reference_keys = reference[:, 0] * width + reference[:, 1]
+    sorter = np.argsort(reference_keys)
+    return sorter[np.searchsorted(reference_keys, indices[:, 0] * width + indices[:, 1],
+                                  sorter=sorter)]
+
+
+def _distance(points, point, metric):
+    difference = np.abs(points - point)
+    if metric == 'chebyshev':
+        return difference.max(axis=1)
+    return np.sqrt((difference ** 2).sum(axis=1))
+
+
+def _closed_path_cost(points, start, metric):
+    nodes = np.vstack((start, points, start))
+    difference = np.abs(np.diff(nodes, axis=0))
+    if metric == 'chebyshev':
+        return difference.max(axis=1).sum()
+    return np.sqrt((difference ** 2).sum(axis=1)).sum()
@@ -50,9 +50,12 @@ class OptimizerLogic(GenericLogic):
     do_surface_subtraction = StatusVar('surface_subtraction', False)
     surface_subtr_scan_offset = StatusVar('surface_subtraction_offset', 1e-6)
     opt_channel = StatusVar('optimization_channel', 0)
+    do_adaptive_refocus = StatusVar('adaptive_refocus', False)
+    adaptive_edge_margin = StatusVar('adaptive_edge_margin', 0.2)
 
     # "private" signals to keep track of activities here in the optimizer logic
     _sigScanNextXyLine = QtCore.Signal()
+    _sigScanXyCross = QtCore.Signal()
     _sigScanZLine = QtCore.Signal()
     _sigCompletedXyOptimizerScan = QtCore.Signal()
     _sigDoNextOptimizationStep = QtCore.Signal()
@@ -124,6 +127,7 @@ class OptimizerLogic(GenericLogic):
 
         # Sets connections between signals and functions
         self._sigScanNextXyLine.connect(self._refocus_xy_line, QtCore.Qt.QueuedConnection)
+        self._sigScanXyCross.connect(self._refocus_xy_cross, QtCore.Qt.QueuedConnection)
         self._sigScanZLine.connect(self.do_z_optimization, QtCore.Qt.QueuedConnection)
         self._sigCompletedXyOptimizerScan.connect(self._set_optimized_xy_from_fit, QtCore.Qt.QueuedConnection)
 
@@ -382,6 +386,120 @@ class OptimizerLogic(GenericLogic):
         else:
             self._sigCompletedXyOptimizerScan.emit()
 
+    def _refocus_xy_cross(self):
+        """ Adaptive xy refocus by a cross scan through the current optimal position.
+
+        Scans one line along x and one line along y (each with the xy optimizer resolution) and fits
+        a 1D gaussian to each of them. If both fits succeed and the maxima lie within the inner part
+        of the scan range, the full xy raster scan is skipped. Otherwise the optimizer falls back to
+        the full xy image scan (centered on the best position found so far).
+        """
+        n_ch = len(self._scanning_device.get_scanner_axes())
+        # stop scanning if instructed
+        if self.stopRequested:
+            with self.threadlock:
+                self.stopRequested = False
+                self.finish_refocus()
+                self.sigImageUpdated.emit()
+                self.sigRefocusFinished.emit(
+                    self._caller_tag,
+                    [self.optim_pos_x, self.optim_pos_y, self.optim_pos_z, 0][0:n_ch])
+                return
+
+        s_ch = len(self.get_scanner_count_channels())
+
+        # scan along x through the current optimal position
+        x_counts = self._scan_cross_line(self._X_values,
+                                         np.full(self._X_values.shape, self.optim_pos_y))
+        if x_counts is None:
+            self._sigScanNextXyLine.emit()
+            return
+        y_row = np.argmin(np.abs(self._Y_values - self.optim_pos_y))
+        self.xy_refocus_image[y_row, :, 3:3 + s_ch] = x_counts
+        self.sigImageUpdated.emit()
+        x_result = self._fit_cross_line(self._X_values, x_counts[:, self.opt_channel])
+
+        # scan along y through the x position just found
+        x_center = self.optim_pos_x if x_result is None else x_result[0]
+        y_counts = self._scan_cross_line(np.full(self._Y_values.shape, x_center), self._Y_values)
+        if y_counts is None:
+            self._sigScanNextXyLine.emit()
+            return
+        x_column = np.argmin(np.abs(self._X_values - x_center))
+        self.xy_refocus_image[:, x_column, 3:3 + s_ch] = y_counts
+        self.sigImageUpdated.emit()
+        y_result = self._fit_cross_line(self._Y_values, y_counts[:, self.opt_channel])
+
+        if x_result is None or y_result is None:
+            self.log.debug('Adaptive xy refocus inconclusive. Falling back to full xy scan.')
+            if x_result is not None:
+                self.optim_pos_x = x_result[0]
+            if y_result is not None:
+                self.optim_pos_y = y_result[0]
+            self._initialize_xy_refocus_image()
+            self._sigScanNextXyLine.emit()
+            return
+
+        self.optim_pos_x, self.optim_sigma_x = x_result
+        self.optim_pos_y, self.optim_sigma_y = y_result
+        self.sigImageUpdated.emit()
+        self._sigDoNextOptimizationStep.emit()
+
+    def _scan_cross_line(self, x_values, y_values):
+        """ Scans a single line at the current optimal z position for the adaptive xy refocus.
+
+        @param numpy.ndarray x_values: x positions of the line
+        @param numpy.ndarray y_values: y positions of the line
+
+        @return numpy.ndarray: counts of the scanned line (None on error)
+        """
+        n_ch = len(self._scanning_device.get_scanner_axes())
+        status = self._move_to_start_pos([x_values[0], y_values[0], self.optim_pos_z])
+        if status < 0:
+            self.log.error('Error during move to starting point.')
+            self.stop_refocus()
+            return None
+
+        z_values = np.full(x_values.shape, self.optim_pos_z)
+        if n_ch <= 3:
+            line = np.vstack((x_values, y_values, z_values)[0:n_ch])
+        else:
+            line = np.vstack((x_values, y_values, z_values, np.zeros(x_values.shape)))
+
+        line_counts = self._scanning_device.scan_line(line)
+        if np.any(line_counts == -1):
+            self.log.error('The scan went wrong, killing the scanner.')
+            self.stop_refocus()
+            return None
+        return line_counts
+
+    def _fit_cross_line(self, axis_values, counts):
+        """ Fits a gaussian peak to a line of the adaptive xy refocus.
+
+        @param numpy.ndarray axis_values: positions of the scanned line
+        @param numpy.ndarray counts: counts of the optimization channel along the line
+
+        @return tuple: (center, sigma) of the fitted peak or None if the fit failed or the peak is
+                       too close to the edge of the scan range.
+        """
+        try:
+            result = self._fit_logic.make_gaussianlinearoffset_fit(
+                x_axis=axis_values,
+                data=counts,
+                units='m',
+                estimator=self._fit_logic.estimate_gaussianlinearoffset_peak)
+        except:
+            self.log.exception('Fit of adaptive xy refocus line failed.')
+            return None
+        if not result.success:
+            return None
+
+        center = result.best_values['center']
+        margin = self.adaptive_edge_margin * abs(axis_values[-1] - axis_values[0])
+        if not min(axis_values) + margin <= center <= max(axis_values) - margin:
+            return None
+        return center, abs(result.best_values['sigma'])
+
     def _set_optimized_xy_from_fit(self):
         """Fit the completed xy optimizer scan and set the optimized xy position."""
         fit_x, fit_y = np.meshgrid(self._X_values, self._Y_values)
@@ -630,7 +748,10 @@ class OptimizerLogic(GenericLogic):
         # Launch the next step
         if this_step == 'XY':
             self._initialize_xy_refocus_image()
-            self._sigScanNextXyLine.emit()
+            if self.do_adaptive_refocus:
+                self._sigScanXyCross.emit()
+            else:
+                self._sigScanNextXyLine.emit()
         elif this_step == 'Z':
             self._initialize_z_refocus_image()
             self._sigScanZLine.emit()
@@ -20,6 +20,7 @@ top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi
 """
 
 from core.connector import Connector
+from core.util.motion_watcher import MotionCompletionWatcher
 from logic.generic_logic import GenericLogic
 from qtpy import QtCore
 
@@ -47,6 +48,7 @@ class PolarisationDepLogic(GenericLogic):
         self._save_logic = self.savelogic()
 
         self._hwpmotor = self.motor()
+        self._motion_watcher = MotionCompletionWatcher(max_interval=1.0, parent=self)
 
         # Initialise measurement parameters
         self.scan_length = 360
@@ -60,6 +62,7 @@ class PolarisationDepLogic(GenericLogic):
     def on_deactivate(self):
         """ Deinitialisation performed during deactivation of the module.
         """
+        self._motion_watcher.cancel_all()
         return
 
     def measure_polarisation_dependence(self):
@@ -77,6 +80,16 @@ class PolarisationDepLogic(GenericLogic):
 
     def rotate_polarisation(self):
         self._hwpmotor.move_rel(self.scan_length)
+        # save the data as soon as the motor stopped
+        future = self._motion_watcher.watch(self._hwpmotor)
+        future.add_done_callback(self._rotation_finished)
+
+    def _rotation_finished(self, future):
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            self.log.error('Could not detect the end of the rotation: {0}'
+                           ''.format(future.exception()))
         self.log.info('rotation finished, saving data')
         self.signal_rotation_finished.emit()
 
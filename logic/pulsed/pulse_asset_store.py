@@ -0,0 +1,371 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains the database storage of the saved pulse assets (PulseBlock, PulseBlockEnsemble
+and PulseSequence instances) used by the SequenceGeneratorLogic.
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import io
+import json
+import time
+import base64
+import pickle
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+from collections.abc import ItemsView, KeysView, ValuesView
+
+from logic.pulsed.pulse_objects import PulseBlock, PulseBlockEnsemble, PulseSequence
+
+
+class PulseAssetStore:
+    """
+    Single file SQLite database holding the saved PulseBlock, PulseBlockEnsemble and PulseSequence
+    instances.
+
+    Each asset is stored in one row indexed by its type ('block', 'ensemble' or 'sequence') and
+    name. The payload is the JSON encoded dict representation of the asset (see
+    get_dict_representation of the pulse objects). Assets containing objects that can not be
+    represented in JSON are pickled instead.
+    The store remembers a hash of the last payload loaded or saved for each asset, so saving an
+    unchanged asset does not write to the database.
+    """
+    default_filename = 'pulse_assets.sqlite'
+
+    _asset_classes = {'block': PulseBlock,
+                      'ensemble': PulseBlockEnsemble,
+                      'sequence': PulseSequence}
+    _from_dict = {'block': PulseBlock.block_from_dict,
+                  'ensemble': PulseBlockEnsemble.ensemble_from_dict,
+                  'sequence': PulseSequence.sequence_from_dict}
+
+    def __init__(self, path):
+        """
+        Open (and create if necessary) the asset database.
+
+        @param str path: path of the SQLite database file
+        """
+        self.path = path
+        self._lock = threading.RLock()
+        self._digests = dict()
+        # The assets are accessed from the logic and GUI threads, access is serialized by the lock
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('PRAGMA synchronous=NORMAL')
+            self._connection.execute('CREATE TABLE IF NOT EXISTS assets ('
+                                     'asset_type TEXT NOT NULL, '
+                                     'name TEXT NOT NULL, '
+                                     'format TEXT NOT NULL, '
+                                     'payload BLOB NOT NULL, '
+                                     'modified REAL NOT NULL, '
+                                     'PRIMARY KEY (asset_type, name))')
+
+    def close(self):
+        """
+        Close the database connection.
+        """
+        with self._lock:
+            self._connection.close()
+            self._digests.clear()
+
+    def names(self, asset_type):
+        """
+        Names of all stored assets of a type. Does not de-serialize the assets.
+
+        @param str asset_type: 'block', 'ensemble' or 'sequence'
+
+        @return list: asset names
+        """
+        self._check_asset_type(asset_type)
+        with self._lock:
+            cursor = self._connection.execute('SELECT name FROM assets WHERE asset_type=?',
+                                              (asset_type,))
+            return [row[0] for row in cursor]
+
+    def load(self, asset_type, name):
+        """
+        De-serialize a single asset.
+
+        @param str asset_type: 'block', 'ensemble' or 'sequence'
+        @param str name: name of the asset
+
+        @return PulseBlock|PulseBlockEnsemble|PulseSequence: the asset instance
+        """
+        self._check_asset_type(asset_type)
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT format, payload FROM assets WHERE asset_type=? AND name=?',
+                (asset_type, name)).fetchone()
+        if row is None:
+            raise KeyError('No {0} "{1}" found in asset database.'.format(asset_type, name))
+        data_format, payload = row
+        payload = bytes(payload)
+        if data_format == 'json':
+            asset = self._from_dict[asset_type](
+                json.loads(payload.decode('utf-8'), object_hook=_decode_json_object))
+        else:
+            asset = pickle.loads(payload)
+        with self._lock:
+            self._digests[(asset_type, name)] = hashlib.sha1(payload).digest()
+        return asset
+
+    def save(self, asset_type, asset):
+        """
+        Serialize a single asset into the database.
+
+        @param str asset_type: 'block', 'ensemble' or 'sequence'
+        @param PulseBlock|PulseBlockEnsemble|PulseSequence asset: the asset instance to save
+
+        @return bool: True if the asset has been written, False if it was unchanged
+        """
+        return self.save_many(asset_type, (asset,)) > 0
+
+    def save_many(self, asset_type, assets):
+        """
+        Serialize several assets of a type into the database in a single transaction.
+        Assets that did not change since they have been loaded or saved last are skipped.
+
+        @param str asset_type: 'block', 'ensemble' or 'sequence'
+        @param iterable assets: asset instances to save
+
+        @return int: number of assets written
+        """
+        self._check_asset_type(asset_type)
+        rows = list()
+        digests = dict()
+        for asset in assets:
+            if not isinstance(asset, self._asset_classes[asset_type]):
+                raise TypeError('Unable to save {0} as {1} in asset database.'
+                                ''.format(type(asset), asset_type))
+            data_format, payload = self._encode(asset)
+            digest = hashlib.sha1(payload).digest()
+            if self._digests.get((asset_type, asset.name)) == digest:
+                continue
+            digests[(asset_type, asset.name)] = digest
+            rows.append((asset_type, asset.name, data_format, payload, time.time()))
+        if rows:
+            with self._lock, self._connection:
+                self._connection.executemany('INSERT OR REPLACE INTO assets VALUES (?, ?, ?, ?, ?)',
+                                             rows)
+                self._digests.update(digests)
+        return len(rows)
+
+    def delete(self, asset_type, name):
+        """
+        Remove a single asset from the database. Unknown names are ignored.
+
+        @param str asset_type: 'block', 'ensemble' or 'sequence'
+        @param str name: name of the asset
+        """
+        self._check_asset_type(asset_type)
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM assets WHERE asset_type=? AND name=?',
+                                     (asset_type, name))
+            self._digests.pop((asset_type, name), None)
+
+    def _check_asset_type(self, asset_type):
+        if asset_type not in self._asset_classes:
+            raise ValueError('Unknown pulse asset type "{0}". Valid types are: {1}'
+                             ''.format(asset_type, tuple(self._asset_classes)))
+
+    @staticmethod
+    def _encode(asset):
+        """
+        Serialize an asset to JSON and fall back to pickle if the asset holds objects that can not
+        be represented in JSON (e.g. custom objects in the measurement_information).
+
+        @param object asset: PulseBlock, PulseBlockEnsemble or PulseSequence instance
+
+        @return (str, bytes): data format ('json' or 'pickle') and serialized asset
+        """
+        try:
+            payload = json.dumps(_to_json_compatible(asset.get_dict_representation()))
+            return 'json', payload.encode('utf-8')
+        except TypeError:
+            return 'pickle', pickle.dumps(asset)
+
+
+def _to_json_compatible(obj):
+    """
+    Recursively convert an object into an object that can be encoded by the json module.
+    Tuples, sets, dicts with non-str keys and numpy arrays are wrapped into dicts with a single
+    type tag key in order to restore them exactly with _decode_json_object.
+    numpy scalars are converted to python scalars.
+    """
+    if obj is None or isinstance(obj, (bool, int, float, str)):
+        return obj
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        buffer = io.BytesIO()
+        np.save(buffer, obj, allow_pickle=False)
+        return {'__ndarray__': base64.b64encode(buffer.getvalue()).decode('ascii')}
+    if isinstance(obj, list):
+        return [_to_json_compatible(item) for item in obj]
+    if isinstance(obj, tuple):
+        return {'__tuple__': [_to_json_compatible(item) for item in obj]}
+    if isinstance(obj, (set, frozenset)):
+        return {'__set__': [_to_json_compatible(item) for item in obj]}
+    if isinstance(obj, dict):
+        if all(isinstance(key, str) for key in obj):
+            return {key: _to_json_compatible(value) for key, value in obj.items()}
+        return {'__items__': [[_to_json_compatible(key), _to_json_compatible(value)]
+                              for key, value in obj.items()]}
+    raise TypeError('Object of type {0} is not JSON serializable'.format(type(obj)))
+
+
+def _decode_json_object(obj):
+    """
+    object_hook for json.loads restoring the objects tagged by _to_json_compatible.
+    """
+    if len(obj) == 1:
+        tag, value = next(iter(obj.items()))
+        if tag == '__tuple__':
+            return tuple(value)
+        if tag == '__set__':
+            return set(value)
+        if tag == '__items__':
+            return dict((_hashable(key), item) for key, item in value)
+        if tag == '__ndarray__':
+            return np.load(io.BytesIO(base64.b64decode(value)), allow_pickle=False)
+    return obj
+
+
+def _hashable(key):
+    # Tuples inside tuple dict keys are restored by the object_hook, lists are not hashable
+    return tuple(key) if isinstance(key, list) else key
+
+
+_NOT_LOADED = type('_NotLoaded', (), {'__repr__': lambda self: '<not loaded>'})()
+
+
+class LazyAssetDict(OrderedDict):
+    """
+    OrderedDict of saved pulse assets (name -> asset instance) de-serializing the assets only on
+    first access by name.
+
+    Entries that have not been accessed yet hold a placeholder and are resolved by calling
+    loader(name). If the loader returns None (e.g. the asset is broken) the entry is removed and a
+    KeyError is raised. The membership test, keys(), values() and items() resolve the entries as
+    well, hence they only contain assets that can be accessed by name.
+    Iterating over the dict itself yields the names without de-serializing the assets (e.g. to
+    list the saved assets), so broken assets are only skipped once they have been accessed.
+    Iteration runs over a snapshot of the names, hence accessing the assets while iterating is safe.
+    Plain dict access at C level (e.g. conversion for Qt signals) only sees the names and
+    placeholders, so consumers need to access the assets through the mapping interface.
+    """
+    def __init__(self, loader=None, names=None):
+        """
+        @param callable loader: function de-serializing an asset by name
+        @param iterable names: asset names to add as not yet loaded entries (in this order)
+        """
+        super().__init__()
+        self._loader = loader
+        if names is not None:
+            for name in names:
+                super().__setitem__(name, _NOT_LOADED)
+
+    def __getitem__(self, name):
+        value = super().__getitem__(name)
+        if value is _NOT_LOADED:
+            value = self._loader(name) if self._loader is not None else None
+            if value is None:
+                super().__delitem__(name)
+                raise KeyError(name)
+            super().__setitem__(name, value)
+        return value
+
+    def get(self, name, default=None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def pop(self, name, *args):
+        try:
+            value = self[name]
+        except KeyError:
+            if args:
+                return args[0]
+            raise
+        super().__delitem__(name)
+        return value
+
+    def __contains__(self, name):
+        try:
+            self[name]
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        for name in list(super().__iter__()):
+            if super().__contains__(name):
+                yield name
+
+    def keys(self):
+        return _LazyKeysView(self)
+
+    def values(self):
+        return _LazyValuesView(self)
+
+    def items(self):
+        return _LazyItemsView(self)
+
+    def is_loaded(self, name):
+        """
+        Check if an asset has already been de-serialized.
+
+        @param str name: asset name
+
+        @return bool: True if loaded, False if not yet loaded or unknown
+        """
+        return super().get(name, _NOT_LOADED) is not _NOT_LOADED
+
+    def loaded_values(self):
+        """
+        @return list: all assets that have already been de-serialized (or added)
+        """
+        return [value for value in super().values() if value is not _NOT_LOADED]
+
+
+class _LazyKeysView(KeysView):
+    def __iter__(self):
+        for name in self._mapping:
+            if name in self._mapping:
+                yield name
+
+
+class _LazyValuesView(ValuesView):
+    def __iter__(self):
+        for name in self._mapping:
+            value = self._mapping.get(name)
+            if value is not None:
+                yield value
+
+
+class _LazyItemsView(ItemsView):
+    def __iter__(self):
+        for name in self._mapping:
+            value = self._mapping.get(name)
+            if value is not None:
+                yield name, value
@@ -382,6 +382,22 @@ class PulsedMasterLogic(GenericLogic):
     def fit_container(self):
         return self.pulsedmeasurementlogic().fc
 
+    def get_laser_display_data(self, laser_index=0, show_raw=False, x_range=None, max_points=2000):
+        """
+        Get a raw or laser trace decimated for display.
+        See PulsedMeasurementLogic.get_laser_display_data.
+
+        @param int laser_index: index of the laser pulse starting at 1. 0 for the sum of all lasers.
+        @param bool show_raw: display the raw data (True) or the extracted laser pulses (False)
+        @param tuple x_range: (start, end) time range in s to display. None for the full trace.
+        @param int max_points: maximum number of points to return
+        @return (numpy.ndarray, numpy.ndarray): time in s and counts of the points to display
+        """
+        return self.pulsedmeasurementlogic().get_laser_display_data(laser_index=laser_index,
+                                                                    show_raw=show_raw,
+                                                                    x_range=x_range,
+                                                                    max_points=max_points)
+
     #######################################################################
     ###             Pulsed measurement methods                          ###
     #######################################################################
@@ -37,6 +37,7 @@ from core.util.math import compute_ft
 from logic.generic_logic import GenericLogic
 from logic.pulsed.pulse_extractor import PulseExtractor
 from logic.pulsed.pulse_analyzer import PulseAnalyzer
+from logic.pulsed.trace_pyramid import MinMaxPyramid
 
 
 class PulsedMeasurementLogic(GenericLogic):
@@ -140,6 +141,11 @@ class PulsedMeasurementLogic(GenericLogic):
         self._saved_raw_data = OrderedDict()  # temporary saved raw data
         self._recalled_raw_data_tag = None  # the currently recalled raw data dict key
 
+        # Min/max decimation pyramids of the displayed raw/laser traces. Keys are tuples
+        # (<'raw' or 'laser'>, <laser index>) with laser index 0 denoting the sum of all lasers.
+        self._display_pyramids = dict()
+        self._display_lock = Mutex()
+
         # Paused measurement flag
         self.__is_paused = False
         self._time_of_pause = None
@@ -1167,8 +1173,68 @@ class PulsedMeasurementLogic(GenericLogic):
         self.laser_data = return_dict['laser_counts_arr']
         #print('self.laser_data')
         #print(self.laser_data)
+        self._update_display_pyramids()
+        return
+
+    def _get_display_trace(self, trace_type, laser_index):
+        """
+        Get the full resolution raw or laser trace to display.
+
+        @param str trace_type: 'raw' or 'laser'
+        @param int laser_index: index of the laser pulse starting at 1. 0 for the sum of all lasers.
+        @return numpy.ndarray: 1D trace
+        """
+        data = self.raw_data if trace_type == 'raw' else self.laser_data
+        if data.ndim < 2:
+            return data
+        if laser_index == 0:
+            return np.sum(data, axis=0)
+        if laser_index > data.shape[0]:
+            return np.zeros(0, dtype=data.dtype)
+        return data[laser_index - 1]
+
+    def _update_display_pyramids(self):
+        """
+        Update the decimation pyramids of all previously displayed traces with the current data.
+        """
+        with self._display_lock:
+            for (trace_type, laser_index), pyramid in self._display_pyramids.items():
+                pyramid.update(self._get_display_trace(trace_type, laser_index))
         return
 
+    def get_laser_display_data(self, laser_index=0, show_raw=False, x_range=None, max_points=2000):
+        """
+        Get a raw or laser trace decimated for display.
+
+        Traces longer than max_points within x_range are returned as minimum and maximum per
+        block of bins from a min/max decimation pyramid, so no peak gets lost. The pyramids are
+        created on first request and updated incrementally with each data update.
+
+        @param int laser_index: index of the laser pulse starting at 1. 0 for the sum of all lasers.
+        @param bool show_raw: display the raw data (True) or the extracted laser pulses (False)
+        @param tuple x_range: (start, end) time range in s to display. None for the full trace.
+        @param int max_points: maximum number of points to return (e.g. two per screen pixel)
+        @return (numpy.ndarray, numpy.ndarray): time in s and counts of the points to display
+        """
+        key = ('raw' if show_raw else 'laser', int(laser_index))
+        bin_width = self.__fast_counter_binwidth
+        with self._display_lock:
+            pyramid = self._display_pyramids.get(key)
+            if pyramid is None:
+                # Only keep the pyramids of the laser sums and of the last displayed single laser
+                for old_key in [k for k in self._display_pyramids if k[0] == key[0] and k[1] != 0]:
+                    del self._display_pyramids[old_key]
+                pyramid = MinMaxPyramid()
+                pyramid.set_data(self._get_display_trace(*key))
+                self._display_pyramids[key] = pyramid
+            if x_range is None:
+                start, stop = 0, None
+            else:
+                start = int(np.floor(x_range[0] / bin_width))
+                stop = int(np.ceil(x_range[1] / bin_width)) + 1
+            x_data, y_data = pyramid.get_display_data(start, stop, max_points)
+        return x_data * bin_width, y_data
+
     def _analyze_laser_pulses(self):
         # analyze pulses and get data points for signal array. Also check if extraction
         # worked (non-zero array returned).
@@ -1256,6 +1322,7 @@ class PulsedMeasurementLogic(GenericLogic):
         else:
             self.raw_data = np.zeros(number_of_bins, dtype='int64')
             #print(number_of_bins)
+        self._update_display_pyramids()
         self.sigMeasurementDataUpdated.emit()
 
         return
@@ -20,6 +20,7 @@ Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
 top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
 """
 
+import math
 import numpy as np
 from collections import OrderedDict
 from logic.pulsed.sampling_functions import SamplingBase
@@ -37,6 +38,14 @@ class Idle(SamplingBase):
         samples_arr = np.zeros(len(time_array))
         return samples_arr
 
+    @staticmethod
+    def get_samples_into(out, offset_bin, sample_rate, scale=1.0):
+        out.fill(0)
+
+    @staticmethod
+    def get_sample_period(length, sample_rate):
+        return 1
+
 
 class DC(SamplingBase):
     """
@@ -61,6 +70,13 @@ class DC(SamplingBase):
         samples_arr = self._get_dc(time_array, self.voltage)
         return samples_arr
 
+    def get_samples_into(self, out, offset_bin, sample_rate, scale=1.0):
+        out.fill(self.voltage * scale)
+
+    @staticmethod
+    def get_sample_period(length, sample_rate):
+        return 1
+
 
 class Sin(SamplingBase):
     """
@@ -96,6 +112,13 @@ class Sin(SamplingBase):
         samples_arr = self._get_sine(time_array, self.amplitude, self.frequency, phase_rad)
         return samples_arr
 
+    def get_samples_into(self, out, offset_bin, sample_rate, scale=1.0):
+        self._write_sines(out, offset_bin, sample_rate, scale,
+                          ((self.amplitude, self.frequency, self.phase),))
+
+    def get_sample_period(self, length, sample_rate):
+        return self._get_sample_period(length, sample_rate, [self.frequency])
+
 
 class DoubleSinSum(SamplingBase):
     """
@@ -154,6 +177,14 @@ class DoubleSinSum(SamplingBase):
         samples_arr += self._get_sine(time_array, self.amplitude_2, self.frequency_2, phase_rad)
         return samples_arr
 
+    def get_samples_into(self, out, offset_bin, sample_rate, scale=1.0):
+        sines = ((self.amplitude_1, self.frequency_1, self.phase_1),
+                 (self.amplitude_2, self.frequency_2, self.phase_2))
+        self._write_sines(out, offset_bin, sample_rate, scale, sines)
+
+    def get_sample_period(self, length, sample_rate):
+        return self._get_sample_period(length, sample_rate, [self.frequency_1, self.frequency_2])
+
 
 class DoubleSinProduct(SamplingBase):
     """
@@ -212,6 +243,14 @@ class DoubleSinProduct(SamplingBase):
         samples_arr *= self._get_sine(time_array, self.amplitude_2, self.frequency_2, phase_rad)
         return samples_arr
 
+    def get_samples_into(self, out, offset_bin, sample_rate, scale=1.0):
+        sines = ((self.amplitude_1, self.frequency_1, self.phase_1),
+                 (self.amplitude_2, self.frequency_2, self.phase_2))
+        self._write_sines(out, offset_bin, sample_rate, scale, sines, multiply=True)
+
+    def get_sample_period(self, length, sample_rate):
+        return self._get_sample_period(length, sample_rate, [self.frequency_1, self.frequency_2])
+
 
 class TripleSinSum(SamplingBase):
     """
@@ -292,6 +331,16 @@ class TripleSinSum(SamplingBase):
         samples_arr += self._get_sine(time_array, self.amplitude_3, self.frequency_3, phase_rad)
         return samples_arr
 
+    def get_samples_into(self, out, offset_bin, sample_rate, scale=1.0):
+        sines = ((self.amplitude_1, self.frequency_1, self.phase_1),
+                 (self.amplitude_2, self.frequency_2, self.phase_2),
+                 (self.amplitude_3, self.frequency_3, self.phase_3))
+        self._write_sines(out, offset_bin, sample_rate, scale, sines)
+
+    def get_sample_period(self, length, sample_rate):
+        return self._get_sample_period(
+            length, sample_rate, [self.frequency_1, self.frequency_2, self.frequency_3])
+
 
 class TripleSinProduct(SamplingBase):
     """
@@ -372,6 +421,16 @@ class TripleSinProduct(SamplingBase):
         samples_arr *= self._get_sine(time_array, self.amplitude_3, self.frequency_3, phase_rad)
         return samples_arr
 
+    def get_samples_into(self, out, offset_bin, sample_rate, scale=1.0):
+        sines = ((self.amplitude_1, self.frequency_1, self.phase_1),
+                 (self.amplitude_2, self.frequency_2, self.phase_2),
+                 (self.amplitude_3, self.frequency_3, self.phase_3))
+        self._write_sines(out, offset_bin, sample_rate, scale, sines, multiply=True)
+
+    def get_sample_period(self, length, sample_rate):
+        return self._get_sample_period(
+            length, sample_rate, [self.frequency_1, self.frequency_2, self.frequency_3])
+
 
 class Chirp(SamplingBase):
     """
@@ -414,6 +473,26 @@ class Chirp(SamplingBase):
                         time_array - time_array[0]) / time_diff / 2) + phase_rad)
         return samples_arr
 
+    def get_samples_into(self, out, offset_bin, sample_rate, scale=1.0):
+        # Same waveform as get_samples, expanded around the start time t_0 of out:
+        # phase = 2*pi*(t_0*f_start + rel_t*(f_start + chirp_rate*t_0 + chirp_rate*rel_t))
+        phase_rad = np.deg2rad(self.phase)
+        length = len(out)
+        start_time = offset_bin / sample_rate
+        time_diff = (length - 1) / sample_rate
+        chirp_rate = (self.stop_freq - self.start_freq) / time_diff / 2 if length > 1 else 0
+        rel_time = np.arange(length, dtype='float64')
+        rel_time /= sample_rate
+        samples = rel_time * chirp_rate
+        samples += self.start_freq + chirp_rate * start_time
+        samples *= rel_time
+        del rel_time
+        samples += math.fmod(start_time * self.start_freq, 1.0)
+        samples *= 2 * np.pi
+        samples += phase_rad
+        np.sin(samples, out=samples)
+        np.multiply(samples, self.amplitude * scale, out=out, casting='same_kind')
+
 class AllenEberlyChirp(SamplingBase):
 
     """
@@ -491,6 +570,40 @@ class AllenEberlyChirp(SamplingBase):
                              phi_tanh_chirp(time_array))
         return samples_arr
 
+    def get_samples_into(self, out, offset_bin, sample_rate, scale=1.0):
+        # Same waveform as get_samples. It only depends on the time relative to the start of out.
+        phase_rad = np.deg2rad(self.phase)
+        freq_range_max = self.stop_freq - self.start_freq
+        pulse_duration = (len(out) - 1) / sample_rate
+        freq_center = (self.stop_freq + self.start_freq) / 2
+        tau_run = self.tau_pulse
+        amp_conv = 2 * self.amplitude
+
+        # reduced time (t - t_start - pulse_duration / 2) / tau_run
+        samples = np.arange(len(out), dtype='float64')
+        samples /= sample_rate
+        samples -= pulse_duration / 2
+        samples /= tau_run
+        cosh_arr = np.cosh(samples)
+
+        # sech envelope
+        np.divide(amp_conv * scale, cosh_arr, out=out, casting='same_kind')
+
+        # phase of the tanh chirp
+        np.log(cosh_arr, out=cosh_arr)
+        cosh_arr -= np.log(np.cosh(pulse_duration / (2 * tau_run)))
+        cosh_arr *= np.pi * freq_range_max * tau_run
+
+        # carrier phase
+        samples *= tau_run
+        samples += pulse_duration / 2
+        samples *= 2 * np.pi * freq_center
+        samples += phase_rad
+        samples += cosh_arr
+        del cosh_arr
+        np.cos(samples, out=samples)
+        out *= samples
+
 # FIXME: Not implemented yet!
 # class ImportedSamples(object):
 #     """
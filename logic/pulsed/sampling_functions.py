@@ -26,7 +26,10 @@ import sys
 import inspect
 import copy
 import logging
+import math
+import numpy as np
 from collections import OrderedDict
+from fractions import Fraction
 
 
 class SamplingBase:
@@ -36,6 +39,11 @@ class SamplingBase:
     params = OrderedDict()
     log = logging.getLogger(__name__)
 
+    # Periodic waveforms with a period of up to this many samples are sampled once and tiled
+    _max_tiling_period = 2 ** 16
+    # Maximum phase drift (in periods) accumulated by tiling over the whole output array
+    _max_tiling_drift = 1e-9
+
     def __repr__(self):
         kwargs = []
         for param, def_dict in self.params.items():
@@ -75,6 +83,125 @@ class SamplingBase:
             dict_repr['params'][param] = getattr(self, param)
         return dict_repr
 
+    def get_samples_into(self, out, offset_bin, sample_rate, scale=1.0):
+        """ Calculate the samples for the time bins offset_bin ... offset_bin + len(out) - 1 and
+        write them, multiplied by scale, directly into the (float32) array out.
+
+        This default implementation calls get_samples with a float64 time array. Sampling
+        functions should override it to avoid temporary arrays.
+
+        @param numpy.ndarray out: destination array (usually a slice of the sample buffer)
+        @param int offset_bin: absolute time bin of the first sample
+        @param float sample_rate: sample rate in Hz
+        @param float scale: factor applied to the samples (e.g. normalization to the Vpp)
+        """
+        time_array = (offset_bin + np.arange(len(out), dtype='float64')) / sample_rate
+        np.multiply(self.get_samples(time_array), scale, out=out, casting='same_kind')
+
+    def get_sample_period(self, length, sample_rate):
+        """ Period (in samples) after which the samples of this function repeat exactly.
+
+        Used to decide if a repeated element can be sampled once and repeated by the hardware
+        while preserving the rotating frame.
+
+        @param int length: total number of samples the period must hold for
+        @param float sample_rate: sample rate in Hz
+
+        @return int: period in samples or None if the function is not periodic (default)
+        """
+        return None
+
+    @staticmethod
+    def _get_sine_phase(length, offset_bin, sample_rate, frequency, phase_rad):
+        """ Phase (in rad) of a sine wave for length consecutive time bins starting at offset_bin.
+
+        The phase at offset_bin is reduced modulo one period before adding the per-sample phase,
+        so the result stays accurate for arbitrarily large offset_bin.
+
+        @param int length: number of samples
+        @param int offset_bin: absolute time bin of the first sample
+        @param float sample_rate: sample rate in Hz
+        @param float frequency: frequency of the sine in Hz
+        @param float phase_rad: phase offset in rad
+
+        @return numpy.ndarray: float64 phase array
+        """
+        cycles_per_bin = frequency / sample_rate
+        start_phase = 2 * np.pi * math.fmod(cycles_per_bin * offset_bin, 1.0) + phase_rad
+        phase = np.arange(length, dtype='float64')
+        phase *= 2 * np.pi * cycles_per_bin
+        phase += start_phase
+        return phase
+
+    @classmethod
+    def _get_sample_period(cls, length, sample_rate, frequencies):
+        """ Get the exact period (in samples) of a waveform composed of the given frequencies.
+
+        Each frequency / sample_rate ratio is approximated by a fraction p/q. The approximation is
+        accepted if the phase drift accumulated over length samples stays below _max_tiling_drift.
+
+        @param int length: number of samples to generate
+        @param float sample_rate: sample rate in Hz
+        @param list frequencies: frequencies in Hz contained in the waveform
+
+        @return int: period in samples or None if the waveform is not (short) periodic
+        """
+        period = 1
+        for frequency in frequencies:
+            cycles_per_bin = frequency / sample_rate
+            fraction = Fraction(cycles_per_bin).limit_denominator(cls._max_tiling_period)
+            if abs(cycles_per_bin - float(fraction)) * length > cls._max_tiling_drift:
+                return None
+            period = period * fraction.denominator // math.gcd(period, fraction.denominator)
+            if period > cls._max_tiling_period:
+                return None
+        return period
+
+    @staticmethod
+    def _tile_period(out, period):
+        """ Repeat the first period samples of out over the whole array (in place).
+
+        @param numpy.ndarray out: array with the first period already calculated
+        @param int period: period in samples
+        """
+        filled = period
+        while filled < len(out):
+            chunk = min(filled, len(out) - filled)
+            out[filled:filled + chunk] = out[:chunk]
+            filled += chunk
+
+    @classmethod
+    def _write_sines(cls, out, offset_bin, sample_rate, scale, sines, multiply=False):
+        """ Write the (scaled) sum or product of several sine waves into out.
+
+        @param numpy.ndarray out: destination array
+        @param int offset_bin: absolute time bin of the first sample
+        @param float sample_rate: sample rate in Hz
+        @param float scale: factor applied to the result
+        @param iterable sines: (amplitude, frequency in Hz, phase in degree) for each sine wave
+        @param bool multiply: multiply the sine waves instead of adding them
+        """
+        # If the waveform is exactly periodic in samples, calculate a single period and tile it
+        period = cls._get_sample_period(len(out), sample_rate, [sine[1] for sine in sines])
+        if period is not None and 2 * period <= len(out):
+            cls._write_sines(out[:period], offset_bin, sample_rate, scale, sines, multiply)
+            cls._tile_period(out, period)
+            return
+
+        for index, (amplitude, frequency, phase) in enumerate(sines):
+            samples = cls._get_sine_phase(
+                len(out), offset_bin, sample_rate, frequency, np.pi * phase / 180)
+            np.sin(samples, out=samples)
+            if index == 0:
+                samples *= amplitude * scale
+                out[:] = samples
+            elif multiply:
+                samples *= amplitude
+                out *= samples
+            else:
+                samples *= amplitude * scale
+                out += samples
+
 
 class SamplingFunctions:
     """
@@ -26,6 +26,8 @@ import pickle
 import time
 import copy
 import traceback
+import shutil
+import multiprocessing
 
 from qtpy import QtCore
 from collections import OrderedDict
@@ -38,6 +40,7 @@ from core.util.network import netobtain
 from logic.generic_logic import GenericLogic
 from logic.pulsed.pulse_objects import PulseBlock, PulseBlockEnsemble, PulseSequence
 from logic.pulsed.pulse_objects import PulseObjectGenerator, PulseBlockElement
+from logic.pulsed.pulse_asset_store import PulseAssetStore, LazyAssetDict
 from logic.pulsed.sampling_functions import SamplingFunctions
 from interface.pulser_interface import SequenceOption
 
@@ -65,6 +68,14 @@ class SequenceGeneratorLogic(GenericLogic):
                                        default=os.path.join(get_home_dir(), 'saved_pulsed_assets'),
                                        missing='warn')
     _overhead_bytes = ConfigOption(name='overhead_bytes', default=0, missing='nothing')
+    # Play repeated PulseBlocks of predefined methods as sequence step repetitions if possible
+    _sequence_repeated_blocks = ConfigOption(name='sequence_repeated_blocks',
+                                             default=False,
+                                             missing='nothing')
+    # Number of worker processes to sample independent PulseSequence steps in parallel (<2: serial)
+    _sequence_sampling_processes = ConfigOption(name='sequence_sampling_processes',
+                                                default=0,
+                                                missing='nothing')
     # Optional additional paths to import from
     _additional_methods_import_path = ConfigOption(name='additional_predefined_methods_path',
                                                    default=None,
@@ -138,6 +149,12 @@ class SequenceGeneratorLogic(GenericLogic):
         self._saved_pulse_blocks = OrderedDict()
         self._saved_pulse_block_ensembles = OrderedDict()
         self._saved_pulse_sequences = OrderedDict()
+        # Database holding the serialized pulse objects
+        self._asset_store = None
+        # Waveforms and sequences present on the pulser during activation. Used to delete outdated
+        # sampling_information dicts of the pulse objects when they are de-serialized.
+        self._activation_waveforms = set()
+        self._activation_sequences = set()
         return
 
     def on_activate(self):
@@ -187,10 +204,13 @@ class SequenceGeneratorLogic(GenericLogic):
         # Read back settings from device and update instance variables accordingly
         self._read_settings_from_device()
 
-        # Update saved blocks/ensembles/sequences from serialized files
-        self._saved_pulse_blocks = OrderedDict()
-        self._saved_pulse_block_ensembles = OrderedDict()
-        self._saved_pulse_sequences = OrderedDict()
+        # Open the asset database and import pulse objects still pickled in single files
+        self._asset_store = PulseAssetStore(
+            os.path.join(self._assets_storage_dir, PulseAssetStore.default_filename))
+        self._migrate_pickled_assets()
+
+        # Update saved blocks/ensembles/sequences from the asset database. The objects themselves
+        # are de-serialized on first access.
         self._update_blocks_from_file()
         self._update_ensembles_from_file()
         self._update_sequences_from_file()
@@ -204,6 +224,9 @@ class SequenceGeneratorLogic(GenericLogic):
     def on_deactivate(self):
         """ Deinitialisation performed during deactivation of the module.
         """
+        if self._asset_store is not None:
+            self._asset_store.close()
+            self._asset_store = None
         return
 
     # @_saved_pulse_blocks.constructor
@@ -446,15 +469,19 @@ class SequenceGeneratorLogic(GenericLogic):
             self.log.error('Can´t clear the pulser as it is running. Switch off the pulser and try again.')
             return -1
         self.pulsegenerator().clear_all()
-        # Delete all sampling information from all PulseBlockEnsembles and PulseSequences
-        for seq_name in self.saved_pulse_sequences:
-            seq = self.saved_pulse_sequences[seq_name]
+        # Delete all sampling information from all PulseBlockEnsembles and PulseSequences.
+        # Pulse objects not de-serialized yet drop their sampling information upon
+        # de-serialization since the pulser memory is empty now.
+        self._activation_waveforms = set()
+        self._activation_sequences = set()
+        for seq in self._loaded_assets(self._saved_pulse_sequences):
             seq.sampling_information = dict()
-            self.save_sequence(seq)
-        for ens_name in self.saved_pulse_block_ensembles:
-            ens = self.saved_pulse_block_ensembles[ens_name]
+        for ens in self._loaded_assets(self._saved_pulse_block_ensembles):
             ens.sampling_information = dict()
-            self.save_ensemble(ens)
+        self._save_sequences_to_file()
+        self._save_ensembles_to_file()
+        self.sigSequenceDictUpdated.emit(self.saved_pulse_sequences)
+        self.sigEnsembleDictUpdated.emit(self.saved_pulse_block_ensembles)
         self.sigAvailableWaveformsUpdated.emit(self.sampled_waveforms)
         self.sigAvailableSequencesUpdated.emit(self.sampled_sequences)
         self.sigLoadedAssetUpdated.emit('', '')
@@ -733,9 +760,7 @@ class SequenceGeneratorLogic(GenericLogic):
             del (self._saved_pulse_blocks[name])
 
         # Delete from disk
-        filepath = os.path.join(self._assets_storage_dir, '{0}.block'.format(name))
-        if os.path.exists(filepath):
-            os.remove(filepath)
+        self._delete_asset_from_store('block', name)
 
         self.sigBlockDictUpdated.emit(self.saved_pulse_blocks)
         return
@@ -765,42 +790,37 @@ class SequenceGeneratorLogic(GenericLogic):
 
     def _update_blocks_from_file(self):
         """
-        Update the saved_pulse_blocks dict by de-serializing stored file.
+        Update the saved_pulse_blocks dict with the PulseBlock names found in the asset database.
+        The PulseBlock instances are de-serialized on first access.
         """
-        # Get all files in asset directory ending on ".block" and extract a sorted list of
-        # PulseBlock names
-        with os.scandir(self._assets_storage_dir) as scan:
-            names = natural_sort(f.name[:-6] for f in scan if f.is_file and f.name.endswith('.block'))
-
-        # Load all blocks from file
-        for block_name in names:
-            block = self._load_block_from_file(block_name)
-            if block is not None:
-                self._saved_pulse_blocks[block_name] = block
-
+        names = natural_sort(self._asset_store.names('block'))
+        self._saved_pulse_blocks = LazyAssetDict(self._load_block_from_store, names)
         self.sigBlockDictUpdated.emit(self._saved_pulse_blocks)
         return
 
+    def _load_block_from_store(self, block_name):
+        """
+        De-serializes a PulseBlock instance from the asset database.
+
+        @param str block_name: The name of the PulseBlock instance to de-serialize
+        @return PulseBlock: The de-serialized PulseBlock instance (None if failed)
+        """
+        return self._load_asset_from_store('block', block_name)
+
     def _save_block_to_file(self, block):
         """
-        Saves a single PulseBlock instance to file by serialization using pickle.
+        Saves a single PulseBlock instance to the asset database.
 
         @param PulseBlock block: The PulseBlock instance to be saved
         """
-        filename = '{0}.block'.format(block.name)
-        try:
-            with open(os.path.join(self._assets_storage_dir, filename), 'wb') as file:
-                pickle.dump(block, file)
-        except:
-            self.log.error('Failed to serialize PulseBlock "{0}" to file.'.format(block.name))
+        self._save_assets_to_store('block', [block])
         return
 
     def _save_blocks_to_file(self):
         """
-        Saves the saved_pulse_blocks dict items to files.
+        Saves the changed saved_pulse_blocks dict items to the asset database.
         """
-        for block in self._saved_pulse_blocks.values():
-            self._save_block_to_file(block)
+        self._save_assets_to_store('block', self._loaded_assets(self._saved_pulse_blocks))
         return
 
     def save_ensemble(self, ensemble):
@@ -840,9 +860,7 @@ class SequenceGeneratorLogic(GenericLogic):
             del self._saved_pulse_block_ensembles[name]
 
         # Delete from disk
-        filepath = os.path.join(self._assets_storage_dir, '{0}.ensemble'.format(name))
-        if os.path.exists(filepath):
-            os.remove(filepath)
+        self._delete_asset_from_store('ensemble', name)
 
         self.sigEnsembleDictUpdated.emit(self.saved_pulse_block_ensembles)
         return
@@ -868,51 +886,47 @@ class SequenceGeneratorLogic(GenericLogic):
 
     def _update_ensembles_from_file(self):
         """
-        Update the saved_pulse_block_ensembles dict from temporary file.
+        Update the saved_pulse_block_ensembles dict with the PulseBlockEnsemble names found in the
+        asset database. The PulseBlockEnsemble instances are de-serialized on first access.
         """
-        # Get all files in asset directory ending on ".ensemble" and extract a sorted list of
-        # PulseBlockEnsemble names
-        with os.scandir(self._assets_storage_dir) as scan:
-            names = natural_sort(f.name[:-9] for f in scan if f.is_file and f.name.endswith('.ensemble'))
-
         # Get all waveforms currently stored on pulser hardware in order to delete outdated
-        # sampling_information dicts
-        sampled_waveforms = set(self.sampled_waveforms)
-
-        # Load all ensembles from file
-        for ensemble_name in names:
-            ensemble = self._load_ensemble_from_file(ensemble_name)
-            if ensemble is not None:
-                if ensemble.sampling_information.get('waveforms'):
-                    waveform_set = set(ensemble.sampling_information['waveforms'])
-                    if not sampled_waveforms.issuperset(waveform_set):
-                        ensemble.sampling_information = dict()
-                self._saved_pulse_block_ensembles[ensemble_name] = ensemble
+        # sampling_information dicts upon de-serialization
+        self._activation_waveforms = set(self.sampled_waveforms)
 
+        names = natural_sort(self._asset_store.names('ensemble'))
+        self._saved_pulse_block_ensembles = LazyAssetDict(self._load_ensemble_from_store, names)
         self.sigEnsembleDictUpdated.emit(self.saved_pulse_block_ensembles)
         return
 
+    def _load_ensemble_from_store(self, ensemble_name):
+        """
+        De-serializes a PulseBlockEnsemble instance from the asset database.
+
+        @param str ensemble_name: The name of the PulseBlockEnsemble instance to de-serialize
+        @return PulseBlockEnsemble: The de-serialized PulseBlockEnsemble instance (None if failed)
+        """
+        ensemble = self._load_asset_from_store('ensemble', ensemble_name)
+        if ensemble is not None and ensemble.sampling_information.get('waveforms'):
+            waveform_set = set(ensemble.sampling_information['waveforms'])
+            if not self._activation_waveforms.issuperset(waveform_set):
+                ensemble.sampling_information = dict()
+        return ensemble
+
     def _save_ensemble_to_file(self, ensemble):
         """
-        Saves a single PulseBlockEnsemble instance to file by serialization using pickle.
+        Saves a single PulseBlockEnsemble instance to the asset database.
 
         @param PulseBlockEnsemble ensemble: The PulseBlockEnsemble instance to be saved
         """
-        filename = '{0}.ensemble'.format(ensemble.name)
-        try:
-            with open(os.path.join(self._assets_storage_dir, filename), 'wb') as file:
-                pickle.dump(ensemble, file)
-        except:
-            self.log.error('Failed to serialize PulseBlockEnsemble "{0}" to file.'
-                           ''.format(ensemble.name))
+        self._save_assets_to_store('ensemble', [ensemble])
         return
 
     def _save_ensembles_to_file(self):
         """
-        Saves the saved_pulse_block_ensembles dict items to files.
+        Saves the changed saved_pulse_block_ensembles dict items to the asset database.
         """
-        for ensemble in self.saved_pulse_block_ensembles.values():
-            self._save_ensemble_to_file(ensemble)
+        self._save_assets_to_store('ensemble',
+                                   self._loaded_assets(self._saved_pulse_block_ensembles))
         return
 
     def save_sequence(self, sequence):
@@ -957,9 +971,7 @@ class SequenceGeneratorLogic(GenericLogic):
             del self._saved_pulse_sequences[name]
 
         # Delete from disk
-        filepath = os.path.join(self._assets_storage_dir, '{0}.sequence'.format(name))
-        if os.path.exists(filepath):
-            os.remove(filepath)
+        self._delete_asset_from_store('sequence', name)
 
         self.sigSequenceDictUpdated.emit(self.saved_pulse_sequences)
         return
@@ -1030,53 +1042,151 @@ class SequenceGeneratorLogic(GenericLogic):
 
     def _update_sequences_from_file(self):
         """
-        Update the saved_pulse_sequences dict from files.
+        Update the saved_pulse_sequences dict with the PulseSequence names found in the asset
+        database. The PulseSequence instances are de-serialized on first access.
         """
-        # Get all files in asset directory ending on ".sequence" and extract a sorted list of
-        # PulseSequence names
-        with os.scandir(self._assets_storage_dir) as scan:
-            names = natural_sort(f.name[:-9] for f in scan if f.is_file and f.name.endswith('.sequence'))
-
         # Get all waveforms and sequences currently stored on pulser hardware in order to delete
-        # outdated sampling_information dicts
-        sampled_waveforms = set(self.sampled_waveforms)
-        sampled_sequences = set(self.sampled_sequences)
-
-        # Load all sequences from file
-        for sequence_name in names:
-            sequence = self._load_sequence_from_file(sequence_name)
-            if sequence is not None:
-                if sequence.name not in sampled_sequences:
-                    sequence.sampling_information = dict()
-                elif sequence.sampling_information:
-                    waveform_set = set(sequence.sampling_information['waveforms'])
-                    if not sampled_waveforms.issuperset(waveform_set):
-                        sequence.sampling_information = dict()
-                self._saved_pulse_sequences[sequence_name] = sequence
+        # outdated sampling_information dicts upon de-serialization
+        self._activation_waveforms = set(self.sampled_waveforms)
+        self._activation_sequences = set(self.sampled_sequences)
 
+        names = natural_sort(self._asset_store.names('sequence'))
+        self._saved_pulse_sequences = LazyAssetDict(self._load_sequence_from_store, names)
         self.sigSequenceDictUpdated.emit(self.saved_pulse_sequences)
         return
 
+    def _load_sequence_from_store(self, sequence_name):
+        """
+        De-serializes a PulseSequence instance from the asset database.
+
+        @param str sequence_name: The name of the PulseSequence instance to de-serialize
+        @return PulseSequence: The de-serialized PulseSequence instance (None if failed)
+        """
+        sequence = self._load_asset_from_store('sequence', sequence_name)
+        if sequence is not None:
+            if sequence.name not in self._activation_sequences:
+                sequence.sampling_information = dict()
+            elif sequence.sampling_information:
+                waveform_set = set(sequence.sampling_information['waveforms'])
+                if not self._activation_waveforms.issuperset(waveform_set):
+                    sequence.sampling_information = dict()
+        return sequence
+
     def _save_sequence_to_file(self, sequence):
         """
-        Saves a single PulseSequence instance to file by serialization using pickle.
+        Saves a single PulseSequence instance to the asset database.
 
         @param PulseSequence sequence: The PulseSequence instance to be saved
         """
-        filename = '{0}.sequence'.format(sequence.name)
+        self._save_assets_to_store('sequence', [sequence])
+        return
+
+    def _save_sequences_to_file(self):
+        """
+        Saves the changed saved_pulse_sequences dict items to the asset database.
+        """
+        self._save_assets_to_store('sequence', self._loaded_assets(self._saved_pulse_sequences))
+        return
+
+    def _load_asset_from_store(self, asset_type, name):
+        """
+        De-serializes a pulse object from the asset database and logs failures.
+
+        @param str asset_type: 'block', 'ensemble' or 'sequence'
+        @param str name: The name of the pulse object to de-serialize
+        @return object: The de-serialized pulse object (None if failed)
+        """
+        try:
+            return self._asset_store.load(asset_type, name)
+        except:
+            self.log.error('Failed to de-serialize {0} "{1}" from asset database "{2}".\n'
+                           'For better debugging I dumped the traceback to debug.'
+                           ''.format(asset_type, name, self._asset_store.path))
+            self.log.debug('{0!s}'.format(traceback.format_exc()))
+        return None
+
+    def _save_assets_to_store(self, asset_type, assets):
+        """
+        Saves pulse objects to the asset database. Pulse objects not changed since the last
+        load/save are not written again.
+
+        @param str asset_type: 'block', 'ensemble' or 'sequence'
+        @param list assets: The pulse object instances to be saved
+        @return bool: True if successful, False otherwise
+        """
+        try:
+            self._asset_store.save_many(asset_type, assets)
+        except:
+            self.log.error('Failed to serialize {0}(s) "{1}" to asset database.\n'
+                           'For better debugging I dumped the traceback to debug.'
+                           ''.format(asset_type, '", "'.join(asset.name for asset in assets)))
+            self.log.debug('{0!s}'.format(traceback.format_exc()))
+            return False
+        return True
+
+    def _delete_asset_from_store(self, asset_type, name):
+        """
+        Removes a pulse object from the asset database.
+
+        @param str asset_type: 'block', 'ensemble' or 'sequence'
+        @param str name: The name of the pulse object to remove
+        """
         try:
-            with open(os.path.join(self._assets_storage_dir, filename), 'wb') as file:
-                pickle.dump(sequence, file)
+            self._asset_store.delete(asset_type, name)
         except:
-            self.log.error('Failed to serialize PulseSequence "{0}" to file.'.format(sequence.name))
+            self.log.error('Failed to delete {0} "{1}" from asset database.'
+                           ''.format(asset_type, name))
         return
 
-    def _save_sequences_to_file(self):
+    @staticmethod
+    def _loaded_assets(asset_dict):
         """
-        Saves the saved_pulse_sequences dict items to files.
+        All pulse objects of a saved assets dict that have already been de-serialized. Pulse
+        objects not de-serialized yet can not have changed.
+
+        @param dict asset_dict: saved_pulse_blocks/_block_ensembles/_sequences dict
+        @return list: pulse object instances
         """
-        for sequence in self.saved_pulse_sequences.values():
-            self._save_sequence_to_file(sequence)
+        if isinstance(asset_dict, LazyAssetDict):
+            return asset_dict.loaded_values()
+        return list(asset_dict.values())
+
+    def _migrate_pickled_assets(self):
+        """
+        Imports pulse objects pickled into single files (".block", ".ensemble" and ".sequence" in
+        the asset directory) by earlier versions of this module into the asset database.
+        Successfully imported files are moved to the sub-directory "pickled_assets_backup".
+        """
+        loaders = OrderedDict([('block', self._load_block_from_file),
+                               ('ensemble', self._load_ensemble_from_file),
+                               ('sequence', self._load_sequence_from_file)])
+        with os.scandir(self._assets_storage_dir) as scan:
+            files = [f.name for f in scan if f.is_file() and
+                     os.path.splitext(f.name)[1][1:] in loaders]
+        if not files:
+            return
+
+        backup_dir = os.path.join(self._assets_storage_dir, 'pickled_assets_backup')
+        os.makedirs(backup_dir, exist_ok=True)
+        imported = 0
+        for asset_type, loader in loaders.items():
+            extension = '.{0}'.format(asset_type)
+            names = natural_sort(f[:-len(extension)] for f in files if f.endswith(extension))
+            loaded = OrderedDict()
+            for name in names:
+                asset = loader(name)
+                if asset is not None:
+                    loaded[name] = asset
+            if not self._save_assets_to_store(asset_type, list(loaded.values())):
+                continue
+            for name in loaded:
+                filename = '{0}{1}'.format(name, extension)
+                shutil.move(os.path.join(self._assets_storage_dir, filename),
+                            os.path.join(backup_dir, filename))
+            imported += len(loaded)
+        self.log.info('Imported {0:d} pickled pulse objects into asset database "{1}". Original '
+                      'files have been moved to "{2}".'.format(imported, self._asset_store.path,
+                                                               backup_dir))
         return
 
     def generate_predefined_sequence(self, predefined_sequence_name, kwargs_dict):
@@ -1117,6 +1227,13 @@ class SequenceGeneratorLogic(GenericLogic):
             ensemble.sampling_information = dict()
             self.save_ensemble(ensemble)
 
+        if self._sequence_repeated_blocks and len(sequences) < 1 and len(ensembles) == 1:
+            sequence = self.generate_repetition_sequence(ensembles[0])
+            if sequence is not None:
+                self.log.info('Repeated PulseBlocks of "{0}" will be played as sequence steps.'
+                              ''.format(ensembles[0].name))
+                sequences.append(sequence)
+
         if self.pulse_generator_constraints.sequence_option == SequenceOption.FORCED and len(sequences) < 1:
             self.log.info('Adding default sequence for: {0:s}'.format(predefined_sequence_name))
             self._add_default_sequence(ensembles, sequences)
@@ -1156,6 +1273,142 @@ class SequenceGeneratorLogic(GenericLogic):
         # Append PulseSequence to created_sequences list
         sequences.append(sequence)
 
+    def generate_repetition_sequence(self, ensemble):
+        """
+        Create a PulseSequence that plays the given PulseBlockEnsemble, but with repeated
+        PulseBlocks sampled only once and repeated by the pulse generator sequencer.
+
+        A repeated PulseBlock gets a sequence step of its own if its elements have no length
+        increment, its length fulfills the waveform granularity constraints, the repetitions
+        fit into the sequencer and (for ensembles in the rotating frame) all its sampling
+        functions are periodic with the block length. All other PulseBlocks are grouped into
+        unrolled sequence steps in between. The created PulseBlockEnsembles are named
+        "<ensemble name>_part<index>" and the PulseSequence gets the name of the ensemble.
+
+        @param str|PulseBlockEnsemble ensemble: PulseBlockEnsemble instance or name of a saved one
+        @return PulseSequence: the created (and saved) PulseSequence or None if the pulse generator
+                               has no sequence mode or no PulseBlock can be repeated by it.
+        """
+        if isinstance(ensemble, str):
+            ensemble = self.get_ensemble(ensemble)
+        if not isinstance(ensemble, PulseBlockEnsemble):
+            self.log.error('Unable to create repetition sequence. PulseBlockEnsemble not found.')
+            return None
+        if self.pulse_generator_constraints.sequence_option == SequenceOption.NON:
+            return None
+
+        parts = self._split_ensemble_by_repetitions(ensemble)
+        if parts is None:
+            return None
+
+        sequence = PulseSequence(name=ensemble.name, rotating_frame=ensemble.rotating_frame)
+        for part_index, (block_list, repetitions, length_bins) in enumerate(parts):
+            part = PulseBlockEnsemble(name='{0}_part{1:03d}'.format(ensemble.name, part_index),
+                                      block_list=block_list,
+                                      rotating_frame=ensemble.rotating_frame)
+            self.save_ensemble(part)
+            sequence.append(part.name)
+            sequence[-1].repetitions = repetitions
+
+        sequence[-1].go_to = 1
+
+        # Trigger the calculation of parameters in the PulseSequence instance
+        sequence.refresh_parameters()
+        sequence.measurement_information = copy.deepcopy(ensemble.measurement_information)
+        self.save_sequence(sequence)
+        return sequence
+
+    def _split_ensemble_by_repetitions(self, ensemble):
+        """
+        Split a PulseBlockEnsemble into sequence step parts (see generate_repetition_sequence).
+
+        @param PulseBlockEnsemble ensemble: The PulseBlockEnsemble to split
+        @return list: parts as lists [block_list, repetitions, length_bins] in chronological order
+                      or None if no PulseBlock can be played as repeated sequence step.
+        """
+        constraints = self.pulse_generator_constraints
+        granularity = max(1, int(constraints.waveform_length.step))
+        min_length = constraints.waveform_length.min
+        max_repetitions = constraints.repetitions.max
+
+        elements_length_bins = self.analyze_block_ensemble(ensemble)['elements_length_bins']
+
+        parts = list()
+        unrolled = [list(), 0, 0]
+        start_bin = 0
+        element_index = 0
+        for block_name, reps in ensemble:
+            block = self.get_block(block_name)
+            end_index = element_index + len(block) * (reps + 1)
+            lengths = elements_length_bins[element_index:end_index].reshape(reps + 1, len(block))
+            element_index = end_index
+            block_bins = int(lengths[0].sum()) if len(block) > 0 else 0
+
+            # The waveforms before and of the repeated block must fulfill the length constraints
+            if (0 < reps <= max_repetitions
+                    and start_bin % granularity == 0
+                    and block_bins % granularity == 0
+                    and block_bins >= max(min_length, 1)
+                    and (unrolled[2] == 0 or unrolled[2] >= min_length)
+                    and self._is_repeatable_block(block, lengths, ensemble.rotating_frame)):
+                if unrolled[0]:
+                    parts.append(unrolled)
+                    unrolled = [list(), 0, 0]
+                parts.append([[(block_name, 0)], reps, block_bins * (reps + 1)])
+            else:
+                unrolled[0].append((block_name, reps))
+                unrolled[2] += int(lengths.sum())
+            start_bin += int(lengths.sum())
+
+        # The last unrolled part must fulfill the minimum waveform length as well. If it doesn't,
+        # unroll the preceding parts into it.
+        while parts and 0 < unrolled[2] < min_length:
+            block_list, repetitions, length_bins = parts.pop()
+            if repetitions > 0:
+                block_list = [(block_list[0][0], repetitions)]
+            unrolled = [block_list + unrolled[0], 0, length_bins + unrolled[2]]
+        if unrolled[0]:
+            parts.append(unrolled)
+
+        if not any(part[1] > 0 for part in parts):
+            return None
+        if 0 < constraints.sequence_steps.max < len(parts):
+            self.log.warning('Number of sequence steps needed to play the repeated PulseBlocks of '
+                             '"{0}" exceeds the sequencer capabilities.'.format(ensemble.name))
+            return None
+        return parts
+
+    def _is_repeatable_block(self, block, lengths, rotating_frame):
+        """
+        Check if all repetitions of a PulseBlock are sampled to identical waveforms.
+
+        @param PulseBlock block: The PulseBlock to check
+        @param numpy.ndarray lengths: element lengths in bins, one row per repetition
+        @param bool rotating_frame: Flag indicating if the phase is preserved across the ensemble
+        @return bool: True if the block can be sampled once and repeated
+        """
+        if any(element.increment_s != 0 for element in block):
+            return False
+        if not np.all(lengths == lengths[0]):
+            return False
+
+        # The block sampled on its own must be discretized like within the ensemble
+        end_bins = np.rint(np.cumsum([element.init_length_s for element in block]) * self.__sample_rate)
+        if not np.array_equal(np.diff(end_bins, prepend=0), lengths[0]):
+            return False
+
+        # In the rotating frame each repetition continues the phase, so all sampling functions
+        # must be periodic with the block length.
+        if rotating_frame:
+            block_bins = int(lengths[0].sum())
+            total_bins = block_bins * len(lengths)
+            for element in block:
+                for function in element.pulse_function.values():
+                    period = function.get_sample_period(total_bins, self.__sample_rate)
+                    if period is None or block_bins % period != 0:
+                        return False
+        return True
+
     # ---------------------------------------------------------------------------
     #                    END sequence/block generation
     # ---------------------------------------------------------------------------
@@ -1362,6 +1615,124 @@ class SequenceGeneratorLogic(GenericLogic):
         return_dict['laser_falling_bins'] = laser_falling_bins
         return return_dict
 
+    def get_digital_instruction_table(self, ensemble, ensemble_info=None):
+        """
+        Compress the digital channels of a PulseBlockEnsemble into a state transition table that
+        can be consumed directly by digital-only pulse generators (e.g. PulseBlaster, FPGA pulser,
+        PulseStreamer) without sampling any per-sample arrays.
+
+        The table consists of segments with constant digital output. Each segment is described by
+        its length in timebins and a bitmask of the channels being high (bit n corresponds to
+        channel "d_ch<n+1>"). Consecutive segments with identical bitmask are merged.
+        Repetitions of a PulseBlock without length increments are detected and stored as loops
+        over the segments of a single repetition.
+
+        @param PulseBlockEnsemble ensemble: The PulseBlockEnsemble instance to compress
+        @param dict ensemble_info: optional, the result of analyze_block_ensemble for this ensemble
+        @return dict: digital_channels (list): sorted digital channel descriptors used
+                      number_of_samples (int): total number of samples of the ensemble
+                      durations (1D numpy.ndarray[int]): segment lengths in timebins with loops
+                                                         not unrolled
+                      bitmasks (1D numpy.ndarray[uint32]): segment channel bitmasks with loops not
+                                                           unrolled
+                      loops (2D numpy.ndarray[int]): one row per loop containing the index of the
+                                                     first segment, the number of segments and
+                                                     the number of executions of the loop body
+                      flat_durations (1D numpy.ndarray[int]): segment lengths in timebins of the
+                                                              fully unrolled ensemble
+                      flat_bitmasks (1D numpy.ndarray[uint32]): segment channel bitmasks of the
+                                                                fully unrolled ensemble
+        """
+        if ensemble_info is None:
+            ensemble_info = self.analyze_block_ensemble(ensemble)
+
+        digital_channels = natural_sort(ensemble_info['digital_channels'])
+        channel_bits = {chnl: 1 << (int(chnl.rsplit('ch', 1)[1]) - 1) for chnl in digital_channels}
+        elements_length_bins = ensemble_info['elements_length_bins']
+
+        # Parts of the ensemble as tuples (durations, bitmasks, number of executions).
+        # Parts with more than one execution become loops in the table.
+        parts = list()
+        element_index = 0
+        for block_name, reps in ensemble:
+            block = self.get_block(block_name)
+            if len(block) == 0:
+                continue
+            bitmasks = np.array(
+                [sum(channel_bits[chnl] for chnl, high in element.digital_high.items() if high)
+                 for element in block],
+                dtype='uint32')
+            end_index = element_index + len(block) * (reps + 1)
+            lengths = elements_length_bins[element_index:end_index].reshape(reps + 1, len(block))
+            element_index = end_index
+
+            # Repetitions of a block can only be looped if all have the same discrete length
+            if reps > 0 and np.all(lengths == lengths[0]):
+                durations, bitmasks = self._merge_digital_segments(lengths[0], bitmasks)
+                if len(bitmasks) > 1:
+                    parts.append((durations, bitmasks, reps + 1))
+                    continue
+                parts.append((durations * (reps + 1), bitmasks, 1))
+            else:
+                parts.append((lengths.ravel(), np.tile(bitmasks, reps + 1), 1))
+
+        # Merge adjacent parts without loops
+        merged_parts = list()
+        index = 0
+        while index < len(parts):
+            if parts[index][2] > 1:
+                merged_parts.append(parts[index])
+                index += 1
+                continue
+            stop = index
+            while stop < len(parts) and parts[stop][2] == 1:
+                stop += 1
+            merged_parts.append(self._merge_digital_segments(
+                np.concatenate([part[0] for part in parts[index:stop]]),
+                np.concatenate([part[1] for part in parts[index:stop]])) + (1,))
+            index = stop
+
+        # Collect the loop positions and unroll the loops for pulse generators without looping
+        # capabilities
+        loops = list()
+        segment_count = 0
+        for durations, bitmasks, executions in merged_parts:
+            if executions > 1:
+                loops.append((segment_count, len(bitmasks), executions))
+            segment_count += len(bitmasks)
+        durations = [part[0] for part in merged_parts]
+        bitmasks = [part[1] for part in merged_parts]
+        flat_durations = [np.tile(part[0], part[2]) for part in merged_parts]
+        flat_bitmasks = [np.tile(part[1], part[2]) for part in merged_parts]
+
+        table = dict()
+        table['digital_channels'] = digital_channels
+        table['number_of_samples'] = int(ensemble_info['number_of_samples'])
+        table['durations'] = np.concatenate(durations) if durations else np.empty(0, dtype='int64')
+        table['bitmasks'] = np.concatenate(bitmasks) if bitmasks else np.empty(0, dtype='uint32')
+        table['loops'] = np.array(loops, dtype='int64').reshape(-1, 3)
+        table['flat_durations'], table['flat_bitmasks'] = self._merge_digital_segments(
+            np.concatenate(flat_durations) if flat_durations else np.empty(0, dtype='int64'),
+            np.concatenate(flat_bitmasks) if flat_bitmasks else np.empty(0, dtype='uint32'))
+        return table
+
+    @staticmethod
+    def _merge_digital_segments(durations, bitmasks):
+        """
+        Remove empty segments and merge consecutive segments with identical channel bitmask.
+
+        @param numpy.ndarray durations: segment lengths in timebins
+        @param numpy.ndarray bitmasks: channel bitmask for each segment
+        @return (numpy.ndarray, numpy.ndarray): merged durations and bitmasks
+        """
+        non_empty = durations > 0
+        durations = np.asarray(durations[non_empty], dtype='int64')
+        bitmasks = np.asarray(bitmasks[non_empty], dtype='uint32')
+        if len(bitmasks) == 0:
+            return durations, bitmasks
+        starts = np.flatnonzero(np.concatenate(([True], bitmasks[1:] != bitmasks[:-1])))
+        return np.add.reduceat(durations, starts), bitmasks[starts]
+
     def analyze_sequence(self, sequence):
         """
         This helper method runs through each step of a PulseSequence object and extracts
@@ -1648,10 +2019,10 @@ class SequenceGeneratorLogic(GenericLogic):
         This method is creating the actual samples (voltages and logic states) for each time step
         of the analog and digital channels specified in the PulseBlockEnsemble.
         Therefore it iterates through all blocks, repetitions and elements of the ensemble and
-        calculates the exact voltages (float64) according to the specified math_function. The
-        samples are later on stored inside a float32 array.
-        So each element is calculated with high precision (float64) and then down-converted to
-        float32 to be stored.
+        calculates the exact voltages according to the specified math_function. The sampling
+        functions write the samples directly into the float32 sample arrays (see
+        SamplingBase.get_samples_into). Phases are calculated with high precision (float64) and
+        only the final samples are down-converted to float32.
 
         To preserve the rotating frame, an offset counter is used to indicate the absolute time
         within the ensemble. All calculations are done with time bins (dtype=int) to avoid rounding
@@ -1662,6 +2033,11 @@ class SequenceGeneratorLogic(GenericLogic):
         In other words: The whole sample arrays are never created at any time. This results in more
         function calls and general overhead causing much longer time to complete.
 
+        Before sampling, the digital channels are compressed into a state transition table (see
+        get_digital_instruction_table) and handed to the pulse generator via set_pulse_ensemble.
+        If the pulse generator accepts it and the ensemble has no analog channels, no sample
+        arrays are created at all.
+
         In addition the pulse_block_ensemble gets analyzed and important parameters used during
         sampling get stored in the ensemble object "sampling_information" attribute.
         It is a dictionary containing:
@@ -1690,58 +2066,22 @@ class SequenceGeneratorLogic(GenericLogic):
         # Set the waveform name (excluding the device specific channel naming suffix, i.e. '_ch1')
         waveform_name = name_tag if name_tag else ensemble.name
 
-        # check for old waveforms associated with the ensemble and delete them from pulse generator.
-        self._delete_waveform_by_nametag(waveform_name)
-
         # Take current time
         start_time = time.time()
 
-        # get important parameters from the ensemble
-        ensemble_info = self.analyze_block_ensemble(ensemble)
-
-        # Make sure the length of the channel is a multiple of the step size.
-        # This is done by appending an idle block
-        granularity = self.pulse_generator_constraints.waveform_length.step
-        self.log.debug('length: {0}, mod {1}'.format(
-            ensemble_info['number_of_samples'], ensemble_info['number_of_samples'] % granularity))
-        if ensemble_info['number_of_samples'] % granularity != 0:
-            self.log.warn('Length {0} does not fulfil step constraint {1}.'.format(
-                ensemble_info['number_of_samples'], granularity))
-            # TODO: take care of rounding errors!
-            extension_samples = granularity - ensemble_info['number_of_samples'] % granularity
-            target_total_samples = ensemble_info['number_of_samples'] + extension_samples
-            extension_seconds = (target_total_samples / self.__sample_rate) - ensemble_info[
-                'ideal_length']
-
-            pb_element = PulseBlockElement(
-                init_length_s=extension_seconds,
-                increment_s=0,
-                pulse_function={chnl: SamplingFunctions.Idle() for chnl in self.analog_channels},
-                digital_high={chnl: False for chnl in self.digital_channels})
-            idle_extension = PulseBlock('idle_extension', element_list=[pb_element])
-            temp_measurement_info = copy.deepcopy(ensemble.measurement_information)
-            ensemble.append((idle_extension.name, 0))
-            ensemble.measurement_information = temp_measurement_info
-
-            self.save_block(idle_extension)
-            self.save_ensemble(ensemble)
-
-            # get important parameters from the ensemble
-            ensemble_info = self.analyze_block_ensemble(ensemble)
-            if ensemble_info['number_of_samples'] != target_total_samples:
-                self.log.error('Expanding the PulseBlockEnsemble to match the waveform granularity '
-                               'has failed.\nTarget number of samples was {0:d}.\nfinal number of '
-                               'samples is {1:d}.\nThis is probably due to a rounding error in '
-                               'SequenceGeneratorLogic.sample_pulse_block_ensemble.'
-                               ''.format(target_total_samples, ensemble_info['number_of_samples']))
-            else:
-                self.log.warn('Extending waveform {0} by {2} bins. New length {1}.'.format(
-                    ensemble.name, ensemble_info['number_of_samples'], extension_samples))
+        # delete old waveforms, analyze the ensemble and match the waveform granularity
+        ensemble_info = self._prepare_ensemble_sampling(ensemble, waveform_name)
 
         # Non-sampling pulsers may have all they need to generate the pulse pattern at this point
-        if self.pulsegenerator().set_pulse_ensemble(ensemble.name, ensemble_info):
+        if self.pulsegenerator().set_pulse_ensemble(waveform_name, ensemble_info):
             self.sigLoadedAssetUpdated.emit(*self.loaded_asset)
             self.log.info("Successfully loaded pulse sequence '{}'".format(ensemble.name))
+            # Without analog channels there is nothing left to sample
+            if not ensemble_info['analog_channels']:
+                if ensemble.rotating_frame:
+                    offset_bin += ensemble_info['number_of_samples']
+                return self._finish_ensemble_sampling(
+                    ensemble, waveform_name, ensemble_info, [waveform_name], offset_bin, start_time)
             # let the rest of the loading continue so that measurement etc are set up
 
         # Calculate the byte size per sample.
@@ -1802,24 +2142,19 @@ class SequenceGeneratorLogic(GenericLogic):
                     while element_samples_written != element_length_bins:
                         samples_to_add = min(array_length - array_write_index,
                                              element_length_bins - element_samples_written)
-                        # create floating point time array for the current element inside rotating
-                        # frame if analog samples are to be calculated.
-                        if pulse_function:
-                            time_arr = (offset_bin + np.arange(
-                                samples_to_add, dtype='float64')) / self.__sample_rate
 
                         # Calculate respective part of the sample arrays
                         for chnl in digital_high:
                             digital_samples[chnl][array_write_index:array_write_index + samples_to_add] = digital_high[
                                 chnl]
+                        # The sampling functions write the samples normalized to the analog
+                        # voltage range directly into the float32 sample arrays.
                         for chnl in pulse_function:
-                            analog_samples[chnl][array_write_index:array_write_index + samples_to_add] = pulse_function[
-                                                                                                             chnl].get_samples(
-                                time_arr) / (self.__analog_levels[0][chnl] / 2)
-
-                        # Free memory
-                        if pulse_function:
-                            del time_arr
+                            pulse_function[chnl].get_samples_into(
+                                analog_samples[chnl][array_write_index:array_write_index + samples_to_add],
+                                offset_bin,
+                                self.__sample_rate,
+                                2 / self.__analog_levels[0][chnl])
 
                         element_samples_written += samples_to_add
                         array_write_index += samples_to_add
@@ -1877,6 +2212,89 @@ class SequenceGeneratorLogic(GenericLogic):
                     # Increment element index
                     element_count += 1
 
+        return self._finish_ensemble_sampling(
+            ensemble, waveform_name, ensemble_info, written_waveforms, offset_bin, start_time)
+
+    def _prepare_ensemble_sampling(self, ensemble, waveform_name):
+        """ Prepare the sampling of a PulseBlockEnsemble.
+
+        Deletes old waveforms associated with waveform_name from the pulse generator, analyzes the
+        ensemble and extends it by an idle block if the number of samples does not fulfil the
+        waveform length step constraint. Also adds the digital instruction table to the returned
+        ensemble_info if there are digital channels.
+
+        @param PulseBlockEnsemble ensemble: The PulseBlockEnsemble instance to sample
+        @param str waveform_name: name (tag) of the waveforms to create
+
+        @return dict: information about the ensemble returned by analyze_block_ensemble
+        """
+        # check for old waveforms associated with the ensemble and delete them from pulse generator.
+        self._delete_waveform_by_nametag(waveform_name)
+
+        # get important parameters from the ensemble
+        ensemble_info = self.analyze_block_ensemble(ensemble)
+
+        # Make sure the length of the channel is a multiple of the step size.
+        # This is done by appending an idle block
+        granularity = self.pulse_generator_constraints.waveform_length.step
+        self.log.debug('length: {0}, mod {1}'.format(
+            ensemble_info['number_of_samples'], ensemble_info['number_of_samples'] % granularity))
+        if ensemble_info['number_of_samples'] % granularity != 0:
+            self.log.warn('Length {0} does not fulfil step constraint {1}.'.format(
+                ensemble_info['number_of_samples'], granularity))
+            # TODO: take care of rounding errors!
+            extension_samples = granularity - ensemble_info['number_of_samples'] % granularity
+            target_total_samples = ensemble_info['number_of_samples'] + extension_samples
+            extension_seconds = (target_total_samples / self.__sample_rate) - ensemble_info[
+                'ideal_length']
+
+            pb_element = PulseBlockElement(
+                init_length_s=extension_seconds,
+                increment_s=0,
+                pulse_function={chnl: SamplingFunctions.Idle() for chnl in self.analog_channels},
+                digital_high={chnl: False for chnl in self.digital_channels})
+            idle_extension = PulseBlock('idle_extension', element_list=[pb_element])
+            temp_measurement_info = copy.deepcopy(ensemble.measurement_information)
+            ensemble.append((idle_extension.name, 0))
+            ensemble.measurement_information = temp_measurement_info
+
+            self.save_block(idle_extension)
+            self.save_ensemble(ensemble)
+
+            # get important parameters from the ensemble
+            ensemble_info = self.analyze_block_ensemble(ensemble)
+            if ensemble_info['number_of_samples'] != target_total_samples:
+                self.log.error('Expanding the PulseBlockEnsemble to match the waveform granularity '
+                               'has failed.\nTarget number of samples was {0:d}.\nfinal number of '
+                               'samples is {1:d}.\nThis is probably due to a rounding error in '
+                               'SequenceGeneratorLogic.sample_pulse_block_ensemble.'
+                               ''.format(target_total_samples, ensemble_info['number_of_samples']))
+            else:
+                self.log.warn('Extending waveform {0} by {2} bins. New length {1}.'.format(
+                    ensemble.name, ensemble_info['number_of_samples'], extension_samples))
+
+        # Digital-only pulsers can generate the pulse pattern directly from the state transition
+        # table of the digital channels.
+        if ensemble_info['digital_channels']:
+            ensemble_info['digital_instruction_table'] = self.get_digital_instruction_table(
+                ensemble, ensemble_info)
+
+        return ensemble_info
+
+    def _finish_ensemble_sampling(self, ensemble, waveform_name, ensemble_info, written_waveforms,
+                                  offset_bin, start_time):
+        """ Store the sampling information in the ensemble and signal the end of the sampling.
+
+        @param PulseBlockEnsemble ensemble: The sampled PulseBlockEnsemble instance
+        @param str waveform_name: name (tag) of the created waveforms
+        @param dict ensemble_info: information about the ensemble returned by analyze_block_ensemble
+        @param iterable written_waveforms: names of the waveforms created on the device
+        @param int offset_bin: offset bin to maintain the rotating frame in subsequent samplings
+        @param float start_time: time.time() at the start of the sampling
+
+        @return tuple: (offset_bin, created_waveforms, ensemble_info), see
+                       sample_pulse_block_ensemble
+        """
         # Save sampling related parameters to the sampling_information container within the
         # PulseBlockEnsemble.
         # This step is only performed if the resulting waveforms are named by the PulseBlockEnsemble
@@ -1899,6 +2317,231 @@ class SequenceGeneratorLogic(GenericLogic):
         self.sigSampleEnsembleComplete.emit(ensemble)
         return offset_bin, natural_sort(written_waveforms), ensemble_info
 
+    def _submit_ensemble_sampling(self, pool, ensemble, offset_bin, name_tag):
+        """ Prepare the sampling of a PulseBlockEnsemble in the main process and hand the
+        calculation of the sample arrays over to a worker process of pool.
+
+        The waveforms are written to the device afterwards by _complete_ensemble_sampling.
+        Ensembles that do not need any sampling (see set_pulse_ensemble), that exceed the
+        overhead_bytes memory limit or whose PulseBlocks can not be pickled are sampled right away
+        by sample_pulse_block_ensemble.
+
+        @param multiprocessing.Pool pool: process pool to sample the ensemble in
+        @param str ensemble: name of the PulseBlockEnsemble to sample
+        @param int offset_bin: offset bin to maintain the rotating frame
+        @param str name_tag: name tag of the waveforms to create
+
+        @return tuple: (offset_bin, job) with the offset bin after the ensemble and a dict
+                       describing the sampling job. job['ensemble_info'] is an empty dict if the
+                       sampling failed.
+        """
+        ensemble = self.get_ensemble(ensemble)
+        job = {'ensemble': ensemble, 'name_tag': name_tag, 'waveforms': list(),
+               'ensemble_info': dict(), 'result': None, 'start_offset_bin': offset_bin,
+               'offset_bin': offset_bin, 'start_time': time.time()}
+        if ensemble is None or self._sampling_ensemble_sanity_check(ensemble) < 0:
+            return offset_bin, job
+
+        # Sample large ensembles chunkwise in this process to respect the memory limit
+        ensemble_info = self.analyze_block_ensemble(ensemble)
+        bytes_per_ensemble = ensemble_info['number_of_samples'] * (
+                len(ensemble_info['analog_channels']) * 4 + len(ensemble_info['digital_channels']))
+        if 0 < self._overhead_bytes < bytes_per_ensemble:
+            offset_bin, job['waveforms'], job['ensemble_info'] = self.sample_pulse_block_ensemble(
+                ensemble=ensemble, offset_bin=offset_bin, name_tag=name_tag)
+            return offset_bin, job
+
+        # The PulseBlocks are pickled here, so that errors show up in this process and not while
+        # the worker process receives the job.
+        block_list = [(self.get_block(block_name), reps) for block_name, reps in ensemble.block_list]
+        try:
+            pickled_block_list = pickle.dumps(block_list, pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            self.log.warning('Unable to pickle the PulseBlocks of PulseBlockEnsemble "{0}" for '
+                             'sampling in a worker process. Sampling it in this process instead.'
+                             '\n{1}'.format(ensemble.name, traceback.format_exc()))
+            offset_bin, job['waveforms'], job['ensemble_info'] = self.sample_pulse_block_ensemble(
+                ensemble=ensemble, offset_bin=offset_bin, name_tag=name_tag)
+            return offset_bin, job
+
+        ensemble_info = self._prepare_ensemble_sampling(ensemble, name_tag)
+        job['ensemble_info'] = ensemble_info
+        end_offset_bin = offset_bin + ensemble_info['number_of_samples'] if ensemble.rotating_frame else offset_bin
+        job['offset_bin'] = end_offset_bin
+
+        # Non-sampling pulsers may have all they need to generate the pulse pattern at this point
+        if self.pulsegenerator().set_pulse_ensemble(name_tag, ensemble_info):
+            self.sigLoadedAssetUpdated.emit(*self.loaded_asset)
+            self.log.info("Successfully loaded pulse sequence '{}'".format(ensemble.name))
+            # Without analog channels there is nothing left to sample
+            if not ensemble_info['analog_channels']:
+                job['waveforms'] = self._finish_ensemble_sampling(
+                    ensemble, name_tag, ensemble_info, [name_tag], end_offset_bin,
+                    job['start_time'])[1]
+                return end_offset_bin, job
+
+        job['result'] = pool.apply_async(
+            self._sample_pickled_ensemble_arrays,
+            (pickled_block_list, ensemble_info['elements_length_bins'], ensemble_info['analog_channels'],
+             ensemble_info['digital_channels'], offset_bin, ensemble.rotating_frame,
+             self.__sample_rate, self.__analog_levels[0]))
+        return end_offset_bin, job
+
+    def _complete_ensemble_sampling(self, job):
+        """ Wait for a sampling job created by _submit_ensemble_sampling and write the sample
+        arrays to the device.
+
+        @param dict job: sampling job returned by _submit_ensemble_sampling
+
+        @return list: names of the created waveforms (empty list if sampling failed)
+        """
+        if job['result'] is None:
+            return job['waveforms']
+
+        ensemble = job['ensemble']
+        ensemble_info = job['ensemble_info']
+        try:
+            analog_samples, digital_samples = job['result'].get()
+        except (pickle.PickleError, ImportError):
+            # e.g. sampling functions from additional_sampling_functions_path can not be imported
+            # by the spawned worker processes
+            self.log.warning('Unable to sample PulseBlockEnsemble "{0}" in a worker process. '
+                             'Sampling it in this process instead.\n{1}'
+                             ''.format(ensemble.name, traceback.format_exc()))
+            return self.sample_pulse_block_ensemble(ensemble=ensemble,
+                                                    offset_bin=job['start_offset_bin'],
+                                                    name_tag=job['name_tag'])[1]
+        except Exception:
+            self.log.error('Sampling of PulseBlockEnsemble "{0}" in a worker process failed:\n{1}'
+                           ''.format(ensemble.name, traceback.format_exc()))
+            return list()
+
+        written_waveforms = set()
+        if ensemble_info['number_of_samples'] > 0:
+            written_samples, wfm_list = self.pulsegenerator().write_waveform(
+                name=job['name_tag'],
+                analog_samples=analog_samples,
+                digital_samples=digital_samples,
+                is_first_chunk=True,
+                is_last_chunk=True,
+                total_number_of_samples=ensemble_info['number_of_samples'])
+            if written_samples != ensemble_info['number_of_samples']:
+                self.log.error('Sampling of ensemble "{0}" failed. Write to device was '
+                               'unsuccessful.\nThe number of actually written samples ({1:d}) '
+                               'does not match the number of samples staged to write ({2:d}).'
+                               ''.format(ensemble.name, written_samples,
+                                         ensemble_info['number_of_samples']))
+                self.sigAvailableWaveformsUpdated.emit(self.sampled_waveforms)
+                return list()
+            written_waveforms.update(wfm_list)
+
+        return self._finish_ensemble_sampling(ensemble, job['name_tag'], ensemble_info,
+                                              written_waveforms, job['offset_bin'],
+                                              job['start_time'])[1]
+
+    @classmethod
+    def _sample_pickled_ensemble_arrays(cls, pickled_block_list, *args):
+        """ Unpickle the PulseBlocks and sample the ensemble with _sample_ensemble_arrays.
+
+        Runs in the worker processes of the parallel sequence sampling. Unpickling the PulseBlocks
+        here (and not while the worker receives the job) hands errors back to the main process.
+
+        @param bytes pickled_block_list: pickled list of (PulseBlock, repetitions) tuples
+        @param args: remaining arguments of _sample_ensemble_arrays
+
+        @return tuple: (analog_samples, digital_samples) dicts of the sample arrays
+        """
+        try:
+            block_list = pickle.loads(pickled_block_list)
+        except Exception as err:
+            raise pickle.UnpicklingError(
+                'Unable to unpickle the PulseBlocks in the worker process: {0!r}'.format(err))
+        return cls._sample_ensemble_arrays(block_list, *args)
+
+    @staticmethod
+    def _sample_ensemble_arrays(block_list, elements_length_bins, analog_channels,
+                                digital_channels, offset_bin, rotating_frame, sample_rate,
+                                analog_amplitudes):
+        """ Sample a whole PulseBlockEnsemble into newly allocated sample arrays.
+
+        Runs in the worker processes of the parallel sequence sampling and therefore only depends
+        on its (picklable) arguments. The samples are identical to the ones created by
+        sample_pulse_block_ensemble.
+
+        @param list block_list: list of (PulseBlock, repetitions) tuples of the ensemble
+        @param list elements_length_bins: length in bins of each element (see analyze_block_ensemble)
+        @param iterable analog_channels: names of the analog channels to sample
+        @param iterable digital_channels: names of the digital channels to sample
+        @param int offset_bin: offset bin to maintain the rotating frame
+        @param bool rotating_frame: increment the offset bin with the samples written
+        @param float sample_rate: sample rate of the pulse generator in Hz
+        @param dict analog_amplitudes: peak-to-peak amplitudes of the analog channels
+
+        @return tuple: (analog_samples, digital_samples) dicts of the sample arrays
+        """
+        number_of_samples = int(np.sum(elements_length_bins))
+        analog_samples = {chnl: np.empty(number_of_samples, dtype='float32')
+                          for chnl in analog_channels}
+        digital_samples = {chnl: np.empty(number_of_samples, dtype=bool)
+                           for chnl in digital_channels}
+
+        write_index = 0
+        element_count = 0
+        for block, reps in block_list:
+            for rep_no in range(reps + 1):
+                for element in block.element_list:
+                    element_length_bins = elements_length_bins[element_count]
+                    end_index = write_index + element_length_bins
+                    for chnl, state in element.digital_high.items():
+                        digital_samples[chnl][write_index:end_index] = state
+                    for chnl, function in element.pulse_function.items():
+                        function.get_samples_into(analog_samples[chnl][write_index:end_index],
+                                                  offset_bin,
+                                                  sample_rate,
+                                                  2 / analog_amplitudes[chnl])
+                    write_index = end_index
+                    if rotating_frame:
+                        offset_bin += element_length_bins
+                    element_count += 1
+        return analog_samples, digital_samples
+
+    def _write_pending_ensembles(self, pending_jobs, generated_ensembles, written_waveforms,
+                                 max_pending=0):
+        """ Write the waveforms of the oldest pending sampling jobs to the device (in order) until
+        at most max_pending jobs are left.
+
+        @param OrderedDict pending_jobs: sampling jobs (see _submit_ensemble_sampling) not written
+                                         yet with their name tags as keys. Written jobs are removed.
+        @param dict generated_ensembles: ensemble_info dicts of the sequence with the name tags as
+                                         keys. The names of the written waveforms are added.
+        @param set written_waveforms: names of all waveforms written for the sequence
+        @param int max_pending: number of jobs to leave pending
+
+        @return str: name of the PulseBlockEnsemble that failed, None if all jobs succeeded
+        """
+        while len(pending_jobs) > max_pending:
+            name_tag, job = pending_jobs.popitem(last=False)
+            waveform_list = self._complete_ensemble_sampling(job)
+            if len(waveform_list) == 0:
+                return job['ensemble'].name
+            generated_ensembles[name_tag]['waveforms'] = waveform_list
+            written_waveforms.update(waveform_list)
+        return None
+
+    def _sequence_sampling_failed(self, sequence, ensemble_name):
+        """ Log the failed sampling of a PulseSequence step and release the module.
+
+        @param PulseSequence sequence: The PulseSequence that was being sampled
+        @param str ensemble_name: name of the PulseBlockEnsemble that could not be sampled
+        """
+        self.log.error('Sampling of PulseBlockEnsemble "{0}" failed during sampling of '
+                       'PulseSequence "{1}".\nFailed to create waveforms on device.'
+                       ''.format(ensemble_name, sequence.name))
+        self.module_state.unlock()
+        self.__sequence_generation_in_progress = False
+        self.sigSampleSequenceComplete.emit(None)
+        return
+
     @QtCore.Slot(str)
     def sample_pulse_sequence(self, sequence):
         """ Samples the PulseSequence object, which serves as the construction plan.
@@ -1915,6 +2558,13 @@ class SequenceGeneratorLogic(GenericLogic):
         ATTENTION: The phase preservation within a single PulseBlockEnsemble is NOT affected by
                    this method.
 
+        If the ConfigOption sequence_sampling_processes is set to more than one process, the sample
+        arrays of the steps are calculated concurrently in a process pool. Everything else
+        (waveform names, rotating frame offsets, writing the waveforms and the sequence table) is
+        done in this process in the order of the sequence steps, so the result is identical to
+        serial sampling. At most sequence_sampling_processes steps are sampled ahead of the
+        waveforms written to the device, which limits the memory held by finished steps.
+
         More sophisticated sequence sampling method can be implemented here.
         """
         # Get PulseSequence from saved sequences if string has been passed as argument
@@ -1969,51 +2619,93 @@ class SequenceGeneratorLogic(GenericLogic):
         # of the sampled Pulse_Block_Ensembles one has to introduce a running number as an
         # additional name tag, so keep the sampled files separate.
         offset_bin = 0  # that will be used for phase preservation
-        for step_index, seq_step in enumerate(sequence):
-            if sequence.rotating_frame:
-                # to make something like 001
-                name_tag = seq_step.ensemble + '_' + str(step_index).zfill(3)
-            else:
-                name_tag = seq_step.ensemble
-                offset_bin = 0  # Keep the offset at 0
-
-            # Only sample ensembles if they have not already been sampled
-            if sequence.rotating_frame or \
-                    not self.get_ensemble(name_tag).sampling_information or \
-                    self.get_ensemble(name_tag).sampling_information['pulse_generator_settings'] != self.pulse_generator_settings:
-
-                offset_bin, waveform_list, ensemble_info = self.sample_pulse_block_ensemble(
-                    ensemble=seq_step.ensemble,
-                    offset_bin=offset_bin,
-                    name_tag=name_tag)
-
-                if len(waveform_list) == 0:
-                    self.log.error('Sampling of PulseBlockEnsemble "{0}" failed during sampling of '
-                                   'PulseSequence "{1}".\nFailed to create waveforms on device.'
-                                   ''.format(seq_step.ensemble, sequence.name))
-                    self.module_state.unlock()
-                    self.__sequence_generation_in_progress = False
-                    self.sigSampleSequenceComplete.emit(None)
-                    return
+        # Sampling jobs of the parallel sampling mode not written to the device yet (in the order
+        # of the sequence steps)
+        pending_jobs = OrderedDict()
+        pool = None
+        if self._sequence_sampling_processes > 1 and len(sequence) > 1:
+            pool = multiprocessing.get_context('spawn').Pool(self._sequence_sampling_processes)
+        try:
+            for step_index, seq_step in enumerate(sequence):
+                if sequence.rotating_frame:
+                    # to make something like 001
+                    name_tag = seq_step.ensemble + '_' + str(step_index).zfill(3)
+                else:
+                    name_tag = seq_step.ensemble
+                    offset_bin = 0  # Keep the offset at 0
+
+                if name_tag in pending_jobs:
+                    self.log.debug('Waveform already scheduled for sampling: {0}'.format(name_tag))
+                # Only sample ensembles if they have not already been sampled
+                elif sequence.rotating_frame or \
+                        not self.get_ensemble(name_tag).sampling_information or \
+                        self.get_ensemble(name_tag).sampling_information['pulse_generator_settings'] != self.pulse_generator_settings:
+
+                    if pool is not None:
+                        offset_bin, job = self._submit_ensemble_sampling(
+                            pool=pool,
+                            ensemble=seq_step.ensemble,
+                            offset_bin=offset_bin,
+                            name_tag=name_tag)
+                        if not job['ensemble_info']:
+                            self._sequence_sampling_failed(sequence, seq_step.ensemble)
+                            return
+                        pending_jobs[name_tag] = job
+                        generated_ensembles[name_tag] = job['ensemble_info']
+
+                        # Write the oldest steps once the pool is busy
+                        failed_ensemble = self._write_pending_ensembles(
+                            pending_jobs, generated_ensembles, written_waveforms,
+                            self._sequence_sampling_processes)
+                        if failed_ensemble is not None:
+                            self._sequence_sampling_failed(sequence, failed_ensemble)
+                            return
+                    else:
+                        offset_bin, waveform_list, ensemble_info = self.sample_pulse_block_ensemble(
+                            ensemble=seq_step.ensemble,
+                            offset_bin=offset_bin,
+                            name_tag=name_tag)
 
-                # Add to generated ensembles
-                ensemble_info['waveforms'] = waveform_list
-                generated_ensembles[name_tag] = ensemble_info
+                        if len(waveform_list) == 0:
+                            self._sequence_sampling_failed(sequence, seq_step.ensemble)
+                            return
 
-                # Add created waveform names to the set
-                written_waveforms.update(waveform_list)
-            else:
-                self.log.debug('Waveform already sampled: {0}'.format(name_tag))
-                ensemble_info = self.get_ensemble(name_tag).sampling_information.copy()
-                del(ensemble_info['pulse_generator_settings'])
-                generated_ensembles[name_tag] = ensemble_info
+                        # Add to generated ensembles
+                        ensemble_info['waveforms'] = waveform_list
+                        generated_ensembles[name_tag] = ensemble_info
 
-                # Add created waveform names to the set
-                written_waveforms.update(ensemble_info['waveforms'])
+                        # Add created waveform names to the set
+                        written_waveforms.update(waveform_list)
+                else:
+                    self.log.debug('Waveform already sampled: {0}'.format(name_tag))
+                    ensemble_info = self.get_ensemble(name_tag).sampling_information.copy()
+                    del(ensemble_info['pulse_generator_settings'])
+                    generated_ensembles[name_tag] = ensemble_info
+
+                    # Add created waveform names to the set
+                    written_waveforms.update(ensemble_info['waveforms'])
+
+                # Step repetitions advance the rotating frame as well
+                if sequence.rotating_frame and seq_step.repetitions > 0:
+                    offset_bin += seq_step.repetitions * generated_ensembles[name_tag]['number_of_samples']
+
+                # Remember the sequence step together with the name tag of its waveforms
+                sequence_param_dict_list.append((name_tag, seq_step))
+
+            # Write the remaining waveforms sampled in the worker processes
+            failed_ensemble = self._write_pending_ensembles(
+                pending_jobs, generated_ensembles, written_waveforms)
+            if failed_ensemble is not None:
+                self._sequence_sampling_failed(sequence, failed_ensemble)
+                return
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
 
-            # Append written sequence step to sequence_param_dict_list
-            sequence_param_dict_list.append(
-                (tuple(generated_ensembles[name_tag]['waveforms']), seq_step))
+        # Replace the name tags by the written waveform names of each sequence step
+        sequence_param_dict_list = [(tuple(generated_ensembles[name_tag]['waveforms']), seq_step)
+                                    for name_tag, seq_step in sequence_param_dict_list]
 
         # pass the whole information to the sequence creation method:
         steps_written = self.pulsegenerator().write_sequence(sequence.name,
@@ -2062,8 +2754,8 @@ class SequenceGeneratorLogic(GenericLogic):
         self._delete_waveform(wfm_to_delete)
         # Erase sampling information if a PulseBlockEnsemble by the same name can be found in saved
         # ensembles
-        if nametag in self.saved_pulse_block_ensembles:
-            ensemble = self.saved_pulse_block_ensembles[nametag]
+        ensemble = self.saved_pulse_block_ensembles.get(nametag)
+        if ensemble is not None:
             ensemble.sampling_information = dict()
             self.save_ensemble(ensemble)
         return
@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file contains the min/max decimation pyramid used to display long pulsed traces.
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import numpy as np
+
+
+class MinMaxPyramid:
+    """
+    Min/max decimation pyramid of a 1D trace for display purposes.
+
+    Level 0 holds the minimum and maximum of each block of <factor> consecutive bins of the trace,
+    each higher level holds the minimum and maximum of <factor> consecutive blocks of the level
+    below. The top level has at most <min_blocks> blocks.
+    Drawing the minimum and maximum of each block as vertical line preserves all peaks of the
+    trace, so a trace with any number of bins can be displayed with about two points per screen
+    pixel by picking the right level for the displayed range (see get_display_data).
+
+    Updates are incremental: update() compares the new trace with the previous one and only
+    recalculates the blocks containing changed bins on each level.
+    """
+    # Rebuild the pyramid from scratch if more than this fraction of bins or blocks changed
+    _rebuild_fraction = 0.25
+
+    def __init__(self, factor=4, min_blocks=256):
+        """
+        @param int factor: number of bins (blocks) combined into one block of the next level
+        @param int min_blocks: build levels until a level has at most this number of blocks
+        """
+        if factor < 2:
+            raise ValueError('Decimation factor of MinMaxPyramid must be >= 2.')
+        self.factor = int(factor)
+        self.min_blocks = max(1, int(min_blocks))
+        self._trace = None
+        self._levels = list()
+
+    @property
+    def size(self):
+        """
+        Number of bins in the trace.
+        """
+        return 0 if self._trace is None else self._trace.size
+
+    @property
+    def trace(self):
+        """
+        The full resolution trace (read-only view).
+        """
+        if self._trace is None:
+            return np.empty(0)
+        view = self._trace.view()
+        view.flags.writeable = False
+        return view
+
+    @property
+    def number_of_levels(self):
+        return len(self._levels)
+
+    def block_size(self, level):
+        """
+        Number of bins in a block of a level.
+
+        @param int level: pyramid level
+
+        @return int: number of bins per block
+        """
+        return self.factor ** (level + 1)
+
+    def reset(self):
+        """
+        Remove the trace and all levels.
+        """
+        self._trace = None
+        self._levels = list()
+
+    def set_data(self, trace):
+        """
+        Replace the trace and rebuild all levels.
+
+        @param numpy.ndarray trace: 1D trace
+        """
+        trace = np.asarray(trace)
+        if trace.ndim != 1:
+            raise ValueError('MinMaxPyramid expects a 1D trace, got {0:d} dimensions.'
+                             ''.format(trace.ndim))
+        self._trace = trace.copy()
+        self._levels = list()
+        lower_min = lower_max = self._trace
+        while lower_min.size > self.min_blocks:
+            level_min, level_max = self._reduce(lower_min, lower_max, self.factor)
+            self._levels.append((level_min, level_max))
+            lower_min, lower_max = level_min, level_max
+
+    def update(self, trace):
+        """
+        Update the pyramid with a new version of the trace. Only blocks containing bins that
+        changed with respect to the previous trace are recalculated. If the trace size or dtype
+        changed, the pyramid is rebuilt.
+
+        @param numpy.ndarray trace: 1D trace
+
+        @return bool: True if anything changed, False otherwise
+        """
+        trace = np.asarray(trace)
+        if (self._trace is None or trace.shape != self._trace.shape or
+                trace.dtype != self._trace.dtype):
+            self.set_data(trace)
+            return True
+
+        changed = trace != self._trace
+        number_changed = np.count_nonzero(changed)
+        if number_changed == 0:
+            return False
+        if number_changed > self._rebuild_fraction * trace.size:
+            self.set_data(trace)
+            return True
+        changed = np.flatnonzero(changed)
+        self._trace[changed] = trace[changed]
+        blocks = self._unique_sorted(changed // self.factor)
+        if not self._levels or blocks.size > self._rebuild_fraction * self._levels[0][0].size:
+            self.set_data(self._trace)
+            return True
+
+        lower_min = lower_max = self._trace
+        for level_min, level_max in self._levels:
+            block_min, block_max = self._reduce_blocks(lower_min, lower_max, self.factor, blocks)
+            level_min[blocks] = block_min
+            level_max[blocks] = block_max
+            lower_min, lower_max = level_min, level_max
+            blocks = self._unique_sorted(blocks // self.factor)
+        return True
+
+    def get_display_data(self, start=0, stop=None, max_points=2000):
+        """
+        Get the trace in a range of bins decimated to at most max_points points.
+
+        If the range holds less than max_points bins, the bins are returned unchanged. Otherwise
+        the finest level resulting in at most max_points / 2 blocks is used and each block is
+        returned as two points (minimum and maximum) at the block center. If even the top level
+        has more blocks in the range, adjacent blocks are combined further.
+
+        @param int start: first bin of the range
+        @param int stop: bin after the last bin of the range (default: end of trace)
+        @param int max_points: maximum number of points to return, at least 2
+
+        @return (numpy.ndarray, numpy.ndarray): positions in bins (float) and values of the points
+        """
+        if max_points < 2:
+            raise ValueError('MinMaxPyramid needs at least 2 points to display a range, got {0}.'
+                             ''.format(max_points))
+        size = self.size
+        start = min(max(int(start), 0), size)
+        stop = size if stop is None else min(max(int(np.ceil(stop)), start), size)
+        if stop - start <= max_points:
+            return np.arange(start, stop, dtype=float), self._trace[start:stop].copy()
+
+        # Pick the finest level showing the range with at most max_points / 2 blocks
+        max_blocks = int(max_points) // 2
+        data_min = data_max = self._trace
+        block_size = 1
+        first_block, last_block = start, stop
+        for level, (level_min, level_max) in enumerate(self._levels):
+            data_min, data_max = level_min, level_max
+            block_size = self.block_size(level)
+            first_block = start // block_size
+            last_block = -(-stop // block_size)
+            if last_block - first_block <= max_blocks:
+                break
+        data_min = data_min[first_block:last_block]
+        data_max = data_max[first_block:last_block]
+
+        # The top level (or the trace if it is too short for any level) may still hold too many
+        # blocks in the range if max_points < 2 * min_blocks. Combine adjacent blocks in this case.
+        merge = -(-(last_block - first_block) // max_blocks)
+        if merge > 1:
+            data_min, data_max = self._reduce(data_min, data_max, merge)
+
+        block_starts = (first_block + np.arange(data_min.size) * merge) * block_size
+        block_centers = block_starts + (merge * block_size - 1) / 2
+        x_data = np.repeat(np.minimum(block_centers, size - 1), 2)
+        y_data = np.empty(x_data.size, dtype=self._trace.dtype)
+        y_data[0::2] = data_min
+        y_data[1::2] = data_max
+        return x_data, y_data
+
+    @staticmethod
+    def _reduce(data_min, data_max, factor):
+        """
+        Minimum and maximum of all blocks of factor consecutive items. The last block may be
+        shorter.
+        """
+        full_blocks = data_min.size // factor
+        number_of_blocks = -(-data_min.size // factor)
+        block_min = np.empty(number_of_blocks, dtype=data_min.dtype)
+        block_max = np.empty(number_of_blocks, dtype=data_max.dtype)
+        # Strided element-wise reduction is much faster than reducing a (-1, factor) shaped view
+        # along its short last axis
+        end = full_blocks * factor
+        block_min[:full_blocks] = data_min[0:end:factor]
+        block_max[:full_blocks] = data_max[0:end:factor]
+        for offset in range(1, factor):
+            np.minimum(block_min[:full_blocks], data_min[offset:end:factor],
+                       out=block_min[:full_blocks])
+            np.maximum(block_max[:full_blocks], data_max[offset:end:factor],
+                       out=block_max[:full_blocks])
+        if number_of_blocks > full_blocks:
+            block_min[-1] = data_min[full_blocks * factor:].min()
+            block_max[-1] = data_max[full_blocks * factor:].max()
+        return block_min, block_max
+
+    @staticmethod
+    def _reduce_blocks(data_min, data_max, factor, blocks):
+        """
+        Minimum and maximum of selected blocks of factor consecutive items.
+        """
+        # Indices beyond the end of the data (shorter last block) are clipped to the last item,
+        # which does not change minimum and maximum of the block.
+        indices = blocks[:, np.newaxis] * factor + np.arange(factor)
+        np.minimum(indices, data_min.size - 1, out=indices)
+        return data_min[indices].min(axis=1), data_max[indices].max(axis=1)
+
+    @staticmethod
+    def _unique_sorted(indices):
+        """
+        Unique values of a sorted integer array.
+        """
+        if indices.size < 2:
+            return indices
+        return indices[np.concatenate(([True], indices[1:] != indices[:-1]))]
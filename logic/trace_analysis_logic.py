@@ -24,7 +24,10 @@ from scipy.interpolate import InterpolatedUnivariateSpline
 from collections import OrderedDict
 
 from core.connector import Connector
+from core.util.histogram import IncrementalHistogram
 from logic.generic_logic import GenericLogic
+from logic.flip_statistics import DwellTimeStatistics, FlipStatistics, run_lengths
+from logic.flip_statistics import threshold_pair_counts, initialization_pair_counts
 
 
 class TraceAnalysisLogic(GenericLogic):
@@ -56,6 +59,9 @@ class TraceAnalysisLogic(GenericLogic):
         self.spin_flip_prob = 0
         self.fidelity_left = 0
         self.fidelity_right = 0
+        self.flip_statistics = FlipStatistics()
+        self.dwell_time_statistics = DwellTimeStatistics(threshold=1)
+        self.reset_histogram()
 
     def on_activate(self):
         """ Initialisation performed during activation of the module.
@@ -89,6 +95,9 @@ class TraceAnalysisLogic(GenericLogic):
 
     def do_calculate_histogram(self, mode='normal'):
         """ Passes all the needed parameters to the appropriated methods.
+        @param str mode: 'normal' (histogram of the counter trace), 'fastcomtec' or
+                         'incremental' (histogram of the samples passed to update_histogram,
+                         without recalculating it from the trace)
         @return:
         """
         if mode == 'normal':
@@ -96,6 +105,12 @@ class TraceAnalysisLogic(GenericLogic):
                                                       self._hist_num_bins)
         if mode == 'fastcomtec':
             self.sigHistogramUpdated.emit()
+        if mode == 'incremental':
+            hist_data = self._get_filled_incremental_histogram(self._hist_num_bins)
+            if hist_data is None:
+                return
+            self.hist_data = hist_data
+            self.sigHistogramUpdated.emit()
 
     def calculate_histogram(self, trace, num_bins=None, custom_bin_arr=None):
         """ Calculate the histogram of a given trace.
@@ -146,6 +161,66 @@ class TraceAnalysisLogic(GenericLogic):
 
         return self.hist_data
 
+    def reset_histogram(self, bin_width=1, origin=-0.5, number_of_bins=4096):
+        """ Start a new incremental histogram of a trace, see update_histogram.
+
+        @param float bin_width: fixed width of the bins. The default bins are centered on integer
+                                count values.
+        @param float origin: lower edge of the first bin
+        @param int number_of_bins: number of bins. Values outside of the range
+                                   origin + [0, number_of_bins] * bin_width double the bin width.
+
+        @return IncrementalHistogram: the (empty) histogram
+        """
+        self.trace_histogram = IncrementalHistogram(number_of_bins=number_of_bins,
+                                                    origin=origin,
+                                                    bin_width=bin_width)
+        return self.trace_histogram
+
+    def update_histogram(self, new_samples=None, removed_samples=None):
+        """ Update the incremental histogram with the samples added to a trace since the last
+        update (and the samples dropped from a trace of fixed length). Only these samples are
+        binned, the rest of the trace is not touched again.
+
+        @param np.array new_samples: optional, 1D array of the new samples
+        @param np.array removed_samples: optional, 1D array of samples added before that are no
+                                         longer part of the trace
+        """
+        if removed_samples is not None:
+            self.trace_histogram.remove(removed_samples)
+        if new_samples is not None:
+            self.trace_histogram.add(new_samples)
+
+    def get_incremental_histogram(self, num_bins=None):
+        """ Histogram data of the incremental histogram, in the format of calculate_histogram.
+
+        @param int num_bins: optional, maximum number of bins. Neighbouring bins of the
+                             incremental histogram are merged to get at most num_bins bins
+                             between the minimal and maximal value. By default the bins of the
+                             incremental histogram are used.
+
+        @return: np.array: a 2D array, where first entry are the x_values (bin edges) and second
+                           entry are the count values.
+        """
+        hist_x_val, hist_y_val = self.trace_histogram.rebin(num_bins)
+        # one more bin edge than bins, like the histogram data of calculate_histogram
+        return np.array([hist_x_val, hist_y_val], dtype=object)
+
+    def _get_filled_incremental_histogram(self, num_bins=None):
+        """ Histogram data of the incremental histogram or None (with an error logged) if the
+        incremental histogram does not contain any samples (e.g. after reset_histogram).
+
+        @param int num_bins: optional, maximum number of bins (see get_incremental_histogram)
+
+        @return: np.array: histogram data like get_incremental_histogram or None
+        """
+        hist_data = self.get_incremental_histogram(num_bins)
+        if len(hist_data[1]) == 0 or hist_data[1].sum() == 0:
+            self.log.error('The incremental histogram is empty. Add samples with '
+                           'update_histogram first.')
+            return None
+        return hist_data
+
     def analyze_flip_prob(self, trace, num_bins=None, threshold=None):
         """General method, which analysis how often a value was changed from
            one data point to another in relation to a certain threshold.
@@ -232,36 +307,22 @@ class TraceAnalysisLogic(GenericLogic):
                       float lifetime_dark: the lifetime in the dark state in s
                       float lifetime_bright: lifetime in the bright state in s
         """
-        no_flip = 0.0
+        start_high, start_low, stay_high, stay_low = threshold_pair_counts(trace, threshold)
 
         if analyze_mode == 'full':
-            for ii in range(len(trace) - 1):
-                if trace[ii] > threshold and trace[ii + 1] > threshold:
-                    no_flip = no_flip + 1
-
-                elif trace[ii] < threshold and trace[ii + 1] < threshold:
-                    no_flip = no_flip + 1
-
+            no_flip = float(stay_high + stay_low)
             probability = 1.0 - (no_flip / len(trace))
             lost_events = 0.0
 
         if analyze_mode == 'dark':
-            dark_counter = 0.0
-            for ii in range(len(trace) - 1):
-                if trace[ii] < threshold:
-                    dark_counter = dark_counter + 1
-                    if trace[ii + 1] < threshold:
-                        no_flip = no_flip + 1
+            dark_counter = float(start_low)
+            no_flip = float(stay_low)
             probability = 1.0 - (no_flip / dark_counter)
             lost_events = (1.0 - (dark_counter / len(trace))) * 100
 
         if analyze_mode == 'bright':
-            bright_counter = 0.0
-            for ii in range(len(trace) - 1):
-                if trace[ii] > threshold:
-                    bright_counter = bright_counter + 1
-                    if trace[ii + 1] > threshold:
-                        no_flip = no_flip + 1
+            bright_counter = float(start_high)
+            no_flip = float(stay_high)
             probability = 1.0 - (no_flip / bright_counter)
             lost_events = (1.0 - (bright_counter / len(trace))) * 100
 
@@ -287,32 +348,21 @@ class TraceAnalysisLogic(GenericLogic):
         no_flip = 0.0
         flip = 0.0
 
-        # find all indices in the trace-array, where the value is above init_threshold[1]
-        init_high = np.where(trace[:-1] > init_threshold[1])[0]
-        # find all indices in the trace-array, where the value is below init_threshold[0]
-        init_low = np.where(trace[:-1] < init_threshold[0])[0]
-        # find all indices in the trace-array, where the value is above ana_threshold[1]
-        ana_high = np.where(trace > ana_threshold[1])[0]
-        # find all indices in the trace-array, where the value is below ana_threshold[0]
-        ana_low = np.where(trace < ana_threshold[0])[0]
+        # count the transitions from the initialization point (high: above init_threshold[1],
+        # low: below init_threshold[0]) to the following analysis point (high: above
+        # ana_threshold[1], low: below ana_threshold[0])
+        high_to_high, high_to_low, low_to_high, low_to_low = initialization_pair_counts(
+            trace, init_threshold, ana_threshold)
 
         if analyze_mode == 'bright' or analyze_mode == 'full':
             # analyze the trace where the data were the nuclear was initalized into one direction
-            for index in init_high:
-                # check if the following data point is in the analysis array
-                if index + 1 in ana_high:
-                    no_flip = no_flip + 1
-                elif index + 1 in ana_low:
-                    flip = flip + 1
+            no_flip = no_flip + high_to_high
+            flip = flip + high_to_low
 
         if analyze_mode == 'dark' or analyze_mode == 'full':
             # repeat the same if the nucleus was initalized into the other array
-            for index in init_low:
-                # check if the following data point is in the analysis array
-                if index + 1 in ana_high:
-                    flip = flip + 1
-                elif index + 1 in ana_low:
-                    no_flip = no_flip + 1
+            flip = flip + low_to_high
+            no_flip = no_flip + low_to_low
 
         # the flip probability is given by the number of flips divided by the total number of analyzed data points
         if (flip + no_flip) == 0:
@@ -368,31 +418,20 @@ class TraceAnalysisLogic(GenericLogic):
         # calculate the flip probability
         no_flip = 0.0
         flip = 0.0
-        # find all indices in the trace-array, where the value is above init_threshold[1]
-        init_high = np.where(trace[:-1] > init_threshold[1])[0]
-        # find all indices in the trace-array, where the value is below init_threshold[0]
-        init_low = np.where(trace[:-1] < init_threshold[0])[0]
-        # find all indices in the trace-array, where the value is above ana_threshold[1]
-        ana_high = np.where(trace > ana_threshold[1])[0]
-        # find all indices in the trace-array, where the value is below ana_threshold[0]
-        ana_low = np.where(trace < ana_threshold[0])[0]
+        # count the transitions from the initialization point (high: above init_threshold[1],
+        # low: below init_threshold[0]) to the following analysis point (high: above
+        # ana_threshold[1], low: below ana_threshold[0])
+        high_to_high, high_to_low, low_to_high, low_to_low = initialization_pair_counts(
+            trace, init_threshold, ana_threshold)
 
         if analyze_mode == 'bright' or analyze_mode == 'full':
             # analyze the trace where the data were the nuclear was initalized into one direction
-            for index in init_high:
-                # check if the following data point is in the analysis array
-                if index + 1 in ana_high:
-                    no_flip = no_flip + 1
-                elif index + 1 in ana_low:
-                    flip = flip + 1
+            no_flip = no_flip + high_to_high
+            flip = flip + high_to_low
         if analyze_mode == 'dark' or analyze_mode == 'full':
             # repeat the same if the nucleus was initalized into the other array
-            for index in init_low:
-                # check if the following data point is in the analysis array
-                if index + 1 in ana_high:
-                    flip = flip + 1
-                elif index + 1 in ana_low:
-                    no_flip = no_flip + 1
+            flip = flip + low_to_high
+            no_flip = no_flip + low_to_low
 
         # the flip probability is given by the number of flips divided by the total number of analyzed data points
         if (flip + no_flip) == 0:
@@ -411,6 +450,40 @@ class TraceAnalysisLogic(GenericLogic):
 
         return self.spin_flip_prob, lost_events, hist_fit_x, hist_fit_y, fit_result
 
+    def reset_flip_statistics(self, threshold=1, init_threshold=None, ana_threshold=None):
+        """ Start a new streaming flip probability analysis, see update_flip_statistics.
+
+        @param float threshold: threshold of the single threshold analysis (see
+                                analyze_flip_prob2)
+        @param list init_threshold: [low, high] thresholds of the initialization point (see
+                                    analyze_flip_prob3)
+        @param list ana_threshold: [low, high] thresholds of the analysis point
+
+        @return FlipStatistics: the (empty) statistics
+        """
+        self.flip_statistics = FlipStatistics(threshold=threshold,
+                                              init_threshold=init_threshold,
+                                              ana_threshold=ana_threshold)
+        return self.flip_statistics
+
+    def update_flip_statistics(self, trace_chunk, analyze_mode='full'):
+        """ Add the next chunk of a single shot readout trace to the streaming flip probability
+        analysis. Only the new data is analyzed, the results equal those of analyze_flip_prob3
+        for the whole trace added since reset_flip_statistics.
+
+        @param np.array trace_chunk: 1D data following the data added before
+        @param str analyze_mode: 'full', 'dark' or 'bright'
+
+        @return tuple(float, float): flip probability (NaN if nothing could be analyzed yet) and
+                                     number of lost events
+        """
+        self.flip_statistics.update(trace_chunk)
+        probability, lost_events = self.flip_statistics.flip_probability_init(analyze_mode)
+        if not np.isnan(probability):
+            self.spin_flip_prob = probability
+        self.sigAnalysisResultsUpdated.emit()
+        return probability, lost_events
+
     def analyze_flip_prob_postselect(self):
         """ Post select the data trace so that the flip probability is only
             calculated from a jump from below a threshold value to an value
@@ -506,50 +579,10 @@ class TraceAnalysisLogic(GenericLogic):
                                                                                distr='gaussian_normalized')
                 threshold = threshold_fit
 
-            # helper functions to get and analyze the timetrace
-            def analog_digitial_converter(cut_off, data):
-                new_digital_trace = []
-                for data_point in data:
-                    if data_point >= cut_off:
-                        new_digital_trace.append(1)
-                    else:
-                        new_digital_trace.append(0)
-                return new_digital_trace
-
-            def time_in_high_low(raw_digital_trace, local_dt):
-                """
-                What I need this function to do is to get all consecutive {1, ... , n} 1s or 0s and add
-                them up and put into a list to later make a histogram from them.
-                """
-                occurances = []
-                index = 0
-                index2 = 0
-
-                while index < len(raw_digital_trace):
-                    occurances.append(0)
-                    # start following the consecutive 1s
-                    while raw_digital_trace[index] == 1:
-                        occurances[index2] += 1
-                        if index == (len(raw_digital_trace) - 1):
-                            occurances = np.array(occurances)
-                            return occurances * local_dt
-                        else:
-                            index += 1
-                    if raw_digital_trace[index - 1] == 1:
-                        index2 += 1
-                        occurances.append(0)
-                    # start following the consecutive 0s
-                    while raw_digital_trace[index] == 0:
-                        occurances[index2] -= 1
-                        if index == (len(raw_digital_trace) - 1):
-                            occurances = np.array(occurances)
-                            return occurances * local_dt
-                        else:
-                            index += 1
-                    index2 += 1
-
-            digital_trace = analog_digitial_converter(threshold, trace)
-            time_array = time_in_high_low(digital_trace, dt)
+            # signed dwell times in trace order from the run lengths of the digitized trace:
+            # positive for runs in the high state (>= threshold), negative for the low state
+            run_length, run_state = run_lengths(np.asarray(trace) >= threshold)
+            time_array = np.where(run_state, run_length, -run_length) * dt
 
             # now we need to make a histogram as well as a fit
             # what would be a good estimate for the number of bins
@@ -558,15 +591,12 @@ class TraceAnalysisLogic(GenericLogic):
             # number of steps in between, rather not use that for now
             # est_bins = np.int(longest/dt)
 
-            time_array_high = np.array([ii for ii in filter(lambda x: x > 0, time_array)])
-            time_array_low = np.array([ii for ii in filter(lambda x: x < 0, time_array)])
+            time_array_high = time_array[time_array > 0]
+            time_array_low = time_array[time_array < 0]
 
             # get lifetime of bright state
             time_hist_high = np.histogram(time_array_high, bins=num_bins)
-            vals = [i for i in filter(lambda x: x[1] > 0, enumerate(time_hist_high[0][0:num_bins]))]
-
-            indices = np.array([val[0] for val in vals])
-            indices = np.array([np.int(indice) for indice in indices])
+            indices = np.flatnonzero(time_hist_high[0][0:num_bins] > 0)
             self.log.debug('threshold {0}'.format(threshold))
             self.log.debug('time_array:{0}'.format(time_array))
             self.log.debug('time_array_high:{0}'.format(time_array_high))
@@ -588,10 +618,8 @@ class TraceAnalysisLogic(GenericLogic):
 
             # get lifetime of dark state
             time_hist_low = np.histogram(time_array_low, bins=num_bins)
-            vals = [i for i in filter(lambda x: x[1] > 0, enumerate(time_hist_low[0][0:num_bins]))]
-            indices = np.array([val[0] for val in vals])
-            indices = np.array([np.int(indice) for indice in indices])
-            values = np.array([val[1] for val in vals])
+            indices = np.flatnonzero(time_hist_low[0][0:num_bins] > 0)
+            values = time_hist_low[0][indices]
             # positive axis
             mirror_axis = -time_hist_low[1][indices]
             result = self._fit_logic.make_decayexponential_fit(mirror_axis,
@@ -608,6 +636,45 @@ class TraceAnalysisLogic(GenericLogic):
 
         return lifetime_dict
 
+    def calculate_dwell_time_histograms(self, trace, threshold, dt):
+        """ Dwell time histograms of the bright and dark state of a 1D time trace, calculated
+        from the run lengths of the digitized trace in one pass.
+
+        @param np.array trace: 1D time trace
+        @param float threshold: values >= threshold are in the bright state, all others dark
+        @param float dt: time between two data points of the trace
+
+        @return tuple(np.array, np.array, np.array): dwell times (multiples of dt) and the number
+                                                     of bright and dark runs with each dwell time
+        """
+        statistics = DwellTimeStatistics(threshold=threshold, dt=dt)
+        statistics.update(trace)
+        return statistics.histograms()
+
+    def reset_dwell_time_statistics(self, threshold, dt):
+        """ Start a new streaming dwell time analysis, see update_dwell_time_statistics.
+
+        @param float threshold: values >= threshold are in the bright state, all others dark
+        @param float dt: time between two data points of the trace
+
+        @return DwellTimeStatistics: the (empty) statistics
+        """
+        self.dwell_time_statistics = DwellTimeStatistics(threshold=threshold, dt=dt)
+        return self.dwell_time_statistics
+
+    def update_dwell_time_statistics(self, trace_chunk):
+        """ Add the next chunk of a time trace to the streaming dwell time analysis. Only the new
+        data is analyzed, the histograms equal those of calculate_dwell_time_histograms for the
+        whole trace added since reset_dwell_time_statistics.
+
+        @param np.array trace_chunk: 1D data following the data added before
+
+        @return tuple(np.array, np.array, np.array): dwell times (multiples of dt) and the number
+                                                     of bright and dark runs with each dwell time
+        """
+        self.dwell_time_statistics.update(trace_chunk)
+        return self.dwell_time_statistics.histograms()
+
     def do_gaussian_fit(self, axis, data):
         """ Perform a gaussian fit.
         @param axis:
@@ -833,17 +900,23 @@ class TraceAnalysisLogic(GenericLogic):
                                        all the data which are 10% or less in
                                        amptitude compared to the maximal value
                                        are neglected.
+        If neither hist_val nor trace are passed, the incremental histogram
+        (see update_histogram) is used.
         The guess procedure tries to find all values, which are
         max_ratio_value * maximum value of the histogram of the trace and
         selects those by indices. Then taking the first an the last might and
         assuming that the threshold is in the middle, gives a first estimate
         of the threshold value.
         FIXME: That guessing procedure can be improved!
-        @return float: a guessed threshold
+        @return float: a guessed threshold, None if the incremental histogram is empty
         """
 
         if hist_val is None and trace is not None:
             hist_val = self.calculate_histogram(trace)
+        elif hist_val is None:
+            hist_val = self._get_filled_incremental_histogram()
+            if hist_val is None:
+                return None
 
         hist_val = np.array(hist_val)  # just to be sure to have a np.array
         indices_arr = np.where(hist_val[1] > hist_val[1].max() * max_ratio_value)[0]
@@ -854,7 +927,8 @@ class TraceAnalysisLogic(GenericLogic):
     def calculate_threshold(self, hist_data=None, distr='poissonian'):
         """ Calculate the threshold by minimizing its overlap with the poissonian fits.
         @param np.array hist_data: 2D array which represent the x and y values
-                                   of a histogram of a trace.
+                                   of a histogram of a trace. If None is passed, the
+                                   incremental histogram (see update_histogram) is used.
                string distr: tells the function on what distribution it should calculate
                              the threshold ( Added because it might happen that one normalizes data
                              between (-1,1) and then a poissonian distribution won't work anymore.
@@ -863,10 +937,15 @@ class TraceAnalysisLogic(GenericLogic):
                                poissonian distributed peaks.
                     fidelity: the measure how good the two peaks are resolved
                               according to the calculated threshold
+                    None if hist_data is not passed and the incremental histogram is empty.
         The calculation of the threshold relies on fitting two poissonian
         distributions to the count histogram and minimize a threshold with
         respect to the overlap area:
         """
+        if hist_data is None:
+            hist_data = self._get_filled_incremental_histogram(self._hist_num_bins)
+            if hist_data is None:
+                return None
         # in any case calculate the hist data
         x_axis = hist_data[0][:-1] + (hist_data[0][1] - hist_data[0][0]) / 2.
         y_data = hist_data[1]
@@ -20,8 +20,10 @@ Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
 top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
 """
 
+import numpy as np
 from pyqtgraph import PlotWidget, ImageItem, ViewBox, InfiniteLine, ROI
-from qtpy import QtCore
+from pyqtgraph import functions as fn
+from qtpy import QtCore, QtGui
 from core.util.filters import scan_blink_correction
 
 __all__ = ['ScanImageItem', 'ScanPlotWidget', 'ScanViewBox']
@@ -87,6 +89,65 @@ class ScanImageItem(ImageItem):
             image = scan_blink_correction(image=image, axis=self.blink_correction_axis)
         return super().setImage(image=image, autoLevels=autoLevels, **kwargs)
 
+    def update_image_rows(self, image, rows, levels=None):
+        """
+        Redraw only some rows of the image, e.g. the lines just scanned.
+
+        The image must be the same array (or a view of the same memory) as displayed before, with
+        only the given rows changed in-place. Only these rows are converted to colours and painted
+        into the cached QImage instead of re-rendering the whole image.
+        If this is not possible (different array, shape or levels, blink correction active,
+        row-major order not used, downsampling, ...) the whole image is set via setImage.
+
+        @param numpy.ndarray image: 2D image array
+        @param tuple rows: (first row, row after the last row) to redraw. None redraws the whole
+                           image.
+        @param tuple levels: (min, max) colour levels. None keeps the current levels.
+        """
+        if rows is None or not self._can_update_rows(image, levels):
+            if levels is None:
+                self.setImage(image=image, autoLevels=False)
+            else:
+                self.setImage(image=image, levels=levels)
+            return
+        start, stop = max(int(rows[0]), 0), min(int(rows[1]), image.shape[0])
+        if start >= stop:
+            return
+
+        argb, alpha = fn.makeARGB(self.image[start:stop], lut=self.lut, levels=self.levels)
+        rows_qimage = fn.makeQImage(argb, alpha, transpose=False)
+        painter = QtGui.QPainter(self.qimage)
+        try:
+            painter.setCompositionMode(QtGui.QPainter.CompositionMode_Source)
+            painter.drawImage(0, start, rows_qimage)
+        finally:
+            painter.end()
+        self.update()
+
+    def _can_update_rows(self, image, levels):
+        """
+        Check if the rendered QImage can be updated row-wise for the image array passed to
+        update_image_rows.
+        """
+        if self.image is None or self.qimage is None or image is None:
+            return False
+        if self.use_blink_correction or self.autoDownsample or self.axisOrder != 'row-major':
+            return False
+        if image.ndim != 2 or image.dtype.kind != 'f' or callable(self.lut):
+            return False
+        # setImage stores a view of the image, so in-place changes are visible through self.image
+        # as long as both refer to the same memory.
+        if (image.shape != self.image.shape or image.dtype != self.image.dtype or
+                image.strides != self.image.strides or
+                image.__array_interface__['data'][0] !=
+                self.image.__array_interface__['data'][0]):
+            return False
+        if levels is not None:
+            if self.levels is None or not np.array_equal(np.asarray(levels, dtype=float),
+                                                         np.asarray(self.levels, dtype=float)):
+                return False
+        return True
+
     def mouseClickEvent(self, ev):
         if not ev.double():
             pos = self.getViewBox().mapSceneToView(ev.scenePos())
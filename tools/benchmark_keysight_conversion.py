@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+Time and memory benchmark of the sample conversion of the Keysight M819x AWG drivers (see
+_convert_samples_into in hardware/awg/keysight_m819x.py).
+
+Converts a sine waveform with two markers into the binary format of the M8190A (14 bit, analog
+shifted by 2 bits, markers in bit 0 and 1) and of the interleaved M8195A format (8 bit, analog and
+marker bytes alternating). The former conversion (scipy interp1d mapper, astype and addition of the
+marker samples) is compared with the current one. The current conversion rounds to nearest instead
+of truncating towards zero, so analog values may differ by one DAC LSB; the markers have to be
+identical. Run from the qudi main directory, e.g.:
+
+    python -m tools.benchmark_keysight_conversion --samples 20e6
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import sys
+import time
+import tempfile
+import argparse
+import tracemalloc
+import numpy as np
+import scipy.interpolate
+
+from hardware.awg.keysight_m819x import AWGM8190A, AWGM8195A
+
+
+class BenchmarkM8195A(AWGM8195A):
+    """
+    M8195A driver in marker mode without a connected device.
+    """
+    awg_mode = 'MARK'
+
+
+def old_float_to_int(val, n_bits):
+    """
+    Former AWGM819X._float_to_int (without the range warning).
+    """
+    bitsize = int(2 ** n_bits)
+    min_intval = -bitsize / 2
+    max_intval = bitsize / 2 - 1
+
+    max_u_samples = 1
+    if max(abs(val)) > 1:
+        max_u_samples = max([abs(np.min(val)), np.max(val)])
+    mapper = scipy.interpolate.interp1d([-max_u_samples, max_u_samples], [min_intval, max_intval])
+    return mapper(val)
+
+
+def old_bool_to_sample(val_dch_1, val_dch_2, int_type_str='int16'):
+    """
+    Former AWGM819X.bool_to_sample.
+    """
+    bit_dch_1 = 0x1 & np.asarray(val_dch_1).astype(int_type_str)
+    bit_dch_2 = 0x2 & (np.asarray(val_dch_2).astype(int_type_str) << 1)
+    return bit_dch_1 + bit_dch_2
+
+
+def old_m8190a(analog_samples, digital_samples, dac_resolution):
+    """
+    Former AWGM8190A._compile_bin_samples of channel a_ch1 with markers.
+    """
+    shiftbits = 16 - dac_resolution
+    a_samples = old_float_to_int(analog_samples['a_ch1'], dac_resolution).astype('int16') << shiftbits
+    d_samples = old_bool_to_sample(digital_samples['d_ch1'], digital_samples['d_ch3'], 'int16')
+    return a_samples + d_samples
+
+
+def old_m8195a(analog_samples, digital_samples):
+    """
+    Former AWGM8195A._compile_bin_samples of channel a_ch1 in the interleaved format.
+    """
+    a_samples = old_float_to_int(analog_samples['a_ch1'], 8).astype('int8')
+    d_samples = old_bool_to_sample(digital_samples['d_ch1'], digital_samples['d_ch2'], 'int8')
+    comb_samples = np.zeros(2 * a_samples.size, dtype=np.int8)
+    comb_samples[::2] = a_samples
+    comb_samples[1::2] = d_samples
+    return comb_samples
+
+
+def measure(method, *args):
+    """
+    Call method(*args) and measure time and peak memory allocated during the call.
+
+    @return tuple: (result, time needed in s, peak memory in bytes)
+    """
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        result = method(*args)
+        duration = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, duration, peak
+
+
+def compare(old, new, analog, shift_bits=0):
+    """
+    Compare the analog values (in DAC LSB) and the marker bits of the old and new conversion.
+
+    @return tuple: (number of analog values differing, maximum difference in LSB, markers equal)
+    """
+    old = old.astype('int32')
+    new = new.astype('int32')
+    if shift_bits:
+        old_analog, new_analog = old[analog] >> shift_bits, new[analog] >> shift_bits
+        old_markers, new_markers = old[analog] & 0x3, new[analog] & 0x3
+    else:
+        old_analog, new_analog = old[analog], new[analog]
+        old_markers, new_markers = old[~analog], new[~analog]
+    difference = np.abs(new_analog - old_analog)
+    return (np.count_nonzero(difference),
+            int(difference.max()) if difference.size else 0,
+            np.array_equal(old_markers, new_markers))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the sample conversion of the Keysight '
+                                                 'M819x drivers against the former conversion.')
+    parser.add_argument('--samples', type=float, default=20e6,
+                        help='number of samples per channel (default: 20e6)')
+    parser.add_argument('--dac-resolution', type=int, default=14,
+                        help='DAC resolution of the M8190A in bits (default: 14)')
+    args = parser.parse_args()
+
+    number_of_samples = int(args.samples)
+    times = np.arange(number_of_samples, dtype='float64')
+    analog_samples = {'a_ch1': (0.9 * np.sin(2 * np.pi * times / 97.3)).astype('float32')}
+    digital_samples = {chnl: (np.arange(number_of_samples) // (50 * (num + 1))) % 2 == 0
+                       for num, chnl in enumerate(('d_ch1', 'd_ch2', 'd_ch3', 'd_ch4'))}
+    del times
+
+    # the drivers are not activated, i.e. they do not connect to a device
+    config = {'awg_visa_address': '',
+              'awg_timeout': 20,
+              'sample_rate_div': 1,
+              'pulsed_file_dir': tempfile.gettempdir(),
+              'assets_storage_path': tempfile.gettempdir()}
+    m8190a = AWGM8190A(manager=None, name='m8190a',
+                       config=dict(config, dac_resolution_bits=args.dac_resolution))
+    m8195a = BenchmarkM8195A(manager=None, name='m8195a', config=dict(config, awg_mode='MARK'))
+
+    passed = True
+    print('{0:>18s} {1:>8s} {2:>10s} {3:>10s} {4:>12s} {5:>8s} {6:>8s}'.format(
+        'format', 'method', 'time (s)', 'peak MB', 'values +-1', 'max LSB', 'markers'))
+    cases = (
+        ('M8190A {0:d} bit'.format(args.dac_resolution),
+         lambda: old_m8190a(analog_samples, digital_samples, args.dac_resolution),
+         lambda: m8190a._compile_bin_samples(analog_samples, digital_samples, 'a_ch1'),
+         np.ones(number_of_samples, dtype=bool),
+         16 - args.dac_resolution),
+        ('M8195A interleaved',
+         lambda: old_m8195a(analog_samples, digital_samples),
+         lambda: m8195a._compile_bin_samples(analog_samples, digital_samples, 'a_ch1'),
+         np.arange(2 * number_of_samples) % 2 == 0,
+         0),
+    )
+    for name, old_method, new_method, analog, shift_bits in cases:
+        old, duration, peak = measure(old_method)
+        print('{0:>18s} {1:>8s} {2:>10.2f} {3:>10.1f}'.format(name, 'old', duration, peak / 1e6))
+        new, duration, peak = measure(new_method)
+        differing, max_lsb, markers_equal = compare(old, new, analog, shift_bits)
+        print('{0:>18s} {1:>8s} {2:>10.2f} {3:>10.1f} {4:>12d} {5:>8d} {6:>8s}'.format(
+            '', 'new', duration, peak / 1e6, differing, max_lsb,
+            'equal' if markers_equal else 'DIFFER'))
+        passed &= max_lsb <= 1 and markers_equal
+        del old, new
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == '__main__':
+    main()
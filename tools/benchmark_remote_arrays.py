@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+Throughput benchmark of the NumPy array transfer between qudi instances (see netobtain in
+core/util/network.py).
+
+Serves an array with the remote module service on localhost and copies it to the client with
+pickle (rpyc.classic.obtain) and with each array transport of netobtain: shared memory, raw buffer
+socket and raw bytes through rpyc. Afterwards it checks that shared memory segments of a client
+that disconnects without releasing them are freed. Run from the qudi main directory, e.g.:
+
+    python -m tools.benchmark_remote_arrays --size 320e6
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import sys
+import time
+import types
+import argparse
+import threading
+import numpy as np
+import rpyc
+import rpyc.utils.classic
+from rpyc.utils.server import ThreadedServer
+
+from core.remote import RemoteObjectManager
+from core.util import network
+
+
+# the pickle transfer of large arrays takes longer than the default timeout of rpyc requests
+CLIENT_CONFIG = {'allow_all_attrs': True, 'sync_request_timeout': None}
+
+
+class ArrayHost:
+    """
+    Shared module holding the array to transfer.
+    """
+    def __init__(self, array):
+        self.data = array
+
+
+def start_server(array):
+    """
+    Serve the array as shared module 'arrays' with the remote module service on localhost.
+
+    @return ThreadedServer: the running server
+    """
+    remote_manager = RemoteObjectManager(types.SimpleNamespace(tm=None))
+    remote_manager.shareModule('arrays', ArrayHost(array))
+    server = ThreadedServer(remote_manager.makeRemoteService(),
+                            hostname='localhost',
+                            port=0,
+                            protocol_config={'allow_all_attrs': True})
+    threading.Thread(target=server.start, name='benchmark-server', daemon=True).start()
+    return server
+
+
+def transfer(port, transport):
+    """
+    Copy the served array to this process with the given transport.
+
+    @param int port: port of the server
+    @param str transport: 'pickle', 'shm', 'socket' or 'bytes'
+
+    @return tuple: (local array, time needed in s)
+    """
+    conn = rpyc.connect('localhost', port, config=CLIENT_CONFIG)
+    shared_memory = network.shared_memory
+    get_plain_socket_peer = network._get_plain_socket_peer
+    try:
+        remote_array = conn.root.getModule('arrays').data
+        if transport in ('socket', 'bytes'):
+            # as for Python < 3.8 (no shared memory)
+            network.shared_memory = None
+        if transport == 'bytes':
+            # as for SSL connections (no separate socket)
+            network._get_plain_socket_peer = lambda connection: None
+        start = time.perf_counter()
+        if transport == 'pickle':
+            array = rpyc.utils.classic.obtain(remote_array)
+        else:
+            array = network.netobtain(remote_array)
+        return array, time.perf_counter() - start
+    finally:
+        network.shared_memory = shared_memory
+        network._get_plain_socket_peer = get_plain_socket_peer
+        conn.close()
+
+
+def check_release_on_disconnect(port):
+    """
+    Let a client request a shared memory segment and disconnect without releasing it.
+
+    @return bool: True if the server freed the segment
+    """
+    if network.shared_memory is None:
+        return True
+    conn = rpyc.connect('localhost', port, config=CLIENT_CONFIG)
+    remote_array = conn.root.getModule('arrays').data
+    descriptor = conn.root.share_array(remote_array, network.socket.gethostname(), False)
+    name = descriptor[3]
+    leaked = name in network._shared_arrays
+    conn.close()
+    # the server handles the disconnect in its own thread
+    deadline = time.monotonic() + 5
+    while name in network._shared_arrays and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return leaked and name not in network._shared_arrays
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the transfer of NumPy arrays '
+                                                 'between qudi instances.')
+    parser.add_argument('--size', type=float, default=320e6,
+                        help='size of the array in bytes (default: 320e6)')
+    parser.add_argument('--transports', nargs='+', default=['pickle', 'shm', 'socket', 'bytes'],
+                        help='transports to benchmark')
+    args = parser.parse_args()
+
+    array = np.random.random_sample(int(args.size) // 8)
+    server = start_server(array)
+    passed = True
+    try:
+        print('{0:>8s} {1:>10s} {2:>10s} {3:>10s}'.format('transport', 'MB', 'time (s)', 'MB/s'))
+        for transport in args.transports:
+            local_array, duration = transfer(server.port, transport)
+            if not np.array_equal(local_array, array):
+                print('{0:>8s} transferred array differs'.format(transport))
+                passed = False
+                continue
+            print('{0:>8s} {1:>10.1f} {2:>10.2f} {3:>10.1f}'.format(
+                transport, array.nbytes / 1e6, duration, array.nbytes / 1e6 / duration))
+            del local_array
+        released = check_release_on_disconnect(server.port)
+        print('shared memory released on disconnect: {0}'.format('yes' if released else 'NO'))
+        passed &= released
+        passed &= not network._shared_arrays
+    finally:
+        server.close()
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+Throughput benchmark of the sample file formats in tools/samples_write_methods.py.
+
+Writes a waveform (by default 2 GS) chunkwise in each file format and prints the write throughput.
+Run from the qudi main directory, e.g.:
+
+    python -m tools.benchmark_sample_files --samples 2e9 --chunk 1e8 --dir /path/to/fast/disk
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import os
+import time
+import logging
+import argparse
+import tempfile
+import numpy as np
+
+from tools.samples_write_methods import SamplesWriteMethods
+
+
+class BenchmarkWriter(SamplesWriteMethods):
+    """
+    Minimal host of the sample write methods writing into a single directory.
+    """
+    def __init__(self, directory, sample_rate, use_mmap=False, checksum=False):
+        super().__init__()
+        self.waveform_dir = directory
+        self.temp_dir = directory
+        self.sample_rate = sample_rate
+        self.use_mmap = use_mmap
+        self.checksum = checksum
+        self.log = logging.getLogger('benchmark_sample_files')
+
+
+def benchmark_format(writer, file_format, number_of_samples, chunk_samples):
+    """
+    Write a waveform of number_of_samples samples chunkwise and measure the throughput.
+
+    @param BenchmarkWriter writer: host of the sample write methods
+    @param str file_format: file format to write ('wfm', 'wfmx', 'fpga' or 'pstream')
+    @param int number_of_samples: total number of samples of the waveform
+    @param int chunk_samples: number of samples passed per write call
+
+    @return tuple: (number of samples written, bytes written, time needed in s)
+    """
+    if file_format == 'pstream':
+        # pulse streamer files can only be written at once
+        number_of_samples = min(number_of_samples, chunk_samples)
+    chunk_samples = min(chunk_samples, number_of_samples)
+
+    # One chunk of samples reused for every write call: a sine with markers toggling every 50 ns
+    times = np.arange(chunk_samples) / writer.sample_rate
+    analog_samples = dict()
+    digital_samples = dict()
+    if file_format in ('wfm', 'wfmx'):
+        analog_samples['a_ch1'] = np.sin(2 * np.pi * 100e6 * times).astype('float32')
+        digital_channels = ('d_ch1', 'd_ch2')
+    else:
+        digital_channels = tuple('d_ch{0:d}'.format(chnl) for chnl in range(1, 9))
+    for num, chnl in enumerate(digital_channels):
+        digital_samples[chnl] = (np.arange(chunk_samples) // (50 * (num + 1))) % 2 == 0
+
+    start = time.perf_counter()
+    created_files = set()
+    samples_written = 0
+    while samples_written < number_of_samples:
+        length = min(chunk_samples, number_of_samples - samples_written)
+        created_files.update(writer._write_to_file[file_format](
+            name='benchmark',
+            analog_samples={chnl: samples[:length] for chnl, samples in analog_samples.items()},
+            digital_samples={chnl: samples[:length] for chnl, samples in digital_samples.items()},
+            total_number_of_samples=number_of_samples,
+            is_first_chunk=samples_written == 0,
+            is_last_chunk=samples_written + length == number_of_samples))
+        samples_written += length
+    duration = time.perf_counter() - start
+
+    bytes_written = 0
+    for filename in created_files:
+        path = os.path.join(writer.waveform_dir, filename)
+        bytes_written += os.path.getsize(path)
+        os.remove(path)
+    return samples_written, bytes_written, duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the write throughput of the sample '
+                                                 'file formats.')
+    parser.add_argument('--samples', type=float, default=2e9,
+                        help='number of samples of the waveform (default: 2e9)')
+    parser.add_argument('--chunk', type=float, default=1e8,
+                        help='number of samples per write call (default: 1e8)')
+    parser.add_argument('--dir', default=None,
+                        help='directory to write the files to (default: system temp directory)')
+    parser.add_argument('--formats', nargs='+', default=['wfm', 'wfmx', 'fpga', 'pstream'],
+                        help='file formats to benchmark')
+    parser.add_argument('--mmap', action='store_true', help='write through memory mapped files')
+    parser.add_argument('--checksum', action='store_true',
+                        help='calculate the CRC32 checksum of each file')
+    args = parser.parse_args()
+
+    directory = args.dir if args.dir else tempfile.gettempdir()
+    writer = BenchmarkWriter(directory, sample_rate=25e9, use_mmap=args.mmap,
+                             checksum=args.checksum)
+    print('{0:>8s} {1:>14s} {2:>12s} {3:>10s} {4:>10s} {5:>10s}'.format(
+        'format', 'samples', 'file MB', 'time (s)', 'MB/s', 'MS/s'))
+    for file_format in args.formats:
+        samples, bytes_written, duration = benchmark_format(writer, file_format, int(args.samples),
+                                                            int(args.chunk))
+        print('{0:>8s} {1:>14d} {2:>12.1f} {3:>10.2f} {4:>10.1f} {5:>10.1f}'.format(
+            file_format, samples, bytes_written / 1e6, duration, bytes_written / 1e6 / duration,
+            samples / 1e6 / duration))
+
+
+if __name__ == '__main__':
+    main()
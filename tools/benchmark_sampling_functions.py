@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+Time and memory benchmark of the built-in sampling functions (see
+logic/pulsed/sampling_function_defs/basic_sampling_functions.py).
+
+Samples one element of each sampling function into a float32 buffer in three ways:
+- "get_samples": the former path of the SequenceGeneratorLogic (float64 time array, get_samples
+  and division by the analog voltage range),
+- "into": get_samples_into without tiling of periodic waveforms,
+- "into+tiling": get_samples_into as used by the SequenceGeneratorLogic.
+Prints the time, the peak memory allocated in addition to the buffer and the maximum deviation
+from the get_samples result. Run from the qudi main directory, e.g.:
+
+    python -m tools.benchmark_sampling_functions --samples 25e6
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import sys
+import time
+import argparse
+import tracemalloc
+import numpy as np
+
+from logic.pulsed.sampling_functions import SamplingBase
+from logic.pulsed.sampling_function_defs import basic_sampling_functions as sf
+
+
+def create_functions(number_of_samples, sample_rate):
+    """
+    Instances of all built-in sampling functions with typical parameters.
+
+    @return list: (name, sampling function instance)
+    """
+    duration = number_of_samples / sample_rate
+    return [
+        ('Idle', sf.Idle()),
+        ('DC', sf.DC(voltage=0.3)),
+        ('Sin', sf.Sin(amplitude=0.25, frequency=100e6, phase=30)),
+        ('DoubleSinSum', sf.DoubleSinSum(amplitude_1=0.2, frequency_1=100e6, phase_1=30,
+                                         amplitude_2=0.1, frequency_2=125e6, phase_2=-45)),
+        ('DoubleSinProduct', sf.DoubleSinProduct(amplitude_1=0.5, frequency_1=100e6, phase_1=30,
+                                                 amplitude_2=0.8, frequency_2=5e6, phase_2=90)),
+        ('TripleSinSum', sf.TripleSinSum(amplitude_1=0.2, frequency_1=100e6, phase_1=30,
+                                         amplitude_2=0.1, frequency_2=125e6, phase_2=-45,
+                                         amplitude_3=0.05, frequency_3=40e6, phase_3=10)),
+        ('TripleSinProduct', sf.TripleSinProduct(amplitude_1=0.5, frequency_1=100e6, phase_1=30,
+                                                 amplitude_2=0.8, frequency_2=5e6, phase_2=90,
+                                                 amplitude_3=0.9, frequency_3=1e6, phase_3=0)),
+        ('Chirp', sf.Chirp(amplitude=0.25, phase=30, start_freq=100e6, stop_freq=200e6)),
+        ('AllenEberlyChirp', sf.AllenEberlyChirp(amplitude=0.1, phase=30, start_freq=100e6,
+                                                 stop_freq=200e6, tau_pulse=0.1 * duration)),
+    ]
+
+
+def sample_old(out, function, offset_bin, sample_rate, vpp):
+    """
+    Former sampling of the SequenceGeneratorLogic using get_samples.
+    """
+    time_arr = (offset_bin + np.arange(len(out), dtype='float64')) / sample_rate
+    out[:] = function.get_samples(time_arr) / (vpp / 2)
+
+
+def sample_into(out, function, offset_bin, sample_rate, vpp, tiling=True):
+    """
+    Sampling with get_samples_into, optionally without tiling of periodic waveforms.
+    """
+    max_tiling_period = SamplingBase._max_tiling_period
+    if not tiling:
+        # only integer cycles per sample are accepted as periodic
+        SamplingBase._max_tiling_period = 1
+    try:
+        function.get_samples_into(out, offset_bin, sample_rate, 2 / vpp)
+    finally:
+        SamplingBase._max_tiling_period = max_tiling_period
+
+
+def measure(method, out, *args, **kwargs):
+    """
+    Call method(out, *args, **kwargs) and measure time and peak memory of temporary arrays.
+
+    @return tuple: (time needed in s, peak memory allocated during the call in bytes)
+    """
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        method(out, *args, **kwargs)
+        duration = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return duration, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark get_samples against get_samples_into '
+                                                 'for the built-in sampling functions.')
+    parser.add_argument('--samples', type=float, default=25e6,
+                        help='number of samples of the element (default: 25e6)')
+    parser.add_argument('--offset', type=int, default=12345,
+                        help='time bin of the first sample within the ensemble (default: 12345)')
+    parser.add_argument('--sample-rate', type=float, default=25e9,
+                        help='sample rate in Hz (default: 25e9)')
+    parser.add_argument('--vpp', type=float, default=1.0,
+                        help='analog voltage range in V (default: 1.0)')
+    parser.add_argument('--tolerance', type=float, default=1e-5,
+                        help='maximum deviation from get_samples (normalized, default: 1e-5)')
+    args = parser.parse_args()
+
+    number_of_samples = int(args.samples)
+    out = np.empty(number_of_samples, dtype='float32')
+    reference = np.empty(number_of_samples, dtype='float32')
+    passed = True
+    print('{0:>16s} {1:>12s} {2:>10s} {3:>12s} {4:>12s}'.format(
+        'function', 'method', 'time (s)', 'peak MB', 'max dev'))
+    for name, function in create_functions(number_of_samples, args.sample_rate):
+        sample_args = (function, args.offset, args.sample_rate, args.vpp)
+        duration, peak = measure(sample_old, reference, *sample_args)
+        print('{0:>16s} {1:>12s} {2:>10.3f} {3:>12.1f} {4:>12s}'.format(
+            name, 'get_samples', duration, peak / 1e6, '-'))
+        for method, tiling in (('into', False), ('into+tiling', True)):
+            duration, peak = measure(sample_into, out, *sample_args, tiling=tiling)
+            deviation = np.max(np.abs(out - reference))
+            passed &= deviation <= args.tolerance
+            print('{0:>16s} {1:>12s} {2:>10.3f} {3:>12.1f} {4:>12.2e}'.format(
+                '', method, duration, peak / 1e6, deviation))
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == '__main__':
+    main()
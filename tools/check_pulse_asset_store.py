@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""
+Round trip and migration check of the pulse asset database (see logic/pulsed/pulse_asset_store.py).
+
+Generates PulseBlocks, PulseBlockEnsembles and PulseSequences with the basic predefined methods,
+saves them with the SequenceGeneratorLogic (connected to the pulser dummy) and adds assets with
+sampling information and with objects that can only be pickled. Then checks that
+- the assets reloaded from a new connection to the database are identical to the saved ones,
+- a re-activated SequenceGeneratorLogic lists and de-serializes all saved assets,
+- assets pickled into single files (as saved by earlier versions) are migrated into the database,
+  identical to the originals, and that only the migrated files are moved to the backup directory
+  (broken files are deleted),
+- a broken asset in the database is dropped from the saved assets on first access and does not
+  break clear_pulser.
+Run from the qudi main directory, e.g.:
+
+    python -m tools.check_pulse_asset_store
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import os
+import sys
+import copy
+import pickle
+import argparse
+import datetime
+import tempfile
+import numpy as np
+
+from hardware.pulser_dummy import PulserDummy
+from logic.pulsed.pulse_asset_store import PulseAssetStore
+from logic.pulsed.pulse_objects import PulseSequence
+from logic.pulsed.predefined_generate_methods.basic_predefined_methods import \
+    BasicPredefinedGenerator
+from logic.pulsed.sequence_generator_logic import SequenceGeneratorLogic
+
+ASSET_TYPES = ('block', 'ensemble', 'sequence')
+PREDEFINED_METHODS = ('rabi', 'pulsedodmr', 'ramsey', 'hahnecho', 'xy8_tau', 't1_sequencing')
+
+
+def create_logic(assets_dir):
+    """
+    Create and activate the pulser dummy and the sequence generator outside of the manager.
+
+    @return SequenceGeneratorLogic: the activated sequence generator
+    """
+    pulser = PulserDummy(manager=None, name='pulser', config={})
+    pulser.module_state.activate()
+    logic = SequenceGeneratorLogic(manager=None,
+                                   name='sequencegenerator',
+                                   config={'assets_storage_path': assets_dir})
+    logic.connectors['pulsegenerator'].connect(pulser)
+    logic.module_state.activate()
+    return logic
+
+
+def saved_assets(logic, asset_type):
+    """
+    @return dict: the saved assets of a type of the sequence generator (name -> asset)
+    """
+    if asset_type == 'block':
+        return logic.saved_pulse_blocks
+    if asset_type == 'ensemble':
+        return logic.saved_pulse_block_ensembles
+    return logic.saved_pulse_sequences
+
+
+def create_assets(logic):
+    """
+    Generate assets of all types. Adds an ensemble and a sequence with sampling information and an
+    ensemble holding an object that can not be represented in JSON.
+
+    @return dict: asset type -> {name: asset}
+    """
+    generator = BasicPredefinedGenerator(logic)
+    for method in PREDEFINED_METHODS:
+        blocks, ensembles, sequences = getattr(generator, 'generate_' + method)()
+        for block in blocks:
+            logic.save_block(block)
+        for ensemble in ensembles:
+            logic.save_ensemble(ensemble)
+        for sequence in sequences:
+            logic.save_sequence(sequence)
+    assets = {asset_type: {name: saved_assets(logic, asset_type)[name]
+                           for name in saved_assets(logic, asset_type)}
+              for asset_type in ASSET_TYPES}
+
+    ensemble = copy.deepcopy(assets['ensemble']['rabi'])
+    ensemble.name = 'rabi_sampled'
+    ensemble.sampling_information = {'waveforms': ['rabi_sampled_ch1'],
+                                     'number_of_samples': 12345,
+                                     'digital_rising_bins': {'d_ch1': np.arange(5, dtype='int64')},
+                                     'pulse_streamer_channels': (1, 2)}
+    logic.save_ensemble(ensemble)
+    assets['ensemble'][ensemble.name] = ensemble
+
+    ensemble = copy.deepcopy(assets['ensemble']['ramsey'])
+    ensemble.name = 'ramsey_pickled'
+    ensemble.measurement_information['created'] = datetime.datetime(2020, 1, 2, 3, 4, 5)
+    logic.save_ensemble(ensemble)
+    assets['ensemble'][ensemble.name] = ensemble
+
+    sequence = PulseSequence('rabi_ramsey_sequence',
+                             ensemble_list=[('rabi', {'repetitions': 10, 'flag_high': ['A']}),
+                                            ('ramsey', {'go_to': 1, 'event_jump_to': 2})])
+    sequence.measurement_information = dict(assets['ensemble']['rabi'].measurement_information)
+    sequence.sampling_information = {'waveforms': ['rabi_ch1', 'ramsey_ch1'],
+                                     'step_waveform_list': [('rabi_ch1',), ('ramsey_ch1',)]}
+    logic.save_sequence(sequence)
+    assets['sequence'][sequence.name] = sequence
+    return assets
+
+
+def equal(obj1, obj2):
+    """
+    Recursive comparison of (dict representations of) assets including types and numpy arrays.
+    numpy scalars are stored as python scalars (see pulse_asset_store._to_json_compatible).
+    """
+    if isinstance(obj1, np.generic):
+        obj1 = obj1.item()
+    if isinstance(obj2, np.generic):
+        obj2 = obj2.item()
+    if type(obj1) is not type(obj2):
+        return False
+    if isinstance(obj1, np.ndarray):
+        return obj1.dtype == obj2.dtype and np.array_equal(obj1, obj2)
+    if isinstance(obj1, dict):
+        return list(obj1) == list(obj2) and all(equal(obj1[key], obj2[key]) for key in obj1)
+    if isinstance(obj1, (list, tuple)):
+        return len(obj1) == len(obj2) and all(equal(i1, i2) for i1, i2 in zip(obj1, obj2))
+    if hasattr(obj1, 'get_dict_representation'):
+        return equal(obj1.get_dict_representation(), obj2.get_dict_representation())
+    return obj1 == obj2
+
+
+def equal_assets(asset1, asset2, sampling_information=True):
+    """
+    Compare two assets, optionally without their sampling information.
+    """
+    repr1 = asset1.get_dict_representation()
+    repr2 = asset2.get_dict_representation()
+    if not sampling_information:
+        repr1.pop('sampling_information', None)
+        repr2.pop('sampling_information', None)
+    return type(asset1) is type(asset2) and equal(repr1, repr2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check saving, reloading and migration of pulse '
+                                                 'assets with the asset database.')
+    parser.parse_args()
+
+    failures = list()
+
+    def check(passed, message):
+        if not passed:
+            failures.append(message)
+            print('FAILED: {0}'.format(message))
+
+    print('{0:>10s} {1:>8s} {2:>8s} {3:>8s} {4:>10s} {5:>10s}'.format(
+        'type', 'assets', 'json', 'pickle', 'reloaded', 'migrated'))
+    with tempfile.TemporaryDirectory() as assets_dir, \
+            tempfile.TemporaryDirectory() as migration_dir:
+        logic = create_logic(assets_dir)
+        assets = create_assets(logic)
+        # Pickle the assets into single files like earlier versions did. The sampling functions
+        # are imported again upon re-activation, so this has to be done right away.
+        for asset_type in ASSET_TYPES:
+            for name, asset in assets[asset_type].items():
+                path = os.path.join(migration_dir, '{0}.{1}'.format(name, asset_type))
+                with open(path, 'wb') as file:
+                    pickle.dump(asset, file)
+        with open(os.path.join(migration_dir, 'broken.ensemble'), 'wb') as file:
+            file.write(b'not a pickle')
+        logic.module_state.deactivate()
+
+        # Reload from a new connection to the database
+        store = PulseAssetStore(os.path.join(assets_dir, PulseAssetStore.default_filename))
+        formats = dict(store._connection.execute('SELECT asset_type || name, format FROM assets'))
+        reloaded = {asset_type: 0 for asset_type in ASSET_TYPES}
+        for asset_type in ASSET_TYPES:
+            check(sorted(store.names(asset_type)) == sorted(assets[asset_type]),
+                  '{0} names in database'.format(asset_type))
+            for name, asset in assets[asset_type].items():
+                if equal_assets(store.load(asset_type, name), asset):
+                    reloaded[asset_type] += 1
+                else:
+                    check(False, '{0} "{1}" reloaded from database'.format(asset_type, name))
+        check(formats.get('ensembleramsey_pickled') == 'pickle', 'pickle fallback of non-JSON data')
+
+        # Add a broken asset to the database
+        with store._connection:
+            store._connection.execute('INSERT INTO assets VALUES (?, ?, ?, ?, ?)',
+                                      ('ensemble', 'broken', 'json', b'{"name": ', 0))
+        store.close()
+
+        # Re-activate the logic on the same database. The pulser dummy holds no waveforms, so the
+        # sampling information is dropped upon de-serialization.
+        logic = create_logic(assets_dir)
+        for asset_type in ASSET_TYPES:
+            saved = saved_assets(logic, asset_type)
+            for name, asset in assets[asset_type].items():
+                check(name in saved and equal_assets(saved[name], asset, False),
+                      '{0} "{1}" after re-activation'.format(asset_type, name))
+        ensembles = logic.saved_pulse_block_ensembles
+        check('broken' in list(ensembles), 'broken asset listed before access')
+        check(ensembles.get('broken') is None, 'broken asset access')
+        check('broken' not in ensembles and 'broken' not in ensembles.keys(),
+              'broken asset dropped after access')
+        check(sorted(dict(ensembles)) == sorted(assets['ensemble']), 'dict of saved ensembles')
+        check(logic.clear_pulser() == 0, 'clear_pulser')
+        logic.module_state.deactivate()
+
+        # Migrate the assets pickled into single files
+        logic = create_logic(migration_dir)
+        migrated = {asset_type: 0 for asset_type in ASSET_TYPES}
+        for asset_type in ASSET_TYPES:
+            saved = saved_assets(logic, asset_type)
+            for name, asset in assets[asset_type].items():
+                if name in saved and equal_assets(saved[name], asset, False):
+                    migrated[asset_type] += 1
+                else:
+                    check(False, '{0} "{1}" migrated from file'.format(asset_type, name))
+        logic.module_state.deactivate()
+        backup_files = os.listdir(os.path.join(migration_dir, 'pickled_assets_backup'))
+        check(len(backup_files) == sum(len(assets[asset_type]) for asset_type in ASSET_TYPES),
+              'migrated files moved to backup directory')
+        remaining = [f for f in os.listdir(migration_dir)
+                     if os.path.splitext(f)[1][1:] in ASSET_TYPES]
+        # broken files are deleted by the file loaders
+        check(not remaining and 'broken.ensemble' not in backup_files, 'broken file deleted')
+
+    for asset_type in ASSET_TYPES:
+        asset_formats = [formats.get(asset_type + name) for name in assets[asset_type]]
+        print('{0:>10s} {1:>8d} {2:>8d} {3:>8d} {4:>10d} {5:>10d}'.format(
+            asset_type, len(assets[asset_type]), asset_formats.count('json'),
+            asset_formats.count('pickle'), reloaded[asset_type], migrated[asset_type]))
+    print('{0:d} failed checks'.format(len(failures)))
+    sys.exit(0 if not failures else 1)
+
+
+if __name__ == '__main__':
+    main()
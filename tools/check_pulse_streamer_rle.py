@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+Regression check of the run length encoding of the PulseStreamer digital channels.
+
+Builds random PulseBlockEnsembles with the SequenceGeneratorLogic (connected to the pulser dummy)
+and compares for each digital channel
+- the run length encoding of PulseStreamer.set_pulse_ensemble (_get_channel_rle of the edges taken
+  from the digital instruction table),
+- the former per-sample loop of set_pulse_ensemble (from the rising/falling edge bins),
+- the per-sample expansion of the ensemble.
+The new encoding has to reproduce the per-sample expansion and has to be identical to the former
+loop wherever the latter is correct. The former loop rejected channels that are high at the start
+of the ensemble and dropped pulses of channels that are high only at the end and have more than
+one pulse; these cases are counted separately.
+Run from the qudi main directory, e.g.:
+
+    python -m tools.check_pulse_streamer_rle --ensembles 2000
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import sys
+import argparse
+import tempfile
+import numpy as np
+
+from hardware.pulser_dummy import PulserDummy
+from hardware.swabian_instruments.pulse_streamer import PulseStreamer
+from logic.pulsed.pulse_objects import PulseBlock, PulseBlockElement, PulseBlockEnsemble
+from logic.pulsed.sequence_generator_logic import SequenceGeneratorLogic
+
+DIGITAL_CHANNELS = ('d_ch1', 'd_ch2', 'd_ch3', 'd_ch4')
+
+
+def create_logic(assets_dir):
+    """
+    Create and activate the pulser dummy and the sequence generator outside of the manager.
+
+    @return SequenceGeneratorLogic: the activated sequence generator
+    """
+    pulser = PulserDummy(manager=None, name='pulser', config={})
+    pulser.module_state.activate()
+    logic = SequenceGeneratorLogic(manager=None,
+                                   name='sequencegenerator',
+                                   config={'assets_storage_path': assets_dir})
+    logic.connectors['pulsegenerator'].connect(pulser)
+    logic.module_state.activate()
+    return logic
+
+
+def random_ensemble(logic, name, rng, sample_rate):
+    """
+    Create and save a random digital-only PulseBlockEnsemble with its PulseBlocks.
+
+    @return PulseBlockEnsemble: the saved ensemble
+    """
+    block_list = list()
+    for block_index in range(rng.randint(1, 5)):
+        elements = list()
+        for element_index in range(rng.randint(1, 6)):
+            increment = rng.randint(0, 3) / sample_rate if rng.random_sample() < 0.3 else 0
+            elements.append(PulseBlockElement(
+                init_length_s=rng.randint(1, 20) / sample_rate,
+                increment_s=increment,
+                digital_high={chnl: bool(rng.randint(2)) for chnl in DIGITAL_CHANNELS}))
+        block = PulseBlock('{0}_block{1:d}'.format(name, block_index), elements)
+        logic.save_block(block)
+        block_list.append((block.name, rng.randint(0, 4)))
+    ensemble = PulseBlockEnsemble(name, block_list)
+    logic.save_ensemble(ensemble)
+    return ensemble
+
+
+def expand_channel(logic, ensemble, info, channel):
+    """
+    Per-sample expansion of a digital channel of the ensemble.
+
+    @return numpy.ndarray: channel level (0 or 1) for each sample
+    """
+    levels = list()
+    for block_name, reps in ensemble:
+        block = logic.get_block(block_name)
+        for rep_no in range(reps + 1):
+            levels.extend(int(element.digital_high[channel]) for element in block)
+    return np.repeat(np.array(levels, dtype='int64'), info['elements_length_bins'])
+
+
+def old_channel_rle(rising, falling, n_samples):
+    """
+    Former per-sample loop of PulseStreamer.set_pulse_ensemble.
+
+    @return list: run length encoded sequence as list of (duration, level) tuples, None if the
+                  channel was skipped (no edges) or False if the ensemble was rejected
+    """
+    rle = []
+    n_elem = len(rising)
+    if len(rising) + len(falling) == 0:
+        return None
+    if len(falling) != n_elem or (falling[0] < rising[0] and falling[0] != 0):
+        return False
+    if rising[0] > 0:
+        rle.append((rising[0], 0))
+    for i in range(0, n_elem):
+        if i == (n_elem - 1) and falling[0] == 0:
+            duration = n_samples - rising[i]
+        else:
+            duration = falling[i] - rising[i]
+        if duration > 0:
+            rle.append((duration, 1))
+        if i + 1 < n_elem:
+            duration = rising[i + 1] - falling[i]
+            if duration > 0:
+                rle.append((duration, 0))
+        elif falling[i] < n_samples:
+            if i == (n_elem - 1) and falling[0] == 0:
+                continue
+            duration = n_samples - falling[i]
+            if duration > 0:
+                rle.append((duration, 0))
+    return [(int(duration), level) for duration, level in rle]
+
+
+def new_channel_rle(table, channel, n_samples):
+    """
+    Run length encoding of PulseStreamer.set_pulse_ensemble.
+
+    @return list: run length encoded sequence as list of (duration, level) tuples
+    """
+    rising, falling = PulseStreamer._get_channel_edges(table['flat_durations'],
+                                                       table['flat_bitmasks'],
+                                                       PulseStreamer.numeric_channel(channel))
+    if len(rising) == 0:
+        return [(n_samples, 0)]
+    return PulseStreamer._get_channel_rle(rising, falling, n_samples)
+
+
+def expand_rle(rle):
+    """
+    Per-sample expansion of a run length encoded sequence.
+    """
+    if not rle:
+        return np.zeros(0, dtype='int64')
+    durations, levels = zip(*rle)
+    return np.repeat(np.array(levels, dtype='int64'), durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the PulseStreamer run length encoding '
+                                                 'with the former per-sample loop.')
+    parser.add_argument('--ensembles', type=int, default=2000,
+                        help='number of random ensembles to check (default: 2000)')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the random ensembles')
+    args = parser.parse_args()
+
+    rng = np.random.RandomState(args.seed)
+    counts = {'identical': 0,
+              'constant channel': 0,
+              'old loop rejected': 0,
+              'old loop wrong': 0,
+              'mismatch': 0}
+    with tempfile.TemporaryDirectory() as assets_dir:
+        logic = create_logic(assets_dir)
+        sample_rate = logic.pulse_generator_settings['sample_rate']
+        for index in range(args.ensembles):
+            ensemble = random_ensemble(logic, 'rle_check{0:d}'.format(index), rng, sample_rate)
+            info = logic.analyze_block_ensemble(ensemble)
+            table = logic.get_digital_instruction_table(ensemble, info)
+            n_samples = info['number_of_samples']
+            for channel in DIGITAL_CHANNELS:
+                expected = expand_channel(logic, ensemble, info, channel)
+                new_rle = new_channel_rle(table, channel, n_samples)
+                old_rle = old_channel_rle(info['digital_rising_bins'][channel],
+                                          info['digital_falling_bins'][channel],
+                                          n_samples)
+                if not np.array_equal(expand_rle(new_rle), expected):
+                    counts['mismatch'] += 1
+                    print('{0} {1}: new encoding differs from the ensemble'.format(
+                        ensemble.name, channel))
+                elif old_rle is None:
+                    # the former loop did not set channels without edges
+                    counts['constant channel'] += 1
+                elif old_rle is False:
+                    # the former loop rejected channels starting with a falling edge
+                    counts['old loop rejected'] += 1
+                elif old_rle == new_rle:
+                    counts['identical'] += 1
+                elif not np.array_equal(expand_rle(old_rle), expected):
+                    counts['old loop wrong'] += 1
+                else:
+                    counts['mismatch'] += 1
+                    print('{0} {1}: new encoding differs from the former loop'.format(
+                        ensemble.name, channel))
+        logic.module_state.deactivate()
+
+    for key, count in counts.items():
+        print('{0:>18s}: {1:d}'.format(key, count))
+    sys.exit(0 if counts['mismatch'] == 0 else 1)
+
+
+if __name__ == '__main__':
+    main()
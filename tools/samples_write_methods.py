@@ -26,13 +26,25 @@ import numpy as np
 from collections import OrderedDict
 from lxml import etree as ET
 
+from core.util.sample_file_writer import SampleFileWriter
+
 
 class SamplesWriteMethods:
     """
     Collection of write-to-file methods used to create hardware compatible files for the pulse
     generator out of sample arrays.
+
+    All sample files are written by a SampleFileWriter, which is kept open between the chunks of
+    a waveform.
     """
+    # Write the samples through memory mapped files instead of positioned file writes
+    use_mmap = False
+    # Calculate and log the CRC32 checksum of each written sample file
+    checksum = False
+
     def __init__(self):
+        # open sample file writers of waveforms that are written chunkwise
+        self._sample_file_writers = dict()
         # If you want to define a new file format, make a new method and add the
         # reference to this method to the _write_to_file dictionary:
         self._write_to_file = OrderedDict()
@@ -47,11 +59,15 @@ class SamplesWriteMethods:
     def _write_wfmx(self, name, analog_samples, digital_samples, total_number_of_samples,
                     is_first_chunk, is_last_chunk):
         """
-        Appends a sampled chunk of a whole waveform to a wfmx-file. Create the file
+        Writes a sampled chunk of a whole waveform to a wfmx-file. Create the file
         if it is the first chunk.
         If both flags (is_first_chunk, is_last_chunk) are set to TRUE it means
         that the whole ensemble is written as a whole in one big chunk.
 
+        The wfmx-file contains the analog samples (float32) of all samples followed by the marker
+        bytes of all samples. Both parts are written at their final position in the preallocated
+        file, so no temporary file for the markers is needed.
+
         @param name: string, represents the name of the sampled ensemble
         @param analog_samples: dict containing float32 numpy ndarrays, contains the
                                        samples for the analog channels that
@@ -72,126 +88,41 @@ class SamplesWriteMethods:
         # record the name of the created files
         created_files = []
 
-        # The overhead of the write process in bytes.
-        # Making this value bigger will result in a faster write process
-        # but consumes more memory
-        write_overhead_bytes = 1024*1024*256 # 256 MB
-        # The overhead of the write process in number of samples
-        write_overhead_samples = write_overhead_bytes//4
-
-        # if it is the first chunk, create the .WFMX file with header.
+        # if it is the first chunk, create the header.
         if is_first_chunk:
             # create header
             self._create_xml_file(total_number_of_samples, self.temp_dir)
             # read back the header xml-file and delete it afterwards
             temp_file = os.path.join(self.temp_dir, 'header.xml')
-            with open(temp_file, 'r') as header:
-                header_lines = header.readlines()
+            with open(temp_file, 'rb') as header_file:
+                header = header_file.read()
             os.remove(temp_file)
 
-            # create wfmx-file for each analog channel
-            for channel in analog_samples:
-                filename = name + channel[1:] + '.wfmx'
-                created_files.append(filename)
-
-                filepath = os.path.join(self.waveform_dir, filename)
-
-                with open(filepath, 'wb') as wfmxfile:
-                    # write header
-                    for line in header_lines:
-                        wfmxfile.write(bytes(line, 'UTF-8'))
-
-        # append analog samples to the .WFMX files of each channel. Write
-        # digital samples in temporary files.
+        # write analog samples and marker bytes of each channel into its .WFMX file
         for channel in analog_samples:
-            # get analog channel number as integer from string
-            a_chnl_number = int(channel.strip('a_ch'))
-            # get marker string descriptors for this analog channel
-            markers = ['d_ch'+str((a_chnl_number*2)-1), 'd_ch'+str(a_chnl_number*2)]
-            # append analog samples chunk to .WFMX file
-            filepath = os.path.join(self.waveform_dir, name + channel[1:] + '.wfmx')
-            with open(filepath, 'ab') as wfmxfile:
-                # append analog samples in binary format. One sample is 4
-                # bytes (np.float32). Write in chunks if array is very big to
-                # avoid large temporary copys in memory
-                number_of_full_chunks = int(analog_samples[channel].size//write_overhead_samples)
-                for start_ind in np.arange(0, number_of_full_chunks * write_overhead_samples,
-                                           write_overhead_samples):
-                    stop_ind = start_ind+write_overhead_samples
-                    wfmxfile.write(analog_samples[channel][start_ind:stop_ind])
-                # write rest
-                rest_start_ind = number_of_full_chunks*write_overhead_samples
-                wfmxfile.write(analog_samples[channel][rest_start_ind:])
-
-            # create the byte values corresponding to the marker states
-            # (\x01 for marker 1, \x02 for marker 2, \x03 for both)
-            # and write them into a temporary file
-            filepath = os.path.join(self.temp_dir, name + channel[1:] + '_digi' + '.tmp')
-            with open(filepath, 'ab') as tmpfile:
-                if markers[0] not in digital_samples and markers[1] not in digital_samples:
-                    # no digital channels to write for this analog channel
-                    pass
-                elif markers[0] in digital_samples and markers[1] not in digital_samples:
-                    # Only marker one is active for this channel
-                    for start_ind in np.arange(0, number_of_full_chunks * write_overhead_bytes,
-                                               write_overhead_bytes):
-                        stop_ind = start_ind + write_overhead_bytes
-                        # append digital samples in binary format. One sample is 1 byte (np.uint8).
-                        tmpfile.write(digital_samples[markers[0]][start_ind:stop_ind])
-                    # write rest of digital samples
-                    rest_start_ind = number_of_full_chunks * write_overhead_bytes
-                    tmpfile.write(digital_samples[markers[0]][rest_start_ind:])
-                elif markers[0] not in digital_samples and markers[1] in digital_samples:
-                    # Only marker two is active for this channel
-                    for start_ind in np.arange(0, number_of_full_chunks * write_overhead_bytes,
-                                               write_overhead_bytes):
-                        stop_ind = start_ind + write_overhead_bytes
-                        # append digital samples in binary format. One sample is 1 byte (np.uint8).
-                        tmpfile.write(np.left_shift(
-                            digital_samples[markers[1]][start_ind:stop_ind].astype('uint8'),
-                            1))
-                    # write rest of digital samples
-                    rest_start_ind = number_of_full_chunks * write_overhead_bytes
-                    tmpfile.write(np.left_shift(
-                        digital_samples[markers[1]][rest_start_ind:].astype('uint8'), 1))
-                else:
-                    # Both markers are active for this channel
-                    for start_ind in np.arange(0, number_of_full_chunks * write_overhead_bytes,
-                                               write_overhead_bytes):
-                        stop_ind = start_ind + write_overhead_bytes
-                        # append digital samples in binary format. One sample is 1 byte (np.uint8).
-                        tmpfile.write(np.add(np.left_shift(
-                            digital_samples[markers[1]][start_ind:stop_ind].astype('uint8'), 1),
-                            digital_samples[markers[0]][start_ind:stop_ind]))
-                    # write rest of digital samples
-                    rest_start_ind = number_of_full_chunks * write_overhead_bytes
-                    tmpfile.write(np.add(np.left_shift(
-                        digital_samples[markers[1]][rest_start_ind:].astype('uint8'), 1),
-                        digital_samples[markers[0]][rest_start_ind:]))
-
-        # append the digital sample tmp file to the .WFMX file and delete the
-        # .tmp files if it was the last chunk to write.
-        if is_last_chunk:
-            for channel in analog_samples:
-                tmp_filepath = os.path.join(self.temp_dir, name + channel[1:] + '_digi' + '.tmp')
-                wfmx_filepath = os.path.join(self.waveform_dir, name + channel[1:] + '.wfmx')
-                with open(wfmx_filepath, 'ab') as wfmxfile:
-                    with open(tmp_filepath, 'rb') as tmpfile:
-                        # read and write files in max. write_overhead_bytes chunks to reduce
-                        # memory usage
-                        while True:
-                            tmp_data = tmpfile.read(write_overhead_bytes)
-                            if not tmp_data:
-                                break
-                            wfmxfile.write(tmp_data)
-                # delete tmp file
-                os.remove(tmp_filepath)
+            filename = name + channel[1:] + '.wfmx'
+            created_files.append(filename)
+            if is_first_chunk:
+                self._open_sample_file(filename, total_number_of_samples, ['<f4', 'u1'],
+                                       header=header)
+            writer = self._sample_file_writers[filename]
+
+            # marker bytes (\x01 for marker 1, \x02 for marker 2, \x03 for both)
+            marker_bytes = self._get_marker_bytes(channel, digital_samples)
+            chunk_position = writer.position(section=0)
+            writer.write(analog_samples[channel], section=0)
+            # If no digital channels are active for this analog channel the markers stay at zero
+            if marker_bytes is not None:
+                writer.write(marker_bytes, section=1, position=chunk_position)
+
+            if is_last_chunk:
+                self._close_sample_file(filename)
         return created_files
 
     def _write_wfm(self, name, analog_samples, digital_samples, total_number_of_samples,
                     is_first_chunk, is_last_chunk):
         """
-        Appends a sampled chunk of a whole waveform to a wfm-file. Create the file
+        Writes a sampled chunk of a whole waveform to a wfm-file. Create the file
         if it is the first chunk.
         If both flags (is_first_chunk, is_last_chunk) are set to TRUE it means
         that the whole ensemble is written as a whole in one big chunk.
@@ -229,62 +160,33 @@ class SamplesWriteMethods:
         # After this number a 14bit binary representation of the channel
         # and the marker are followed.
         for channel in analog_samples:
-            # get analog channel number as integer from string
-            a_chnl_number = int(channel.strip('a_ch'))
-            # get marker string descriptors for this analog channel
-            markers = ['d_ch' + str((a_chnl_number * 2) - 1), 'd_ch' + str(a_chnl_number * 2)]
-
             filename = name + channel[1:] + '.wfm'
             created_files.append(filename)
-            filepath = os.path.join(self.waveform_dir, filename)
 
             if is_first_chunk:
-                with open(filepath, 'wb') as wfm_file:
-                    # write the first line, which is the header file, if first chunk is passed:
-                    num_bytes = str(int(total_number_of_samples * 5))
-                    num_digits = str(len(num_bytes))
-                    header = str.encode('MAGIC 1000\r\n#' + num_digits + num_bytes)
-                    wfm_file.write(header)
-
-            # now write the samples chunk in binary representation:
-            # First we create a structured numpy array representing one byte (numpy uint8)
-            # for the markers and 4 byte (numpy float32) for the analog samples.
-            write_array = np.empty(analog_samples[channel].size, dtype='float32, uint8')
-
-            # now we determine which markers are active for this channel and write them to
-            # write_array.
-            if markers[0] in digital_samples and markers[1] in digital_samples:
-                # both markers active for this channel
-                write_array['f1'] = np.add(
-                    np.left_shift(digital_samples[markers[1]][:].astype('uint8'), 1),
-                    digital_samples[markers[0]][:].astype('uint8'))
-            elif markers[0] in digital_samples and markers[1] not in digital_samples:
-                # only marker 1 active for this channel
-                write_array['f1'] = digital_samples[markers[0]][:].astype('uint8')
-            elif markers[0] not in digital_samples and markers[1] in digital_samples:
-                # only marker 2 active for this channel
-                write_array['f1'] = np.left_shift(digital_samples[markers[1]][:].astype('uint8'), 1)
-            else:
-                # no markers active for this channel
-                write_array['f1'] = np.zeros(analog_samples[channel].size, dtype='uint8')
-            # Write analog samples into the write_array
-            write_array['f0'] = analog_samples[channel][:]
-
-            # Write write_array to file
-            with open(filepath, 'ab') as wfm_file:
-                wfm_file.write(write_array)
-
-                # append footer if it's the last chunk to write
-                if is_last_chunk:
-                    # the footer encodes the sample rate, which was used for that file:
-                    footer = str.encode('CLOCK {0:16.10E}\r\n'.format(self.sample_rate))
-                    wfm_file.write(footer)
+                num_bytes = str(int(total_number_of_samples * 5))
+                num_digits = str(len(num_bytes))
+                header = str.encode('MAGIC 1000\r\n#' + num_digits + num_bytes)
+                # the footer encodes the sample rate, which was used for that file:
+                footer = str.encode('CLOCK {0:16.10E}\r\n'.format(self.sample_rate))
+                # Each sample is a record of 4 byte (numpy float32) for the analog sample and one
+                # byte (numpy uint8) for the markers.
+                self._open_sample_file(filename, total_number_of_samples, ['float32, uint8'],
+                                       header=header, footer=footer)
+
+            # write the samples chunk in binary representation
+            self._sample_file_writers[filename].write(
+                {'f0': analog_samples[channel],
+                 'f1': self._get_marker_bytes(channel, digital_samples)})
+
+            if is_last_chunk:
+                self._close_sample_file(filename)
         return created_files
 
     def _write_fpga(self, name, analog_samples, digital_samples, total_number_of_samples,
                     is_first_chunk, is_last_chunk):
         """
-        Appends a sampled chunk of a whole waveform to a fpga-file. Create the file
+        Writes a sampled chunk of a whole waveform to a fpga-file. Create the file
         if it is the first chunk.
         If both flags (is_first_chunk, is_last_chunk) are set to TRUE it means
         that the whole ensemble is written as a whole in one big chunk.
@@ -315,44 +217,33 @@ class SamplesWriteMethods:
                              ''.format(len(digital_samples)))
             return -1
 
-        chunk_length_bins = len(digital_samples[list(digital_samples)[0]])
-
-        # encode channels into FPGA samples (bytes)
-        # check if the sequence length is an integer multiple of 32 bins
-        if is_last_chunk and (total_number_of_samples % 32 != 0):
-            # calculate number of zero timeslots to append
-            number_of_zeros = 32 - (total_number_of_samples % 32)
-            encoded_samples = np.zeros(chunk_length_bins + number_of_zeros, dtype='uint8')
-            self.log.warning('FPGA pulse sequence length is no integer multiple of 32 samples. '
-                             'Appending {0} zero-samples to the sequence.'.format(number_of_zeros))
-        else:
-            encoded_samples = np.zeros(chunk_length_bins, dtype='uint8')
-
-        for chnl_num in range(1, 9):
-            chnl_str = 'd_ch' + str(chnl_num)
-            if chnl_str in digital_samples:
-                encoded_samples[:chunk_length_bins] += (2 ** chnl_num) * np.uint8(
-                    digital_samples[chnl_str])
-
-        del digital_samples  # no longer needed
-
-        # append samples to file
         filename = name + '.fpga'
         created_files.append(filename)
 
-        filepath = os.path.join(self.waveform_dir, filename)
-        with open(filepath, 'wb') as fpgafile:
-            fpgafile.write(encoded_samples)
+        # The sequence length must be an integer multiple of 32 bins. The zero timeslots appended
+        # are already present in the preallocated file.
+        if is_first_chunk:
+            number_of_zeros = (32 - total_number_of_samples % 32) % 32
+            if number_of_zeros:
+                self.log.warning('FPGA pulse sequence length is no integer multiple of 32 samples. '
+                                 'Appending {0} zero-samples to the sequence.'
+                                 ''.format(number_of_zeros))
+            self._open_sample_file(filename, total_number_of_samples + number_of_zeros, ['u1'])
+
+        # encode channels into FPGA samples (bytes). Bit n-1 encodes the state of channel d_ch<n>.
+        encoded_samples = self._encode_bitmasks(digital_samples)
 
+        self._sample_file_writers[filename].write(encoded_samples)
+        if is_last_chunk:
+            self._close_sample_file(filename)
         return created_files
 
     def _write_pstream(self, name, analog_samples, digital_samples, total_number_of_samples,
                        is_first_chunk, is_last_chunk):
         """
-        Appends a sampled chunk of a whole waveform to a fpga-file. Create the file
-        if it is the first chunk.
-        If both flags (is_first_chunk, is_last_chunk) are set to TRUE it means
-        that the whole ensemble is written as a whole in one big chunk.
+        Writes a sampled waveform to a pstream-file.
+        The waveform must be passed as a whole in one chunk (is_first_chunk and is_last_chunk
+        set to TRUE) since the number of pulses is only known after compression.
 
         The PulseStreamer programming interface is based on a sequence of <Pulse> elements,
         with the following C++ datatype (taken from the documentation available at 
@@ -379,13 +270,9 @@ class SamplesWriteMethods:
         will be compressed to three Pulse elements with duration 2, 2, 1 and with the correct
         respective bitmasks for the active channels. 
         
-        This function traverses the digital_samples array to identify where the active digital
-        channels are modified and compresses it down to a sequence of pulse elements each with 
-        a bitmask and a length. The file is then written to disk. 
-        
-        TODO: This is inefficient, as the original PulseElement representation inside Qudi is
-        first decompressed into a sample stream, then recompressed into the PulseStreamer 
-        representation. Work is required to enable the bypass of the interim stage. 
+        This function finds the samples where the active digital channels are modified and
+        compresses the samples down to a sequence of pulse elements each with a bitmask and a
+        length. The pulse elements are written to disk as packed little endian <Pulse> records.
 
         @param name: string, represents the name of the sampled ensemble
         @param analog_samples: dict containing float32 numpy ndarrays, contains the
@@ -404,9 +291,6 @@ class SamplesWriteMethods:
         @return list: the list contains the string names of the created files for the passed
                       presampled arrays
         """
-        # FIXME: This method needs to be adapted to "digital_samples" now being a dictionary
-        import dill
-
         # record the name of the created files
         created_files = []
 
@@ -416,28 +300,118 @@ class SamplesWriteMethods:
             self.log.error('Pulse streamer needs 8 digital channels. {0} is not allowed!'
                            ''.format(channel_number))
             return -1
+        if not (is_first_chunk and is_last_chunk):
+            self.log.error('Pulse streamer files can not be written chunkwise. Please pass the '
+                           'whole waveform at once.')
+            return -1
 
-        # fetch locations where digital channel states change, and eliminate duplicates
-        new_channel_indices = np.where(digital_samples[:-1,:] != digital_samples[1:,:])[0]
-        new_channel_indices = np.unique(new_channel_indices)
-
-        # add in indices for the start and end of the sequence to simplify iteration
-        new_channel_indices = np.insert(new_channel_indices, 0, [-1])
-        new_channel_indices = np.insert(new_channel_indices, new_channel_indices.size, [digital_samples.shape[0]-1])
+        # bitmask of the active channels for each sample
+        bitmasks = self._encode_bitmasks(digital_samples)
 
-        pulses = []
-        for new_channel_index in range(1, new_channel_indices.size):
-            pulse = [new_channel_indices[new_channel_index] - new_channel_indices[new_channel_index - 1], _convert_to_bitmask(digital_samples[new_channel_indices[new_channel_index - 1] + 1,:])]
-            pulses.append(pulse)
+        # fetch locations where digital channel states change
+        pulse_starts = np.flatnonzero(bitmasks[1:] != bitmasks[:-1]) + 1
+        pulse_starts = np.insert(pulse_starts, 0, 0)
+        pulse_lengths = np.diff(np.append(pulse_starts, total_number_of_samples))
 
-        # append samples to file
+        # write pulse elements to file
         filename = name + '.pstream'
         created_files.append(filename)
+        self._open_sample_file(
+            filename, pulse_starts.size, [[('ticks', '<u4'), ('digi', 'u1'), ('ao0', '<i2'),
+                                           ('ao1', '<i2')]])
+        self._sample_file_writers[filename].write({'ticks': pulse_lengths,
+                                                   'digi': bitmasks[pulse_starts]})
+        self._close_sample_file(filename)
+        return created_files
 
-        filepath = os.path.join(self.waveform_dir, filename)
-        dill.dump(pulses, open(filepath, 'wb'))
+    @staticmethod
+    def _encode_bitmasks(digital_samples):
+        """
+        Encode the states of the digital channels d_ch1 to d_ch8 in an array of bytes.
+        Bit n-1 of each byte encodes the state of channel d_ch<n>.
 
-        return created_files
+        @param dict digital_samples: dict containing bool numpy ndarrays of the digital channels
+
+        @return numpy.ndarray: uint8 bitmask for each sample
+        """
+        chunk_length_bins = len(digital_samples[list(digital_samples)[0]])
+        bitmasks = np.zeros(chunk_length_bins, dtype='uint8')
+        shifted = np.empty(chunk_length_bins, dtype='uint8')
+        for chnl_num in range(1, 9):
+            chnl_str = 'd_ch' + str(chnl_num)
+            if chnl_str in digital_samples:
+                np.left_shift(digital_samples[chnl_str].view('uint8'), chnl_num - 1, out=shifted)
+                np.bitwise_or(bitmasks, shifted, out=bitmasks)
+        return bitmasks
+
+    def _get_marker_bytes(self, channel, digital_samples):
+        """
+        Encode the states of the two markers belonging to an analog channel in an array of bytes
+        (\x01 for marker 1, \x02 for marker 2, \x03 for both).
+
+        @param str channel: analog channel name, e.g. 'a_ch1'
+        @param dict digital_samples: dict containing bool numpy ndarrays of the digital channels
+
+        @return numpy.ndarray: uint8 marker bytes or None if no marker is active for the channel
+        """
+        # get analog channel number as integer from string
+        a_chnl_number = int(channel.strip('a_ch'))
+        # get marker string descriptors for this analog channel
+        markers = ['d_ch' + str((a_chnl_number * 2) - 1), 'd_ch' + str(a_chnl_number * 2)]
+
+        if markers[0] in digital_samples and markers[1] in digital_samples:
+            # both markers active for this channel
+            marker_bytes = np.left_shift(digital_samples[markers[1]].view('uint8'), 1)
+            marker_bytes |= digital_samples[markers[0]].view('uint8')
+        elif markers[0] in digital_samples:
+            # only marker 1 active for this channel
+            marker_bytes = digital_samples[markers[0]].view('uint8')
+        elif markers[1] in digital_samples:
+            # only marker 2 active for this channel
+            marker_bytes = np.left_shift(digital_samples[markers[1]].view('uint8'), 1)
+        else:
+            # no markers active for this channel
+            marker_bytes = None
+        return marker_bytes
+
+    def _open_sample_file(self, filename, number_of_samples, section_dtypes, header=b'',
+                          footer=b''):
+        """
+        Create a preallocated sample file in the waveform directory. An unfinished file of the
+        same name is closed before.
+
+        @param str filename: name of the file to create
+        @param int number_of_samples: number of samples in each data section of the file
+        @param list section_dtypes: numpy dtypes of the data sections (see SampleFileWriter)
+        @param bytes header: file header
+        @param bytes footer: file footer
+        """
+        self._close_sample_file(filename)
+        self._sample_file_writers[filename] = SampleFileWriter(
+            os.path.join(self.waveform_dir, filename),
+            number_of_samples,
+            section_dtypes,
+            header=header,
+            footer=footer,
+            use_mmap=self.use_mmap)
+        return
+
+    def _close_sample_file(self, filename):
+        """
+        Close a sample file opened by _open_sample_file.
+
+        @param str filename: name of the file to close
+
+        @return int: CRC32 checksum of the file if the checksum attribute is set, None otherwise
+        """
+        writer = self._sample_file_writers.pop(filename, None)
+        if writer is None:
+            return None
+        crc = writer.close(checksum=self.checksum)
+        if crc is not None:
+            self.log.debug('Written sample file "{0}" with CRC32 checksum {1:08x}.'
+                           ''.format(filename, crc))
+        return crc
 
     def _write_seq(self, sequence_obj):
         """
@@ -589,46 +563,9 @@ class SamplesWriteMethods:
         # The header length is written into the file
         # The first line is not included since it is redundant
         # Also the last endline (\n) is excluded
-        text = open(filepath, "U").read()
+        text = open(filepath, "r").read()
         text = text.replace("xxxxxxxxx", length_of_header)
         text = bytes(text, 'UTF-8')
         f = open(filepath, "wb")
         f.write(text[39:-1])
         f.close()
-
-def _convert_to_bitmask(active_channels):
-    """ Convert a list of channels into a bitmask.
-    @param numpy.array active_channels: the list of active channels like
-                        e.g. [0,4,7]. Note that the channels start from 0.
-    @return int: The channel-list is converted into a bitmask (an sequence
-                 of 1 and 0). The returned integer corresponds to such a
-                 bitmask.
-    Note that you can get a binary representation of an integer in python
-    if you use the command bin(<integer-value>). All higher unneeded digits
-    will be dropped, i.e. 0b00100 is turned into 0b100. Examples are
-        bin(0) =    0b0
-        bin(1) =    0b1
-        bin(8) = 0b1000
-    Each bit value (read from right to left) corresponds to the fact that a
-    channel is on or off. I.e. if you have
-        0b001011
-    then it would mean that only channel 0, 1 and 3 are switched to on, the
-    others are off.
-    Helper method for write_pulse_form.
-    """
-    bits = 0  # that corresponds to: 0b0
-    active_channels = np.where(active_channels == True)
-    for channel in active_channels[0]:
-        # go through each list element and create the digital word out of
-        # 0 and 1 that represents the channel configuration. In order to do
-        # that a bitwise shift to the left (<< operator) is performed and
-        # the current channel configuration is compared with a bitwise OR
-        # to check whether the bit was already set. E.g.:
-        #   0b1001 | 0b0110: compare elementwise:
-        #           1 | 0 => 1
-        #           0 | 1 => 1
-        #           0 | 1 => 1
-        #           1 | 1 => 1
-        #                   => 0b1111
-        bits = bits | (1 << channel)
-    return bits
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+Simulation of the adaptive (cross scan) XY refocus of the OptimizerLogic against the
+ConfocalScannerDummy.
+
+A single dummy emitter is placed off-centre in the refocus area. The cross scan has to converge to
+the emitter without the full XY image scan. An emitter at the edge of the refocus area has to make
+the optimizer fall back to the full XY image scan. Run from the qudi main directory, e.g.:
+
+    python -m tools.simulate_adaptive_refocus
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import sys
+import argparse
+import numpy as np
+from qtpy import QtCore
+
+from hardware.confocal_scanner_dummy import ConfocalScannerDummy
+from logic.fit_logic import FitLogic
+from logic.optimizer_logic import OptimizerLogic
+
+
+def create_modules():
+    """
+    Create and activate the dummy scanner, the fit logic and the optimizer outside of the manager.
+
+    @return tuple: (ConfocalScannerDummy, OptimizerLogic)
+    """
+    fit_logic = FitLogic(manager=None, name='fitlogic', config={})
+    fit_logic.module_state.activate()
+
+    scanner = ConfocalScannerDummy(manager=None,
+                                   name='scanner',
+                                   config={'clock_frequency': 1000,
+                                           'number_of_emitters': 1,
+                                           'simulate_timing': False})
+    scanner.connectors['fitlogic'].connect(fit_logic)
+    scanner.module_state.activate()
+
+    optimizer = OptimizerLogic(manager=None, name='optimizer', config={})
+    optimizer.connectors['confocalscanner1'].connect(scanner)
+    optimizer.connectors['fitlogic'].connect(fit_logic)
+    optimizer.module_state.activate()
+    optimizer.do_adaptive_refocus = True
+    optimizer.optimization_sequence = ['XY']
+    optimizer.hw_settle_time = 0
+    optimizer.return_slowness = 5
+    return scanner, optimizer
+
+
+def place_emitter(scanner, x, y, z):
+    """
+    Replace the emitters of the dummy scanner by a single emitter with a sigma of 0.1 µm.
+    """
+    scanner._num_points = 1
+    # amplitude, x_zero, y_zero, sigma_x, sigma_y, theta, offset
+    scanner._points = np.array([[4e5, x, y, 0.1e-6, 0.1e-6, 0, 0]])
+    # amplitude, z_zero, sigma, offset
+    scanner._points_z = np.array([[1, z, 0.5e-6, 0]])
+    scanner._build_emitter_grid()
+
+
+def refocus(app, optimizer, start, timeout=60):
+    """
+    Run a refocus from the start position and wait until it has finished.
+
+    @return tuple: optimized position [x, y, z, a] (None on timeout) and number of lines of the
+                   full xy image scan
+    """
+    result = list()
+    full_scan_lines = list()
+
+    def finished(caller_tag, position):
+        result.append(position)
+        app.quit()
+
+    def full_scan_line():
+        full_scan_lines.append(1)
+
+    optimizer.sigRefocusFinished.connect(finished)
+    # each line of the full xy image scan is requested by this signal
+    optimizer._sigScanNextXyLine.connect(full_scan_line)
+    QtCore.QTimer.singleShot(0, lambda: optimizer.start_refocus(initial_pos=start))
+    QtCore.QTimer.singleShot(int(timeout * 1000), app.quit)
+    app.exec_()
+    optimizer.sigRefocusFinished.disconnect(finished)
+    optimizer._sigScanNextXyLine.disconnect(full_scan_line)
+    return (result[0] if result else None), len(full_scan_lines)
+
+
+def run_case(app, scanner, optimizer, name, offset, expect_full_scan, tolerance):
+    """
+    Refocus onto an emitter placed at offset from the start position and check the result.
+
+    @return bool: True if the case passed
+    """
+    start = np.array([50e-6, 50e-6, 50e-6])
+    emitter = start + np.array([offset[0], offset[1], 0])
+    place_emitter(scanner, *emitter)
+    position, full_scan_lines = refocus(app, optimizer, start)
+    if position is None:
+        print('{0}: FAILED (no result)'.format(name))
+        return False
+    error = np.hypot(position[0] - emitter[0], position[1] - emitter[1])
+    passed = error <= tolerance and (full_scan_lines > 0) == expect_full_scan
+    print('{0}: {1} (error {2:.1f} nm, full xy scan lines: {3:d})'.format(
+        name, 'passed' if passed else 'FAILED', error * 1e9, full_scan_lines))
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulate the adaptive xy refocus against the '
+                                                 'confocal scanner dummy.')
+    parser.add_argument('--tolerance', type=float, default=30e-9,
+                        help='maximum distance of the result to the emitter in m (default: 30e-9)')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the dummy scanner noise')
+    args = parser.parse_args()
+
+    np.random.seed(args.seed)
+    app = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication(sys.argv)
+    scanner, optimizer = create_modules()
+    # the default refocus area is 0.6 µm wide with an edge margin of 20 %, i.e. the cross scan is
+    # accepted for peaks within 0.18 µm of the centre
+    passed = run_case(app, scanner, optimizer, 'off-centre emitter', (0.12e-6, -0.08e-6),
+                      expect_full_scan=False, tolerance=args.tolerance)
+    passed &= run_case(app, scanner, optimizer, 'emitter at the edge', (0.27e-6, 0.05e-6),
+                       expect_full_scan=True, tolerance=args.tolerance)
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == '__main__':
+    main()
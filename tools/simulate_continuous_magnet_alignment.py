@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""
+Simulation of the continuous (pipelined) 2D fluorescence alignment of the MagnetLogic.
+
+The magnet dummy moves with constant velocities, so the magnet passes the grid points while the
+counter records. The counter dummy integrates a Gaussian fluorescence peak over the motion of the
+magnet during each count interval (see tools/simulate_magnet_alignment.py for the other modules).
+The MagnetLogic maps the time stamped counter samples back onto the grid by the logged magnet
+positions. For each position tolerance the alignment is run and checked that
+- the value of each grid point lies within the range of the fluorescence within the tolerance
+  around the grid point, i.e. the time stamps are mapped to the right positions,
+- every grid point got counter samples if the tolerance window holds at least two samples,
+- the peak is found at the right grid point.
+The number of counter samples per grid point, the largest deviation from the fluorescence at the
+grid points and the duration of the alignment are reported. Run from the qudi main directory,
+e.g.:
+
+    python -m tools.simulate_continuous_magnet_alignment
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import sys
+import time
+import argparse
+import numpy as np
+from qtpy import QtCore
+
+from hardware.magnet.magnet_dummy import MagnetDummy
+from tools.simulate_magnet_alignment import CENTER, FluorescenceCounterDummy, create_modules, \
+    grid_index, peak_index, run_alignment, set_grid
+
+
+class MovingMagnetDummy(MagnetDummy):
+    """ Magnet dummy moving each axis with a constant velocity, the axes move simultaneously.
+
+    move_abs returns immediately and the axes report the status 1 until they reached the target.
+    Moves are instantaneous as long as velocities is None.
+    """
+    velocities = None
+
+    def on_activate(self):
+        super().on_activate()
+        # (start time, start position, target position) of the last move
+        self._motion = None
+
+    def move_abs(self, param_dict):
+        start = self.get_pos()
+        super().move_abs(param_dict)
+        if self.velocities is not None:
+            self._motion = (time.time(), start, super().get_pos())
+
+    def abort(self):
+        self.move_abs(self.get_pos())
+        return super().abort()
+
+    def position_at(self, timestamp):
+        """
+        @param float timestamp: time as returned by time.time()
+
+        @return dict: position of all axes at the time
+        """
+        if self._motion is None or self.velocities is None:
+            return super().get_pos()
+        start_time, start, target = self._motion
+        pos = dict()
+        for axis, target_pos in target.items():
+            vel = self.velocities.get(axis)
+            distance = target_pos - start[axis]
+            if vel is None or abs(distance) <= vel * (timestamp - start_time):
+                pos[axis] = target_pos
+            else:
+                pos[axis] = start[axis] + np.sign(distance) * vel * max(timestamp - start_time, 0)
+        return pos
+
+    def get_pos(self, param_list=None):
+        pos = self.position_at(time.time())
+        if param_list is None:
+            return pos
+        return {axis: pos[axis] for axis in param_list if axis in pos}
+
+    def get_status(self, param_list=None):
+        pos = self.get_pos(param_list)
+        target = super().get_pos(param_list)
+        return {axis: 0 if pos[axis] == target[axis] else 1 for axis in pos}
+
+    def get_velocity(self, param_list=None):
+        velocities = self.velocities or dict()
+        if param_list is None:
+            return dict(velocities)
+        return {axis: velocities[axis] for axis in param_list if axis in velocities}
+
+
+class MotionCounterDummy(FluorescenceCounterDummy):
+    """ Counter dummy integrating the fluorescence over the motion of the magnet during each count
+    interval. The magnet must be a MovingMagnetDummy.
+    """
+
+    def get_counter(self, samples=None):
+        if samples is None:
+            samples = int(self._samples_number)
+        interval = 1 / self._clock_frequency
+        start = time.time()
+        time.sleep(samples * interval)
+        rates = np.empty(samples)
+        for sample in range(samples):
+            times = start + (sample + np.linspace(0, 1, 5)) * interval
+            rates[sample] = np.mean([self.fluorescence(self.magnet.position_at(t)) for t in times])
+        return np.tile(rates, (len(self.get_counter_channels()), 1))
+
+
+def fluorescence_range(counter, center, half_width):
+    """
+    @param FluorescenceCounterDummy counter: the counter dummy
+    @param dict center: position of the grid point (axis label -> position)
+    @param dict half_width: half width of the window around the grid point (axis label -> width)
+
+    @return tuple: minimum and maximum count rate within the window
+    """
+    axes = list(center)
+    grids = np.meshgrid(*[center[axis] + np.linspace(-1, 1, 21) * half_width[axis]
+                          for axis in axes])
+    rates = counter.fluorescence({axis: grid for axis, grid in zip(axes, grids)})
+    return rates.min(), rates.max()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulate the continuous 2D magnet alignment '
+                                                 'with a moving magnet dummy.')
+    parser.add_argument('--points', type=int, default=11,
+                        help='grid points per axis (default: 11)')
+    parser.add_argument('--clock-frequency', type=float, default=200,
+                        help='clock frequency of the counter in Hz (default: 200)')
+    parser.add_argument('--speed', type=float, default=20,
+                        help='velocity of the magnet in grid steps per s (default: 20)')
+    parser.add_argument('--tolerances', type=float, nargs='+', default=[0.5, 0.25, 0.1],
+                        help='position tolerances in grid steps (default: 0.5 0.25 0.1)')
+    args = parser.parse_args()
+
+    app = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication(sys.argv)
+    magnet, counter, counter_logic, magnet_logic, counter_thread = create_modules(
+        magnet_class=MovingMagnetDummy,
+        counter_class=MotionCounterDummy,
+        clock_frequency=args.clock_frequency)
+    step = 1e-3
+    velocity = args.speed * step
+    magnet.velocities = {'x': velocity, 'y': velocity}
+    set_grid(magnet_logic, args.points, step, (velocity, velocity))
+    counter.peak_position = {'x': CENTER['x'] + 2 * step, 'y': CENTER['y'] - 3 * step}
+    counter.peak_width = 2 * step
+    # samples per grid step and extent of the motion during one count interval in grid steps
+    samples_per_step = args.clock_frequency / args.speed
+    smear = 0.5 * args.speed / args.clock_frequency
+    passed = True
+
+    print('{0:>9s} {1:>13s} {2:>8s} {3:>6s} {4:>13s} {5:>9s} {6:>10s}'.format(
+        'tolerance', 'samples/point', 'covered', 'peak', 'deviation (%)', 'outliers', 'duration'))
+    for tolerance in args.tolerances:
+        magnet_logic.set_align_2d_position_tolerance(tolerance)
+        start_time = time.time()
+        if not run_alignment(app, magnet_logic, stepwise_meas=False):
+            print('{0:>9.2f}: FAILED (timeout)'.format(tolerance))
+            passed = False
+            continue
+        duration = time.time() - start_time
+
+        matrix = magnet_logic.get_2d_data_matrix()
+        num_samples = magnet_logic._2d_cont_num
+        axis0, axis1 = magnet_logic.get_2d_axis_arrays()
+        covered = num_samples > 0
+        # tolerance window, widened by the motion during a count interval and 1 % of the peak
+        half_width = {'x': (tolerance + smear) * step, 'y': (tolerance + smear) * step}
+        slack = 0.01 * counter.peak_rate
+        deviations = list()
+        outliers = 0
+        for i, j in zip(*np.nonzero(covered)):
+            center = {'x': axis0[i], 'y': axis1[j]}
+            low, high = fluorescence_range(counter, center, half_width)
+            outliers += not low - slack <= matrix[i, j] <= high + slack
+            deviations.append(abs(matrix[i, j] - counter.fluorescence(center)))
+        peak_found = peak_index(magnet_logic) == grid_index(magnet_logic, counter.peak_position)
+        need_coverage = 2 * tolerance * samples_per_step >= 2
+
+        failures = list()
+        if outliers:
+            failures.append('values outside of the tolerance window')
+        if need_coverage and not covered.all():
+            failures.append('grid points without samples')
+        if not peak_found:
+            failures.append('peak missed')
+        print('{0:>9.2f} {1:>13.1f} {2:>4d}/{3:<3d} {4:>6s} {5:>13.1f} {6:>9d} {7:>9.1f}s '
+              '{8}'.format(tolerance, num_samples[covered].mean() if covered.any() else 0,
+                           int(covered.sum()), covered.size,
+                           'found' if peak_found else 'missed',
+                           100 * max(deviations, default=0) / counter.peak_rate, outliers,
+                           duration, 'FAILED: ' + ', '.join(failures) if failures else ''))
+        passed &= not failures
+
+    counter_logic.stopCount()
+    counter_thread.quit()
+    counter_thread.wait()
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == '__main__':
+    main()
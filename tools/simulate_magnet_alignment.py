@@ -0,0 +1,348 @@
+# -*- coding: utf-8 -*-
+"""
+Simulation of the stepwise 2D fluorescence alignment of the MagnetLogic against the MagnetDummy.
+
+The fluorescence is simulated by a slow counter dummy whose count rate is a Gaussian peak over
+the position of the magnet dummy. The alignment runs with the real MagnetLogic, CounterLogic and
+_perform_fluorescence_measure, without refocus. For each pathway mode the full grid is measured
+and checked that
+- every grid point is measured exactly once,
+- the peak is found at the right grid point.
+The path length and the estimated travel time of the measured pathway are reported relative to
+the default pathway mode (snake-wise). Then the adaptive (coarse-to-fine) alignment runs on a
+finer grid and is checked to measure every grid point at most once, to find the peak and to
+measure considerably less points than the full grid. Run from the qudi main directory, e.g.:
+
+    python -m tools.simulate_magnet_alignment
+
+Qudi is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Qudi. If not, see <http://www.gnu.org/licenses/>.
+
+Copyright (c) the Qudi Developers. See the COPYRIGHT.txt file at the
+top-level directory of this distribution and at <https://github.com/Ulm-IQO/qudi/>
+"""
+
+import sys
+import time
+import argparse
+import collections
+import numpy as np
+from qtpy import QtCore
+
+from hardware.confocal_scanner_dummy import ConfocalScannerDummy
+from hardware.magnet.magnet_dummy import MagnetDummy
+from hardware.microwave.mw_source_dummy import MicrowaveDummy
+from hardware.odmr_counter_dummy import ODMRCounterDummy
+from hardware.pulser_dummy import PulserDummy
+from hardware.slow_counter_dummy import SlowCounterDummy
+from logic.confocal_logic import ConfocalLogic
+from logic.counter_logic import CounterLogic
+from logic.fit_logic import FitLogic
+from logic.magnet_logic import MagnetLogic
+from logic.magnet_pathways import PATHWAY_MODES, estimate_pathway_duration
+from logic.odmr_logic import ODMRLogic
+from logic.optimizer_logic import OptimizerLogic
+from logic.pulsed.sequence_generator_logic import SequenceGeneratorLogic
+from logic.save_logic import SaveLogic
+from logic.taskrunner import TaskRunner
+from logic.trace_analysis_logic import TraceAnalysisLogic
+
+# position of the magnet before the alignment, the grid is centered around it
+CENTER = {'x': 50e-3, 'y': 50e-3}
+
+
+class FluorescenceCounterDummy(SlowCounterDummy):
+    """ Slow counter dummy counting a Gaussian fluorescence peak over the position of a magnet.
+
+    Set magnet, peak_position (dict of axis label -> position) and peak_width before counting.
+    The counts are not noisy, so the measured values can be compared to the expected ones.
+    """
+    magnet = None
+    peak_position = None
+    peak_width = 1e-3
+    peak_rate = 200e3
+    background_rate = 20e3
+
+    def fluorescence(self, position):
+        """
+        @param dict position: magnet position (axis label -> position)
+
+        @return float: count rate in counts/s at the position
+        """
+        distance2 = sum((position[axis] - self.peak_position[axis]) ** 2
+                        for axis in self.peak_position)
+        return self.background_rate + self.peak_rate * np.exp(
+            -distance2 / (2 * self.peak_width ** 2))
+
+    def get_counter(self, samples=None):
+        """ Returns the count rate at the magnet position at the end of the count interval.
+
+        @param int samples: if defined, number of samples to read in one go
+
+        @return numpy.ndarray: (channels, samples) count rates in counts/s
+        """
+        if samples is None:
+            samples = int(self._samples_number)
+        time.sleep(samples / self._clock_frequency)
+        rate = self.fluorescence(self.magnet.get_pos(list(self.peak_position)))
+        return np.full((len(self.get_counter_channels()), samples), rate)
+
+
+class MeasurementRecorder:
+    """ Records the grid index and the magnet position of each point measured by a MagnetLogic.
+
+    The stepwise alignment emits sig2DMatrixChanged directly after setting the value of the
+    current pathway index.
+    """
+
+    def __init__(self, magnet_logic):
+        self.magnet_logic = magnet_logic
+        self.points = list()
+        magnet_logic.sig2DMatrixChanged.connect(self.record, QtCore.Qt.DirectConnection)
+
+    def record(self):
+        logic = self.magnet_logic
+        axes = [logic.get_align_2d_axis0_name(), logic.get_align_2d_axis1_name()]
+        pos = logic.get_pos(axes)
+        self.points.append((logic._backmap[logic._pathway_index]['index'],
+                            (pos[axes[0]], pos[axes[1]])))
+
+
+def create_modules(magnet_class=MagnetDummy, counter_class=FluorescenceCounterDummy,
+                   clock_frequency=200):
+    """
+    Create and activate the magnet dummy, the fluorescence counter and the logic modules outside
+    of the manager. The counter logic runs in its own thread, like in qudi.
+
+    The optimizer, confocal, trace analysis and sequence generator logic are only created for the
+    connectors of the MagnetLogic, they are not used by the fluorescence alignment without
+    refocus.
+
+    @param class magnet_class: class of the magnet dummy
+    @param class counter_class: class of the counter dummy, a FluorescenceCounterDummy
+    @param float clock_frequency: clock frequency of the counter in Hz
+
+    @return tuple: (magnet, counter dummy, counter logic, magnet logic, counter thread)
+    """
+    fit_logic = FitLogic(manager=None, name='fitlogic', config={})
+    fit_logic.module_state.activate()
+    save_logic = SaveLogic(manager=None, name='savelogic', config={})
+    save_logic.module_state.activate()
+
+    magnet = magnet_class(manager=None, name='magnet', config={})
+    magnet.module_state.activate()
+    magnet.move_abs(CENTER)
+
+    counter = counter_class(manager=None,
+                            name='counter',
+                            config={'clock_frequency': clock_frequency,
+                                    'samples_number': 1,
+                                    'source_channels': 1})
+    counter.module_state.activate()
+    counter.magnet = magnet
+    counter_logic = CounterLogic(manager=None, name='counterlogic', config={})
+    counter_logic.connectors['counter1'].connect(counter)
+    counter_logic.connectors['savelogic'].connect(save_logic)
+    # move to the thread before the activation connects the signals of the count loop
+    counter_thread = QtCore.QThread()
+    counter_logic.moveToThread(counter_thread)
+    counter_thread.start()
+    counter_logic.module_state.activate()
+    counter_logic.set_count_frequency(clock_frequency)
+
+    odmr_counter = ODMRCounterDummy(manager=None, name='odmrcounter', config={})
+    odmr_counter.connectors['fitlogic'].connect(fit_logic)
+    odmr_counter.module_state.activate()
+    microwave = MicrowaveDummy(manager=None, name='microwave', config={})
+    microwave.module_state.activate()
+    odmr_logic = ODMRLogic(manager=None, name='odmrlogic', config={})
+    odmr_logic.connectors['odmrcounter'].connect(odmr_counter)
+    odmr_logic.connectors['fitlogic'].connect(fit_logic)
+    odmr_logic.connectors['microwave1'].connect(microwave)
+    odmr_logic.connectors['savelogic'].connect(save_logic)
+    odmr_logic.connectors['taskrunner'].connect(
+        TaskRunner(manager=None, name='tasklogic', config={}))
+    odmr_logic.module_state.activate()
+
+    scanner = ConfocalScannerDummy(manager=None, name='scanner', config={})
+    pulser = PulserDummy(manager=None, name='pulser', config={})
+    unused = {'optimizerlogic': OptimizerLogic(manager=None, name='optimizer', config={}),
+              'scannerlogic': ConfocalLogic(manager=None, name='confocal', config={}),
+              'traceanalysis': TraceAnalysisLogic(manager=None, name='traceanalysis', config={}),
+              'sequencegeneratorlogic': SequenceGeneratorLogic(manager=None,
+                                                               name='sequencegenerator',
+                                                               config={})}
+    unused['optimizerlogic'].connectors['confocalscanner1'].connect(scanner)
+    unused['scannerlogic'].connectors['confocalscanner1'].connect(scanner)
+    unused['sequencegeneratorlogic'].connectors['pulsegenerator'].connect(pulser)
+
+    magnet_logic = MagnetLogic(manager=None, name='magnetlogic', config={})
+    magnet_logic.connectors['magnetstage'].connect(magnet)
+    magnet_logic.connectors['counterlogic'].connect(counter_logic)
+    magnet_logic.connectors['gatedcounterlogic'].connect(counter_logic)
+    magnet_logic.connectors['odmrlogic'].connect(odmr_logic)
+    magnet_logic.connectors['savelogic'].connect(save_logic)
+    for connector, module in unused.items():
+        magnet_logic.connectors[connector].connect(module)
+    magnet_logic.module_state.activate()
+    magnet_logic.set_optimize_pos_freq(0)
+    magnet_logic.set_align_2d_axis0_name('x')
+    magnet_logic.set_align_2d_axis1_name('y')
+    return magnet, counter, counter_logic, magnet_logic, counter_thread
+
+
+def set_grid(magnet_logic, num_points, step, velocities):
+    """
+    Set a square alignment grid of num_points per axis around the current position.
+    """
+    magnet_logic.set_align_2d_axis0_range((num_points - 1) * step)
+    magnet_logic.set_align_2d_axis0_step(step)
+    magnet_logic.set_align_2d_axis0_vel(velocities[0])
+    magnet_logic.set_align_2d_axis1_range((num_points - 1) * step)
+    magnet_logic.set_align_2d_axis1_step(step)
+    magnet_logic.set_align_2d_axis1_vel(velocities[1])
+
+
+def run_alignment(app, magnet_logic, stepwise_meas=True, timeout=300):
+    """
+    Run a 2D alignment and wait until it has finished.
+
+    @return bool: True if the alignment finished before the timeout
+    """
+    finished = list()
+
+    def measurement_finished():
+        finished.append(True)
+        app.quit()
+
+    magnet_logic.sigMeasurementFinished.connect(measurement_finished)
+    QtCore.QTimer.singleShot(0, lambda: magnet_logic.start_2d_alignment(stepwise_meas))
+    timer = QtCore.QTimer()
+    timer.setSingleShot(True)
+    timer.timeout.connect(app.quit)
+    timer.start(int(timeout * 1000))
+    app.exec_()
+    timer.stop()
+    magnet_logic.sigMeasurementFinished.disconnect(measurement_finished)
+    return bool(finished)
+
+
+def peak_index(magnet_logic):
+    """
+    @return tuple: grid index (axis0, axis1) of the maximum of the measured data
+    """
+    matrix = magnet_logic.get_2d_data_matrix()
+    return tuple(int(i) for i in np.unravel_index(np.argmax(matrix), np.shape(matrix)))
+
+
+def grid_index(magnet_logic, position):
+    """
+    @return tuple: grid index (axis0, axis1) of a position (axis label -> position)
+    """
+    axis0, axis1 = magnet_logic.get_2d_axis_arrays()
+    return (int(np.argmin(np.abs(axis0 - position[magnet_logic.align_2d_axis0_name]))),
+            int(np.argmin(np.abs(axis1 - position[magnet_logic.align_2d_axis1_name]))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulate the stepwise and the adaptive 2D '
+                                                 'magnet alignment against the magnet dummy.')
+    parser.add_argument('--points', type=int, default=11,
+                        help='grid points per axis of the pathway mode runs (default: 11)')
+    parser.add_argument('--adaptive-points', type=int, default=41,
+                        help='grid points per axis of the adaptive run (default: 41)')
+    parser.add_argument('--integration-time', type=float, default=0.05,
+                        help='fluorescence integration time per point in s (default: 0.05)')
+    args = parser.parse_args()
+
+    app = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication(sys.argv)
+    magnet, counter, counter_logic, magnet_logic, counter_thread = create_modules()
+    magnet_logic.set_fluorescence_integration_time(args.integration_time)
+    recorder = MeasurementRecorder(magnet_logic)
+    step = 1e-3
+    # axis1 moves slower, so the pathway modes differ in travel time
+    velocities = (1e-3, 0.25e-3)
+    passed = True
+
+    print('{0:>18s} {1:>8s} {2:>6s} {3:>13s} {4:>6s} {5:>15s} {6:>6s}'.format(
+        'pathway mode', 'points', 'peak', 'path (steps)', 'gain', 'travel time (s)', 'gain'))
+    set_grid(magnet_logic, args.points, step, velocities)
+    counter.peak_position = {'x': CENTER['x'] + 2 * step, 'y': CENTER['y'] - 3 * step}
+    counter.peak_width = 2 * step
+    reference = None
+    for mode in PATHWAY_MODES:
+        magnet_logic.set_2d_pathway_mode(mode)
+        recorder.points = list()
+        if not run_alignment(app, magnet_logic):
+            print('{0:>18s}: FAILED (timeout)'.format(mode))
+            passed = False
+            continue
+        indices = [index for index, _ in recorder.points]
+        positions = np.array([pos for _, pos in recorder.points])
+        counts = collections.Counter(indices)
+        grid = {(i, j) for i in range(args.points) for j in range(args.points)}
+        once = set(counts) == grid and all(count == 1 for count in counts.values())
+        peak_found = peak_index(magnet_logic) == grid_index(magnet_logic, counter.peak_position)
+        # the pathway runs from and back to the center
+        start = (CENTER['x'], CENTER['y'])
+        path_length = np.sum(np.linalg.norm(np.diff(np.vstack((start, positions, start)),
+                                                    axis=0), axis=1)) / step
+        travel_time = estimate_pathway_duration(positions, velocities, start_position=start)
+        if reference is None:
+            reference = path_length, travel_time
+        failures = list()
+        if not once:
+            failures.append('grid points not measured exactly once')
+        if not peak_found:
+            failures.append('peak missed')
+        # the ramp-time mode considers the serpentines, so it must not be slower
+        if mode == 'ramp-time' and travel_time > reference[1] * (1 + 1e-9):
+            failures.append('slower than snake-wise')
+        print('{0:>18s} {1:>8d} {2:>6s} {3:>13.1f} {4:>5.0f}% {5:>15.1f} {6:>5.0f}% {7}'.format(
+            mode, len(indices), 'found' if peak_found else 'missed', path_length,
+            100 * (1 - path_length / reference[0]), travel_time,
+            100 * (1 - travel_time / reference[1]),
+            'FAILED: ' + ', '.join(failures) if failures else ''))
+        passed &= not failures
+
+    # adaptive alignment on a finer grid, peak between the points of the coarse grid
+    magnet_logic.set_2d_pathway_mode('snake-wise')
+    magnet_logic.set_2d_adaptive_alignment(enabled=True, coarse_step=4, optimum='max')
+    set_grid(magnet_logic, args.adaptive_points, step, velocities)
+    counter.peak_position = {'x': CENTER['x'] + 7 * step, 'y': CENTER['y'] - 5 * step}
+    counter.peak_width = 5 * step
+    recorder.points = list()
+    if run_alignment(app, magnet_logic):
+        indices = [index for index, _ in recorder.points]
+        at_most_once = len(set(indices)) == len(indices)
+        peak_found = peak_index(magnet_logic) == grid_index(magnet_logic, counter.peak_position)
+        fewer = len(indices) <= args.adaptive_points ** 2 / 5
+        adaptive_passed = at_most_once and peak_found and fewer
+        print('adaptive: {0} ({1:d} of {2:d} points measured, peak {3}{4})'.format(
+            'passed' if adaptive_passed else 'FAILED', len(indices), args.adaptive_points ** 2,
+            'found' if peak_found else 'missed',
+            '' if at_most_once else ', points measured more than once'))
+        passed &= adaptive_passed
+    else:
+        print('adaptive: FAILED (timeout)')
+        passed = False
+    magnet_logic.set_2d_adaptive_alignment(enabled=False)
+
+    counter_logic.stopCount()
+    counter_thread.quit()
+    counter_thread.wait()
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == '__main__':
+    main()